@@ -90,7 +90,21 @@ class BidAnnouncementsApplication:
         if self.args.run_step0_prepare_documents:
             self._run_step0()
 
-        self.service.step3(remove_table=self.args.step3_remove_table)
+        self.service.step3(
+            remove_table=self.args.step3_remove_table,
+            engine=self.args.step3_engine,
+            batch_size=self.args.step3_batch_size,
+            flush_size=self.args.step3_flush_size,
+            incremental=self.args.step3_incremental,
+            prefilter=self.args.step3_prefilter,
+            result_cache=self.args.step3_result_cache,
+            result_cache_path=self.args.step3_result_cache_path,
+            profile_report=self.args.step3_profile_report,
+            profile_dir=self.args.step3_profile_dir,
+            early_exit=self.args.step3_early_exit,
+            early_exit_costs=self.args.step3_early_exit_costs,
+            refill_partial=self.args.step3_refill_partial,
+        )
         print("Ended step3.")
 
     def _create_db_operator(self):
@@ -123,6 +137,7 @@ class BidAnnouncementsApplication:
             sys.exit(1)
         return DBOperatorSQLITE3(
             sqlite3_db_file_path=str(path_obj),
+            sqlite3_performance_mode=self.args.sqlite3_performance_mode,
         )
 
     def _run_step0(self):
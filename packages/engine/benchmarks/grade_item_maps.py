@@ -0,0 +1,99 @@
+# coding: utf-8 -*-
+"""
+業種・等級要件 (checkGradeAndItemRequirement) の1回あたりの判定時間を計測する。
+
+- before: DataFrame を渡す従来の呼び出し。呼び出しごとに agencyMap / constructionMap を
+  iterrows で作り直し、ライセンスを office_no で全件フィルタする。
+- after: MasterSnapshot を渡す呼び出し。agencyMap / constructionMap と拠点ごとの
+  ライセンスリストはスナップショットで1回だけ作る。
+
+リポジトリのルートで実行する::
+
+    python -m packages.engine.benchmarks.grade_item_maps --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import pandas as pd
+
+import packages.engine.domain  # noqa: F401  (requirements は domain 経由で import する)
+from packages.engine.requirements.grade_item import checkGradeAndItemRequirement
+from packages.engine.requirements.snapshot import MasterSnapshot
+
+REQUIREMENT_TEXTS = [
+    "全省庁統一資格の「物品の販売」に係る等級がA、B、C、D等級であること",
+    "国土交通省の土木一式工事でB等級以上に格付けされていること",
+    "防衛省の建築工事で1200点以上であること",
+    "電気工事に係る一般競争参加資格を有し九州・沖縄の地域",
+]
+
+
+def loadMasters(data_dir):
+    return {
+        "office_registration_authorization_with_converter": pd.read_csv(
+            os.path.join(data_dir, "office_registration_authorization_master.txt"), sep="\t",
+            converters={"construction_no": lambda x: str(x)}
+        ),
+        "agency": pd.read_csv(os.path.join(data_dir, "agency_master.txt"), sep="\t"),
+        "construction": pd.read_csv(os.path.join(data_dir, "construction_master.txt"), sep="\t"),
+    }
+
+
+def _timePerCall(calls, repeat):
+    """calls を repeat 回流し、1回あたりの時間 (マイクロ秒) の中央値を返す。"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for call in calls:
+            call()
+        timings.append((time.perf_counter() - start) / len(calls) * 1e6)
+    return statistics.median(timings)
+
+
+def run(data_dir="data/master", repeat=5):
+    masters = loadMasters(data_dir)
+    licenses = masters["office_registration_authorization_with_converter"]
+    office_nos = licenses["office_no"].drop_duplicates().tolist()
+    snapshot = MasterSnapshot(masters)
+
+    before_calls = []
+    after_calls = []
+    for text in REQUIREMENT_TEXTS:
+        for office_no in office_nos:
+            before_calls.append(lambda text=text, office_no=office_no: checkGradeAndItemRequirement(
+                requirementText=text,
+                officeNo=office_no,
+                licenseData=licenses,
+                agencyData=masters["agency"],
+                constructionData=masters["construction"],
+            ))
+            after_calls.append(lambda text=text, office_no=office_no: checkGradeAndItemRequirement(
+                requirementText=text,
+                officeNo=office_no,
+                snapshot=snapshot,
+            ))
+
+    # 両者の判定結果が一致することを確認してから計測する
+    mismatched = [i for i, (before, after) in enumerate(zip(before_calls, after_calls)) if before() != after()]
+    if mismatched:
+        raise AssertionError(f"before/after の判定結果が一致しません: {len(mismatched)} 件")
+
+    before_us = _timePerCall(before_calls, repeat)
+    after_us = _timePerCall(after_calls, repeat)
+    print(f"agency={masters['agency'].shape[0]} construction={masters['construction'].shape[0]} "
+          f"licenses={licenses.shape[0]} calls={len(before_calls)}")
+    print(f"before (maps rebuilt per call) : {before_us:10.1f} us/call")
+    print(f"after  (maps built once)       : {after_us:10.1f} us/call")
+    print(f"speedup                        : {before_us / after_us:10.1f}x")
+    return before_us, after_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="checkGradeAndItemRequirement の1回あたりの判定時間を計測する")
+    parser.add_argument("--data_dir", default="data/master")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(data_dir=args.data_dir, repeat=args.repeat)
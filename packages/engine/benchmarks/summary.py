@@ -0,0 +1,197 @@
+# coding: utf-8 -*-
+"""
+拠点1件 x 公告1件の判定結果のサマリー化 (_summarize_office_judgement) の時間を計測する。
+
+- before: 判定ごとに要件の結果から DataFrame を作り、is_ok で絞り込んで
+  要件種別ごとに unique / str.replace する従来の処理。
+- after: 要件の結果を1回走査し、種別ごとの "種別:" パターンをコンパイル済みで使う処理。
+
+リポジトリのルートで実行する::
+
+    python -m packages.engine.benchmarks.summary --repeat 5
+"""
+
+import argparse
+import itertools
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+import packages.engine.domain  # noqa: F401  (requirements は domain 経由で import する)
+from packages.engine.domain.master import REQUIREMENT_TYPE_COLUMNS, _summarize_office_judgement
+from packages.engine.requirements.compiled import CompiledRequirement
+
+# 要件種別ごとの (充足, 不足) の理由の例
+REASONS = {
+    "欠格要件": ("欠格要件：欠格データなし => OK", "欠格要件：指名停止中です"),
+    "業種・等級要件": ("業種・等級要件：土木一式工事 A等級 => OK", "業種・等級要件：拠点ID=1にライセンス情報がありません"),
+    "所在地要件": ("所在地要件：愛知県に本店があります", "所在地要件：要求地域(愛知県)に拠点がありません"),
+    "実績要件": ("実績要件：過去実績あり", "実績要件 : 拠点ID=1に実績情報が見つかりません"),
+    "技術者要件": ("技術者要件：1級土木施工管理技士 2名", "技術者要件：従業員資格情報が見つかりません"),
+    "その他要件": ("その他要件：確認済み", "その他要件があります。確認してください"),
+}
+
+
+def summarizeWithDataFrame(announcement_no, company_no, office_no, evaluation_no, evaluated, now=None):
+    """user-013 より前の _summarize_office_judgement (判定ごとに DataFrame を作ってサマリー化する)。"""
+    if now is None:
+        now = datetime.now()
+    tmp_result_judgement_list = []
+    sufficient_list = []
+    insufficient_list = []
+
+    for compiled, val in evaluated:
+        requirement_type = compiled.requirement_type
+        requirement_no = compiled.requirement_no
+
+        tmp_result_judgement_list.append({
+            "evaluation_no":evaluation_no,
+            "requirement_no":requirement_no,
+            "company_no":company_no,
+            "office_no":office_no,
+            "requirementType":requirement_type,
+            "is_ok":val["is_ok"],
+            "result":val["reason"]
+        })
+
+        if val["is_ok"]:
+            sufficient_list.append({
+                "sufficiency_detail_no":str(uuid.uuid4()),
+                "evaluation_no":evaluation_no,
+                "announcement_no":announcement_no,
+                "requirement_no":requirement_no,
+                "company_no":company_no,
+                "office_no":office_no,
+                "requirement_type":requirement_type,
+                "requirement_description":val["reason"],
+                "createdDate":now,
+                "updatedDate":now
+            })
+        else:
+            insufficient_list.append({
+                "shortage_detail_no":str(uuid.uuid4()),
+                "evaluation_no":evaluation_no,
+                "announcement_no":announcement_no,
+                "requirement_no":requirement_no,
+                "company_no":company_no,
+                "office_no":office_no,
+                "requirement_type":requirement_type,
+                "requirement_description":val["reason"],
+                "suggestions_for_improvement":"",
+                "final_comment":"",
+                "createdDate":now,
+                "updatedDate":now
+            })
+
+    # サマリー化
+    tmp_result_judgement_df = pd.DataFrame(tmp_result_judgement_list)
+
+    checked_requirement = {
+        "evaluation_no":evaluation_no,
+        "announcement_no":announcement_no,
+        "company_no":company_no,
+        "office_no":office_no,
+        "requirement_ineligibility":True,
+        "requirement_grade_item":True,
+        "requirement_location":True,
+        "requirement_experience":True,
+        "requirement_technician":True,
+        "requirement_other":True,
+        "deficit_requirement_message":"",
+        "final_status":True,
+        "message":"",
+        "remarks":"",
+        "createdDate":now,
+        "updatedDate":now
+    }
+    requirement_type_map = REQUIREMENT_TYPE_COLUMNS
+
+    is_ok_false = tmp_result_judgement_df[~tmp_result_judgement_df["is_ok"]]
+
+    if is_ok_false.shape[0] > 0:
+        ng_req_types = is_ok_false["requirementType"].unique()
+        for type_ in ng_req_types:
+            type_name = requirement_type_map.get(type_, "requirement_other")
+            checked_requirement[type_name] = False
+            is_ok_false_type = is_ok_false[is_ok_false["requirementType"] == type_]
+            result_values = is_ok_false_type["result"].str.replace(rf"{type_}[:：]", "", regex=True).unique()
+            result_values = "[" + type_ + "]" + "|".join(result_values)
+
+            if checked_requirement["deficit_requirement_message"] == "":
+                checked_requirement["deficit_requirement_message"] = result_values
+            else:
+                checked_requirement["deficit_requirement_message"] = checked_requirement["deficit_requirement_message"] + " " + result_values
+        checked_requirement["final_status"] = False
+
+    return checked_requirement, sufficient_list, insufficient_list
+
+
+def makeEvaluations(n_evaluations, n_requirements=8):
+    """要件数 n_requirements の判定結果を n_evaluations 件作る (不足の有無・種別は順に変える)。"""
+    types = itertools.cycle(REASONS)
+    evaluations = []
+    for i in range(n_evaluations):
+        evaluated = []
+        for requirement_no in range(n_requirements):
+            requirement_type = next(types)
+            is_ok = (i + requirement_no) % 3 != 0
+            evaluated.append((
+                CompiledRequirement(requirement_no, requirement_type, ""),
+                {"is_ok": is_ok, "reason": REASONS[requirement_type][0 if is_ok else 1]},
+            ))
+        evaluations.append(evaluated)
+    return evaluations
+
+
+def _withoutDetailNo(result):
+    checked_requirement, sufficient_list, insufficient_list = result
+    return (
+        checked_requirement,
+        [{k: v for k, v in row.items() if k != "sufficiency_detail_no"} for row in sufficient_list],
+        [{k: v for k, v in row.items() if k != "shortage_detail_no"} for row in insufficient_list],
+    )
+
+
+def _timePerCall(summarize, evaluations, now, repeat):
+    """evaluations を repeat 回サマリー化し、1回あたりの時間 (マイクロ秒) の中央値を返す。"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for evaluated in evaluations:
+            summarize(1, 1, 1, "evaluation", evaluated, now=now)
+        timings.append((time.perf_counter() - start) / len(evaluations) * 1e6)
+    return statistics.median(timings)
+
+
+def run(n_evaluations=2000, n_requirements=8, repeat=5):
+    evaluations = makeEvaluations(n_evaluations, n_requirements)
+    now = datetime.now()
+
+    # 両者のサマリーが一致することを確認してから計測する (UUID の列は除く)
+    mismatched = [
+        i for i, evaluated in enumerate(evaluations)
+        if _withoutDetailNo(summarizeWithDataFrame(1, 1, 1, "evaluation", evaluated, now=now))
+        != _withoutDetailNo(_summarize_office_judgement(1, 1, 1, "evaluation", evaluated, now=now))
+    ]
+    if mismatched:
+        raise AssertionError(f"before/after のサマリーが一致しません: {len(mismatched)} 件")
+
+    before_us = _timePerCall(summarizeWithDataFrame, evaluations, now, repeat)
+    after_us = _timePerCall(_summarize_office_judgement, evaluations, now, repeat)
+    print(f"evaluations={n_evaluations} requirements/evaluation={n_requirements}")
+    print(f"before (DataFrame per evaluation) : {before_us:10.1f} us/call")
+    print(f"after  (single pass)              : {after_us:10.1f} us/call")
+    print(f"speedup                           : {before_us / after_us:10.1f}x")
+    return before_us, after_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="_summarize_office_judgement の1回あたりの時間を計測する")
+    parser.add_argument("--n_evaluations", type=int, default=2000)
+    parser.add_argument("--n_requirements", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(n_evaluations=args.n_evaluations, n_requirements=args.n_requirements, repeat=args.repeat)
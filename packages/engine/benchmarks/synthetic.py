@@ -0,0 +1,371 @@
+# coding: utf-8 -*-
+"""
+判定エンジンのベンチマーク用の合成データを作る。
+
+企業・拠点・ライセンス・従業員・資格・経験・工事実績と公告の要件を、
+拠点数 (1k / 10k / 100k など) を指定して決定的に (seed が同じなら同じ内容で) 生成する。
+発注機関・工種・技術者資格のマスターはリポジトリの data/master をそのまま使う。
+
+- generateSyntheticData: (判定対象の組み合わせ, 要件, master_data_dict) を返す
+- writeMasterFiles: master_data_dict を data/master と同じ形式の TSV に書き出す
+  (MasterRegistry.setMasterDir でそのディレクトリを指すと step3 がそのまま読み込む)
+- loadIntoDatabase: step3 が DB から読むテーブル (企業・欠格情報・公告・要件) を作る
+
+リポジトリのルートで実行すると、生成にかかる時間と件数を表示する::
+
+    python -m packages.engine.benchmarks.synthetic --scale 10k
+"""
+
+import argparse
+import os
+from datetime import datetime
+import random
+import time
+
+import pandas as pd
+
+import packages.engine.domain  # noqa: F401  (requirements は domain 経由で import する)
+from packages.engine.requirements.master_registry import DEFAULT_MASTER_DIR, MASTER_FILES, MasterRegistry
+
+# 規模の名前 -> 拠点数
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000}
+
+PREFECTURES = ["北海道", "青森県", "宮城県", "東京都", "神奈川県", "愛知県", "大阪府", "京都府", "福岡県", "沖縄県", "広島県", "新潟県"]
+OFFICE_TYPES = ["本社", "支店", "営業所", "出張所"]
+
+# 要件種別 -> 要件テキストの例 (公告の要件はここから選ぶ)
+REQUIREMENT_TEXTS = {
+    "欠格要件": [
+        "予算決算及び会計令第70条及び第71条の規定に該当しない者であること。",
+        "会社更生法に基づき更生手続開始の申立てがなされている者又は民事再生法に基づき再生手続開始の申立てがなされている者でないこと。",
+        "暴力団関係業者でないこと。",
+        "指名停止の措置を受けている期間中でないこと。",
+        "破産手続開始の決定を受けていないこと",
+        "社会保険料の滞納がないこと",
+        "成年被後見人でないこと",
+        "情報保全体制が整備されていること",
+    ],
+    "業種・等級要件": [
+        "令和07・08・09年度防衛省競争参加資格(全省庁統一資格)の「役務の提供等」において、開札時までに「C」又は「D」の等級に格付けされ北海道地域の競争参加を希望する者であること",
+        "全省庁統一資格の「物品の販売」に係る等級がA、B、C、D等級であること",
+        "国土交通省の土木一式工事でB等級以上に格付けされていること",
+        "防衛省の建築工事で1200点以上であること",
+        "土木又は舗装の競争参加資格を有すること。東北地域",
+        "法務省の管工事の競争参加資格を有し、東京地域の登録があること",
+        "電気工事に係る一般競争参加資格を有し九州・沖縄の地域",
+    ],
+    "所在地要件": [
+        "愛知県内に本店を有すること",
+        "東京都内に本社、支店又は営業所を有すること",
+        "北関東防衛局管内に支店等を有すること",
+        "福岡県に営業拠点を有すること",
+        "近畿中部防衛局管轄区域内に本店又は支店を有すること",
+    ],
+    "実績要件": [
+        "平成20年度以降に元請けとして完成した土木工事の施工実績を有すること",
+        "令和2年度以降に完成した建築工事の実績があり、工事成績65点以上であること",
+        "2015年度以降に一次請として電気工事の実績を有すること。JV比率20%以上",
+    ],
+    "技術者要件": [
+        "監理技術者資格者証及び監理技術者講習修了証を有する者を専任で配置できること",
+        "1級土木施工管理技士又は2級土木施工管理技士（土木）の資格を有する主任技術者を配置",
+        "1級建築施工管理技士で5年以上の実務経験、工事成績70点以上",
+        "第3種電気主任技術者を配置できること",
+    ],
+    "その他要件": ["JV結成の場合は共同企業体として申請すること", "入札説明書を受領していること"],
+}
+
+DISQUALIFICATION_FLAGS = [
+    "article_70_flag", "article_71_flag", "bankruptcy_flag", "corporate_reorganization_flag",
+    "anti_social_forces_flag", "adult_ward_flag", "foreign_legal_restriction_flag",
+    "subversive_organization_flag", "no_social_insurance_arrears_flag",
+    "information_security_framework_flag", "boj_transaction_suspension_flag",
+]
+
+# REQUIREMENT_TEXTS["実績要件"] のすべてを満たす工事実績 (matching_achievements=True で全拠点に持たせる)
+#   立場 (元請け)・成績点・JV比率 (一次請) の各条件を1件ずつ満たす。
+#   完成日は datetime のまま持つ (pd.Timestamp だと generateSuccessReason の astimezone が tz-naive で例外になる)
+MATCHING_ACHIEVEMENTS = [
+    # 平成20年度以降・元請け・土木
+    {"construction_no": 7, "contractor_layer": "元請け", "completion_date": datetime(2020, 3, 31),
+     "final_score": 80, "is_jv_flag": False, "jv_ratio": None},
+    # 令和2年度以降・建築・成績65点以上
+    {"construction_no": 8, "contractor_layer": "元請け", "completion_date": datetime(2022, 3, 31),
+     "final_score": 75, "is_jv_flag": False, "jv_ratio": None},
+    # 2015年度以降・一次請・電気・JV比率20%以上
+    {"construction_no": 14, "contractor_layer": "一次請", "completion_date": datetime(2023, 3, 31),
+     "final_score": 70, "is_jv_flag": True, "jv_ratio": 40},
+]
+
+LICENSE_COLUMNS = ["office_no", "office_registration_no", "agency_no", "construction_no", "license_grade", "license_score", "status", "is_suspended"]
+ACHIEVEMENT_COLUMNS = [
+    "office_experience_no", "office_no", "agency_no", "construction_no", "project_name", "contractor_layer",
+    "start_date", "completion_date", "final_score", "total_amount", "is_jv_flag", "jv_ratio", "remarks",
+]
+EMPLOYEE_COLUMNS = ["employee_no", "company_no", "office_no", "employee_name", "birthdate", "is_retired_flg"]
+QUALIFICATION_COLUMNS = ["employee_qual_no", "employee_no", "qualification_no", "obtained_date", "license_number", "is_active_flg"]
+EXPERIENCE_COLUMNS = [
+    "employee_experience_no", "employee_no", "project_name", "role_position", "start_date", "end_date",
+    "agency_no", "construction_no", "is_original_contractor_flg", "final_score",
+]
+
+
+def resolveScale(scale):
+    """"10k" などの規模の名前、または拠点数 (int / 数字の文字列) を拠点数にする。"""
+    if isinstance(scale, int):
+        return scale
+    if scale in SCALES:
+        return SCALES[scale]
+    return int(scale)
+
+
+def generateSyntheticData(
+    n_offices=1000,
+    offices_per_company=2,
+    n_announcements=10,
+    requirements_per_announcement=(3, 12),
+    seed=0,
+    achievements=False,
+    matching_achievements=False,
+    master_dir=DEFAULT_MASTER_DIR,
+):
+    """
+    合成データを生成する。
+
+    Args:
+        n_offices: 拠点数
+        offices_per_company: 企業あたりの拠点数
+        n_announcements: 公告数 (判定対象は 公告 x 全拠点)
+        requirements_per_announcement: 公告あたりの要件数の範囲 (最小, 最大)
+        seed: 乱数の種
+        achievements: 拠点の工事実績 (office_work_achivements) を作るかどうか。
+            実績のある拠点が実績要件を満たさないと experience.generateFailureReason が
+            tz-naive の Timestamp で例外になるため、step3 全体を流す場合は False のままにする
+        matching_achievements: 全拠点に MATCHING_ACHIEVEMENTS の工事実績を持たせるかどうか (achievements より優先)。
+            実績要件はすべて成功 (generateSuccessReason) になるので、実績要件の判定で最も重い経路を計測できる。
+            完成日が datetime の列なので、master_data_dict をそのまま _process_judgement_chunk に渡して使う
+            (writeMasterFiles で TSV にすると完成日が文字列になり、実績要件を満たさなくなる)
+        master_dir: 発注機関・工種・技術者資格のマスターを読むディレクトリ
+
+    Returns:
+        tuple: (pairs, req_df, master_data_dict)
+            pairs は preselectCompanyBidJudgement と同じ列 (announcement_no, company_no, office_no)、
+            req_df は bid_requirements と同じ列、master_data_dict は step3 と同じキー
+    """
+    rng = random.Random(seed)
+    registry = MasterRegistry(master_dir)
+    agency = registry.get("agency")
+    construction = registry.get("construction")
+    technician_qualification = registry.get("technician_qualification")
+    agency_nos = agency["agency_no"].tolist()[:60]
+    # 親機関のある発注機関 (getAgencyInfo は親機関が見つからないと例外になる)
+    child_agency_nos = [no for no in agency_nos if no in set(agency.loc[agency["parent_agency_no"].notna(), "agency_no"])]
+    construction_nos = construction["construction_no"].tolist()
+    qualification_nos = technician_qualification["qualification_no"].tolist()
+
+    n_companies = max(1, -(-n_offices // offices_per_company))
+    company = pd.DataFrame({
+        "company_no": range(1, n_companies + 1),
+        "id": [f"cmp-{i}" for i in range(1, n_companies + 1)],
+        "is_customer": True,
+    })
+
+    disqualification_rows = []
+    for company_no in range(1, n_companies + 1):
+        if rng.random() < 0.7:
+            row = {"company_id": f"cmp-{company_no}"}
+            for flag in DISQUALIFICATION_FLAGS:
+                row[flag] = rng.random() < 0.15
+            row["corporate_reorganization_start_date"] = None
+            row["post_reorganization_reacquisition_date"] = rng.choice([None, "2020-01-01"])
+            disqualification_rows.append(row)
+
+    office_rows, license_rows, achievement_rows = [], [], []
+    employee_rows, qualification_rows, experience_rows = [], [], []
+    for office_no in range(1, n_offices + 1):
+        company_no = (office_no - 1) // offices_per_company + 1
+        prefecture = rng.choice(PREFECTURES)
+        office_rows.append({
+            "office_no": office_no,
+            "company_no": company_no,
+            "office_name": f"会社{company_no}",
+            "office_type": rng.choice(OFFICE_TYPES),
+            "office_address": prefecture + "某市1-2-3",
+            "Located_Prefecture": prefecture if rng.random() < 0.9 else None,
+        })
+        for registration_no in range(rng.randint(0, 6)):
+            license_rows.append({
+                "office_no": office_no,
+                "office_registration_no": registration_no,
+                "agency_no": rng.choice(agency_nos),
+                "construction_no": rng.choice(construction_nos),
+                "license_grade": rng.choice(["A", "B", "C", "D", None]),
+                "license_score": rng.choice([42, 800, 1200, 1500, None]),
+                "status": "有効",
+                "is_suspended": int(rng.random() < 0.1),
+            })
+        if matching_achievements:
+            for j, achievement in enumerate(MATCHING_ACHIEVEMENTS):
+                achievement_rows.append({
+                    "office_experience_no": len(achievement_rows) + 1,
+                    "office_no": office_no,
+                    "agency_no": rng.choice(child_agency_nos),
+                    "project_name": f"工事{j}",
+                    "start_date": f"{achievement['completion_date'].year - 1}-04-01",
+                    "total_amount": 1000,
+                    "remarks": None,
+                    **achievement,
+                })
+        for j in range(rng.randint(0, 4) if achievements and not matching_achievements else 0):
+            year = rng.randint(2005, 2024)
+            achievement_rows.append({
+                "office_experience_no": len(achievement_rows) + 1,
+                "office_no": office_no,
+                "agency_no": rng.choice(agency_nos),
+                "construction_no": rng.choice(construction_nos),
+                "project_name": f"工事{j}",
+                "contractor_layer": rng.choice(["元請け", "一次請", "二次請"]),
+                "start_date": f"{year - 1}-04-01",
+                "completion_date": f"{year}-03-31",
+                "final_score": rng.choice([60, 70, 80, None]),
+                "total_amount": 1000,
+                "is_jv_flag": rng.random() < 0.3,
+                "jv_ratio": rng.choice([10, 30, 50]),
+                "remarks": None,
+            })
+        for _ in range(rng.randint(0, 3)):
+            employee_no = len(employee_rows) + 1
+            employee_rows.append({
+                "employee_no": employee_no,
+                "company_no": company_no,
+                "office_no": office_no,
+                "employee_name": f"技術者{employee_no}",
+                "birthdate": "1980-01-01",
+                "is_retired_flg": rng.random() < 0.1,
+            })
+            for _ in range(rng.randint(0, 3)):
+                qualification_rows.append({
+                    "employee_qual_no": len(qualification_rows) + 1,
+                    "employee_no": employee_no,
+                    "qualification_no": int(rng.choice(qualification_nos)),
+                    "obtained_date": "2010-01-01",
+                    "license_number": "x",
+                    "is_active_flg": rng.random() < 0.9,
+                })
+            for _ in range(rng.randint(0, 2)):
+                experience_rows.append({
+                    "employee_experience_no": len(experience_rows) + 1,
+                    "employee_no": employee_no,
+                    "project_name": "p",
+                    "role_position": "主任",
+                    "start_date": "2010-01-01",
+                    "end_date": "2015-01-01",
+                    "agency_no": 1,
+                    "construction_no": 7,
+                    "is_original_contractor_flg": True,
+                    "final_score": 75,
+                })
+
+    office = pd.DataFrame(office_rows)
+    licenses = pd.DataFrame(license_rows, columns=LICENSE_COLUMNS)
+    licenses_with_converter = licenses.copy()
+    licenses_with_converter["construction_no"] = licenses_with_converter["construction_no"].astype(str)
+    master_data_dict = {
+        "company": company,
+        "disqualifications": pd.DataFrame(disqualification_rows),
+        "office": office,
+        "office_registration_authorization": licenses,
+        "office_registration_authorization_with_converter": licenses_with_converter,
+        "agency": agency,
+        "construction": construction,
+        "office_work_achivements": _achievementFrame(achievement_rows),
+        "employee": pd.DataFrame(employee_rows, columns=EMPLOYEE_COLUMNS),
+        "employee_qualification": pd.DataFrame(qualification_rows, columns=QUALIFICATION_COLUMNS),
+        "technician_qualification": technician_qualification,
+        "employee_experience": pd.DataFrame(experience_rows, columns=EXPERIENCE_COLUMNS),
+    }
+
+    requirement_rows = []
+    requirement_types = list(REQUIREMENT_TEXTS)
+    for announcement_no in range(1, n_announcements + 1):
+        for requirement_no in range(rng.randint(*requirements_per_announcement)):
+            requirement_type = rng.choice(requirement_types)
+            requirement_rows.append({
+                "announcement_no": announcement_no,
+                "requirement_no": requirement_no,
+                "requirement_type": requirement_type,
+                "requirement_text": rng.choice(REQUIREMENT_TEXTS[requirement_type]),
+            })
+    req_df = pd.DataFrame(requirement_rows)
+
+    pairs = pd.DataFrame({
+        "announcement_no": [a for a in range(1, n_announcements + 1) for _ in range(n_offices)],
+        "company_no": office["company_no"].tolist() * n_announcements,
+        "office_no": office["office_no"].tolist() * n_announcements,
+    })
+    return pairs, req_df, master_data_dict
+
+
+def _achievementFrame(achievement_rows):
+    achievements = pd.DataFrame(achievement_rows, columns=ACHIEVEMENT_COLUMNS)
+    if achievement_rows and isinstance(achievement_rows[0]["completion_date"], datetime):
+        # datetime64 (pd.Timestamp) にせず datetime のまま持つ
+        achievements["completion_date"] = pd.Series([row["completion_date"] for row in achievement_rows], dtype=object)
+    return achievements
+
+
+def writeMasterFiles(master_data_dict, master_dir):
+    """master_data_dict のうちファイル由来のマスターを data/master と同じ形式 (TSV) で書き出す。"""
+    os.makedirs(master_dir, exist_ok=True)
+    for name, (filename, _) in MASTER_FILES.items():
+        if name.endswith("_with_converter"):
+            # 同じファイルを読み方だけ変えて使う
+            continue
+        master_data_dict[name].to_csv(os.path.join(master_dir, filename), sep="\t", index=False)
+
+
+def loadIntoDatabase(db_operator, tablenamesconfig, req_df, master_data_dict):
+    """
+    step3 が DB から読むテーブルを合成データで作る。
+
+    企業 (companies) と欠格情報 (company_disqualifications) は master_data_dict から、
+    公告 (bid_announcements) と公告文書 (bid_announcements_document_table) は req_df の公告番号から、
+    要件 (bid_requirements) は req_df から作る。
+    """
+    announcement_nos = sorted(req_df["announcement_no"].unique().tolist())
+    db_operator.uploadDataToTable(data=master_data_dict["company"], tablename="companies", chunksize=5000)
+    db_operator.uploadDataToTable(data=master_data_dict["disqualifications"], tablename="company_disqualifications", chunksize=5000)
+    db_operator.uploadDataToTable(
+        data=pd.DataFrame({"announcement_no": announcement_nos}),
+        tablename=tablenamesconfig.bid_announcements,
+        chunksize=5000,
+    )
+    db_operator.uploadDataToTable(
+        data=pd.DataFrame({
+            "announcement_id": announcement_nos,
+            "document_id": [f"doc-{announcement_no}" for announcement_no in announcement_nos],
+        }),
+        tablename=tablenamesconfig.bid_announcements_document_table,
+        chunksize=5000,
+    )
+    db_operator.uploadDataToTable(data=req_df, tablename=tablenamesconfig.bid_requirements, chunksize=5000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="判定エンジンのベンチマーク用の合成データを生成する")
+    parser.add_argument("--scale", default="1k", help=f"拠点数 ({' / '.join(SCALES)} または数値)")
+    parser.add_argument("--n_announcements", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--master_dir", default=None, help="指定するとマスターを TSV で書き出す")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pairs, req_df, master_data_dict = generateSyntheticData(
+        n_offices=resolveScale(args.scale), n_announcements=args.n_announcements, seed=args.seed
+    )
+    print(f"generated in {time.perf_counter() - start:.1f}s: pairs={pairs.shape[0]} requirements={req_df.shape[0]}")
+    for name, data in master_data_dict.items():
+        print(f"  {name}: {data.shape[0]} rows")
+    if args.master_dir is not None:
+        writeMasterFiles(master_data_dict, args.master_dir)
+        print(f"wrote masters to {args.master_dir}")
@@ -15,6 +15,8 @@ def build_parser():
 
     # DB接続設定
     parser.add_argument("--sqlite3_db_file_path", default=None)
+    parser.add_argument("--sqlite3_performance_mode", action="store_true",
+                        help="SQLite を WAL・synchronous=NORMAL などの性能重視の PRAGMA で開く")
     parser.add_argument("--bigquery_location", default=None)
     parser.add_argument("--bigquery_project_id", default=None)
     parser.add_argument("--bigquery_dataset_name", default=None)
@@ -100,6 +102,30 @@ def build_parser():
 
     # その他
     parser.add_argument("--step3_remove_table", action="store_true")
+    parser.add_argument("--step3_engine", choices=["row", "columnar"], default="row",
+                        help="step3の判定エンジン（row: 拠点x要件ごと / columnar: 要件ごとに全拠点をまとめて判定）")
+    parser.add_argument("--step3_batch_size", type=int, default=None,
+                        help="step3でワーカーに渡すバッチ1件あたりの要件判定回数（未指定時はワーカー数から自動で決める）")
+    parser.add_argument("--step3_flush_size", type=int, default=50000,
+                        help="step3の判定結果をDBに書き込む単位（企業公告判定・充足要件・不足要件の合計行数）")
+    parser.add_argument("--step3_incremental", action="store_true",
+                        help="step3で前回から入力データが変わった拠点・公告の組み合わせだけを判定し直す")
+    parser.add_argument("--step3_prefilter", action="store_true",
+                        help="step3で業種・等級要件と所在地要件を先に判定し、満たさない組み合わせは他の要件を判定しない")
+    parser.add_argument("--step3_result_cache", action="store_true",
+                        help="step3で同じ拠点・同じ要件テキストの判定結果をメモ化する（rowエンジンのみ）")
+    parser.add_argument("--step3_result_cache_path", default=None,
+                        help="step3でメモ化した判定結果を保存するファイル（指定すると --step3_result_cache も有効になる）")
+    parser.add_argument("--step3_profile_report", default=None,
+                        help="step3のフェーズ・checkerごとの処理時間と呼び出し回数を書き出すファイル（.csvならCSV、それ以外はJSON）")
+    parser.add_argument("--step3_profile_dir", default=None,
+                        help="step3のワーカーごとのcProfileの結果（step3_worker_<pid>.prof）を書き出すディレクトリ")
+    parser.add_argument("--step3_early_exit", action="store_true",
+                        help="step3で判定コストの低い要件から判定し、満たさない要件があればその他の要件を判定しない（スクリーニング用）")
+    parser.add_argument("--step3_early_exit_costs", default=None,
+                        help="早期打ち切りの判定順に使う計測結果のファイル（--step3_profile_report の出力）")
+    parser.add_argument("--step3_refill_partial", action="store_true",
+                        help="step3で事前判定・早期打ち切りにより一部の要件しか判定していない組み合わせを判定し直す")
     parser.add_argument("--ocr_json_debug_output_path", default=None,
                         help="OCR JSON 生成対象の document_id とパスを書き出すCSVパス（デバッグ用途）")
 
@@ -40,6 +40,7 @@ from packages.engine.domain.notice_structures import (
     slugify_identifier,
     parse_japanese_date,
 )
+from packages.engine.repository.base import BID_ANNOUNCEMENTS_COLUMNS, BID_REQUIREMENTS_COLUMNS
 
 
 FILE_LINK_PATTERN = re.compile(r'\.(pdf|xlsx?|csv|zip|docx?|txt)$', re.IGNORECASE)
@@ -1546,21 +1547,20 @@ class DocumentPreparationMixin:
             print("\n--- DB-based merge processing ---")
             print(f"[DEBUG] df_new document_id sample: {df_new['document_id'].head(10).tolist()}")
 
-            tmp_table = "tmp_new_announcements_document"
-            print(f"Uploading {len(df_new)} records to temporary table: {tmp_table}")
-            self.db_operator.uploadDataToTable(df_new, tmp_table, chunksize=5000)
+            # 比較クエリは any_query (別の接続) で読むので temporary にはしない
+            with self.db_operator.stagingTable(df_new, "tmp_new_announcements_document") as tmp_table:
+                print(f"Uploaded {len(df_new)} records to temporary table: {tmp_table}")
 
-            if self.db_operator.ifTableExists(existing_table):
-                print(f"Comparing with existing table: {existing_table}")
-                df_new_only = self._get_new_documents_from_db(tmp_table, existing_table)
-                print(f"[DEBUG] Found {len(df_new_only)} new records (not in DB)")
-                if len(df_new_only) > 0:
-                    print(f"[DEBUG] New document_id sample: {df_new_only['document_id'].head(10).tolist()}")
-            else:
-                print(f"Table {existing_table} does not exist. All records are new.")
-                df_new_only = df_new.copy()
+                if self.db_operator.ifTableExists(existing_table):
+                    print(f"Comparing with existing table: {existing_table}")
+                    df_new_only = self._get_new_documents_from_db(tmp_table, existing_table)
+                    print(f"[DEBUG] Found {len(df_new_only)} new records (not in DB)")
+                    if len(df_new_only) > 0:
+                        print(f"[DEBUG] New document_id sample: {df_new_only['document_id'].head(10).tolist()}")
+                else:
+                    print(f"Table {existing_table} does not exist. All records are new.")
+                    df_new_only = df_new.copy()
 
-            self.db_operator.dropTable(tmp_table)
             print(f"Dropped temporary table: {tmp_table}")
 
         if len(df_new_only) > 0:
@@ -1657,6 +1657,7 @@ class DocumentPreparationMixin:
         if not self.db_operator.ifTableExists(tablename):
             print(f"Creating new table: {tablename}")
             self.db_operator.uploadDataToTable(df, tablename, chunksize=5000)
+            self.db_operator.ensurePerformanceIndexes("announcements_documents_master", tablename)
             print(f"Created {tablename} with {len(df)} records")
         else:
             self.db_operator.ensure_column(tablename, "ocr_json_path", text_column_type)
@@ -1674,14 +1675,12 @@ class DocumentPreparationMixin:
             ]:
                 self.db_operator.ensure_column(tablename, column, text_column_type)
             print(f"Merging {len(df)} records into existing table: {tablename}")
-            tmp_table = f"tmp_{tablename}_final"
-            self.db_operator.uploadDataToTable(df, tmp_table, chunksize=5000)
-            affected_rows = self.db_operator.mergeAnnouncementsDocumentTable(
-                target_tablename=tablename,
-                source_tablename=tmp_table,
-                columns=df.columns.tolist()
-            )
-            self.db_operator.dropTable(tmp_table)
+            with self.db_operator.stagingTable(df, f"tmp_{tablename}_final", temporary=True) as tmp_table:
+                affected_rows = self.db_operator.mergeAnnouncementsDocumentTable(
+                    target_tablename=tablename,
+                    source_tablename=tmp_table,
+                    columns=df.columns.tolist()
+                )
             print(f"Merged: {affected_rows} rows inserted")
 
 
@@ -1704,13 +1703,14 @@ class DocumentPreparationMixin:
             self.db_operator.createBidAnnouncementsV2(tablename)
 
         print(f"Merging {len(df)} announcements into {tablename}...")
-        tmp_table = f"tmp_{tablename}_ocr"
-        self.db_operator.uploadDataToTable(df, tmp_table, chunksize=5000)
-        affected_rows = self.db_operator.mergeBidAnnouncements(
-            target_tablename=tablename,
-            source_tablename=tmp_table
+        affected_rows = self.db_operator.insertRows(
+            df,
+            tablename,
+            self.db_operator.mergeBidAnnouncements,
+            BID_ANNOUNCEMENTS_COLUMNS,
+            skip_existing_key="announcement_no",
+            prefix=f"tmp_{tablename}_ocr",
         )
-        self.db_operator.dropTable(tmp_table)
         print(f"Merged: {affected_rows} rows inserted")
 
 
@@ -1741,10 +1741,14 @@ class DocumentPreparationMixin:
         df['announcement_no'] = df['announcement_no'].astype('int64')
 
         print(f"Merging {len(df)} requirements into {tablename}...")
-        tmp_table = 'tmp_bid_requirements_ocr'
-        self.db_operator.uploadDataToTable(df, tmp_table, chunksize=5000)
-        affected_rows = self.db_operator.mergeRequirements(tablename, tmp_table)
-        self.db_operator.dropTable(tmp_table)
+        affected_rows = self.db_operator.insertRows(
+            df,
+            tablename,
+            self.db_operator.mergeRequirements,
+            BID_REQUIREMENTS_COLUMNS,
+            skip_existing_key="announcement_no",
+            prefix="tmp_bid_requirements_ocr",
+        )
         print(f"Merged: {affected_rows} rows inserted")
 
 
@@ -1786,10 +1790,8 @@ class DocumentPreparationMixin:
         df['announcement_no'] = pd.to_numeric(df['announcement_no'], errors='coerce').fillna(0).astype('int64')
 
         print(f"Merging {len(df)} announcement date rows into {tablename}...")
-        tmp_table = f"tmp_{tablename}_ocr"
-        self.db_operator.uploadDataToTable(df, tmp_table, chunksize=5000)
-        affected_rows = self.db_operator.replaceBidAnnouncementDates(tablename, tmp_table)
-        self.db_operator.dropTable(tmp_table)
+        with self.db_operator.stagingTable(df, f"tmp_{tablename}_ocr", temporary=True) as tmp_table:
+            affected_rows = self.db_operator.replaceBidAnnouncementDates(tablename, tmp_table)
         print(f"Merged: {affected_rows} rows updated")
 
 
@@ -3,16 +3,232 @@
 JudgementMixin: step3 判定処理と要件分類メソッド。
 """
 
-import re
+import time
 import uuid
+from contextlib import ExitStack, nullcontext
 from datetime import datetime
+from functools import partial
 from multiprocessing import Pool, cpu_count
 
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
 
-from packages.engine.domain.master import _process_judgement_chunk
+from packages.engine.domain.master import (
+    EARLY_EXIT_REQUIREMENT_COSTS,
+    PARTIAL_JUDGEMENT_REMARKS,
+    _JUDGEMENT_WORKER_CONTEXT,
+    _init_judgement_worker,
+    _prefilter_judgement_pairs,
+    _process_judgement_chunk,
+    _process_judgement_chunk_columnar,
+)
+from packages.engine.domain.profiling import Step3Profiler, load_checker_costs
+from packages.engine.domain.requirement_classifier import (
+    classify_requirement_type,
+    expand_requirement_types,
+)
+from packages.engine.repository.base import (
+    COMPANY_BID_JUDGEMENT_COLUMNS,
+    INSUFFICIENT_REQUIREMENTS_COLUMNS,
+    SUFFICIENT_REQUIREMENTS_COLUMNS,
+)
+from packages.engine.requirements.fingerprint import (
+    OFFICE_KEY_COLUMNS,
+    announcementFingerprints,
+    changedKeys,
+    officeFingerprints,
+)
+from packages.engine.requirements.master_registry import getMaster
+from packages.engine.requirements.result_cache import ResultCache
+from packages.engine.requirements.snapshot import MasterSnapshot
+
+# step3 の判定エンジン名 -> チャンク処理関数
+STEP3_ENGINES = {
+    "row": _process_judgement_chunk,
+    "columnar": _process_judgement_chunk_columnar,
+}
+
+# バッチの大きさ (batch_size) を省略したときに、ワーカー1つあたりに割り当てるバッチ数の目安
+STEP3_BATCHES_PER_WORKER = 8
+
+
+def _step3_row_costs(df0, req_df_map):
+    """
+    df0 の各行の判定コスト (その公告の要件数) を返す。
+
+    要件が見つからない行もスキップ処理があるのでコスト 1 とする。
+    """
+    requirement_counts = {announcement_no: len(req_df) for announcement_no, req_df in req_df_map.items()}
+    costs = df0["announcement_no"].map(requirement_counts).fillna(0).to_numpy(dtype=np.int64)
+    return np.maximum(costs, 1)
+
+
+def _split_step3_batches(df0, req_df_map, batch_size=None, n_processes=1):
+    """
+    df0 を行順のまま、判定コスト (要件数) の合計がおよそ batch_size になる連続したバッチに分ける。
+
+    公告ごとに要件数が大きく異なるため、行数ではなく要件数で分けて、1つのワーカーに重いバッチが偏らないようにする。
+    batch_size を省略した場合は、全体のコストを n_processes x STEP3_BATCHES_PER_WORKER 個程度に分ける大きさにする。
+
+    Args:
+        df0: 判定対象 (announcement_no, company_no, office_no を含む DataFrame)
+        req_df_map: announcement_no -> 要件 DataFrame
+        batch_size: バッチ1件あたりの要件判定回数の目安
+        n_processes: ワーカー数
+
+    Returns:
+        list: df0 の連続スライス (DataFrame) のリスト
+    """
+    if len(df0) == 0:
+        return []
+    if batch_size is not None and batch_size < 1:
+        raise ValueError(f"batch_size must be >= 1: {batch_size}")
+
+    costs = _step3_row_costs(df0, req_df_map)
+    if batch_size is None:
+        batch_size = max(1, -(-int(costs.sum()) // (max(1, n_processes) * STEP3_BATCHES_PER_WORKER)))
+
+    # 各行の開始位置 (累積コスト) を batch_size で区切ってバッチ番号にする
+    # 1行で batch_size を超える場合は、その行で今のバッチを閉じ、次の行から新しいバッチになる
+    batch_ids = (np.cumsum(costs) - costs) // batch_size
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(batch_ids)) + 1))
+    ends = np.append(starts[1:], len(df0))
+    return [df0.iloc[start:end] for start, end in zip(starts, ends)]
+
+
+# step3 の判定結果を DB に書き込む単位 (3テーブル合計の行数) の既定値
+STEP3_FLUSH_SIZE = 50000
+
+
+class Step3ResultSink:
+    """
+    step3 の判定結果を受け取り、たまった行数が flush_size を超えるたびに DB へ書き込む。
+
+    全件をメモリに溜めてから書き込むのではなく、ワーカーから返ってきた順に一定量ずつ書き込むので、
+    メモリ使用量はバッチの大きさに比例し、途中で異常終了してもそれまでに書き込んだ結果は残る。
+    (preselectCompanyBidJudgement は未判定の組み合わせだけを返すので、再実行すると残りから判定される。
+    1回の書き込みは3テーブルまとめて確定するので、判定結果だけが残って充足・不足要件が欠けることはない)
+
+    with 文で使い、正常に抜けたときに残りを書き込む。
+    """
+
+    def __init__(
+        self,
+        db_operator,
+        tablename_company_bid_judgement,
+        tablename_sufficient_requirement_master,
+        tablename_insufficient_requirement_master,
+        flush_size=STEP3_FLUSH_SIZE,
+        profiler=None,
+    ):
+        if flush_size < 1:
+            raise ValueError(f"flush_size must be >= 1: {flush_size}")
+        self.db_operator = db_operator
+        self.tablename_company_bid_judgement = tablename_company_bid_judgement
+        self.tablename_sufficient_requirement_master = tablename_sufficient_requirement_master
+        self.tablename_insufficient_requirement_master = tablename_insufficient_requirement_master
+        self.flush_size = flush_size
+        self._pending = {"judgement": [], "sufficient": [], "insufficient": []}
+        self._pending_rows = 0
+        self.written = {"judgement": 0, "sufficient": 0, "insufficient": 0}
+        self.profiler = profiler
+
+    def _phase(self, name):
+        return self.profiler.measure("phase", name) if self.profiler is not None else nullcontext()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def add(self, result):
+        """チャンク処理の結果 {"judgement", "sufficient", "insufficient"} を追加する。"""
+        for key, rows in self._pending.items():
+            rows.extend(result[key])
+            self._pending_rows += len(result[key])
+        if self._pending_rows >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """
+        たまっている結果を DB に書き込む。
+
+        3テーブルへの書き込みは db_operator.transaction() の中で行い、まとめて確定する
+        (中間テーブルのアップロードはその前に済ませておく)。
+        トランザクションの無い DB (BigQuery) でも判定結果が無いまま再判定されないことがないよう、
+        充足・不足要件を先に、企業公告判定マスターを最後に書き込む。
+        途中で止まって残った充足・不足要件は、次の step3 の開始時に削除される (_delete_orphan_step3_details)。
+        """
+        db_operator = self.db_operator
+
+        writes = (
+            ("insufficient", self.tablename_insufficient_requirement_master, db_operator.updateInsufficientRequirements, INSUFFICIENT_REQUIREMENTS_COLUMNS),
+            ("sufficient", self.tablename_sufficient_requirement_master, db_operator.updateSufficientRequirements, SUFFICIENT_REQUIREMENTS_COLUMNS),
+            ("judgement", self.tablename_company_bid_judgement, db_operator.updateCompanyBidJudgement, COMPANY_BID_JUDGEMENT_COLUMNS),
+        )
+        with ExitStack() as staging:
+            inserts = []
+            for key, tablename, staged_insert, columns in writes:
+                data = pd.DataFrame(self._pending[key])
+                if data.shape[0] == 0:
+                    continue
+                # 少ない行は中間テーブルを作らずに直接書き込む (DBOperator.insertRows と同じ判定)
+                if db_operator.useDirectWrite(data):
+                    inserts.append((key, tablename, None, data[columns]))
+                    continue
+                print(fr"Upload tmp_result_{key}")
+                with self._phase(f"upload {key}"):
+                    tmp_table = staging.enter_context(db_operator.stagingTable(data, f"tmp_result_{key}", temporary=True))
+                inserts.append((key, tablename, staged_insert, tmp_table))
+
+            with db_operator.transaction():
+                for key, tablename, staged_insert, source in inserts:
+                    if staged_insert is None:
+                        print(fr"Insert {source.shape[0]} rows into {tablename}")
+                        with self._phase(f"insert {key}"):
+                            db_operator.insertRowsDirect(tablename, source)
+                        continue
+                    print(fr"Update {tablename}")
+                    with self._phase(f"update {key}"):
+                        staged_insert(tablename, source)
+
+        for key, rows in self._pending.items():
+            self.written[key] += len(rows)
+            rows.clear()
+        self._pending_rows = 0
+
+
+def _run_step3_batch(process_chunk, batch):
+    """
+    imap_unordered 用: (バッチ番号, df_chunk) を処理し、(バッチ番号, 処理結果) を返す。
+
+    initializer で Step3Profiler を共有している場合は、バッチの処理時間を記録し、
+    ワーカーの集計を処理結果の "profile" に添えて返す。cProfile を取っている場合は
+    バッチごとにワーカーの累計をファイルに書き出す。
+    """
+    batch_no, df_chunk = batch
+    profiler = _JUDGEMENT_WORKER_CONTEXT.get("profiler")
+    if profiler is None:
+        return batch_no, process_chunk(df_chunk)
+
+    cprofile = _JUDGEMENT_WORKER_CONTEXT.get("cprofile")
+    start = time.perf_counter()
+    if cprofile is not None:
+        cprofile.enable()
+    try:
+        result = process_chunk(df_chunk)
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+    profiler.record("worker", "batch", time.perf_counter() - start)
+    if cprofile is not None:
+        cprofile.dump_stats(_JUDGEMENT_WORKER_CONTEXT["cprofile_path"])
+    result["profile"] = profiler.take()
+    return batch_no, result
 
 
 class JudgementMixin:
@@ -28,34 +244,7 @@ class JudgementMixin:
         Returns:
             str: 要件タイプ（欠格要件、業種・等級要件、所在地要件、技術者要件、実績要件、その他要件）
         """
-        req_type_list_search_list = {
-            "欠格要件": [
-                "70条", "71条", "会社更生法", "民事再生法", "更生手続",
-                "再生手続", "情報保全", "資本関係", "人的関係", "滞納",
-                "外国法", "取引停止", "破産", "暴力団", "指名停止",
-                "後見人", "法人格取消"
-            ],
-            "業種・等級要件": ["競争参加資格", "一般競争", "指名競争", "等級", "総合審査"],
-            "所在地要件": ["所在", "県内", "市内", "防衛局管内", "本店が", "支店が"],
-            "技術者要件": [
-                "施工管理技士", "技術士", "資格者証", "電気工事士", "建築士",
-                "基幹技能者", "監理技術者", "主任技術者", "監理技術者資格者証", "監理技術者講習修了証"
-            ],
-            "実績要件": [
-                "実績", "工事成績", "元請けとして", "元請として", "点以上",
-                "jv比率", "過去実績"
-            ],
-            "その他要件": ["jv", "共同企業体", "出資比率"]
-        }
-
-        text_lower = text.lower()
-        for req_type, search_list in req_type_list_search_list.items():
-            if req_type == "その他要件":
-                continue
-            search_str = "|".join(search_list)
-            if re.search(search_str, text_lower):
-                return req_type
-        return "その他要件"
+        return classify_requirement_type(text)
 
     def convertRequirementTextDict(self, requirement_texts):
         """
@@ -86,45 +275,20 @@ class JudgementMixin:
         requirement_no_list = []
         requirement_type_list = []
         requirement_text_list = []
-        createdDate_list = []
-        updatedDate_list = []
-        # req_type_list = ["欠格要件","業種・等級要件","所在地要件","技術者要件","実績要件","その他"]
-        req_type_list_search_list = {
-            "欠格要件":[
-                "70条","71条","会社更生法","民事再生法","更生手続",
-                "再生手続","情報保全","資本関係","人的関係","滞納",
-                "外国法","取引停止","破産","暴力団","指名停止",
-                "後見人","法人格取消"
-            ],
-            "業種・等級要件":["競争参加資格","一般競争","指名競争","等級","総合審査"],
-            "所在地要件":["所在","県内","市内","防衛局管内","本店が","支店が"],
-            "技術者要件":[
-                "施工管理技士","技術士","資格者証","電気工事士","建築士",
-                "基幹技能者","監理技術者","主任技術者","監理技術者資格者証","監理技術者講習修了証"
-            ],
-            "実績要件":[
-                "実績","工事成績","元請けとして","元請として","点以上",
-                "jv比率","過去実績"
-            ],
-            "その他要件":["jv","共同企業体","出資比率"] # JV, 共同企業体, or 不明
-        }
         for i, text in enumerate(requirement_texts["資格・条件"]):
             # TODO
             # text は、"改行分割" が必要？
             # 未処理。
 
-            has_other_req = True
-            text_lower = text.lower()
-            for req_type, search_list in req_type_list_search_list.items():
-                search_str = "|".join(search_list)
-                if (req_type != "その他要件" and re.search(search_str, text_lower)) or (req_type == "その他要件" and re.search(search_str, text_lower)) or (req_type == "その他要件" and not re.search(search_str, text_lower) and has_other_req):
-                    announcement_no_list.append(announcement_no)
-                    requirement_no_list.append(i)
-                    requirement_type_list.append(req_type)
-                    requirement_text_list.append(text)
-                    createdDate_list.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                    updatedDate_list.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                    has_other_req = False
+            # 該当する要件タイプごとに 1 行 (どれにも該当しなければ その他要件)
+            for req_type in expand_requirement_types(text):
+                announcement_no_list.append(announcement_no)
+                requirement_no_list.append(i)
+                requirement_type_list.append(req_type)
+                requirement_text_list.append(text)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        createdDate_list = [now] * len(announcement_no_list)
+        updatedDate_list = [now] * len(announcement_no_list)
 
         new_dict = {
             "announcement_no":announcement_no_list,
@@ -136,7 +300,120 @@ class JudgementMixin:
         }
         return new_dict
 
-    def step3(self, remove_table=False):
+    def _invalidate_changed_step3_results(self, office_fingerprints, announcement_fingerprints):
+        """
+        前回の差分判定時からフィンガープリントが変わった拠点・公告の判定結果を削除する。
+
+        削除した組み合わせは preselectCompanyBidJudgement で未判定として再び選ばれる。
+        前回のフィンガープリントが無い場合は、既存の判定結果をそのまま基準とする (何も削除しない)。
+
+        Args:
+            office_fingerprints: officeFingerprints の結果
+            announcement_fingerprints: announcementFingerprints の結果
+        """
+        db_operator = self.db_operator
+        config = self.tablenamesconfig
+
+        stored = {}
+        for tablename in (config.step3_office_fingerprints, config.step3_announcement_fingerprints):
+            if db_operator.ifTableExists(tablename=tablename):
+                stored[tablename] = db_operator.selectToTable(tablename=tablename)
+        if not stored:
+            print("No step3 fingerprints yet. Existing judgements are kept as the baseline.")
+            return
+
+        changed_offices = changedKeys(office_fingerprints, stored.get(config.step3_office_fingerprints), OFFICE_KEY_COLUMNS)
+        changed_announcements = changedKeys(announcement_fingerprints, stored.get(config.step3_announcement_fingerprints), ["announcement_no"])
+        print(f"Changed since last judgement: {changed_offices.shape[0]} offices, {changed_announcements.shape[0]} announcements")
+
+        for changed, key_column in ((changed_offices, "office_no"), (changed_announcements, "announcement_no")):
+            if changed.shape[0] == 0:
+                continue
+            with db_operator.stagingTable(changed[[key_column]].drop_duplicates(), "tmp_step3_changed_keys", temporary=True) as tmp_changed_keys_table:
+                for target_tablename in (
+                    config.company_bid_judgement,
+                    config.sufficient_requirements,
+                    config.insufficient_requirements,
+                ):
+                    db_operator.deleteRowsByKeys(
+                        target_tablename=target_tablename,
+                        source_tablename=tmp_changed_keys_table,
+                        key_column=key_column,
+                    )
+
+    def _invalidate_partial_step3_results(self):
+        """
+        一部の要件しか判定していない判定結果 (事前判定・早期打ち切り。remarks で識別する) を削除する。
+
+        削除した組み合わせは preselectCompanyBidJudgement で未判定として再び選ばれ、すべての要件を判定し直す。
+        """
+        db_operator = self.db_operator
+        config = self.tablenamesconfig
+        if not db_operator.ifTableExists(tablename=config.company_bid_judgement):
+            return
+
+        remarks = ", ".join(f"'{remark}'" for remark in PARTIAL_JUDGEMENT_REMARKS)
+        partial_judgements = db_operator.selectToTable(
+            tablename=config.company_bid_judgement,
+            where_clause=f"where remarks in ({remarks})",
+        )
+        print(f"Partially evaluated judgements to refill: {partial_judgements.shape[0]}")
+        if partial_judgements.shape[0] == 0:
+            return
+
+        with db_operator.stagingTable(partial_judgements[["evaluation_no"]], "tmp_step3_partial_keys", temporary=True) as tmp_partial_keys_table:
+            for target_tablename in (
+                config.company_bid_judgement,
+                config.sufficient_requirements,
+                config.insufficient_requirements,
+            ):
+                db_operator.deleteRowsByKeys(
+                    target_tablename=target_tablename,
+                    source_tablename=tmp_partial_keys_table,
+                    key_column="evaluation_no",
+                )
+
+    def _delete_orphan_step3_details(self):
+        """
+        企業公告判定マスターに判定結果の無い充足・不足要件 (書き込みの途中で止まった残り) を削除する。
+
+        トランザクションの無い DB (BigQuery) では Step3ResultSink.flush が判定結果を最後に書き込むので、
+        途中で止まると充足・不足要件だけが残る。その組み合わせは preselectCompanyBidJudgement で再び選ばれるので、
+        残りを消しておかないと再判定で重複する。
+        """
+        db_operator = self.db_operator
+        config = self.tablenamesconfig
+        if not db_operator.ifTableExists(tablename=config.company_bid_judgement):
+            return
+
+        for target_tablename in (config.sufficient_requirements, config.insufficient_requirements):
+            if not db_operator.ifTableExists(tablename=target_tablename):
+                continue
+            orphan_keys = db_operator.selectKeysMissingFrom(
+                tablename=target_tablename,
+                reference_tablename=config.company_bid_judgement,
+                key_column="evaluation_no",
+            )
+            print(f"Orphan rows to delete from {target_tablename}: {orphan_keys.shape[0]} evaluations")
+            if orphan_keys.shape[0] == 0:
+                continue
+            with db_operator.stagingTable(orphan_keys[["evaluation_no"]], "tmp_step3_orphan_keys", temporary=True) as tmp_orphan_keys_table:
+                db_operator.deleteRowsByKeys(
+                    target_tablename=target_tablename,
+                    source_tablename=tmp_orphan_keys_table,
+                    key_column="evaluation_no",
+                )
+
+    def _save_step3_fingerprints(self, office_fingerprints, announcement_fingerprints):
+        """判定が終わった時点のフィンガープリントを保存する (次回の差分判定の基準になる)。"""
+        db_operator = self.db_operator
+        config = self.tablenamesconfig
+        db_operator.uploadDataToTable(data=office_fingerprints, tablename=config.step3_office_fingerprints, chunksize=5000)
+        db_operator.uploadDataToTable(data=announcement_fingerprints, tablename=config.step3_announcement_fingerprints, chunksize=5000)
+
+    def step3(self, remove_table=False, engine="row", batch_size=None, flush_size=STEP3_FLUSH_SIZE, incremental=False, prefilter=False,
+              result_cache=False, result_cache_path=None, profile_report=None, profile_dir=None,
+              early_exit=False, early_exit_costs=None, refill_partial=False):
         """
         step3 : 要件判定処理
 
@@ -153,7 +430,78 @@ class JudgementMixin:
         - remove_table:
 
           処理の前に、企業公告判定マスター・充足要件マスター・不足要件マスターを削除するかどうか。
+
+        - engine:
+
+          判定エンジン。"row" は拠点 x 要件を1件ずつ判定する（従来処理）。
+          "columnar" は要件1件を公告の対象拠点すべてに対してまとめて判定する。判定結果は同じ。
+
+        - batch_size:
+
+          ワーカーに渡すバッチ1件あたりの要件判定回数の目安。省略時はワーカー数から自動で決める。
+
+        - flush_size:
+
+          判定結果を DB に書き込む単位 (企業公告判定・充足要件・不足要件の合計行数)。
+          終わったバッチの結果から順に、この行数がたまるごとに書き込む。
+
+        - incremental:
+
+          差分判定を行うかどうか。True の場合、拠点ごと・公告の要件セットごとに入力データのフィンガープリントを計算し、
+          前回の差分判定時から変わった拠点・公告の判定結果を削除してから判定する (変わっていない組み合わせは判定し直さない)。
+          判定が終わったら、今回のフィンガープリントを保存する。
+
+        - prefilter:
+
+          事前判定を行うかどうか。True の場合、業種・等級要件と所在地要件だけを先に全組み合わせでまとめて判定し、
+          満たさない組み合わせは他の要件を判定せずに final_status=False として記録する (判定していない要件の列は None)。
+
+        - result_cache:
+
+          判定結果をメモ化するかどうか (engine="row" のみ)。True の場合、同じ拠点に同じ要件テキストが別の公告で出てきたら
+          判定し直さずに前の結果を使う。キーには拠点のフィンガープリントを含める。終了時に要件種別ごとのヒット率を表示する。
+
+        - result_cache_path:
+
+          メモ化した判定結果を保存するファイル。指定すると result_cache を有効にし、開始時に読み込んで終了時に保存する
+          (マスターが変わった拠点はフィンガープリントが変わるので、前回の結果は使われない)。
+
+        - profile_report:
+
+          計測結果を書き出すファイル (.csv なら CSV、それ以外は JSON)。指定すると、フェーズ (マスター読込・preselect・
+          判定・書き込みなど) と requirement_type ごとの checker の処理時間・呼び出し回数を計測する。
+          ワーカーの計測はすべてのワーカーで合計する。
+
+        - profile_dir:
+
+          指定するとワーカーごとに cProfile を取り、このディレクトリに step3_worker_<pid>.prof を書き出す
+          (profile_report を指定しなくても計測は有効になる)。
+
+        - early_exit:
+
+          早期打ち切りで判定するかどうか (適格かどうかだけを見るスクリーニング用)。True の場合、拠点 x 公告ごとに
+          判定コストの低い要件から順に判定し、満たさない要件があればその他の要件は判定せずに final_status=False とする。
+          打ち切った組み合わせは判定していない要件の列を None にし、remarks に理由を残す (refill_partial で判定し直せる)。
+          すべての要件を満たす組み合わせの結果は通常の判定と同じ。
+
+        - early_exit_costs:
+
+          早期打ち切りで要件を判定する順を決めるコスト (要件種別 -> 1回あたりの時間)。dict、または profile_report で
+          書き出した計測結果のファイル (checker の mean_ms を使う)。省略時は EARLY_EXIT_REQUIREMENT_COSTS。
+
+        - refill_partial:
+
+          事前判定・早期打ち切りで一部の要件しか判定していない判定結果を削除し、すべての要件を判定し直すかどうか。
         """
+        if engine not in STEP3_ENGINES:
+            raise ValueError(f"Unknown step3 engine: {engine} (expected one of {list(STEP3_ENGINES)})")
+        process_chunk = STEP3_ENGINES[engine]
+
+        # 計測 (profile_report / profile_dir を指定した場合だけ)
+        profiler = Step3Profiler() if profile_report is not None or profile_dir is not None else None
+
+        def phase(name):
+            return profiler.measure("phase", name) if profiler is not None else nullcontext()
 
         tablename_announcements = self.tablenamesconfig.bid_announcements
         tablename_requirements = self.tablenamesconfig.bid_requirements
@@ -184,31 +532,34 @@ class JudgementMixin:
             return
 
         # ループの外で全てのマスターデータを事前に読み込み（高速化のため）
+        # ファイル由来のマスターは master_registry のキャッシュを使う (更新がなければ再読込しない)
         print("Loading master data...")
-        # companies + company_disqualifications は DB から取得 (#188 企業マスタ統合)
-        master_data_company = db_operator.selectToTable(tablename="companies", where_clause="WHERE is_customer = true")
-        master_data_disqualifications = db_operator.selectToTable(tablename="company_disqualifications")
-        master_data_office_registration_authorization = pd.read_csv("data/master/office_registration_authorization_master.txt", sep="\t")
-        master_data_office_registration_authorization_with_converter = pd.read_csv("data/master/office_registration_authorization_master.txt", sep="\t", converters={"construction_no": lambda x: str(x)})
-        master_data_agency = pd.read_csv("data/master/agency_master.txt", sep="\t")
-        master_data_construction = pd.read_csv("data/master/construction_master.txt", sep="\t")
-        master_data_office = pd.read_csv("data/master/office_master.txt", sep="\t")
-        master_data_office_work_achivements = pd.read_csv("data/master/office_work_achivements_master.txt", sep="\t")
-        master_data_employee = pd.read_csv("data/master/employee_master.txt", sep="\t")
-        master_data_employee_qualification = pd.read_csv("data/master/employee_qualification_master.txt", sep="\t")
-        master_data_technician_qualification = pd.read_csv("data/master/technician_qualification_master.txt", sep="\t")
-        master_data_employee_experience = pd.read_csv("data/master/employee_experience_master.txt", sep="\t")
+        with phase("load master"):
+            # companies + company_disqualifications は DB から取得 (#188 企業マスタ統合)
+            master_data_company = db_operator.selectToTable(tablename="companies", where_clause="WHERE is_customer = true")
+            master_data_disqualifications = db_operator.selectToTable(tablename="company_disqualifications")
+            master_data_office_registration_authorization = getMaster("office_registration_authorization")
+            master_data_office_registration_authorization_with_converter = getMaster("office_registration_authorization_with_converter")
+            master_data_agency = getMaster("agency")
+            master_data_construction = getMaster("construction")
+            master_data_office = getMaster("office")
+            master_data_office_work_achivements = getMaster("office_work_achivements")
+            master_data_employee = getMaster("employee")
+            master_data_employee_qualification = getMaster("employee_qualification")
+            master_data_technician_qualification = getMaster("technician_qualification")
+            master_data_employee_experience = getMaster("employee_experience")
         print("Master data files loaded.")
 
 
 
 
 
-        tablenames = [
-            tablename_company_bid_judgement,
-            tablename_sufficient_requirement_master,
-            tablename_insufficient_requirement_master
-        ]
+        # テーブル名 -> PERFORMANCE_INDEXES のキー
+        tablenames = {
+            tablename_company_bid_judgement: "company_bid_judgement",
+            tablename_sufficient_requirement_master: "sufficient_requirements",
+            tablename_insufficient_requirement_master: "insufficient_requirements",
+        }
         for i, target_tablename in enumerate(tablenames):
 
             tmpcheck = db_operator.ifTableExists(tablename = target_tablename)
@@ -231,27 +582,22 @@ class JudgementMixin:
                 print(fr"NEWLY CREATED: {target_tablename}.")
             else:
                 print(fr"ALREADY EXISTS: {target_tablename}.")
+                # 性能用インデックスができる前に作ったテーブルにも作る (SQLite のみ。既にあれば何もしない)
+                db_operator.ensurePerformanceIndexes(tablenames[target_tablename], target_tablename)
 
 
         # office_master テーブルを作成（既に読み込んだデータを使用）
         print(fr"Upload {tablename_office_master}")
-        db_operator.uploadDataToTable(data=master_data_office, tablename=tablename_office_master, chunksize=5000)
-
-        df0 = db_operator.preselectCompanyBidJudgement(
-            company_bid_judgement_tablename=tablename_company_bid_judgement,
-            office_master_tablename=tablename_office_master,
-            bid_announcements_tablename=tablename_announcements
-        )
-        # df0 = db_operator.selectToTable(tablename=fr"{tablename_company_bid_judgement}", where_clause="where final_status is NULL")
-        print(fr"Target of checking requirement : {df0.shape[0]}")
-        if len(df0) > 0:
-            print(f"[DEBUG] Target combinations (announcement_no, company_no, office_no):")
-            print(df0[['announcement_no', 'company_no', 'office_no']].to_string(index=False, max_rows=20))
+        with phase("upload office master"):
+            db_operator.uploadDataToTable(data=master_data_office, tablename=tablename_office_master, chunksize=5000)
+            # 作り直したのでインデックスもなくなっている (preselect の結合で使う)
+            db_operator.ensurePerformanceIndexes("office_master", tablename_office_master)
 
         # 並列処理では連番採番時に重複が発生するため UUID を使用
 
         # req_df はひとまず一括取得
-        req_df0 = db_operator.selectToTable(tablename=fr"{tablename_requirements}")
+        with phase("select requirements"):
+            req_df0 = db_operator.selectToTable(tablename=fr"{tablename_requirements}")
         # announcement_noでgroupbyして辞書化（高速化のため）
         req_df_map = dict(tuple(req_df0.groupby("announcement_no")))
         # 並列処理設定
@@ -274,69 +620,109 @@ class JudgementMixin:
             'employee_experience': master_data_employee_experience
         }
 
-        # df0をn_processes個のチャンクに分割
-        df_chunks = np.array_split(df0, n_processes)
+        use_result_cache = result_cache or result_cache_path is not None
+        if incremental or use_result_cache:
+            with phase("fingerprint"):
+                office_fingerprints = officeFingerprints(master_data_dict)
+
+        if incremental:
+            announcement_fingerprints = announcementFingerprints(req_df0)
+            if not remove_table:
+                self._invalidate_changed_step3_results(office_fingerprints, announcement_fingerprints)
+
+        if refill_partial and not remove_table:
+            self._invalidate_partial_step3_results()
+
+        if not remove_table:
+            self._delete_orphan_step3_details()
+
+        # 早期打ち切りの判定順 (計測結果のファイルにない種別は既定のコストを使う)
+        costs = None
+        if early_exit:
+            costs = dict(EARLY_EXIT_REQUIREMENT_COSTS)
+            if isinstance(early_exit_costs, str):
+                costs.update(load_checker_costs(early_exit_costs))
+            elif early_exit_costs is not None:
+                costs.update(early_exit_costs)
+            print("Early exit order: " + " < ".join(sorted(costs, key=costs.get)))
+
+        with phase("preselect"):
+            df0 = db_operator.preselectCompanyBidJudgement(
+                company_bid_judgement_tablename=tablename_company_bid_judgement,
+                office_master_tablename=tablename_office_master,
+                bid_announcements_tablename=tablename_announcements
+            )
+        # df0 = db_operator.selectToTable(tablename=fr"{tablename_company_bid_judgement}", where_clause="where final_status is NULL")
+        print(fr"Target of checking requirement : {df0.shape[0]}")
+        if len(df0) > 0:
+            print(f"[DEBUG] Target combinations (announcement_no, company_no, office_no):")
+            print(df0[['announcement_no', 'company_no', 'office_no']].to_string(index=False, max_rows=20))
 
-        # 各チャンクに対するタスクを準備
-        tasks = []
-        for df_chunk in df_chunks:
-            if len(df_chunk) > 0:  # 空のチャンクをスキップ
-                tasks.append((df_chunk, req_df_map, master_data_dict))
+        # 索引は親プロセスで1回だけ作る (fork 起動のワーカーはコピーせずに参照する)
+        with phase("snapshot"):
+            snapshot = MasterSnapshot(master_data_dict)
+
+        # 事前判定: ライセンス・所在地で満たさない組み合わせは、ワーカーに渡す前に対象から外す
+        prefiltered = {"judgement": [], "sufficient": [], "insufficient": []}
+        if prefilter:
+            with phase("prefilter"):
+                df0, prefiltered = _prefilter_judgement_pairs(df0, req_df_map, master_data_dict, snapshot)
+            print(f"Prefiltered out {len(prefiltered['judgement'])} combinations. Remaining: {df0.shape[0]}")
+
+        # 判定結果のメモ化: ワーカーは initializer で受け取ったコピーに結果をため、ヒット数と新しい結果を返す
+        cache = None
+        if use_result_cache:
+            if engine != "row":
+                print(f"Result cache is only used by the row engine (engine={engine}).")
+            cache = ResultCache(office_fingerprints=office_fingerprints, keep_new_entries=result_cache_path is not None)
+            if result_cache_path is not None:
+                cache.load(result_cache_path)
+                print(f"Loaded {len(cache)} cached results from {result_cache_path}")
+
+        # df0 を要件数で重み付けした小さなバッチに分割し、空いたワーカーから順に処理させる
+        # マスターデータと要件はタスクに含めず、initializer でワーカーごとに1回だけ共有する
+        tasks = _split_step3_batches(df0, req_df_map, batch_size=batch_size, n_processes=n_processes)
 
         # 並列実行
         print(f"Starting parallel processing with {len(tasks)} tasks...")
-        with Pool(processes=n_processes) as pool:
-            chunk_results = list(tqdm(pool.imap(_process_judgement_chunk, tasks), total=len(tasks), desc="Processing chunks"))
-
-        # 結果を集約
-        print("Aggregating results from all processes...")
-        result_judgement_list = []
-        result_sufficient_requirements_list = []
-        result_insufficient_requirements_list = []
-
-        for result in chunk_results:
-            result_judgement_list.extend(result['judgement'])
-            result_sufficient_requirements_list.extend(result['sufficient'])
-            result_insufficient_requirements_list.extend(result['insufficient'])
-
-        print(f"Aggregation complete: {len(result_judgement_list)} judgements, {len(result_sufficient_requirements_list)} sufficient, {len(result_insufficient_requirements_list)} insufficient")
-
-        # DataFrameに変換してDB書き込み
-        result_judgement = pd.DataFrame(result_judgement_list)
-        result_insufficient_requirements = pd.DataFrame(result_insufficient_requirements_list)
-        result_sufficient_requirements = pd.DataFrame(result_sufficient_requirements_list)
-
-        if result_judgement.shape[0] > 0:
-            tmp_result_judgement_table = "tmp_result_judgement"
-            #max_evaluation_no = db_operator.any_query(sql = fr"SELECT max(evaluation_no) FROM {tablename_company_bid_judgement}")
-
-            print(fr"Upload {tmp_result_judgement_table}")
-            db_operator.uploadDataToTable(data=result_judgement, tablename=tmp_result_judgement_table, chunksize=5000)
-            print(fr"Update {tablename_company_bid_judgement}")
-            db_operator.updateCompanyBidJudgement(
-                company_bid_judgement_tablename=tablename_company_bid_judgement,
-                company_bid_judgement_tablename_for_update=tmp_result_judgement_table
-            )
-            db_operator.dropTable(tablename=tmp_result_judgement_table)
-
-        if result_insufficient_requirements.shape[0] > 0:
-            tmp_result_insufficient_requirements_master_table = "tmp_result_insufficient_requirements"
-            print(fr"Upload {tmp_result_insufficient_requirements_master_table}")
-            db_operator.uploadDataToTable(data=result_insufficient_requirements, tablename=tmp_result_insufficient_requirements_master_table, chunksize=5000)
-            print(fr"Update {tablename_insufficient_requirement_master}")
-            db_operator.updateInsufficientRequirements(
-                insufficient_requirements_tablename=tablename_insufficient_requirement_master,
-                insufficient_requirements_tablename_for_update=tmp_result_insufficient_requirements_master_table
-            )
-            db_operator.dropTable(tablename=tmp_result_insufficient_requirements_master_table)
-
-        if result_sufficient_requirements.shape[0] > 0:
-            tmp_result_sufficient_requirements_master_table = "tmp_result_sufficient_requirements"
-            print(fr"Upload {tmp_result_sufficient_requirements_master_table}")
-            db_operator.uploadDataToTable(data=result_sufficient_requirements, tablename=tmp_result_sufficient_requirements_master_table, chunksize=5000)
-            print(fr"Update {tablename_sufficient_requirement_master}")
-            db_operator.updateSufficientRequirements(
-                sufficient_requirements_tablename=tablename_sufficient_requirement_master,
-                sufficient_requirements_tablename_for_update=tmp_result_sufficient_requirements_master_table
-            )
-            db_operator.dropTable(tablename=tmp_result_sufficient_requirements_master_table)
+        with Pool(
+            processes=n_processes,
+            initializer=_init_judgement_worker,
+            initargs=(req_df_map, master_data_dict, snapshot, cache, profiler is not None, profile_dir, costs),
+        ) as pool, tqdm(total=len(df0), desc="Processing rows") as progress, Step3ResultSink(
+            db_operator=db_operator,
+            tablename_company_bid_judgement=tablename_company_bid_judgement,
+            tablename_sufficient_requirement_master=tablename_sufficient_requirement_master,
+            tablename_insufficient_requirement_master=tablename_insufficient_requirement_master,
+            flush_size=flush_size,
+            profiler=profiler,
+        ) as sink, phase("judge and write"):
+            sink.add(prefiltered)
+            # 終わったバッチから受け取り、flush_size 行ごとに DB へ書き込む。進捗は行数で進める
+            for batch_no, result in pool.imap_unordered(partial(_run_step3_batch, process_chunk), enumerate(tasks)):
+                profiled = result.pop("profile", None)
+                if profiled is not None:
+                    profiler.merge(profiled)
+                cached = result.pop("result_cache", None)
+                if cached is not None:
+                    cache.addStats(cached["stats"])
+                    cache.update(cached["entries"])
+                sink.add(result)
+                progress.update(len(tasks[batch_no]))
+
+        print(f"Write complete: {sink.written['judgement']} judgements, {sink.written['sufficient']} sufficient, {sink.written['insufficient']} insufficient")
+
+        if cache is not None:
+            print(cache.report())
+            if result_cache_path is not None:
+                cache.save(result_cache_path)
+                print(f"Saved {len(cache)} cached results to {result_cache_path}")
+
+        if incremental:
+            self._save_step3_fingerprints(office_fingerprints, announcement_fingerprints)
+
+        if profiler is not None:
+            print(profiler.summary())
+            if profile_report is not None:
+                profiler.write_report(profile_report)
+                print(f"Wrote step3 profile to {profile_report}")
@@ -8,9 +8,12 @@ GCS 操作、PDF ページカウント、要件テキスト変換、判定チャ
 import os
 import re
 import json
+import time
 import uuid
+import cProfile
 import warnings
 from datetime import datetime
+from functools import partial
 from multiprocessing import Pool, cpu_count
 
 import pandas as pd
@@ -33,12 +36,23 @@ try:
     from packages.engine.requirements.location import checkLocationRequirement
     from packages.engine.requirements.grade_item import checkGradeAndItemRequirement
     from packages.engine.requirements.technician import checkTechnicianRequirement
+    from packages.engine.requirements.snapshot import MasterSnapshot
+    from packages.engine.requirements.compiled import compileRequirements
+    from packages.engine.requirements.columnar import evaluateRequirementColumnar
 except ModuleNotFoundError:
     from requirements.ineligibility import checkIneligibilityDynamic
     from requirements.experience import checkExperienceRequirement
     from requirements.location import checkLocationRequirement
     from requirements.grade_item import checkGradeAndItemRequirement
     from requirements.technician import checkTechnicianRequirement
+    from requirements.snapshot import MasterSnapshot
+    from requirements.compiled import compileRequirements
+    from requirements.columnar import evaluateRequirementColumnar
+
+try:
+    from packages.engine.domain.profiling import Step3Profiler
+except ModuleNotFoundError:
+    from domain.profiling import Step3Profiler
 
 
 # GCS helper functions
@@ -352,45 +366,345 @@ class Master:
 
 
 
+def _evaluate_requirement(compiled, company_no, office_no, master_data_dict, snapshot):
+    """
+    要件1件を拠点1件に対して判定する（requirement_type ごとの checker の呼び分け）
+
+    Args:
+        compiled: CompiledRequirement
+        company_no: 企業番号
+        office_no: 拠点番号
+        master_data_dict: step3 のマスターデータ辞書
+        snapshot: master_data_dict の MasterSnapshot
+
+    Returns:
+        dict: {"is_ok": bool, "reason": str}
+    """
+    requirement_type = compiled.requirement_type
+    requirement_text = compiled.requirement_text
+
+    if requirement_type == "欠格要件":
+        return checkIneligibilityDynamic(
+            requirementText=requirement_text,
+            companyNo=company_no,
+            officeNo=office_no,
+            company_data=master_data_dict['company'],
+            disqualification_data=master_data_dict['disqualifications'],
+            office_registration_authorization_data=master_data_dict['office_registration_authorization'],
+            snapshot=snapshot,
+            conditions=compiled.conditions
+        )
+    elif requirement_type == "業種・等級要件":
+        return checkGradeAndItemRequirement(
+            requirementText=requirement_text,
+            officeNo=office_no,
+            licenseData=master_data_dict['office_registration_authorization_with_converter'],
+            agencyData=master_data_dict['agency'],
+            constructionData=master_data_dict['construction'],
+            snapshot=snapshot,
+            conditions=compiled.conditions
+        )
+    elif requirement_type == "所在地要件":
+        return checkLocationRequirement(
+            requirementText=requirement_text,
+            officeNo=office_no,
+            agencyData=master_data_dict['agency'],
+            officeData=master_data_dict['office'],
+            snapshot=snapshot,
+            conditions=compiled.conditions
+        )
+    elif requirement_type == "実績要件":
+        return checkExperienceRequirement(
+            requirementText=requirement_text,
+            officeNo=office_no,
+            office_experience_data=master_data_dict['office_work_achivements'],
+            agency_data=master_data_dict['agency'],
+            construction_data=master_data_dict['construction'],
+            snapshot=snapshot,
+            conditions=compiled.conditions
+        )
+    elif requirement_type == "技術者要件":
+        return checkTechnicianRequirement(
+            requirementText=requirement_text,
+            companyNo=company_no,
+            officeNo=office_no,
+            employeeData=master_data_dict['employee'],
+            qualData=master_data_dict['employee_qualification'],
+            qualMasterData=master_data_dict['technician_qualification'],
+            expData=master_data_dict['employee_experience'],
+            snapshot=snapshot,
+            conditions=compiled.conditions
+        )
+    else:
+        return {"is_ok":False, "reason":"その他要件があります。確認してください"}
+
+
+def _evaluate_requirement_profiled(profiler, compiled, company_no, office_no, master_data_dict, snapshot):
+    """_evaluate_requirement の時間を profiler に requirement_type ごとに記録する。"""
+    start = time.perf_counter()
+    try:
+        return _evaluate_requirement(compiled, company_no, office_no, master_data_dict, snapshot)
+    finally:
+        profiler.record("checker", compiled.requirement_type, time.perf_counter() - start)
+
+
+# 要件種別 -> 企業公告判定マスターの列名 (これ以外の種別は requirement_other)
+REQUIREMENT_TYPE_COLUMNS = {
+    "欠格要件":"requirement_ineligibility",
+    "業種・等級要件":"requirement_grade_item",
+    "所在地要件":"requirement_location",
+    "実績要件":"requirement_experience",
+    "技術者要件":"requirement_technician"
+}
+
+
+# 早期打ち切り (early_exit) で要件を判定する順を決めるコスト: 要件種別 -> checker 1回あたりの平均時間 (ms)。
+# 合成データ (benchmarks/synthetic.py、1k 拠点) で計測した値。ここにない種別は最後に判定する。
+# step3 の profile_report で計測した値 (checker の mean_ms) を使うこともできる。
+EARLY_EXIT_REQUIREMENT_COSTS = {
+    "その他要件": 0.001,
+    "業種・等級要件": 0.01,
+    "所在地要件": 0.011,
+    "技術者要件": 0.021,
+    "実績要件": 0.05,
+    "欠格要件": 0.2,
+}
+
+EARLY_EXIT_REMARKS = "早期打ち切り：判定コストの低い要件から順に判定し、満たさない要件があったため、その他の要件は判定していません"
+
+
+# 要件種別 -> 不足理由の先頭から除く "種別:" のパターン (未知の種別は初回に作る)
+_REQUIREMENT_TYPE_PREFIX_PATTERNS = {type_: re.compile(rf"{type_}[:：]") for type_ in REQUIREMENT_TYPE_COLUMNS}
+
+
+def _strip_requirement_type_prefix(requirement_type, reason):
+    pattern = _REQUIREMENT_TYPE_PREFIX_PATTERNS.get(requirement_type)
+    if pattern is None:
+        pattern = _REQUIREMENT_TYPE_PREFIX_PATTERNS[requirement_type] = re.compile(rf"{requirement_type}[:：]")
+    return pattern.sub("", reason)
+
+
+def _summarize_office_judgement(announcement_no, company_no, office_no, evaluation_no, evaluated, now=None):
+    """
+    拠点1件 x 公告1件の判定結果をまとめる（企業公告判定・充足要件・不足要件の行を作る）
+
+    Args:
+        announcement_no: 公告番号
+        company_no: 企業番号
+        office_no: 拠点番号
+        evaluation_no: 判定番号 (UUID)
+        evaluated: [(CompiledRequirement, {"is_ok", "reason"}), ...] 公告の要件順
+        now: createdDate / updatedDate に入れる時刻 (省略時は datetime.now())。
+            チャンク処理では1回だけ取得して全行で使い回す。
+
+    Returns:
+        tuple: (checked_requirement, sufficient_list, insufficient_list)
+    """
+    if now is None:
+        now = datetime.now()
+    sufficient_list = []
+    insufficient_list = []
+    # 要件種別 -> {理由: None} (dict を出現順の重複なし集合として使う)
+    ng_reasons = {}
+
+    for compiled, val in evaluated:
+        requirement_type = compiled.requirement_type
+        requirement_no = compiled.requirement_no
+
+        if val["is_ok"]:
+            sufficient_list.append({
+                "sufficiency_detail_no":str(uuid.uuid4()),
+                "evaluation_no":evaluation_no,
+                "announcement_no":announcement_no,
+                "requirement_no":requirement_no,
+                "company_no":company_no,
+                "office_no":office_no,
+                "requirement_type":requirement_type,
+                "requirement_description":val["reason"],
+                "createdDate":now,
+                "updatedDate":now
+            })
+        else:
+            # 不足要件の理由は要件種別ごとに出現順でまとめる (先頭の "種別:" は除く)
+            ng_reasons.setdefault(requirement_type, {})[_strip_requirement_type_prefix(requirement_type, val["reason"])] = None
+            insufficient_list.append({
+                "shortage_detail_no":str(uuid.uuid4()),
+                "evaluation_no":evaluation_no,
+                "announcement_no":announcement_no,
+                "requirement_no":requirement_no,
+                "company_no":company_no,
+                "office_no":office_no,
+                "requirement_type":requirement_type,
+                "requirement_description":val["reason"],
+                "suggestions_for_improvement":"",
+                "final_comment":"",
+                "createdDate":now,
+                "updatedDate":now
+            })
+
+    # サマリー化
+    checked_requirement = {
+        "evaluation_no":evaluation_no,
+        "announcement_no":announcement_no,
+        "company_no":company_no,
+        "office_no":office_no,
+        "requirement_ineligibility":True,
+        "requirement_grade_item":True,
+        "requirement_location":True,
+        "requirement_experience":True,
+        "requirement_technician":True,
+        "requirement_other":True,
+        "deficit_requirement_message":"",
+        "final_status":True,
+        "message":"",
+        "remarks":"",
+        "createdDate":now,
+        "updatedDate":now
+    }
+    if ng_reasons:
+        messages = []
+        for type_, reasons in ng_reasons.items():
+            checked_requirement[REQUIREMENT_TYPE_COLUMNS.get(type_, "requirement_other")] = False
+            messages.append("[" + type_ + "]" + "|".join(reasons))
+        checked_requirement["deficit_requirement_message"] = " ".join(messages)
+        checked_requirement["final_status"] = False
+
+    return checked_requirement, sufficient_list, insufficient_list
+
+
+def _mark_partial_judgement(checked_requirement, skipped_requirements, remarks):
+    """
+    一部の要件しか判定していない企業公告判定に印を付ける (事前判定・早期打ち切り)。
+
+    判定していない要件の列は結果が分からないので None にする (判定した要件で満たさなかった列は False のまま)。
+    remarks に理由を残し、後の判定 (refill_partial) で判定し直す対象として識別できるようにする。
+    """
+    for compiled in skipped_requirements:
+        column = REQUIREMENT_TYPE_COLUMNS.get(compiled.requirement_type, "requirement_other")
+        if checked_requirement[column] is True:
+            checked_requirement[column] = None
+    checked_requirement["remarks"] = remarks
+
+
+def _early_exit_order(compiled_requirements, costs):
+    """要件の位置を判定コストの低い順に並べる (同じコストは要件の順。costs にない種別は最後)。"""
+    return sorted(
+        range(len(compiled_requirements)),
+        key=lambda pos: costs.get(compiled_requirements[pos].requirement_type, float("inf")),
+    )
+
+
+def _judge_requirements(compiled_requirements, judge, order=None):
+    """
+    公告の要件を judge(compiled) -> {"is_ok", "reason"} で判定する。
+
+    order (要件の位置の判定順) を指定した場合は、その順に判定して最初に満たさない要件で打ち切る。
+
+    Returns:
+        tuple: ([(CompiledRequirement, 結果), ...] 判定した要件 (公告の要件順), 判定しなかった要件のリスト)
+    """
+    if order is None:
+        return [(compiled, judge(compiled)) for compiled in compiled_requirements], []
+    judged = {}
+    for pos in order:
+        val = judge(compiled_requirements[pos])
+        judged[pos] = val
+        if not val["is_ok"]:
+            break
+    evaluated = [(compiled, judged[pos]) for pos, compiled in enumerate(compiled_requirements) if pos in judged]
+    skipped = [compiled for pos, compiled in enumerate(compiled_requirements) if pos not in judged]
+    return evaluated, skipped
+
+
+# step3 のワーカープロセスで共有するマスターデータ。
+# Pool の initializer (_init_judgement_worker) でワーカーごとに1回だけ設定し、タスクには df_chunk だけを渡す。
+# fork で起動したワーカーは親プロセスのオブジェクトをそのまま参照する (タスクごとの pickle やコピーが発生しない)。
+_JUDGEMENT_WORKER_CONTEXT = {}
+
+
+def _init_judgement_worker(req_df_map, master_data_dict, snapshot=None, result_cache=None, profile=False, profile_dir=None,
+                           early_exit_costs=None):
+    """
+    step3 の Pool の initializer。判定に使うマスターデータをワーカーのグローバルに設定する。
+
+    Args:
+        req_df_map: announcement_no -> 要件 DataFrame
+        master_data_dict: マスターデータの辞書
+        snapshot: 親プロセスで作成済みの MasterSnapshot (省略時はここで作る)
+        result_cache: 判定結果の ResultCache (省略時はメモ化しない)。ワーカーごとのコピーに結果をためる
+        profile: True ならワーカーごとに Step3Profiler を作り、checker の時間をためる
+        profile_dir: 指定するとワーカーごとに cProfile を取り、このディレクトリに step3_worker_<pid>.prof を書き出す
+            (profile も有効になる)
+        early_exit_costs: 指定すると早期打ち切りで判定する (要件種別 -> 判定コスト)。
+            拠点 x 公告ごとにコストの低い要件から判定し、満たさない要件があればその他の要件は判定しない
+    """
+    if snapshot is None:
+        snapshot = MasterSnapshot(master_data_dict)
+    _JUDGEMENT_WORKER_CONTEXT["req_df_map"] = req_df_map
+    _JUDGEMENT_WORKER_CONTEXT["master_data_dict"] = master_data_dict
+    _JUDGEMENT_WORKER_CONTEXT["snapshot"] = snapshot
+    _JUDGEMENT_WORKER_CONTEXT["result_cache"] = result_cache
+    _JUDGEMENT_WORKER_CONTEXT["profiler"] = Step3Profiler() if profile or profile_dir is not None else None
+    _JUDGEMENT_WORKER_CONTEXT["early_exit_costs"] = early_exit_costs
+    _JUDGEMENT_WORKER_CONTEXT["cprofile"] = None
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        _JUDGEMENT_WORKER_CONTEXT["cprofile"] = cProfile.Profile()
+        _JUDGEMENT_WORKER_CONTEXT["cprofile_path"] = os.path.join(profile_dir, f"step3_worker_{os.getpid()}.prof")
+
+
+def _resolve_chunk_args(args):
+    """
+    チャンク処理の引数を (df_chunk, req_df_map, master_data_dict, snapshot) にそろえる。
+
+    args がタプル (df_chunk, req_df_map, master_data_dict) ならそのマスターデータから索引を作り、
+    df_chunk だけなら _init_judgement_worker で共有したマスターデータを使う。
+    """
+    if isinstance(args, tuple):
+        df_chunk, req_df_map, master_data_dict = args
+        return df_chunk, req_df_map, master_data_dict, MasterSnapshot(master_data_dict)
+    if not _JUDGEMENT_WORKER_CONTEXT:
+        raise RuntimeError("マスターデータが共有されていません。_init_judgement_worker を initializer に指定してください。")
+    return (
+        args,
+        _JUDGEMENT_WORKER_CONTEXT["req_df_map"],
+        _JUDGEMENT_WORKER_CONTEXT["master_data_dict"],
+        _JUDGEMENT_WORKER_CONTEXT["snapshot"],
+    )
+
+
 def _process_judgement_chunk(args):
     """
     チャンク単位で要件判定を処理（multiprocessing用グローバル関数）
 
     Args:
-        args: タプル (df_chunk, req_df_map, master_data_dict)
+        args: タプル (df_chunk, req_df_map, master_data_dict)、
+            または df_chunk のみ (マスターデータは _init_judgement_worker で共有したものを使う)
 
     Returns:
         dict: 処理結果（judgement_list, sufficient_list, insufficient_list）
     """
-    df_chunk, req_df_map, master_data_dict = args
-
-    # マスターデータを取り出し
-    master_data_company = master_data_dict['company']
-    master_data_disqualifications = master_data_dict['disqualifications']
-    master_data_office = master_data_dict['office']
-    master_data_office_registration_authorization = master_data_dict['office_registration_authorization']
-    master_data_office_registration_authorization_with_converter = master_data_dict['office_registration_authorization_with_converter']
-    master_data_agency = master_data_dict['agency']
-    master_data_construction = master_data_dict['construction']
-    master_data_office_work_achivements = master_data_dict['office_work_achivements']
-    master_data_employee = master_data_dict['employee']
-    master_data_employee_qualification = master_data_dict['employee_qualification']
-    master_data_technician_qualification = master_data_dict['technician_qualification']
-    master_data_employee_experience = master_data_dict['employee_experience']
-
     # requirements モジュールの関数をimport（ワーカープロセス内で確実に利用可能にする）
     try:
-        from packages.engine.requirements.ineligibility import checkIneligibilityDynamic
-        from packages.engine.requirements.experience import checkExperienceRequirement
-        from packages.engine.requirements.location import checkLocationRequirement
-        from packages.engine.requirements.grade_item import checkGradeAndItemRequirement
-        from packages.engine.requirements.technician import checkTechnicianRequirement
+        from packages.engine.requirements.compiled import compileRequirements
     except ModuleNotFoundError:
-        from requirements.ineligibility import checkIneligibilityDynamic
-        from requirements.experience import checkExperienceRequirement
-        from requirements.location import checkLocationRequirement
-        from requirements.grade_item import checkGradeAndItemRequirement
-        from requirements.technician import checkTechnicianRequirement
+        from requirements.compiled import compileRequirements
+
+    # snapshot: マスターデータをキー列で索引化したもの (各 checker は全件走査せず索引から行を引く)
+    df_chunk, req_df_map, master_data_dict, snapshot = _resolve_chunk_args(args)
+    # 判定結果のメモ化・計測は initializer で ResultCache / Step3Profiler を共有した場合だけ行う
+    result_cache = None if isinstance(args, tuple) else _JUDGEMENT_WORKER_CONTEXT.get("result_cache")
+    profiler = None if isinstance(args, tuple) else _JUDGEMENT_WORKER_CONTEXT.get("profiler")
+    evaluate = _evaluate_requirement if profiler is None else partial(_evaluate_requirement_profiled, profiler)
+    # 早期打ち切りも initializer で判定コストを共有した場合だけ行う
+    early_exit_costs = None if isinstance(args, tuple) else _JUDGEMENT_WORKER_CONTEXT.get("early_exit_costs")
+
+    # 要件テキストは公告ごとに1回だけ解析し、全拠点で使い回す (早期打ち切りの判定順も公告ごとに1回だけ決める)
+    compiled_requirements_map = {}
+    early_exit_order_map = {}
+
+    # createdDate / updatedDate はチャンク内で共通の時刻にする (DB 側で updatedDate は NOW() に置き換わる)
+    now = datetime.now()
 
     result_judgement_list = []
     result_sufficient_requirements_list = []
@@ -401,7 +715,6 @@ def _process_judgement_chunk(args):
         announcement_no = row1.announcement_no
         company_no = row1.company_no
         office_no = row1.office_no
-        tmp_result_judgement_list = []
 
         req_df = req_df_map.get(announcement_no)
 
@@ -409,148 +722,238 @@ def _process_judgement_chunk(args):
             print(f"   announcement_no={announcement_no}: No requirement found. Skip anyway.")
             continue
 
+        compiled_requirements = compiled_requirements_map.get(announcement_no)
+        if compiled_requirements is None:
+            compiled_requirements = compileRequirements(req_df)
+            compiled_requirements_map[announcement_no] = compiled_requirements
+            if early_exit_costs is not None:
+                early_exit_order_map[announcement_no] = _early_exit_order(compiled_requirements, early_exit_costs)
+
         # UUIDを生成
         evaluation_no = str(uuid.uuid4())
 
-        for row2 in req_df.itertuples():
-            requirement_type = row2.requirement_type
-            requirement_text = row2.requirement_text
-            requirement_no = row2.requirement_no
-
-            if requirement_type == "欠格要件":
-                val = checkIneligibilityDynamic(
-                    requirementText=requirement_text,
-                    companyNo=company_no,
-                    officeNo=office_no,
-                    company_data=master_data_company,
-                    disqualification_data=master_data_disqualifications,
-                    office_registration_authorization_data=master_data_office_registration_authorization
-                )
-            elif requirement_type == "業種・等級要件":
-                val = checkGradeAndItemRequirement(
-                    requirementText=requirement_text,
-                    officeNo=office_no,
-                    licenseData=master_data_office_registration_authorization_with_converter,
-                    agencyData=master_data_agency,
-                    constructionData=master_data_construction
-                )
-            elif requirement_type == "所在地要件":
-                val = checkLocationRequirement(
-                    requirementText=requirement_text,
-                    officeNo=office_no,
-                    agencyData=master_data_agency,
-                    officeData=master_data_office
-                )
-            elif requirement_type == "実績要件":
-                val = checkExperienceRequirement(
-                    requirementText=requirement_text,
-                    officeNo=office_no,
-                    office_experience_data=master_data_office_work_achivements,
-                    agency_data=master_data_agency,
-                    construction_data=master_data_construction
-                )
-            elif requirement_type == "技術者要件":
-                val = checkTechnicianRequirement(
-                    requirementText=requirement_text,
-                    companyNo=company_no,
-                    officeNo=office_no,
-                    employeeData=master_data_employee,
-                    qualData=master_data_employee_qualification,
-                    qualMasterData=master_data_technician_qualification,
-                    expData=master_data_employee_experience
+        if result_cache is None:
+            def judge(compiled):
+                return evaluate(compiled, company_no, office_no, master_data_dict, snapshot)
+        else:
+            def judge(compiled):
+                return result_cache.getOrEvaluate(
+                    compiled, company_no, office_no,
+                    partial(evaluate, compiled, company_no, office_no, master_data_dict, snapshot)
                 )
-            else:
-                val = {"is_ok":False, "reason":"その他要件があります。確認してください"}
+        evaluated, skipped = _judge_requirements(compiled_requirements, judge, early_exit_order_map.get(announcement_no))
 
-            tmp_result_judgement_list.append({
-                "evaluation_no":evaluation_no,
-                "requirement_no":requirement_no,
-                "company_no":company_no,
-                "office_no":office_no,
-                "requirementType":requirement_type,
-                "is_ok":val["is_ok"],
-                "result":val["reason"]
-            })
+        checked_requirement, sufficient_list, insufficient_list = _summarize_office_judgement(
+            announcement_no, company_no, office_no, evaluation_no, evaluated, now=now
+        )
+        if skipped:
+            _mark_partial_judgement(checked_requirement, skipped, EARLY_EXIT_REMARKS)
+        result_judgement_list.append(checked_requirement)
+        result_sufficient_requirements_list.extend(sufficient_list)
+        result_insufficient_requirements_list.extend(insufficient_list)
 
-            if val["is_ok"]:
-                result_sufficient_requirements_list.append({
-                    "sufficiency_detail_no":str(uuid.uuid4()),
-                    "evaluation_no":evaluation_no,
-                    "announcement_no":announcement_no,
-                    "requirement_no":requirement_no,
-                    "company_no":company_no,
-                    "office_no":office_no,
-                    "requirement_type":requirement_type,
-                    "requirement_description":val["reason"],
-                    "createdDate":datetime.now(),
-                    "updatedDate":datetime.now()
-                })
+    result = {
+        'judgement': result_judgement_list,
+        'sufficient': result_sufficient_requirements_list,
+        'insufficient': result_insufficient_requirements_list
+    }
+    if result_cache is not None:
+        # ヒット数と新しく判定した結果は親プロセスで集計・保存する
+        result['result_cache'] = {"stats": result_cache.takeStats(), "entries": result_cache.takeNewEntries()}
+    return result
+
+
+def _process_judgement_chunk_columnar(args):
+    """
+    チャンク単位で要件判定を処理する（要件単位の列指向版、multiprocessing用グローバル関数）
+
+    _process_judgement_chunk と同じ入力・同じ結果を返すが、公告ごとに対象拠点をまとめ、
+    要件1件をすべての対象拠点に対して一度に判定する (evaluateRequirementColumnar)。
+
+    Args:
+        args: タプル (df_chunk, req_df_map, master_data_dict)、
+            または df_chunk のみ (マスターデータは _init_judgement_worker で共有したものを使う)
+
+    Returns:
+        dict: 処理結果（judgement_list, sufficient_list, insufficient_list）
+    """
+    try:
+        from packages.engine.requirements.compiled import compileRequirements
+        from packages.engine.requirements.columnar import evaluateRequirementColumnar
+    except ModuleNotFoundError:
+        from requirements.compiled import compileRequirements
+        from requirements.columnar import evaluateRequirementColumnar
+
+    df_chunk, req_df_map, master_data_dict, snapshot = _resolve_chunk_args(args)
+    profiler = None if isinstance(args, tuple) else _JUDGEMENT_WORKER_CONTEXT.get("profiler")
+    evaluate = _evaluate_requirement if profiler is None else partial(_evaluate_requirement_profiled, profiler)
+    early_exit_costs = None if isinstance(args, tuple) else _JUDGEMENT_WORKER_CONTEXT.get("early_exit_costs")
+
+    rows = list(df_chunk[["announcement_no", "company_no", "office_no"]].itertuples(index=False, name=None))
+
+    # 公告ごとに対象行の位置をまとめる (行順は保つ)
+    positions_by_announcement = {}
+    for pos, (announcement_no, company_no, office_no) in enumerate(rows):
+        positions_by_announcement.setdefault(announcement_no, []).append(pos)
+
+    # 公告ごとに、要件1件ずつ対象拠点すべてをまとめて判定する
+    # 早期打ち切りでは判定コストの低い要件から順に判定し、満たさなかった拠点は以降の要件の対象から外す
+    compiled_by_announcement = {}
+    judged_by_row = {}
+    for announcement_no, positions in positions_by_announcement.items():
+        req_df = req_df_map.get(announcement_no)
+        if req_df is None or req_df.shape[0] == 0:
+            continue
+
+        compiled_requirements = compileRequirements(req_df)
+        compiled_by_announcement[announcement_no] = compiled_requirements
+        if early_exit_costs is None:
+            order = range(len(compiled_requirements))
+        else:
+            order = _early_exit_order(compiled_requirements, early_exit_costs)
+        for pos in positions:
+            judged_by_row[pos] = {}
+
+        active = positions
+        for req_pos in order:
+            if not active:
+                break
+            compiled = compiled_requirements[req_pos]
+            company_nos = [rows[pos][1] for pos in active]
+            office_nos = [rows[pos][2] for pos in active]
+
+            def fallback(company_no, office_no, compiled=compiled):
+                return evaluate(compiled, company_no, office_no, master_data_dict, snapshot)
+
+            if profiler is None:
+                vals = evaluateRequirementColumnar(compiled, company_nos, office_nos, snapshot, fallback)
             else:
-                result_insufficient_requirements_list.append({
-                    "shortage_detail_no":str(uuid.uuid4()),
-                    "evaluation_no":evaluation_no,
-                    "announcement_no":announcement_no,
-                    "requirement_no":requirement_no,
-                    "company_no":company_no,
-                    "office_no":office_no,
-                    "requirement_type":requirement_type,
-                    "requirement_description":val["reason"],
-                    "suggestions_for_improvement":"",
-                    "final_comment":"",
-                    "createdDate":datetime.now(),
-                    "updatedDate":datetime.now()
-                })
-
-        # サマリー化
-        tmp_result_judgement_df = pd.DataFrame(tmp_result_judgement_list)
-
-        checked_requirement = {
-            "evaluation_no":evaluation_no,
-            "announcement_no":announcement_no,
-            "company_no":company_no,
-            "office_no":office_no,
-            "requirement_ineligibility":True,
-            "requirement_grade_item":True,
-            "requirement_location":True,
-            "requirement_experience":True,
-            "requirement_technician":True,
-            "requirement_other":True,
-            "deficit_requirement_message":"",
-            "final_status":True,
-            "message":"",
-            "remarks":"",
-            "createdDate":datetime.now(),
-            "updatedDate":datetime.now()
-        }
-        requirement_type_map = {
-            "欠格要件":"requirement_ineligibility",
-            "業種・等級要件":"requirement_grade_item",
-            "所在地要件":"requirement_location",
-            "実績要件":"requirement_experience",
-            "技術者要件":"requirement_technician"
-        }
+                # 列指向の判定は要件1件 x 対象拠点すべてで1回と数える (fallback の checker 呼び出しは checker に記録される)
+                with profiler.measure("columnar", compiled.requirement_type):
+                    vals = evaluateRequirementColumnar(compiled, company_nos, office_nos, snapshot, fallback)
+            for pos, val in zip(active, vals):
+                judged_by_row[pos][req_pos] = val
+            if early_exit_costs is not None:
+                active = [pos for pos, val in zip(active, vals) if val["is_ok"]]
 
-        is_ok_false = tmp_result_judgement_df[~tmp_result_judgement_df["is_ok"]]
+    result_judgement_list = []
+    result_sufficient_requirements_list = []
+    result_insufficient_requirements_list = []
 
-        if is_ok_false.shape[0] > 0:
-            ng_req_types = is_ok_false["requirementType"].unique()
-            for type_ in ng_req_types:
-                type_name = requirement_type_map.get(type_, "requirement_other")
-                checked_requirement[type_name] = False
-                is_ok_false_type = is_ok_false[is_ok_false["requirementType"] == type_]
-                result_values = is_ok_false_type["result"].str.replace(rf"{type_}[:：]", "", regex=True).unique()
-                result_values = "[" + type_ + "]" + "|".join(result_values)
+    # createdDate / updatedDate はチャンク内で共通の時刻にする (DB 側で updatedDate は NOW() に置き換わる)
+    now = datetime.now()
 
-                if checked_requirement["deficit_requirement_message"] == "":
-                    checked_requirement["deficit_requirement_message"] = result_values
-                else:
-                    checked_requirement["deficit_requirement_message"] = checked_requirement["deficit_requirement_message"] + " " + result_values
-            checked_requirement["final_status"] = False
+    # 結果は行単位の処理と同じくチャンクの行順で並べる
+    for pos, (announcement_no, company_no, office_no) in enumerate(rows):
+        judged = judged_by_row.get(pos)
+        if judged is None:
+            print(f"   announcement_no={announcement_no}: No requirement found. Skip anyway.")
+            continue
+
+        # 判定結果は公告の要件順に並べる
+        evaluated = []
+        skipped = []
+        for req_pos, compiled in enumerate(compiled_by_announcement[announcement_no]):
+            if req_pos in judged:
+                evaluated.append((compiled, judged[req_pos]))
+            else:
+                skipped.append(compiled)
 
+        evaluation_no = str(uuid.uuid4())
+        checked_requirement, sufficient_list, insufficient_list = _summarize_office_judgement(
+            announcement_no, company_no, office_no, evaluation_no, evaluated, now=now
+        )
+        if skipped:
+            _mark_partial_judgement(checked_requirement, skipped, EARLY_EXIT_REMARKS)
         result_judgement_list.append(checked_requirement)
+        result_sufficient_requirements_list.extend(sufficient_list)
+        result_insufficient_requirements_list.extend(insufficient_list)
 
     return {
         'judgement': result_judgement_list,
         'sufficient': result_sufficient_requirements_list,
         'insufficient': result_insufficient_requirements_list
     }
+
+
+# step3 の事前判定 (prefilter) で判定する要件種別。
+# 拠点のライセンス・所在地だけで決まり、evaluateRequirementColumnar で対象拠点をまとめて安く判定できるもの。
+PREFILTER_REQUIREMENT_TYPES = ("業種・等級要件", "所在地要件")
+
+PREFILTER_REMARKS = "事前判定：業種・等級要件または所在地要件を満たさないため、その他の要件は判定していません"
+
+# 一部の要件しか判定していない企業公告判定の remarks (refill_partial で判定し直す対象)
+PARTIAL_JUDGEMENT_REMARKS = (PREFILTER_REMARKS, EARLY_EXIT_REMARKS)
+
+
+def _prefilter_judgement_pairs(df0, req_df_map, master_data_dict, snapshot):
+    """
+    step3 の事前判定。PREFILTER_REQUIREMENT_TYPES の要件だけを先に判定し、満たさない組み合わせを判定対象から外す。
+
+    外した組み合わせは final_status=False の企業公告判定として記録する。
+    判定した要件 (事前判定の要件) の結果は通常の判定と同じ。判定していない要件の列は None にし、remarks に理由を残す。
+
+    Args:
+        df0: 判定対象 (announcement_no, company_no, office_no を含む DataFrame)
+        req_df_map: announcement_no -> 要件 DataFrame
+        master_data_dict: マスターデータの辞書
+        snapshot: master_data_dict の MasterSnapshot
+
+    Returns:
+        tuple: (残りの判定対象の DataFrame, 外した組み合わせの処理結果 {"judgement", "sufficient", "insufficient"})
+    """
+    rows = list(df0[["announcement_no", "company_no", "office_no"]].itertuples(index=False, name=None))
+
+    positions_by_announcement = {}
+    for pos, (announcement_no, company_no, office_no) in enumerate(rows):
+        positions_by_announcement.setdefault(announcement_no, []).append(pos)
+
+    now = datetime.now()
+    pruned = []
+    result = {"judgement": [], "sufficient": [], "insufficient": []}
+    for announcement_no, positions in positions_by_announcement.items():
+        req_df = req_df_map.get(announcement_no)
+        if req_df is None or req_df.shape[0] == 0:
+            continue
+        compiled_requirements = compileRequirements(req_df)
+        prefilter_requirements = [
+            compiled for compiled in compiled_requirements
+            if compiled.requirement_type in PREFILTER_REQUIREMENT_TYPES
+        ]
+        if not prefilter_requirements:
+            continue
+        # 事前判定で判定しない要件 (列は結果が分からないので None にする)
+        skipped_requirements = [
+            compiled for compiled in compiled_requirements
+            if compiled.requirement_type not in PREFILTER_REQUIREMENT_TYPES
+        ]
+
+        company_nos = [rows[pos][1] for pos in positions]
+        office_nos = [rows[pos][2] for pos in positions]
+        evaluated_by_row = [[] for _ in positions]
+        for compiled in prefilter_requirements:
+            def fallback(company_no, office_no, compiled=compiled):
+                return _evaluate_requirement(compiled, company_no, office_no, master_data_dict, snapshot)
+
+            vals = evaluateRequirementColumnar(compiled, company_nos, office_nos, snapshot, fallback)
+            for evaluated, val in zip(evaluated_by_row, vals):
+                evaluated.append((compiled, val))
+
+        for pos, evaluated in zip(positions, evaluated_by_row):
+            if all(val["is_ok"] for compiled, val in evaluated):
+                continue
+            pruned.append(pos)
+            _, company_no, office_no = rows[pos]
+            checked_requirement, sufficient_list, insufficient_list = _summarize_office_judgement(
+                announcement_no, company_no, office_no, str(uuid.uuid4()), evaluated, now=now
+            )
+            _mark_partial_judgement(checked_requirement, skipped_requirements, PREFILTER_REMARKS)
+            result["judgement"].append(checked_requirement)
+            result["sufficient"].extend(sufficient_list)
+            result["insufficient"].extend(insufficient_list)
+
+    if not pruned:
+        return df0, result
+    keep = np.ones(len(rows), dtype=bool)
+    keep[pruned] = False
+    return df0[keep], result
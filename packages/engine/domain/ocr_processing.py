@@ -49,6 +49,7 @@ from packages.engine.domain.constants import (
     BID_TYPE_PREFERRED_DESIGNATION,
     BID_TYPE_OTHER,
 )
+from packages.engine.domain.requirement_classifier import classify_requirement_types
 
 # UI が期待するカテゴリ体系に合わせるための定数
 GOODS_SERVICE_SEGMENTS = {
@@ -1219,19 +1220,16 @@ class OcrProcessingMixin:
             df_main["done"] = False
 
         tablename_requirements = self.tablenamesconfig.bid_requirements
-        tmp_check_table = "tmp_req_check"
-
         df_check = pd.DataFrame({'announcement_id': df_main['announcement_id'].unique().astype(int)})
-        self.db_operator.uploadDataToTable(df_check, tmp_check_table, chunksize=5000)
-
-        if self.db_operator.ifTableExists(tablename_requirements):
-            df_req_status = self.db_operator.checkRequirementsExist(tmp_check_table, tablename_requirements)
-            req_done_lookup = df_req_status.set_index('announcement_id')['req_exists'].to_dict()
-            req_done_lookup = {k: bool(v) for k, v in req_done_lookup.items()}
-        else:
-            req_done_lookup = {ann_id: False for ann_id in df_main['announcement_id']}
+        # checkRequirementsExist は別の接続から読む場合があるので temporary にはしない
+        with self.db_operator.stagingTable(df_check, "tmp_req_check") as tmp_check_table:
+            if self.db_operator.ifTableExists(tablename_requirements):
+                df_req_status = self.db_operator.checkRequirementsExist(tmp_check_table, tablename_requirements)
+                req_done_lookup = df_req_status.set_index('announcement_id')['req_exists'].to_dict()
+                req_done_lookup = {k: bool(v) for k, v in req_done_lookup.items()}
+            else:
+                req_done_lookup = {ann_id: False for ann_id in df_main['announcement_id']}
 
-        self.db_operator.dropTable(tmp_check_table)
         print(f"Checked requirements existence for {len(req_done_lookup)} announcements")
 
         req_done_true = [k for k, v in req_done_lookup.items() if v]
@@ -1613,9 +1611,10 @@ class OcrProcessingMixin:
                         else:
                             req_list = ["Error fetching requirements."]
 
+                        # 要件タイプは公告に依らないので、文書ごとにまとめて分類する
+                        req_types = classify_requirement_types(list(req_list)).tolist()
                         for announcement_id in announcement_ids:
-                            for idx, req_text in enumerate(req_list):
-                                req_type = self._classify_requirement_type(req_text)
+                            for idx, (req_text, req_type) in enumerate(zip(req_list, req_types)):
                                 db_req_records.append({
                                     'document_id': document_id,
                                     'announcement_no': announcement_id,
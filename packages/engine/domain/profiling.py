@@ -0,0 +1,108 @@
+#coding: utf-8
+"""
+step3 の計測 (フェーズ・checker ごとの処理時間と呼び出し回数)。
+
+Step3Profiler は (種類, 名前) ごとに呼び出し回数と経過時間 (秒) を集計する。
+種類は "phase" (マスター読込・preselect・書き込みなど親プロセスの処理) と
+"checker" (要件種別ごとの checker 呼び出し) など。
+ワーカーはチャンクごとに take() した集計を結果に添えて返し、親プロセスで merge する。
+有効にしない場合 (profiler が None) は計測のコードを通らない。
+書き出した checker の平均時間は load_checker_costs で読み、早期打ち切りの判定順に使える。
+"""
+
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+REPORT_COLUMNS = ["kind", "name", "calls", "seconds", "mean_ms"]
+
+
+class Step3Profiler:
+    """(種類, 名前) ごとの呼び出し回数と経過時間の集計。"""
+
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, kind, name, seconds, calls=1):
+        stat = self._stats.get((kind, name))
+        if stat is None:
+            stat = self._stats[(kind, name)] = [0, 0.0]
+        stat[0] += calls
+        stat[1] += seconds
+
+    @contextmanager
+    def measure(self, kind, name):
+        """with ブロックの経過時間を (kind, name) に記録する。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start)
+
+    def take(self):
+        """集計を [(kind, name, calls, seconds), ...] で返して空にする (ワーカーから親プロセスへ渡す)。"""
+        rows = [(kind, name, calls, seconds) for (kind, name), (calls, seconds) in self._stats.items()]
+        self._stats = {}
+        return rows
+
+    def merge(self, rows):
+        """take() の結果を足し合わせる。"""
+        for kind, name, calls, seconds in rows:
+            self.record(kind, name, seconds, calls=calls)
+
+    def rows(self):
+        """集計を種類ごと・経過時間の長い順に並べた dict のリストで返す。"""
+        rows = [
+            {
+                "kind": kind,
+                "name": name,
+                "calls": calls,
+                "seconds": round(seconds, 6),
+                "mean_ms": round(seconds / calls * 1000, 3) if calls else 0.0,
+            }
+            for (kind, name), (calls, seconds) in self._stats.items()
+        ]
+        return sorted(rows, key=lambda row: (row["kind"], -row["seconds"]))
+
+    def write_report(self, path):
+        """集計をファイルに書き出す。拡張子が .csv なら CSV、それ以外は JSON。"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        rows = self.rows()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+
+    def summary(self):
+        """集計を表示用の文字列にする。"""
+        lines = ["step3 profile:"]
+        for row in self.rows():
+            lines.append(
+                f"  {row['kind']:<8} {row['name']:<40} calls={row['calls']:>9} "
+                f"total={row['seconds']:>10.3f}s mean={row['mean_ms']:>9.3f}ms"
+            )
+        return "\n".join(lines)
+
+
+def load_checker_costs(path):
+    """
+    write_report で書き出した計測結果から、checker の要件種別ごとの平均時間 (ms) を読む。
+
+    Returns:
+        dict: 要件種別 -> mean_ms (step3 の早期打ち切りで要件を判定する順に使う)
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    return {row["name"]: float(row["mean_ms"]) for row in rows if row["kind"] == "checker"}
@@ -0,0 +1,108 @@
+#coding: utf-8
+"""
+要件文の requirement_type 分類。
+
+要件タイプごとのキーワードの正規表現をモジュール読み込み時に一度だけ
+コンパイルしておき、要件文の Series は同じ文をまとめて 1 回ずつ分類する。
+OCR で数万行の要件文を分類する場合も、呼び出しごとにキーワード表や
+パターンを作り直さずに済む。
+"""
+
+import re
+
+import pandas as pd
+
+OTHER_REQUIREMENT_TYPE = "その他要件"
+
+# 要件タイプ → キーワード (判定の優先順。その他要件は最後)
+REQUIREMENT_TYPE_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "欠格要件": (
+        "70条", "71条", "会社更生法", "民事再生法", "更生手続",
+        "再生手続", "情報保全", "資本関係", "人的関係", "滞納",
+        "外国法", "取引停止", "破産", "暴力団", "指名停止",
+        "後見人", "法人格取消",
+    ),
+    "業種・等級要件": ("競争参加資格", "一般競争", "指名競争", "等級", "総合審査"),
+    "所在地要件": ("所在", "県内", "市内", "防衛局管内", "本店が", "支店が"),
+    "技術者要件": (
+        "施工管理技士", "技術士", "資格者証", "電気工事士", "建築士",
+        "基幹技能者", "監理技術者", "主任技術者", "監理技術者資格者証", "監理技術者講習修了証",
+    ),
+    "実績要件": (
+        "実績", "工事成績", "元請けとして", "元請として", "点以上",
+        "jv比率", "過去実績",
+    ),
+    OTHER_REQUIREMENT_TYPE: ("jv", "共同企業体", "出資比率"),  # JV, 共同企業体, or 不明
+}
+
+
+class RequirementTypeClassifier:
+    """
+    要件文を requirement_type に分類する。
+
+    キーワードは要件タイプごとに 1 つの選択パターンへまとめてコンパイルする。
+    全タイプを 1 つの選択にまとめるより、CPython の re ではこの方が速い
+    (タイプ単位ならリテラルの先頭文字で候補位置を絞り込める)。
+    """
+
+    def __init__(self, keywords=None):
+        if keywords is None:
+            keywords = REQUIREMENT_TYPE_KEYWORDS
+        self.types = list(keywords)
+        self._patterns = [
+            (req_type, re.compile("|".join(re.escape(kw) for kw in kws)))
+            for req_type, kws in keywords.items()
+        ]
+
+    def matched_types(self, text):
+        """text がキーワードを含む要件タイプを、優先順のリストで返す (その他要件を含む)。"""
+        text_lower = text.lower()
+        return [req_type for req_type, pattern in self._patterns if pattern.search(text_lower)]
+
+    def classify(self, text):
+        """最初に一致した要件タイプを返す。その他要件以外に一致しなければ その他要件。"""
+        text_lower = text.lower()
+        for req_type, pattern in self._patterns:
+            if req_type != OTHER_REQUIREMENT_TYPE and pattern.search(text_lower):
+                return req_type
+        return OTHER_REQUIREMENT_TYPE
+
+    def expand(self, text):
+        """
+        text が該当する要件タイプをすべて返す (convertRequirementTextDict の行展開用)。
+
+        その他要件は、その他要件のキーワードを含む場合か、他のどのタイプにも該当しない場合に付く。
+        """
+        matched = self.matched_types(text)
+        if not matched:
+            matched.append(OTHER_REQUIREMENT_TYPE)
+        return matched
+
+    def classify_series(self, texts):
+        """
+        要件文の Series をまとめて分類し、requirement_type の Series (同じ索引) を返す。
+
+        同じ要件文は 1 回だけ分類する。
+        """
+        texts = pd.Series(texts)
+        codes, uniques = pd.factorize(texts, use_na_sentinel=False)
+        types = [self.classify(str(text)) for text in uniques]
+        return pd.Series([types[code] for code in codes], index=texts.index, name="requirement_type", dtype=object)
+
+
+_DEFAULT_CLASSIFIER = RequirementTypeClassifier()
+
+
+def classify_requirement_type(text):
+    """要件文 1 件の requirement_type を返す。"""
+    return _DEFAULT_CLASSIFIER.classify(text)
+
+
+def classify_requirement_types(texts):
+    """要件文の Series (またはリスト) の requirement_type 列を返す。"""
+    return _DEFAULT_CLASSIFIER.classify_series(texts)
+
+
+def expand_requirement_types(text):
+    """要件文 1 件が該当する要件タイプをすべて返す。"""
+    return _DEFAULT_CLASSIFIER.expand(text)
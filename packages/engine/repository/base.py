@@ -2,7 +2,9 @@
 
 import re
 import sqlite3
+import uuid
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
 
 import pandas as pd
@@ -49,6 +51,84 @@ def validate_sql_identifier(name: str, label: str = "identifier") -> str:
     return name
 
 
+def dataframe_to_rows(data):
+    """
+    DataFrame を executemany / execute_values に渡す行 (タプル) のリストにする。
+
+    値は列ごとの .tolist() で Python のスカラーにし、NaN / None / NaT は None にする (to_sql と同じ)。
+    """
+    columns = []
+    for _, column in data.items():
+        values = column.tolist()
+        if column.hasnans:
+            values = [None if is_missing else value for value, is_missing in zip(values, column.isna().tolist())]
+        columns.append(values)
+    return list(zip(*columns))
+
+
+# 中間テーブルを使わずに直接書き込む (insertRows) ときの列
+COMPANY_BID_JUDGEMENT_COLUMNS = [
+    "evaluation_no", "announcement_no", "company_no", "office_no",
+    "requirement_ineligibility", "requirement_grade_item", "requirement_location",
+    "requirement_experience", "requirement_technician", "requirement_other",
+    "deficit_requirement_message", "final_status", "message", "remarks", "createdDate", "updatedDate",
+]
+SUFFICIENT_REQUIREMENTS_COLUMNS = [
+    "sufficiency_detail_no", "evaluation_no", "announcement_no", "requirement_no", "company_no", "office_no",
+    "requirement_type", "requirement_description", "createdDate", "updatedDate",
+]
+INSUFFICIENT_REQUIREMENTS_COLUMNS = [
+    "shortage_detail_no", "evaluation_no", "announcement_no", "requirement_no", "company_no", "office_no",
+    "requirement_type", "requirement_description", "suggestions_for_improvement", "final_comment",
+    "createdDate", "updatedDate",
+]
+BID_REQUIREMENTS_COLUMNS = [
+    "document_id", "announcement_no", "requirement_no", "requirement_type", "requirement_text",
+    "is_ocr_failed", "done_judgement", "createdDate", "updatedDate",
+]
+BID_ANNOUNCEMENTS_COLUMNS = [
+    "announcement_no", "workName", "topAgencyName", "orderer_id",
+    "workPlace", "zipcode", "address", "department", "assigneeName",
+    "telephone", "fax", "mail", "publishDate", "docDistStart", "docDistEnd",
+    "submissionStart", "submissionEnd", "bidStartDate", "bidEndDate",
+    "bidType", "category", "is_ocr_failed", "doneOCR", "createdDate", "updatedDate",
+    "notice_category_name", "notice_category_code", "notice_procurement_method",
+    "category_segment", "category_detail",
+]
+
+# 結合・絞り込みで使う性能用インデックス: 既定のテーブル名 -> ((インデックス名, 列), ...)
+#   PostgreSQL では db/migrations/20260406100000_add_performance_indexes_and_fulltext.sql
+#   (announcement_id は 20260331000000_add_announcement_id_to_documents.sql) で作成済み。
+#   SQLite はテーブルを作るときに ensurePerformanceIndexes で同じインデックスを作る。
+#   pg_bigm の全文検索インデックスは PostgreSQL 専用なので含めない。
+PERFORMANCE_INDEXES = {
+    "company_bid_judgement": (
+        ("idx_cbj_announcement_company_office", ["announcement_no", "company_no", "office_no"]),
+        ("idx_cbj_announcement_no", ["announcement_no"]),
+    ),
+    "office_master": (
+        ("idx_office_master_company_no", ["company_no"]),
+        ("idx_office_master_office_no", ["office_no"]),
+    ),
+    "bid_requirements": (
+        ("idx_bid_requirements_announcement_no", ["announcement_no"]),
+    ),
+    "sufficient_requirements": (
+        ("idx_sufficient_req_eval_ann", ["evaluation_no", "announcement_no"]),
+        ("idx_sufficient_req_company_office", ["company_no", "office_no"]),
+    ),
+    "insufficient_requirements": (
+        ("idx_insufficient_req_eval_ann", ["evaluation_no", "announcement_no"]),
+        ("idx_insufficient_req_company_office", ["company_no", "office_no"]),
+    ),
+    "announcements_documents_master": (
+        ("idx_docs_master_announcement_no", ["announcement_no"]),
+        ("idx_announcements_documents_master_announcement_id", ["announcement_id"]),
+        ("idx_announcements_documents_master_document_id", ["document_id"]),
+    ),
+}
+
+
 @dataclass(frozen=True)
 class TablenamesConfig:
     """
@@ -65,6 +145,8 @@ class TablenamesConfig:
     office_master: str = "office_master"
     bid_announcements_document_table:str = "announcements_documents_master"
     source_pages: str = "source_pages"
+    step3_office_fingerprints: str = "step3_office_fingerprints"
+    step3_announcement_fingerprints: str = "step3_announcement_fingerprints"
 
 
 class DBOperator(ABC):
@@ -94,6 +176,9 @@ class DBOperator(ABC):
       google cloud platform の bigquery の dataset_name。
     """
 
+    # この行数以下の書き込みは中間テーブルを使わずに直接 INSERT する (insertRows)。0 なら常に中間テーブルを使う。
+    direct_write_max_rows = 5000
+
     def __init__(self, sqlite3_db_file_path=None, bigquery_location=None, bigquery_project_id=None, bigquery_dataset_name=None,
                  postgres_host=None, postgres_port=None, postgres_database=None, postgres_user=None, postgres_password=None):
         """
@@ -190,6 +275,112 @@ class DBOperator(ABC):
     def selectToTable(self, tablename, where_clause=""):
         raise NotImplementedError
 
+    def stagingTableName(self, prefix="tmp"):
+        """
+        中間テーブル (merge / update / delete の入力) の一意な名前を返す。
+
+        同時に動く複数のジョブが同じ tmp_* テーブルを作り直して壊さないよう、prefix に乱数を付ける。
+        """
+        validate_sql_identifier(prefix, "staging table prefix")
+        return f"{prefix[:40]}_{uuid.uuid4().hex[:16]}"
+
+    def uploadStagingTable(self, data, tablename, temporary=False, chunksize=5000):
+        """
+        中間テーブルを作る。既定では uploadDataToTable と同じ (通常のテーブル)。
+
+        PostgreSQL では WAL を書かない UNLOGGED TABLE にし、temporary=True なら TEMPORARY TABLE にする。
+
+        Args:
+            data: アップロードする DataFrame
+            tablename: stagingTableName で作ったテーブル名
+            temporary: 中間テーブルを self.cur (同じ接続) からしか参照しない場合 True。
+                any_query / selectToTable など別の接続から読む場合は False にする。
+            chunksize: uploadDataToTable に渡す chunksize
+        """
+        self.uploadDataToTable(data, tablename, chunksize=chunksize)
+
+    @contextmanager
+    def stagingTable(self, data, prefix="tmp", temporary=False, chunksize=5000):
+        """
+        data を一意な名前の中間テーブルにアップロードし、with を抜けるときに削除する。
+
+            with db_operator.stagingTable(df, "tmp_bid_requirements_ocr", temporary=True) as tmp_table:
+                db_operator.mergeRequirements(tablename, tmp_table)
+
+        Yields:
+            str: 中間テーブル名
+        """
+        tablename = self.stagingTableName(prefix)
+        try:
+            self.uploadStagingTable(data, tablename, temporary=temporary, chunksize=chunksize)
+            yield tablename
+        finally:
+            self.dropTable(tablename)
+
+    @contextmanager
+    def transaction(self):
+        """
+        with の中の書き込み (insertRowsDirect / update* / 中間テーブルの削除など) を1トランザクションで実行する。
+
+        例外時は rollback する。既にトランザクション中ならそれに加わる (入れ子にしても途中で commit しない)。
+        既定はトランザクションの無い DB (BigQuery) 向けで何もしない (各文がそれぞれ確定する)。
+        """
+        yield
+
+    def useDirectWrite(self, data):
+        """data を中間テーブルを使わずに直接書き込むかどうか (行数が direct_write_max_rows 以下)。"""
+        return 0 < data.shape[0] <= self.direct_write_max_rows
+
+    def insertRowsDirect(self, target_tablename, data, skip_existing_key=None):
+        """
+        data の行を target_tablename に直接 INSERT する (中間テーブルを作らない)。
+
+        Args:
+            target_tablename: 書き込み先のテーブル名
+            data: 書き込む列だけにした DataFrame
+            skip_existing_key: 指定した場合、この列の値が target_tablename に既にある行は書き込まない
+                (merge* の WHERE NOT EXISTS と同じ。書き込む前の target_tablename と比べる)
+
+        Returns:
+            int: 挿入した行数
+        """
+        raise NotImplementedError
+
+    def insertRows(self, data, target_tablename, staged_insert, columns, skip_existing_key=None, prefix="tmp"):
+        """
+        行数に応じて、直接 INSERT (insertRowsDirect) するか中間テーブル経由 (staged_insert) で書き込む。
+
+        直接書き込むと中間テーブルの CREATE / DROP と、中間テーブルの全件走査がなくなる。
+        行数が多い場合は従来どおり中間テーブルにアップロードしてから staged_insert で書き込む。
+
+        Args:
+            data: 書き込む DataFrame
+            target_tablename: 書き込み先のテーブル名
+            staged_insert: 中間テーブルから書き込むメソッド (例: self.mergeRequirements)
+            columns: 書き込む列 (COMPANY_BID_JUDGEMENT_COLUMNS など)
+            skip_existing_key: insertRowsDirect と同じ
+            prefix: 中間テーブル名の prefix
+
+        Returns:
+            staged_insert の戻り値、または直接書き込んだ行数
+        """
+        if self.useDirectWrite(data):
+            return self.insertRowsDirect(target_tablename, data[columns], skip_existing_key=skip_existing_key)
+        with self.stagingTable(data, prefix, temporary=True) as tmp_table:
+            return staged_insert(target_tablename, tmp_table)
+
+    def ensurePerformanceIndexes(self, table_kind, tablename):
+        """
+        PERFORMANCE_INDEXES[table_kind] のインデックスを tablename に作る (既にあれば何もしない)。
+
+        既定では何もしない。PostgreSQL はマイグレーションで作成し、BigQuery にはインデックスがないため。
+
+        Args:
+            table_kind (str): PERFORMANCE_INDEXES のキー (既定のテーブル名)
+            tablename (str): インデックスを作るテーブル名
+        """
+        return None
+
     def createIndex(self, index_name, table_name, columns):
         """
         インデックスを作成する（抽象メソッド）
@@ -307,6 +498,40 @@ class DBOperator(ABC):
     def updateInsufficientRequirements(self, insufficient_requirements_tablename, insufficient_requirements_tablename_for_update):
         raise NotImplementedError
 
+    @abstractmethod
+    def deleteRowsByKeys(self, target_tablename, source_tablename, key_column):
+        """
+        target_tablename から、key_column の値が source_tablename に含まれる行を削除する
+
+        step3 の差分判定で、入力が変わった拠点・公告の判定結果を取り消すために使う。
+
+        Args:
+            target_tablename: 削除対象のテーブル名
+            source_tablename: 削除するキーを格納した一時テーブル名
+            key_column: キー列名
+
+        Returns:
+            int: 削除された行数
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def selectKeysMissingFrom(self, tablename, reference_tablename, key_column):
+        """
+        tablename の key_column の値のうち、reference_tablename に無いものを重複なしで返す
+
+        step3 で、判定結果 (企業公告判定マスター) の無い充足・不足要件 (書き込みの途中で止まった残り) を探すために使う。
+
+        Args:
+            tablename: 調べるテーブル名
+            reference_tablename: キーがあるべきテーブル名
+            key_column: キー列名
+
+        Returns:
+            pd.DataFrame: key_column だけの DataFrame
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def mergeAnnouncementsDocumentTable(self, target_tablename, source_tablename, columns):
         """
@@ -16,6 +16,9 @@ class DBOperatorGCPVM(DBOperator):
     google bigquery を操作するクラス。
     """
 
+    # BigQuery は行単位の INSERT が遅く DML の回数にも上限があるので、常にロードジョブ (中間テーブル) + MERGE で書き込む
+    direct_write_max_rows = 0
+
     def get_text_column_type(self):
         return "STRING"
 
@@ -743,22 +746,20 @@ class DBOperatorGCPVM(DBOperator):
         if df_markdown.empty:
             return 0
 
-        tmp_table = "tmp_markdown_updates"
         df_tmp = df_markdown[["document_id", "fileFormat", "markdown_path"]].dropna()
         if df_tmp.empty:
             return 0
 
-        self.uploadDataToTable(df_tmp, tmp_table, chunksize=5000)
-        sql = f"""
-        MERGE `{self.project_id}.{self.dataset_name}.{tablename}` AS T
-        USING `{self.project_id}.{self.dataset_name}.{tmp_table}` AS S
-        ON T.document_id = S.document_id AND T.fileFormat = S.fileFormat
-        WHEN MATCHED THEN
-          UPDATE SET T.markdown_path = S.markdown_path
-        """
-        job = self.client.query(sql)
-        job.result()
-        self.dropTable(tmp_table)
+        with self.stagingTable(df_tmp, "tmp_markdown_updates") as tmp_table:
+            sql = f"""
+            MERGE `{self.project_id}.{self.dataset_name}.{tablename}` AS T
+            USING `{self.project_id}.{self.dataset_name}.{tmp_table}` AS S
+            ON T.document_id = S.document_id AND T.fileFormat = S.fileFormat
+            WHEN MATCHED THEN
+              UPDATE SET T.markdown_path = S.markdown_path
+            """
+            job = self.client.query(sql)
+            job.result()
         return job.num_dml_affected_rows
 
     def updateOcrJsonPaths(self, tablename, df_json):
@@ -766,22 +767,20 @@ class DBOperatorGCPVM(DBOperator):
         if df_json.empty:
             return 0
 
-        tmp_table = "tmp_ocr_json_updates"
         df_tmp = df_json[["document_id", "fileFormat", "ocr_json_path"]].dropna()
         if df_tmp.empty:
             return 0
 
-        self.uploadDataToTable(df_tmp, tmp_table, chunksize=5000)
-        sql = f"""
-        MERGE `{self.project_id}.{self.dataset_name}.{tablename}` AS T
-        USING `{self.project_id}.{self.dataset_name}.{tmp_table}` AS S
-        ON T.document_id = S.document_id AND T.fileFormat = S.fileFormat
-        WHEN MATCHED THEN
-          UPDATE SET T.ocr_json_path = S.ocr_json_path
-        """
-        job = self.client.query(sql)
-        job.result()
-        self.dropTable(tmp_table)
+        with self.stagingTable(df_tmp, "tmp_ocr_json_updates") as tmp_table:
+            sql = f"""
+            MERGE `{self.project_id}.{self.dataset_name}.{tablename}` AS T
+            USING `{self.project_id}.{self.dataset_name}.{tmp_table}` AS S
+            ON T.document_id = S.document_id AND T.fileFormat = S.fileFormat
+            WHEN MATCHED THEN
+              UPDATE SET T.ocr_json_path = S.ocr_json_path
+            """
+            job = self.client.query(sql)
+            job.result()
         return job.num_dml_affected_rows
 
     def updateFile404Flags(self, tablename, df_flags):
@@ -789,22 +788,20 @@ class DBOperatorGCPVM(DBOperator):
         if df_flags.empty:
             return 0
 
-        tmp_table = "tmp_file_404_updates"
         df_tmp = df_flags[["document_id", "fileFormat", "file_404_flag"]].dropna(subset=["document_id", "fileFormat"])
         if df_tmp.empty:
             return 0
 
-        self.uploadDataToTable(df_tmp, tmp_table, chunksize=5000)
-        sql = f"""
-        MERGE `{self.project_id}.{self.dataset_name}.{tablename}` AS T
-        USING `{self.project_id}.{self.dataset_name}.{tmp_table}` AS S
-        ON T.document_id = S.document_id AND T.fileFormat = S.fileFormat
-        WHEN MATCHED THEN
-          UPDATE SET T.file_404_flag = S.file_404_flag
-        """
-        job = self.client.query(sql)
-        job.result()
-        self.dropTable(tmp_table)
+        with self.stagingTable(df_tmp, "tmp_file_404_updates") as tmp_table:
+            sql = f"""
+            MERGE `{self.project_id}.{self.dataset_name}.{tablename}` AS T
+            USING `{self.project_id}.{self.dataset_name}.{tmp_table}` AS S
+            ON T.document_id = S.document_id AND T.fileFormat = S.fileFormat
+            WHEN MATCHED THEN
+              UPDATE SET T.file_404_flag = S.file_404_flag
+            """
+            job = self.client.query(sql)
+            job.result()
         return job.num_dml_affected_rows
 
     def mergeRequirements(self, target_tablename, source_tablename):
@@ -1019,3 +1016,33 @@ class DBOperatorGCPVM(DBOperator):
             """
 
         return self.any_query(query)
+
+    def deleteRowsByKeys(self, target_tablename, source_tablename, key_column):
+        validate_sql_identifier(target_tablename, "table name")
+        validate_sql_identifier(source_tablename, "table name")
+        validate_sql_identifier(key_column, "column name")
+        target = f"`{self.project_id}.{self.dataset_name}.{target_tablename}`"
+        source = f"`{self.project_id}.{self.dataset_name}.{source_tablename}`"
+        delete_sql = f"""
+        DELETE FROM {target}
+        WHERE {key_column} IN (
+            SELECT DISTINCT {key_column} FROM {source}
+        )
+        """
+        query_job = self.client.query(delete_sql)
+        query_job.result()
+        return query_job.num_dml_affected_rows
+
+    def selectKeysMissingFrom(self, tablename, reference_tablename, key_column):
+        validate_sql_identifier(tablename, "table name")
+        validate_sql_identifier(reference_tablename, "table name")
+        validate_sql_identifier(key_column, "column name")
+        table = f"`{self.project_id}.{self.dataset_name}.{tablename}`"
+        reference = f"`{self.project_id}.{self.dataset_name}.{reference_tablename}`"
+        select_sql = f"""
+        SELECT DISTINCT t.{key_column} FROM {table} t
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {reference} r WHERE r.{key_column} = t.{key_column}
+        )
+        """
+        return self.client.query(select_sql).result().to_dataframe()
@@ -1,5 +1,9 @@
 #coding: utf-8
 
+import datetime
+import io
+from contextlib import contextmanager
+
 import pandas as pd
 
 try:
@@ -14,10 +18,95 @@ try:
 except Exception as e:
     print(e)
 
-from packages.engine.repository.base import DBOperator, TablenamesConfig, validate_sql_identifier
+from packages.engine.repository.base import DBOperator, TablenamesConfig, dataframe_to_rows, validate_sql_identifier
 from packages.engine.domain.constants import WORK_STATUS_NOT_STARTED
 
 
+# uploadDataToTable (COPY) で作る列の型。pandas.to_sql が SQLAlchemy で推定する型と同じにする。
+#   キーは pandas.api.types.infer_dtype(skipna=True) の結果。ここにない型 (timedelta 等) は to_sql で書き込む。
+_COPY_COLUMN_TYPES = {
+    "integer": "BIGINT",
+    "floating": "DOUBLE PRECISION",
+    "boolean": "BOOLEAN",
+    "datetime64": "TIMESTAMP WITHOUT TIME ZONE",
+    "datetime": "TIMESTAMP WITHOUT TIME ZONE",
+    "date": "DATE",
+    "time": "TIME WITHOUT TIME ZONE",
+    "string": "TEXT",
+    "empty": "TEXT",
+    "mixed": "TEXT",
+    "mixed-integer": "TEXT",
+    "mixed-integer-float": "TEXT",
+    "decimal": "TEXT",
+    "categorical": "TEXT",
+}
+
+# COPY のテキスト形式でエスケープが必要な文字
+_COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_column_type(column):
+    """
+    DataFrame の列から COPY で作るテーブルの列の型を返す。対応していない型は None。
+    """
+    col_type = pd.api.types.infer_dtype(column, skipna=True)
+    if col_type not in _COPY_COLUMN_TYPES:
+        return None
+    dtype_name = column.dtype.name.lower()
+    if col_type == "integer":
+        if dtype_name in ("int8", "uint8", "int16"):
+            return "SMALLINT"
+        if dtype_name in ("uint16", "int32"):
+            return "INTEGER"
+        if dtype_name == "uint64":
+            return None
+    if col_type == "floating" and dtype_name == "float32":
+        return "REAL"
+    if col_type in ("datetime64", "datetime") and getattr(getattr(column, "dt", None), "tz", None) is not None:
+        return "TIMESTAMP WITH TIME ZONE"
+    return _COPY_COLUMN_TYPES[col_type]
+
+
+def _copy_text_value(value):
+    """値を COPY のテキスト形式の1フィールドにする (TEXT 列など型が混在する列用)。"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).translate(_COPY_TEXT_ESCAPES)
+
+
+def _copy_text_column(column, column_type):
+    """列の値を COPY のテキスト形式のフィールドのリストにする (欠損は \\N)。"""
+    values = column.tolist() if column.dtype.kind != "M" else None
+    if values is None:
+        # datetime64 列は pandas の文字列化 (YYYY-MM-DD HH:MM:SS[.ffffff][+HH:MM]) をそのまま使う
+        fields = column.astype(str).tolist()
+    elif column_type in ("BIGINT", "INTEGER", "SMALLINT", "DOUBLE PRECISION", "REAL"):
+        fields = list(map(str, values))
+    elif column_type == "BOOLEAN":
+        fields = ["t" if value else "f" for value in values]
+    else:
+        fields = [value.translate(_COPY_TEXT_ESCAPES) if type(value) is str else _copy_text_value(value) for value in values]
+    if column.hasnans:
+        for i, is_missing in enumerate(column.isna().tolist()):
+            if is_missing:
+                fields[i] = "\\N"
+    return fields
+
+
+def _copy_text_rows(data, column_types):
+    """
+    DataFrame を COPY のテキスト形式 (タブ区切り、欠損は \\N) にした文字列を返す。
+
+    to_sql と同じく NaN / None / NaT はすべて NULL にする。
+    """
+    columns = [_copy_text_column(column, column_type) for (_, column), column_type in zip(data.items(), column_types)]
+    return "".join(f"{line}\n" for line in map("\t".join, zip(*columns)))
+
+
 class DBOperatorPOSTGRES(DBOperator):
     """
     PostgreSQL を操作するクラス。
@@ -92,8 +181,102 @@ class DBOperatorPOSTGRES(DBOperator):
         self.cur.execute(drop_sql)
 
     def uploadDataToTable(self, data, tablename, chunksize=1):
-        # SQLAlchemy エンジンを使用して pandas DataFrame を PostgreSQL にアップロード
-        data.to_sql(tablename, self.engine, if_exists="replace", index=False, chunksize=chunksize)
+        """
+        DataFrame でテーブルを作り直す (to_sql(if_exists="replace") と同じ結果)。
+
+        INSERT の繰り返しではなく、列の型を明示した CREATE TABLE と COPY ... FROM STDIN で1回に流し込む。
+        DROP / CREATE / COPY は1トランザクションで行うので、失敗した場合は元のテーブルが残る。
+        COPY で扱えない型の列 (timedelta 等) がある場合は従来どおり to_sql で書き込む。
+        chunksize は他の DBOperator と引数を揃えるためのもので、COPY では使わない。
+        """
+        self._copyDataToTable(data, tablename, sql.SQL("CREATE TABLE"), chunksize)
+
+    def uploadStagingTable(self, data, tablename, temporary=False, chunksize=5000):
+        """
+        中間テーブルを UNLOGGED TABLE (temporary=True なら TEMPORARY TABLE) として作る。
+
+        UNLOGGED は WAL を書かないので作成・削除が軽く、他の接続 (self.engine) からも読める。
+        TEMPORARY はこの接続 (self.cur) だけから見え、接続が切れると自動で消える。
+        """
+        create = sql.SQL("CREATE TEMPORARY TABLE") if temporary else sql.SQL("CREATE UNLOGGED TABLE")
+        self._copyDataToTable(data, tablename, create, chunksize)
+
+    def _copyDataToTable(self, data, tablename, create, chunksize):
+        validate_sql_identifier(tablename, "table name")
+        column_types = [_copy_column_type(column) for _, column in data.items()]
+        if any(column_type is None for column_type in column_types):
+            data.to_sql(tablename, self.engine, if_exists="replace", index=False, chunksize=chunksize)
+            return
+
+        column_names = [str(name) for name in data.columns]
+        create_sql = sql.SQL("{} {} ({})").format(
+            create,
+            sql.Identifier(tablename),
+            sql.SQL(", ").join(
+                sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(column_type))
+                for name, column_type in zip(column_names, column_types)
+            ),
+        )
+        copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(tablename),
+            sql.SQL(", ").join(sql.Identifier(name) for name in column_names),
+        )
+
+        with self.transaction():
+            self.cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(tablename)))
+            self.cur.execute(create_sql)
+            if data.shape[0] > 0 and column_names:
+                self.cur.copy_expert(copy_sql, io.StringIO(_copy_text_rows(data, column_types)))
+
+    @contextmanager
+    def transaction(self):
+        """autocommit を一時的に外し、with の中の文を1トランザクションで実行する (例外時は rollback。既にトランザクション中ならそのまま)。"""
+        if not self.conn.autocommit:
+            yield
+            return
+        self.conn.autocommit = False
+        try:
+            yield
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.autocommit = True
+
+    def insertRowsDirect(self, target_tablename, data, skip_existing_key=None):
+        """
+        execute_values で data を直接 INSERT する (1トランザクション)。
+
+        updatedDate は update* / merge* と同じく DB 側の NOW() にする。
+        skip_existing_key がある場合は、既にあるキーを先に取得して書き込む行から除く。
+        """
+        validate_sql_identifier(target_tablename, "table name")
+        with self.transaction():
+            if skip_existing_key is not None and data.shape[0] > 0:
+                validate_sql_identifier(skip_existing_key, "column name")
+                keys = data[skip_existing_key].dropna().unique().tolist()
+                self.cur.execute(
+                    sql.SQL("SELECT DISTINCT {key} FROM {table} WHERE {key} = ANY(%s)").format(
+                        key=sql.Identifier(skip_existing_key),
+                        table=sql.Identifier(target_tablename),
+                    ),
+                    [keys],
+                )
+                existing_keys = [row[0] for row in self.cur.fetchall()]
+                data = data[~data[skip_existing_key].isin(existing_keys)]
+            if data.shape[0] == 0:
+                return 0
+
+            columns = [str(name) for name in data.columns]
+            values_columns = [name for name in columns if name != "updatedDate"]
+            template = "({})".format(", ".join("NOW()::text" if name == "updatedDate" else "%s" for name in columns))
+            insert_sql = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                sql.Identifier(target_tablename),
+                sql.SQL(", ").join(sql.Identifier(name) for name in columns),
+            )
+            execute_values(self.cur, insert_sql, dataframe_to_rows(data[values_columns]), template=template, page_size=1000)
+            return data.shape[0]
 
     def selectToTable(self, tablename, where_clause=""):
         validate_sql_identifier(tablename, "table name")
@@ -1181,3 +1364,28 @@ class DBOperatorPOSTGRES(DBOperator):
             """
 
         return self.any_query(query)
+
+    def deleteRowsByKeys(self, target_tablename, source_tablename, key_column):
+        validate_sql_identifier(target_tablename, "table name")
+        validate_sql_identifier(source_tablename, "table name")
+        validate_sql_identifier(key_column, "column name")
+        delete_sql = f"""
+        DELETE FROM "{target_tablename}"
+        WHERE {key_column} IN (
+            SELECT DISTINCT {key_column} FROM "{source_tablename}"
+        )
+        """
+        self.cur.execute(delete_sql)
+        return self.cur.rowcount
+
+    def selectKeysMissingFrom(self, tablename, reference_tablename, key_column):
+        validate_sql_identifier(tablename, "table name")
+        validate_sql_identifier(reference_tablename, "table name")
+        validate_sql_identifier(key_column, "column name")
+        select_sql = f"""
+        SELECT DISTINCT t.{key_column} FROM "{tablename}" t
+        WHERE NOT EXISTS (
+            SELECT 1 FROM "{reference_tablename}" r WHERE r.{key_column} = t.{key_column}
+        )
+        """
+        return pd.read_sql_query(select_sql, self.engine)
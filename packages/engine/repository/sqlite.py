@@ -1,8 +1,70 @@
 #coding: utf-8
 
+import datetime
+from contextlib import contextmanager
+
 import pandas as pd
 
-from packages.engine.repository.base import DBOperator, TablenamesConfig, validate_sql_identifier
+from packages.engine.repository.base import (
+    PERFORMANCE_INDEXES,
+    DBOperator,
+    TablenamesConfig,
+    dataframe_to_rows,
+    validate_sql_identifier,
+)
+
+# SELECT ... IN (?, ...) 1回に渡すパラメータ数 (SQLite の上限 999 より少なくする)
+_SQLITE_IN_CHUNK_SIZE = 500
+
+# 性能重視モード (sqlite3_performance_mode=True) で接続時に設定する PRAGMA
+#   WAL + synchronous=NORMAL で書き込みごとの fsync を減らし、ページキャッシュ・mmap を広げ、一時テーブルをメモリに置く。
+#   停電時に直近のコミットが失われうるので、ローカル・開発環境やエッジでの実行向け。
+SQLITE_PERFORMANCE_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 268435456),  # 256MB
+    ("cache_size", -65536),    # 64MB (負の値は KiB 単位)
+    ("temp_store", "MEMORY"),
+)
+
+# uploadDataToTable で作る列の型。pandas.to_sql が SQLite で使う型と同じにする。
+#   キーは pandas.api.types.infer_dtype(skipna=True) の結果。ここにない型は TEXT。
+_SQLITE_COLUMN_TYPES = {
+    "floating": "REAL",
+    "integer": "INTEGER",
+    "boolean": "INTEGER",
+    "datetime64": "TIMESTAMP",
+    "datetime": "TIMESTAMP",
+    "date": "DATE",
+    "time": "TIME",
+}
+
+
+def _sqlite_column_type(column):
+    """DataFrame の列から uploadDataToTable で作る列の型を返す。to_sql に任せる型 (timedelta 等) は None。"""
+    col_type = pd.api.types.infer_dtype(column, skipna=True)
+    if col_type in ("timedelta64", "complex"):
+        return None
+    return _SQLITE_COLUMN_TYPES.get(col_type, "TEXT")
+
+
+def _sqlite_name(name):
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def _sqlite_value(value):
+    """sqlite3 がそのまま扱えない値 (pd.Timestamp など) を to_sql と同じ文字列にする。"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, datetime.time):
+        return f"{value.hour:02d}:{value.minute:02d}:{value.second:02d}.{value.microsecond:06d}"
+    return value
+
+
+def _sqlite_rows(data):
+    return [tuple(map(_sqlite_value, row)) for row in dataframe_to_rows(data)]
 
 
 class DBOperatorSQLITE3(DBOperator):
@@ -10,6 +72,34 @@ class DBOperatorSQLITE3(DBOperator):
     sqlite3 を操作するクラス。
     """
 
+    def __init__(self, *args, sqlite3_performance_mode=False, **kwargs):
+        """
+        sqlite3 への接続を初期化する
+
+        Args:
+            sqlite3_performance_mode: True なら接続後に SQLITE_PERFORMANCE_PRAGMAS を設定する
+        """
+        super().__init__(*args, **kwargs)
+        self.sqlite3_performance_mode = sqlite3_performance_mode
+        if sqlite3_performance_mode:
+            self.enablePerformanceMode()
+
+    def enablePerformanceMode(self):
+        """
+        SQLITE_PERFORMANCE_PRAGMAS を設定し、設定後の値を返す。
+
+        journal_mode=WAL はデータベースファイルに記録されるので、一度設定すると以降の接続でも WAL のまま。
+        (インメモリのデータベースは WAL にならず memory のまま)
+
+        Returns:
+            dict: PRAGMA 名 -> 設定後の値
+        """
+        applied = {}
+        for name, value in SQLITE_PERFORMANCE_PRAGMAS:
+            self.cur.execute(f"PRAGMA {name} = {value}")
+            applied[name] = self.cur.execute(f"PRAGMA {name}").fetchone()[0]
+        return applied
+
     def any_query(self, sql):
         df = pd.read_sql_query(sql, self.conn)
         return df
@@ -46,7 +136,29 @@ class DBOperatorSQLITE3(DBOperator):
         self.cur.execute(f'DROP TABLE IF EXISTS "{tablename}"')
 
     def uploadDataToTable(self, data, tablename, chunksize=1):
-        data.to_sql(tablename, self.conn, if_exists="replace", index=False, chunksize=chunksize)
+        """
+        DataFrame でテーブルを作り直す (to_sql(if_exists="replace") と同じ型・値)。
+
+        DROP / CREATE / INSERT (executemany) を1トランザクションで行う。
+        autocommit の接続で to_sql を使うと行ごとにコミット (fsync) されるため。
+        to_sql に任せる型の列 (timedelta 等) がある場合や列がない場合は従来どおり to_sql で書き込む。
+        """
+        validate_sql_identifier(tablename, "table name")
+        column_types = [_sqlite_column_type(column) for _, column in data.items()]
+        if not column_types or any(column_type is None for column_type in column_types):
+            data.to_sql(tablename, self.conn, if_exists="replace", index=False, chunksize=chunksize)
+            return
+
+        columns = ", ".join(_sqlite_name(name) for name in data.columns)
+        create_sql = 'CREATE TABLE "{}" ({})'.format(
+            tablename,
+            ", ".join(f"{_sqlite_name(name)} {column_type}" for name, column_type in zip(data.columns, column_types)),
+        )
+        insert_sql = f'INSERT INTO "{tablename}" ({columns}) VALUES ({", ".join("?" * len(column_types))})'
+        with self.transaction():
+            self.cur.execute(f'DROP TABLE IF EXISTS "{tablename}"')
+            self.cur.execute(create_sql)
+            self.cur.executemany(insert_sql, _sqlite_rows(data))
 
     def selectToTable(self, tablename, where_clause=""):
         validate_sql_identifier(tablename, "table name")
@@ -54,9 +166,103 @@ class DBOperatorSQLITE3(DBOperator):
         ret = pd.read_sql_query(query, self.conn)
         return ret
 
+    @contextmanager
+    def transaction(self):
+        """with の中の文を1トランザクションで実行する (既にトランザクション中ならそのまま)。"""
+        if self.conn.in_transaction:
+            yield
+            return
+        self.cur.execute("BEGIN")
+        try:
+            yield
+            self.cur.execute("COMMIT")
+        except Exception:
+            self.cur.execute("ROLLBACK")
+            raise
+
+    def insertRowsDirect(self, target_tablename, data, skip_existing_key=None):
+        """
+        executemany で data を直接 INSERT する (1トランザクション)。
+
+        skip_existing_key がある場合は、既にあるキーを先に取得して書き込む行から除く。
+        """
+        validate_sql_identifier(target_tablename, "table name")
+        with self.transaction():
+            if skip_existing_key is not None and data.shape[0] > 0:
+                validate_sql_identifier(skip_existing_key, "column name")
+                keys = data[skip_existing_key].dropna().unique().tolist()
+                existing_keys = set()
+                for start in range(0, len(keys), _SQLITE_IN_CHUNK_SIZE):
+                    chunk = keys[start:start + _SQLITE_IN_CHUNK_SIZE]
+                    placeholders = ", ".join("?" * len(chunk))
+                    self.cur.execute(
+                        f'SELECT DISTINCT "{skip_existing_key}" FROM "{target_tablename}" WHERE "{skip_existing_key}" IN ({placeholders})',
+                        chunk,
+                    )
+                    existing_keys.update(row[0] for row in self.cur.fetchall())
+                data = data[~data[skip_existing_key].isin(existing_keys)]
+            if data.shape[0] == 0:
+                return 0
+
+            columns = [str(name) for name in data.columns]
+            for name in columns:
+                validate_sql_identifier(name, "column name")
+            insert_sql = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+                target_tablename,
+                ", ".join(f'"{name}"' for name in columns),
+                ", ".join("?" * len(columns)),
+            )
+            rows = _sqlite_rows(data)
+            self.cur.executemany(insert_sql, rows)
+            return len(rows)
+
     def createIndex(self, index_name, table_name, columns):
-        """SQLite3 のインデックス作成（未実装）"""
-        raise NotImplementedError("SQLite3 index creation is not implemented yet")
+        """
+        SQLite3 にインデックスを作成する (既にあれば何もしない)
+
+        Args:
+            index_name (str): インデックス名
+            table_name (str): テーブル名
+            columns (str or list): カラム指定
+                - 文字列: 単一カラムまたは式 (例: '"evaluatedAt"')
+                - リスト: 複数カラム (例: ['status', '"evaluatedAt" DESC'])
+        """
+        validate_sql_identifier(index_name, "index name")
+        validate_sql_identifier(table_name, "table name")
+
+        if isinstance(columns, list):
+            columns_clause = ", ".join(columns)
+        else:
+            columns_clause = columns
+
+        # columns_clause には式 (DESC など) が入りうるので、テーブル名・インデックス名だけ検証する
+        self.cur.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({columns_clause})')
+
+    def ensurePerformanceIndexes(self, table_kind, tablename):
+        """
+        PERFORMANCE_INDEXES[table_kind] のインデックスを tablename に作る (既にあれば何もしない)。
+
+        tablename が既定のテーブル名と異なる場合は、インデックス名の末尾に tablename を付ける
+        (SQLite のインデックス名はデータベース内で一意のため)。
+        テーブルにない列を使うインデックスは作らない
+        (announcements_documents_master は SQLite では announcement_no ではなく announcement_id を持つ)。
+
+        Returns:
+            list: 作成した (または既にあった) インデックス名
+        """
+        validate_sql_identifier(tablename, "table name")
+        if not self.ifTableExists(tablename):
+            return []
+        table_columns = {row[1] for row in self.cur.execute(f'PRAGMA table_info("{tablename}")').fetchall()}
+        index_names = []
+        for index_name, columns in PERFORMANCE_INDEXES[table_kind]:
+            if not table_columns.issuperset(columns):
+                continue
+            if tablename != table_kind:
+                index_name = f"{index_name}__{tablename}"
+            self.createIndex(index_name, tablename, [_sqlite_name(column) for column in columns])
+            index_names.append(index_name)
+        return index_names
 
     def ensure_column(self, tablename, column_name, column_type):
         validate_sql_identifier(tablename, "table name")
@@ -259,8 +465,8 @@ class DBOperatorSQLITE3(DBOperator):
                     row.get("updated_at"),
                 )
             )
-        self.cur.executemany(sql, params)
-        self.conn.commit()
+        with self.transaction():
+            self.cur.executemany(sql, params)
 
     def createBidAnnouncementsV2(self, bid_announcements_tablename):
         validate_sql_identifier(bid_announcements_tablename, "table name")
@@ -389,6 +595,7 @@ class DBOperatorSQLITE3(DBOperator):
         )
         """
         self.cur.execute(sql)
+        self.ensurePerformanceIndexes("bid_requirements", bid_requirements_tablename)
 
     def updateAnnouncements(self, bid_announcements_tablename, bid_announcements_tablename_for_update):
         validate_sql_identifier(bid_announcements_tablename, "table name")
@@ -510,6 +717,7 @@ class DBOperatorSQLITE3(DBOperator):
         )
         """
         self.cur.execute(sql)
+        self.ensurePerformanceIndexes("company_bid_judgement", company_bid_judgement_tablename)
 
     def createSufficientRequirements(self, sufficient_requirements_tablename):
         validate_sql_identifier(sufficient_requirements_tablename, "table name")
@@ -529,6 +737,7 @@ class DBOperatorSQLITE3(DBOperator):
         )
         """
         self.cur.execute(sql)
+        self.ensurePerformanceIndexes("sufficient_requirements", sufficient_requirements_tablename)
 
     def createInsufficientRequirements(self, insufficient_requirements_tablename):
         validate_sql_identifier(insufficient_requirements_tablename, "table name")
@@ -550,6 +759,7 @@ class DBOperatorSQLITE3(DBOperator):
         )
         """
         self.cur.execute(sql)
+        self.ensurePerformanceIndexes("insufficient_requirements", insufficient_requirements_tablename)
 
     def createWorkflowContacts(self, workflow_contacts_tablename):
         validate_sql_identifier(workflow_contacts_tablename, "table name")
@@ -823,8 +1033,8 @@ class DBOperatorSQLITE3(DBOperator):
             return 0
         sql = f'UPDATE "{tablename}" SET markdown_path = ? WHERE document_id = ? AND fileFormat = ?'
         values = [(row["markdown_path"], row["document_id"], row["fileFormat"]) for _, row in df_tmp.iterrows()]
-        self.cur.executemany(sql, values)
-        self.conn.commit()
+        with self.transaction():
+            self.cur.executemany(sql, values)
         return len(values)
 
     def updateOcrJsonPaths(self, tablename, df_json):
@@ -834,8 +1044,8 @@ class DBOperatorSQLITE3(DBOperator):
             return 0
         sql = f'UPDATE "{tablename}" SET ocr_json_path = ? WHERE document_id = ? AND fileFormat = ?'
         values = [(row["ocr_json_path"], row["document_id"], row["fileFormat"]) for _, row in df_tmp.iterrows()]
-        self.cur.executemany(sql, values)
-        self.conn.commit()
+        with self.transaction():
+            self.cur.executemany(sql, values)
         return len(values)
 
     def updateFile404Flags(self, tablename, df_flags):
@@ -845,8 +1055,8 @@ class DBOperatorSQLITE3(DBOperator):
             return 0
         sql = f'UPDATE "{tablename}" SET file_404_flag = ? WHERE document_id = ? AND fileFormat = ?'
         values = [(bool(row["file_404_flag"]), row["document_id"], row["fileFormat"]) for _, row in df_tmp.iterrows()]
-        self.cur.executemany(sql, values)
-        self.conn.commit()
+        with self.transaction():
+            self.cur.executemany(sql, values)
         return len(values)
 
     def mergeRequirements(self, target_tablename, source_tablename):
@@ -1061,3 +1271,28 @@ class DBOperatorSQLITE3(DBOperator):
             """
 
         return self.any_query(query)
+
+    def deleteRowsByKeys(self, target_tablename, source_tablename, key_column):
+        validate_sql_identifier(target_tablename, "table name")
+        validate_sql_identifier(source_tablename, "table name")
+        validate_sql_identifier(key_column, "column name")
+        delete_sql = f"""
+        DELETE FROM "{target_tablename}"
+        WHERE {key_column} IN (
+            SELECT DISTINCT {key_column} FROM "{source_tablename}"
+        )
+        """
+        self.cur.execute(delete_sql)
+        return self.cur.rowcount
+
+    def selectKeysMissingFrom(self, tablename, reference_tablename, key_column):
+        validate_sql_identifier(tablename, "table name")
+        validate_sql_identifier(reference_tablename, "table name")
+        validate_sql_identifier(key_column, "column name")
+        select_sql = f"""
+        SELECT DISTINCT t.{key_column} FROM "{tablename}" t
+        WHERE NOT EXISTS (
+            SELECT 1 FROM "{reference_tablename}" r WHERE r.{key_column} = t.{key_column}
+        )
+        """
+        return pd.read_sql_query(select_sql, self.conn)
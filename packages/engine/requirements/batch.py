@@ -0,0 +1,194 @@
+# coding: utf-8 -*-
+
+from packages.engine.requirements.columnar import evaluateRequirementColumnar
+from packages.engine.requirements.compiled import CompiledRequirement, compileRequirement
+from packages.engine.requirements.experience import checkExperienceRequirement
+from packages.engine.requirements.grade_item import checkGradeAndItemRequirement
+from packages.engine.requirements.ineligibility import checkIneligibilityDynamic
+from packages.engine.requirements.location import checkLocationRequirement
+from packages.engine.requirements.master_registry import getMaster
+from packages.engine.requirements.snapshot import MasterSnapshot
+from packages.engine.requirements.technician import checkTechnicianRequirement
+
+#######################################
+# 要件1件 x 複数拠点の一括判定 (check*Requirement の *_batch 版)
+#   要件テキストの解析と、マスターの索引・派生テーブル (MasterSnapshot) の作成を
+#   呼び出しごとに1回だけ行い、拠点ごとの判定は evaluateRequirementColumnar でまとめて行う。
+#   列指向で判定できない拠点は1件版の checker に解析済みの conditions と snapshot を渡して判定するので、
+#   判定結果・理由文は1件版を拠点ごとに呼んだ場合と同一になる。
+#######################################
+
+
+def _compile(requirement_type, requirementText, conditions):
+    if conditions is not None:
+        return CompiledRequirement(
+            requirement_no=None,
+            requirement_type=requirement_type,
+            requirement_text=requirementText,
+            conditions=conditions
+        )
+    # 解析できなかった場合 (conditions が None) は1件版の checker が従来どおり解析・例外処理する
+    return compileRequirement(None, requirement_type, requirementText)
+
+
+def _buildSnapshot(tables):
+    """テーブル名 -> DataFrame (None はマスターファイルから読む) の MasterSnapshot を作る。"""
+    return MasterSnapshot({
+        name: data if data is not None else getMaster(name)
+        for name, data in tables.items()
+    })
+
+
+def _evaluate(compiled, companyNos, officeNos, snapshot, check):
+    officeNos = list(officeNos)
+    companyNos = [None] * len(officeNos) if companyNos is None else list(companyNos)
+    if len(companyNos) != len(officeNos):
+        raise ValueError(f"companyNos and officeNos must have the same length: {len(companyNos)} != {len(officeNos)}")
+
+    def fallback(companyNo, officeNo):
+        return check(companyNo, officeNo, compiled.conditions)
+
+    return evaluateRequirementColumnar(compiled, companyNos, officeNos, snapshot, fallback)
+
+
+def checkIneligibilityDynamic_batch(requirementText, companyNos, officeNos, company_data=None, disqualification_data=None, office_registration_authorization_data=None, snapshot=None, conditions=None):
+    """
+    欠格要件を複数の拠点について判定する (checkIneligibilityDynamic の一括版)。
+
+    Args:
+        requirementText: 要件文テキスト
+        companyNos: 企業番号のリスト
+        officeNos: 拠点番号のリスト (companyNos と同じ長さ・同じ順)
+        company_data / disqualification_data / office_registration_authorization_data:
+            checkIneligibilityDynamic と同じ。snapshot がない場合はここから MasterSnapshot を作る。
+        snapshot: MasterSnapshot
+        conditions: extractIneligibilityConditions の結果。省略時は requirementText から1回だけ抽出する。
+
+    Returns:
+        list[dict]: 拠点ごとの {"is_ok": bool, "reason": str} (入力と同じ順)
+    """
+    if snapshot is None:
+        if company_data is None:
+            raise ValueError("company_data must be provided")
+        if disqualification_data is None:
+            raise ValueError("disqualification_data must be provided")
+        snapshot = _buildSnapshot({
+            "company": company_data,
+            "disqualifications": disqualification_data,
+            "office_registration_authorization": office_registration_authorization_data,
+        })
+    compiled = _compile("欠格要件", requirementText, conditions)
+
+    def check(companyNo, officeNo, conditions):
+        return checkIneligibilityDynamic(
+            requirementText=requirementText,
+            companyNo=companyNo,
+            officeNo=officeNo,
+            snapshot=snapshot,
+            conditions=conditions
+        )
+
+    return _evaluate(compiled, companyNos, officeNos, snapshot, check)
+
+
+def checkGradeAndItemRequirement_batch(requirementText, officeNos, licenseData=None, agencyData=None, constructionData=None, snapshot=None, conditions=None):
+    """
+    業種・等級要件を複数の拠点について判定する (checkGradeAndItemRequirement の一括版)。
+
+    agencyMap / constructionMap と拠点ごとのライセンスは snapshot に1回だけ作る。
+    引数・戻り値は checkIneligibilityDynamic_batch と同じ (企業番号は使わない)。
+    """
+    if snapshot is None:
+        snapshot = _buildSnapshot({
+            "office_registration_authorization_with_converter": licenseData,
+            "agency": agencyData,
+            "construction": constructionData,
+        })
+    compiled = _compile("業種・等級要件", requirementText, conditions)
+
+    def check(companyNo, officeNo, conditions):
+        return checkGradeAndItemRequirement(
+            requirementText=requirementText,
+            officeNo=officeNo,
+            snapshot=snapshot,
+            conditions=conditions
+        )
+
+    return _evaluate(compiled, None, officeNos, snapshot, check)
+
+
+def checkLocationRequirement_batch(requirementText, officeNos, agencyData=None, officeData=None, snapshot=None, conditions=None):
+    """
+    所在地要件を複数の拠点について判定する (checkLocationRequirement の一括版)。
+
+    地域名から展開した都道府県のリストは呼び出しごとに1回だけ作る。
+    引数・戻り値は checkIneligibilityDynamic_batch と同じ (企業番号は使わない)。
+    """
+    if snapshot is None:
+        snapshot = _buildSnapshot({"agency": agencyData, "office": officeData})
+    compiled = _compile("所在地要件", requirementText, conditions)
+
+    def check(companyNo, officeNo, conditions):
+        return checkLocationRequirement(
+            requirementText=requirementText,
+            officeNo=officeNo,
+            snapshot=snapshot,
+            conditions=conditions
+        )
+
+    return _evaluate(compiled, None, officeNos, snapshot, check)
+
+
+def checkExperienceRequirement_batch(requirementText, officeNos, office_experience_data=None, agency_data=None, construction_data=None, snapshot=None, conditions=None):
+    """
+    実績要件を複数の拠点について判定する (checkExperienceRequirement の一括版)。
+
+    実績のない拠点はまとめて判定し、実績のある拠点だけ1件版で詳細に照合する。
+    引数・戻り値は checkIneligibilityDynamic_batch と同じ (企業番号は使わない)。
+    """
+    if snapshot is None:
+        snapshot = _buildSnapshot({
+            "office_work_achivements": office_experience_data,
+            "agency": agency_data,
+            "construction": construction_data,
+        })
+    compiled = _compile("実績要件", requirementText, conditions)
+
+    def check(companyNo, officeNo, conditions):
+        return checkExperienceRequirement(
+            requirementText=requirementText,
+            officeNo=officeNo,
+            snapshot=snapshot,
+            conditions=conditions
+        )
+
+    return _evaluate(compiled, None, officeNos, snapshot, check)
+
+
+def checkTechnicianRequirement_batch(requirementText, companyNos, officeNos, employeeData=None, qualData=None, qualMasterData=None, expData=None, snapshot=None, conditions=None):
+    """
+    技術者要件を複数の拠点について判定する (checkTechnicianRequirement の一括版)。
+
+    従業員・資格・経験は (企業, 拠点) ごとの名簿 (TechnicianRoster) として snapshot に1回だけまとめ、
+    有効な資格を持つ従業員がいない拠点はまとめて判定する。
+    引数・戻り値は checkIneligibilityDynamic_batch と同じ。
+    """
+    if snapshot is None:
+        snapshot = _buildSnapshot({
+            "employee": employeeData,
+            "employee_qualification": qualData,
+            "technician_qualification": qualMasterData,
+            "employee_experience": expData,
+        })
+    compiled = _compile("技術者要件", requirementText, conditions)
+
+    def check(companyNo, officeNo, conditions):
+        return checkTechnicianRequirement(
+            requirementText=requirementText,
+            companyNo=companyNo,
+            officeNo=officeNo,
+            snapshot=snapshot,
+            conditions=conditions
+        )
+
+    return _evaluate(compiled, companyNos, officeNos, snapshot, check)
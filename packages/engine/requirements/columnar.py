@@ -0,0 +1,522 @@
+# coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+from packages.engine.requirements.snapshot import truthyMask
+from packages.engine.requirements.location import expandRegionToPrefectures, matchOfficeType
+from packages.engine.requirements.grade_item import LICENSE_GRADES, getAgencyMap, getConstructionMap
+from packages.engine.requirements.technician import getTechnicianRoster
+
+#######################################
+# 要件単位 (列指向) の判定
+#   step3 の従来処理は「拠点 x 要件」を1件ずつ判定するが、ここでは解析済みの要件1件を
+#   公告の対象拠点すべてに対してまとめて判定する。マスター側は MasterSnapshot から
+#   1回だけ派生テーブル (拠点ごとの先頭行、ライセンス属性など) を作り、要件ごとの判定は
+#   NumPy / pandas のベクトル演算で行う。
+#
+#   判定結果・理由文は check*Requirement と同一にする。列指向で扱えない拠点
+#   (想定外の型、後続の詳細判定が必要な拠点など) は fallback (従来の checker) で判定する。
+#######################################
+
+OTHER_REQUIREMENT_REASON = "その他要件があります。確認してください"
+
+# checkIneligibilityDynamic が company_disqualifications から読む列
+INELIGIBILITY_FLAG_COLUMNS = [
+    "article_70_flag",
+    "article_71_flag",
+    "bankruptcy_flag",
+    "corporate_reorganization_flag",
+    "corporate_reorganization_start_date",
+    "post_reorganization_reacquisition_date",
+    "anti_social_forces_flag",
+    "adult_ward_flag",
+    "foreign_legal_restriction_flag",
+    "subversive_organization_flag",
+    "no_social_insurance_arrears_flag",
+    "information_security_framework_flag",
+    "boj_transaction_suspension_flag",
+]
+
+# 欠格ルール -> (NG理由, OK理由)。文言は checkIneligibilityDynamic と揃える
+INELIGIBILITY_REASONS = {
+    "article_70": ("欠格要件：70条NG(破産/暴力団/成年後見等フラグ)", "欠格要件：70条OK"),
+    "article_71": ("欠格要件：71条NG(71条該当フラグ)", "欠格要件：71条OK"),
+    "bankruptcy": ("欠格要件：破産NG(破産フラグ)", "欠格要件：破産OK"),
+    "reorganization": ("欠格要件：更生/再生NG(再取得なし)", "欠格要件：更生/再生OK"),
+    "adult_ward": ("欠格要件：成年後見NG", "欠格要件：成年後見OK"),
+    "anti_social": ("欠格要件：暴力団NG", "欠格要件：暴力団OK"),
+    "foreign_law": ("欠格要件：海外制裁NG", "欠格要件：海外制裁OK"),
+    "subversive": ("欠格要件：破壊的団体NG", "欠格要件：破壊的団体OK"),
+    "social_insurance": ("欠格要件：社会保険滞納NG", "欠格要件：社会保険滞納OK"),
+    "information_security": ("欠格要件：情報保全NG", "欠格要件：情報保全OK"),
+    "boj_suspension": ("欠格要件：日銀取引停止NG", "欠格要件：日銀取引停止OK"),
+    "office_suspension": ("欠格要件：拠点指名停止NG", "欠格要件：拠点指名停止OK"),
+}
+
+# スコア比較 (checkScore と同じ。未知の比較は常に False)
+SCORE_COMPARATORS = {
+    "以上": np.greater_equal,
+    "以下": np.less_equal,
+    "超": np.greater,
+    "未満": np.less,
+}
+
+# 派生テーブルの作成時に想定外のデータ (列の欠損・型違い) で発生しうる例外
+_TABLE_ERRORS = (KeyError, TypeError, ValueError, AttributeError)
+
+
+def _firstRows(data, column):
+    """
+    column の値ごとの先頭行を返す (MasterSnapshot.first と同じく NaN キーの行は引けない)。
+
+    Returns:
+        (pd.Index: キー, DataFrame: キーと同じ順の先頭行)
+    """
+    rows = data[data[column].notnull()].drop_duplicates(subset=column, keep="first")
+    return pd.Index(rows[column]), rows.reset_index(drop=True)
+
+
+def _take(values, positions, default):
+    """positions (-1 は該当なし) で values を引く。該当なしは default。"""
+    result = np.full(len(positions), default, dtype=object)
+    found = positions >= 0
+    result[found] = values[positions[found]]
+    return result
+
+
+def _takeFlag(flags, positions):
+    """positions (-1 は該当なし) で bool 配列を引く。該当なしは False。"""
+    result = np.zeros(len(positions), dtype=bool)
+    found = positions >= 0
+    result[found] = flags[positions[found]]
+    return result
+
+
+def _isStr(*columns):
+    return np.array([all(isinstance(v, str) for v in values) for values in zip(*columns)], dtype=bool)
+
+
+def _fallbackAll(company_nos, office_nos, fallback):
+    return [fallback(company_no, office_no) for company_no, office_no in zip(company_nos, office_nos)]
+
+
+#######################################
+# 欠格要件
+#######################################
+
+def _buildIneligibilityTable(snapshot):
+    try:
+        company_index, company_rows = _firstRows(snapshot.data("company"), "company_no")
+        disq_index, disq_rows = _firstRows(snapshot.data("disqualifications"), "company_id")
+        registration_index, registration_rows = _firstRows(snapshot.data("office_registration_authorization"), "office_no")
+
+        flags = {column: truthyMask(disq_rows[column]) for column in INELIGIBILITY_FLAG_COLUMNS}
+        ng_by_rule = {
+            "article_70": flags["article_70_flag"] | flags["bankruptcy_flag"] | flags["anti_social_forces_flag"] | flags["adult_ward_flag"],
+            "article_71": flags["article_71_flag"],
+            "bankruptcy": flags["bankruptcy_flag"],
+            "reorganization": flags["corporate_reorganization_flag"] & ~flags["post_reorganization_reacquisition_date"],
+            "adult_ward": flags["adult_ward_flag"],
+            "anti_social": flags["anti_social_forces_flag"],
+            "foreign_law": flags["foreign_legal_restriction_flag"],
+            "subversive": flags["subversive_organization_flag"],
+            "social_insurance": flags["no_social_insurance_arrears_flag"],
+            "information_security": flags["information_security_framework_flag"],
+            "boj_suspension": flags["boj_transaction_suspension_flag"],
+        }
+        return {
+            "company_index": company_index,
+            # 企業ごとの company_disqualifications の先頭行位置 (-1 は欠格データなし)
+            "company_disq": disq_index.get_indexer(company_rows["id"].to_numpy(dtype=object)),
+            "ng_by_rule": ng_by_rule,
+            "registration_index": registration_index,
+            "suspended": truthyMask(registration_rows["is_suspended"]),
+        }
+    except _TABLE_ERRORS:
+        return None
+
+
+def _evaluateIneligibility(compiled, company_nos, office_nos, snapshot, fallback):
+    table = snapshot.derived("columnar_ineligibility", _buildIneligibilityTable)
+    if table is None:
+        return _fallbackAll(company_nos, office_nos, fallback)
+
+    rule = compiled.conditions["rule"]
+    company_pos = table["company_index"].get_indexer(company_nos)
+    disq_pos = np.full(len(company_nos), -1, dtype=np.int64)
+    disq_pos[company_pos >= 0] = table["company_disq"][company_pos[company_pos >= 0]]
+
+    if rule is None:
+        is_ng = np.zeros(len(company_nos), dtype=bool)
+    elif rule == "office_suspension":
+        registration_pos = table["registration_index"].get_indexer(office_nos)
+        is_ng = _takeFlag(table["suspended"], registration_pos)
+    else:
+        is_ng = _takeFlag(table["ng_by_rule"][rule], disq_pos)
+
+    results = []
+    for i, company_no in enumerate(company_nos):
+        if company_pos[i] < 0:
+            results.append({ "is_ok": False, "reason": fr"欠格要件：企業No={company_no}が見つからない" })
+        elif disq_pos[i] < 0:
+            results.append({ "is_ok": True, "reason": "欠格要件：欠格データなし => OK" })
+        elif rule is None:
+            results.append({ "is_ok": True, "reason": "欠格要件：該当キーワードなし => OK" })
+        else:
+            ng_reason, ok_reason = INELIGIBILITY_REASONS[rule]
+            if is_ng[i]:
+                results.append({ "is_ok": False, "reason": ng_reason })
+            else:
+                results.append({ "is_ok": True, "reason": ok_reason })
+    return results
+
+
+#######################################
+# 所在地要件
+#######################################
+
+def _buildOfficeTable(snapshot):
+    try:
+        office_index, office_rows = _firstRows(snapshot.data("office"), "office_no")
+        return {
+            "office_index": office_index,
+            "address": office_rows["office_address"].to_numpy(dtype=object),
+            "type": office_rows["office_type"].to_numpy(dtype=object),
+            "prefecture": office_rows["Located_Prefecture"].to_numpy(dtype=object),
+        }
+    except _TABLE_ERRORS:
+        return None
+
+
+def _evaluateLocation(compiled, company_nos, office_nos, snapshot, fallback):
+    table = snapshot.derived("columnar_office", _buildOfficeTable)
+    if table is None:
+        return _fallbackAll(company_nos, office_nos, fallback)
+
+    conditions = compiled.conditions
+    prefectures_from_regions = sum([expandRegionToPrefectures(regionName=region, snapshot=snapshot) for region in conditions["regions"]], [])
+    prefectures = list(set(conditions["prefectures"] + prefectures_from_regions))
+    officetypes = conditions["officeTypes"]
+
+    # 拠点が見つからない場合は checkLocationRequirement と同じく空文字で扱う
+    office_pos = table["office_index"].get_indexer(office_nos)
+    address = _take(table["address"], office_pos, "")
+    officetype = _take(table["type"], office_pos, "")
+    prefecture = _take(table["prefecture"], office_pos, "")
+    # 文字列以外 (NaN など) を含む拠点は従来の checker に任せる
+    is_str = _isStr(address, officetype, prefecture)
+
+    not_found = (address == "") & (prefecture == "")
+
+    # 都道府県の照合: 所在都道府県列が一致すればそれを採用し、なければ住所の部分一致を見る
+    if len(prefectures) > 0:
+        direct = (prefecture != "") & pd.Series(prefecture, dtype=object).isin(prefectures).to_numpy()
+        address_series = pd.Series(address, dtype=object)
+        address_hits = np.column_stack([
+            address_series.str.contains(pref, regex=False, na=False).to_numpy(dtype=bool)
+            for pref in prefectures
+        ])
+        address_hits &= (address != "")[:, None]
+
+    # 拠点種別の照合結果は拠点種別の値だけで決まる
+    type_match = {}
+    results = []
+    for i, office_no in enumerate(office_nos):
+        if not is_str[i]:
+            results.append(fallback(company_nos[i], office_no))
+            continue
+        if not_found[i]:
+            results.append({ "is_ok": False, "reason": fr"所在地要件:拠点ID={office_no}の所在地要件が取得できません" })
+            continue
+
+        if len(prefectures) == 0:
+            prefectureMatch = True
+            matchedPrefecture = []
+        elif direct[i]:
+            prefectureMatch = True
+            matchedPrefecture = [prefecture[i]]
+        else:
+            matchedPrefecture = [pref for pref, hit in zip(prefectures, address_hits[i]) if hit]
+            prefectureMatch = len(matchedPrefecture) > 0
+
+        if officetype[i] not in type_match:
+            type_match[officetype[i]] = matchOfficeType(officetype[i], conditions)
+        officeTypeMatch = type_match[officetype[i]]
+
+        if prefectureMatch and officeTypeMatch:
+            if len(matchedPrefecture) > 0:
+                matchDescription = "所在地要件：" + "・".join(matchedPrefecture) + "に" + (officetype[i] or "拠点") + "があります"
+            else:
+                matchDescription = "所在地要件：条件を満たしています"
+            results.append({ "is_ok": True, "reason": matchDescription })
+        elif not prefectureMatch:
+            results.append({"is_ok": False, "reason": "所在地要件：要求地域(" + "・".join(prefectures) + ")に拠点がありません"})
+        else:
+            results.append({"is_ok": False, "reason": "所在地要件：要求拠点種別(" + "・".join(officetypes) + ")の条件を満たしていません"})
+    return results
+
+
+#######################################
+# 業種・等級要件
+#######################################
+
+def _buildLicenseTable(snapshot):
+    """
+    ライセンス1行ごとに、判定で参照する発注機関・営業品目・等級・点数の属性を展開する。
+
+    agencyMap / constructionMap は checkGradeAndItemRequirement と同じもの (snapshot のキャッシュ) を使う。
+    従来処理で例外になる行 (未登録の発注機関・営業品目など) は anomalous とし、
+    その行を持つ拠点は従来の checker で判定する。
+    """
+    try:
+        agencyMap = getAgencyMap(snapshot)
+        constructionMap = getConstructionMap(snapshot)
+        records = snapshot.records("office_registration_authorization_with_converter")
+
+        columns = {
+            "office_no": [], "anomalous": [], "agency_name": [], "parent_agency_name": [],
+            "agency_area": [], "construction_name": [], "grade_index": [], "score": [],
+        }
+        for lic in records:
+            anomalous = False
+            agInfo = agencyMap.get(lic["agency_no"])
+            if agInfo is None:
+                anomalous = True
+
+            parentName = None
+            if agInfo and agInfo["parent_agency_no"]:
+                parent = agencyMap.get(agInfo["parent_agency_no"])
+                if parent:
+                    parentName = parent["agency_name"]
+
+            # 地域要件 (checkDefault) では文字列以外の agency_area は str() して照合する
+            area = None
+            if agInfo and agInfo["agency_area"]:
+                area = agInfo["agency_area"] if isinstance(agInfo["agency_area"], str) else str(agInfo["agency_area"])
+
+            try:
+                constructionName = constructionMap[fr"{int(lic['construction_no']):04}"]["construction_name"]
+            except (KeyError, TypeError, ValueError):
+                constructionName = None
+            if not isinstance(constructionName, str):
+                anomalous = True
+                constructionName = None
+
+            grade = lic["license_grade"]
+            score = lic["license_score"]
+
+            columns["office_no"].append(lic["office_no"])
+            columns["anomalous"].append(anomalous)
+            columns["agency_name"].append(agInfo["agency_name"] if agInfo else None)
+            columns["parent_agency_name"].append(parentName)
+            columns["agency_area"].append(area)
+            columns["construction_name"].append(constructionName)
+            columns["grade_index"].append(LICENSE_GRADES.index(grade) if grade and grade in LICENSE_GRADES else -1)
+            columns["score"].append(float(score) if isinstance(score, (int, float)) else np.nan)
+
+        return pd.DataFrame({
+            "office_no": pd.Series(columns["office_no"], dtype=object),
+            "anomalous": np.array(columns["anomalous"], dtype=bool),
+            "agency_name": pd.Series(columns["agency_name"], dtype=object),
+            "parent_agency_name": pd.Series(columns["parent_agency_name"], dtype=object),
+            "agency_area": pd.Series(columns["agency_area"], dtype=object),
+            "construction_name": pd.Series(columns["construction_name"], dtype=object),
+            "grade_index": np.array(columns["grade_index"], dtype=np.int64),
+            "score": np.array(columns["score"], dtype=float),
+        })
+    except _TABLE_ERRORS:
+        return None
+
+
+def _containsAny(values, needles):
+    matched = np.zeros(len(values), dtype=bool)
+    for needle in needles:
+        matched |= values.str.contains(needle, regex=False, na=False).to_numpy(dtype=bool)
+    return matched
+
+
+def _gradeMatched(grade_index, requiredGrade, gradeComparison):
+    """checkGrade のベクトル版"""
+    if requiredGrade not in LICENSE_GRADES:
+        return np.zeros(len(grade_index), dtype=bool)
+    reqIndex = LICENSE_GRADES.index(requiredGrade)
+    if gradeComparison == "以上":
+        matched = grade_index <= reqIndex
+    elif gradeComparison == "以下":
+        matched = grade_index >= reqIndex
+    else:
+        matched = grade_index == reqIndex
+    return matched & (grade_index >= 0)
+
+
+def _scoreMatched(score, requiredScore, scoreComparison):
+    """checkScore のベクトル版 (数値でない点数は NaN なので常に False)"""
+    comparator = SCORE_COMPARATORS.get(scoreComparison)
+    if comparator is None:
+        return np.zeros(len(score), dtype=bool)
+    return comparator(score, requiredScore)
+
+
+def _evaluateGradeItem(compiled, company_nos, office_nos, snapshot, fallback):
+    licenses = snapshot.derived("columnar_license", _buildLicenseTable)
+    if licenses is None:
+        return _fallbackAll(company_nos, office_nos, fallback)
+
+    conditions = compiled.conditions
+    specificAgency = conditions["specificAgency"]
+    requiredGrade = conditions["requiredGrade"]
+    gradeComparison = conditions["gradeComparison"]
+    requiredScore = conditions["requiredScore"]
+    scoreComparison = conditions["scoreComparison"]
+    requiredItems = conditions["requiredItems"]
+    requiredAreas = conditions["requiredAreas"]
+
+    # ライセンス行 -> 対象拠点 (重複を除いた拠点) の位置
+    targets = pd.Index(office_nos).unique()
+    target_pos = targets.get_indexer(office_nos)
+    codes = targets.get_indexer(licenses["office_no"])
+    in_target = codes >= 0
+
+    def anyByOffice(mask):
+        selected = in_target & mask
+        return np.bincount(codes[selected], minlength=len(targets)) > 0
+
+    has_license = anyByOffice(np.ones(len(codes), dtype=bool))
+    anomalous = anyByOffice(licenses["anomalous"].to_numpy())
+
+    # (A) 全省庁統一 / (B) 特定省庁 / (C) デフォルト の順に、NG になる段階を上から並べる
+    if conditions["isAllMinistryUnified"]:
+        target_licenses = (licenses["agency_name"] == "全省庁統一").to_numpy()
+        prefix = "全省庁統一資格で"
+        stages = [(target_licenses, "業種・等級要件：全省庁統一資格を保有していません")]
+        ok_reason = "業種・等級要件：全省庁統一資格の条件を満たしています"
+    elif specificAgency:
+        target_licenses = ((licenses["agency_name"] == specificAgency) | (licenses["parent_agency_name"] == specificAgency)).to_numpy()
+        prefix = fr"{specificAgency}資格で"
+        stages = [(target_licenses, fr"業種・等級要件：{specificAgency}の資格を保有していません")]
+        ok_reason = fr"業種・等級要件：{specificAgency}資格の条件を満たしています"
+    else:
+        target_licenses = np.ones(len(codes), dtype=bool)
+        prefix = ""
+        stages = []
+        ok_reason = "業種・等級要件：営業品目の条件を満たしています"
+
+    if len(requiredItems) > 0:
+        matching = target_licenses & _containsAny(licenses["construction_name"], requiredItems)
+        stages.append((matching, fr"業種・等級要件：{prefix}必要な営業品目({"、".join(requiredItems)})を保有していません"))
+        if requiredGrade:
+            graded = matching & _gradeMatched(licenses["grade_index"].to_numpy(), requiredGrade, gradeComparison)
+            stages.append((graded, fr"業種・等級要件：{prefix}{requiredGrade}等級{gradeComparison}の条件を満たしていません"))
+            if requiredScore:
+                scored = graded & _scoreMatched(licenses["score"].to_numpy(), requiredScore, scoreComparison)
+                stages.append((scored, fr"業種・等級要件：{prefix}{requiredScore}点{scoreComparison}の条件を満たしていません"))
+
+    # 地域要件はデフォルトのみ (営業品目に関係なく全ライセンスで照合)
+    if not conditions["isAllMinistryUnified"] and not specificAgency and len(requiredAreas) > 0:
+        stages.append((_containsAny(licenses["agency_area"], requiredAreas), fr"業種・等級要件：必要な地域({"、".join(requiredAreas)})の登録がありません"))
+
+    stage_passed = [(anyByOffice(mask), reason) for mask, reason in stages]
+
+    results = []
+    for i, office_no in enumerate(office_nos):
+        pos = target_pos[i]
+        if anomalous[pos]:
+            results.append(fallback(company_nos[i], office_no))
+        elif not has_license[pos]:
+            results.append({ "is_ok": False, "reason": fr"業種・等級要件：拠点ID={office_no}にライセンス情報がありません" })
+        else:
+            reason = next((reason for passed, reason in stage_passed if not passed[pos]), None)
+            if reason is None:
+                results.append({ "is_ok": True, "reason": ok_reason })
+            else:
+                results.append({ "is_ok": False, "reason": reason })
+    return results
+
+
+#######################################
+# 実績要件 / 技術者要件
+#   詳細判定 (日付・金額・資格名の照合など) は従来の checker に任せ、
+#   「対象データが1件もない」拠点だけを列指向でまとめて判定する。
+#######################################
+
+def _buildAchievementOffices(snapshot):
+    try:
+        office_index, _ = _firstRows(snapshot.data("office_work_achivements"), "office_no")
+        return office_index
+    except _TABLE_ERRORS:
+        return None
+
+
+def _evaluateExperience(compiled, company_nos, office_nos, snapshot, fallback):
+    office_index = snapshot.derived("columnar_achievement_offices", _buildAchievementOffices)
+    if office_index is None:
+        return _fallbackAll(company_nos, office_nos, fallback)
+
+    has_experience = office_index.get_indexer(office_nos) >= 0
+    results = []
+    for i, office_no in enumerate(office_nos):
+        if has_experience[i]:
+            results.append(fallback(company_nos[i], office_no))
+        else:
+            results.append({ "is_ok": False, "reason": fr"実績要件 : 拠点ID={office_no}に実績情報が見つかりません" })
+    return results
+
+
+def _buildQualifiedOffices(snapshot):
+    """有効な資格を持つ在籍従業員がいる (company_no, office_no) の集合 (TechnicianRoster から作る)"""
+    try:
+        return {key for key, entry in getTechnicianRoster(snapshot).items() if entry["qualifications"]}
+    except _TABLE_ERRORS:
+        return None
+
+
+def _evaluateTechnician(compiled, company_nos, office_nos, snapshot, fallback):
+    qualified = snapshot.derived("columnar_qualified_offices", _buildQualifiedOffices)
+    if qualified is None:
+        return _fallbackAll(company_nos, office_nos, fallback)
+
+    results = []
+    for company_no, office_no in zip(company_nos, office_nos):
+        if (company_no, office_no) in qualified:
+            results.append(fallback(company_no, office_no))
+        else:
+            results.append({ "is_ok": False, "reason": "技術者要件：従業員資格情報が見つかりません" })
+    return results
+
+
+# requirement_type -> 列指向の判定関数
+COLUMNAR_EVALUATORS = {
+    "欠格要件": _evaluateIneligibility,
+    "業種・等級要件": _evaluateGradeItem,
+    "所在地要件": _evaluateLocation,
+    "実績要件": _evaluateExperience,
+    "技術者要件": _evaluateTechnician,
+}
+
+
+def evaluateRequirementColumnar(compiled, company_nos, office_nos, snapshot, fallback):
+    """
+    解析済みの要件1件を、対象拠点すべてに対してまとめて判定する。
+
+    Args:
+        compiled: CompiledRequirement
+        company_nos: 企業番号のリスト
+        office_nos: 拠点番号のリスト (company_nos と同じ長さ・同じ順)
+        snapshot: MasterSnapshot
+        fallback: fallback(company_no, office_no) -> {"is_ok", "reason"}。
+            列指向で判定できない拠点に使う従来の判定 (check*Requirement の呼び出し)。
+
+    Returns:
+        list[dict]: 拠点ごとの {"is_ok": bool, "reason": str} (入力と同じ順)
+    """
+    company_nos = list(company_nos)
+    office_nos = list(office_nos)
+
+    evaluator = COLUMNAR_EVALUATORS.get(compiled.requirement_type)
+    if evaluator is None:
+        return [{"is_ok": False, "reason": OTHER_REQUIREMENT_REASON} for _ in office_nos]
+    if compiled.conditions is None:
+        # 要件テキストを解析できなかった場合は従来どおり checker 側で処理する
+        return _fallbackAll(company_nos, office_nos, fallback)
+    return evaluator(compiled, company_nos, office_nos, snapshot, fallback)
@@ -0,0 +1,91 @@
+# coding: utf-8 -*-
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from packages.engine.requirements.ineligibility import extractIneligibilityConditions
+from packages.engine.requirements.grade_item import extractGradeAndItemConditions
+from packages.engine.requirements.location import extractLocationRequirements
+from packages.engine.requirements.experience import extractExperienceConditions
+from packages.engine.requirements.technician import extractTechnicianRequirements
+
+#######################################
+# 要件テキストの事前解析 (compile)
+#   要件テキストの解析結果は拠点に依存しないため、bid_requirements の1行につき
+#   1回だけ解析し、拠点ごとの判定 (check*Requirement) には解析結果を渡す。
+#   同じ (requirement_type, requirement_text) はプロセス内でメモ化する。
+#######################################
+
+# requirement_type -> 要件テキストの解析関数
+REQUIREMENT_EXTRACTORS = {
+    "欠格要件": extractIneligibilityConditions,
+    "業種・等級要件": extractGradeAndItemConditions,
+    "所在地要件": extractLocationRequirements,
+    "実績要件": extractExperienceConditions,
+    "技術者要件": extractTechnicianRequirements,
+}
+
+COMPILE_CACHE_SIZE = 8192
+
+
+@dataclass(frozen=True)
+class CompiledRequirement:
+    """
+    解析済みの要件1件。
+
+    conditions は requirement_type ごとの解析関数の戻り値 (dict)。
+    判定側では読み取り専用として扱う。解析できなかった場合は None で、
+    その場合 checker は従来どおり requirementText から解析する。
+    """
+    requirement_no: object
+    requirement_type: str
+    requirement_text: str
+    conditions: object = None
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compileConditions(requirement_type, requirement_text):
+    extractor = REQUIREMENT_EXTRACTORS.get(requirement_type)
+    if extractor is None:
+        return None
+    try:
+        return extractor(requirement_text)
+    except Exception:
+        # 解析時の例外は checker 側で従来どおり発生・処理させる
+        return None
+
+
+def compileRequirement(requirement_no, requirement_type, requirement_text):
+    """bid_requirements の1行を CompiledRequirement に変換する。"""
+    try:
+        conditions = _compileConditions(requirement_type, requirement_text)
+    except TypeError:
+        # ハッシュできない値 (想定外の型) はメモ化せずに checker 側へ任せる
+        conditions = None
+    return CompiledRequirement(
+        requirement_no=requirement_no,
+        requirement_type=requirement_type,
+        requirement_text=requirement_text,
+        conditions=conditions
+    )
+
+
+def compileRequirements(req_df):
+    """
+    公告1件分の要件 DataFrame を CompiledRequirement のリストに変換する (行順を保つ)。
+
+    Args:
+        req_df: bid_requirements の DataFrame (requirement_no, requirement_type, requirement_text を含む)
+
+    Returns:
+        list[CompiledRequirement]
+    """
+    return [
+        compileRequirement(row.requirement_no, row.requirement_type, row.requirement_text)
+        for row in req_df.itertuples()
+    ]
+
+
+def compileCacheInfo():
+    """解析キャッシュのヒット状況 (functools の CacheInfo) を返す。"""
+    return _compileConditions.cache_info()
@@ -7,23 +7,32 @@ import math
 import pytz
 
 from packages.engine.domain.constants import ERA_OFFSETS
+from packages.engine.requirements.master_registry import getMaster
+from packages.engine.requirements.records import OfficeExperience, buildRecordIndex, buildRecords
+from packages.engine.requirements.snapshot import lookupRecords
 
 #######################################
 # 実績要件の判定を行う
 # ※requirementType === "実績要件"の場合。
 #######################################
 
-def getConstructionInfo(constructionNo, construction_data=pd.read_csv("data/master/construction_master.txt",sep="\t")):
+def getConstructionInfo(constructionNo, construction_data=None, snapshot=None):
     # 営業品目マスター
     # construction_data
+    # snapshot (MasterSnapshot) があれば索引から引く
 
-    data = construction_data[construction_data["construction_no"] == constructionNo]
-    if data.shape[0] == 0:
+    if snapshot is not None:
+        rows = snapshot.rows("construction", constructionNo)
+    else:
+        if construction_data is None:
+            construction_data = getMaster("construction")
+        rows = lookupRecords(construction_data, "construction_no", constructionNo)
+    if len(rows) == 0:
         return None
     else:
-        if data.shape[0] > 1:
-            print(f"Warning: constructionNo={constructionNo} に対して複数行ヒット({data.shape[0]}行)")
-        row_dict = data.iloc[0].to_dict()
+        if len(rows) > 1:
+            print(f"Warning: constructionNo={constructionNo} に対して複数行ヒット({len(rows)}行)")
+        row_dict = rows[0]
         return {
             "construction_no": row_dict["construction_no"],      # 工事種別連番
             "construction_name": row_dict["construction_name"],  # 工事種別名称
@@ -32,26 +41,35 @@ def getConstructionInfo(constructionNo, construction_data=pd.read_csv("data/mast
         }
 
 
-def getAgencyInfo(agencyNo, agency_data = pd.read_csv("data/master/agency_master.txt",sep="\t")):
+def getAgencyInfo(agencyNo, agency_data=None, snapshot=None):
     # 発注者機関マスター
     # agency_data
+    # snapshot (MasterSnapshot) があれば索引から引く
 
-    data = agency_data[agency_data["agency_no"] == agencyNo]
-    if data.shape[0] == 0:
+    if snapshot is not None:
+        rows = snapshot.rows("agency", agencyNo)
+    else:
+        if agency_data is None:
+            agency_data = getMaster("agency")
+        rows = lookupRecords(agency_data, "agency_no", agencyNo)
+    if len(rows) == 0:
         return None
-    
-    if data.shape[0] > 1:
-        print(f"Warning: agencyNo={agencyNo} に対して複数行ヒット({data.shape[0]}行)")
-    row_dict = data.iloc[0].to_dict()
+
+    if len(rows) > 1:
+        print(f"Warning: agencyNo={agencyNo} に対して複数行ヒット({len(rows)}行)")
+    row_dict = rows[0]
 
     # TODO
     # 親機関名取得は要検討。
     parentAgencyNo = row_dict["parent_agency_no"]
     parentName = None
 
-    parentdata = agency_data[agency_data["agency_no"] == parentAgencyNo]
-    if data.shape[0] >= 1:
-        parentName = parentdata.iloc[0]["agency_name"]
+    if snapshot is not None:
+        parentRows = snapshot.rows("agency", parentAgencyNo)
+    else:
+        parentRows = lookupRecords(agency_data, "agency_no", parentAgencyNo)
+    if len(rows) >= 1:
+        parentName = parentRows[0]["agency_name"]
 
     return {
         "agency_no": row_dict["agency_no"],
@@ -63,30 +81,62 @@ def getAgencyInfo(agencyNo, agency_data = pd.read_csv("data/master/agency_master
     }
 
 
-def getOfficeExperiences(officeNo, office_experience_data = pd.read_csv("data/master/office_work_achivements_master.txt",sep="\t")):
+# 拠点工事実績を office_no ごとにまとめた OfficeExperience のリスト (MasterSnapshot ごとに1回だけ作る)
+def _buildOfficeExperiences(snapshot):
+    return buildRecordIndex(OfficeExperience, snapshot.data("office_work_achivements"), "office_no")
+
+
+def getOfficeExperiences(officeNo, office_experience_data=None, snapshot=None):
     # 拠点工事実績マスター  office_experience_data
-        
+    # snapshot (MasterSnapshot) があればまとめ済みのリストを返す (判定側では読み取り専用)
+
+    if snapshot is not None:
+        return snapshot.derived("experience_office_experiences", _buildOfficeExperiences).get(officeNo, [])
 
+    if office_experience_data is None:
+        office_experience_data = getMaster("office_work_achivements")
     office_experience_data = office_experience_data[office_experience_data["office_no"] == officeNo]
-    experiences = []
-    for index, row in office_experience_data.iterrows():
-        row_dict = row.to_dict()
-        experiences.append({
-            "office_experience_no": row_dict["office_experience_no"],
-            "office_no": row_dict["office_no"],
-            "agency_no": row_dict["agency_no"],
-            "construction_no": row_dict["construction_no"],
-            "project_name": row_dict["project_name"],
-            "contractor_layer": row_dict["contractor_layer"],   # 請負階層
-            "start_date": row_dict["start_date"],         # 着工日
-            "completion_date": row_dict["completion_date"],    # 完成日
-            "final_score": row_dict["final_score"],        # 工事成績点
-            "total_amount": row_dict["total_amount"],       # 契約金額
-            "is_jv_flg": row_dict["is_jv_flag"],         # JVフラグ
-            "jv_ratio": row_dict["jv_ratio"],          # JV出資比率
-            "remarks": row_dict["remarks"]            # 備考
-        })
-    return experiences
+    return buildRecords(OfficeExperience, office_experience_data)
+
+
+# 要件テキストの解析に使う正規表現・キーワード (extractExperienceConditions)
+# 期間条件 (平成・令和・西暦の年度)
+HEISEI_YEAR_PATTERN = re.compile(r"平成\s*(\d+)\s*年度以降")
+REIWA_YEAR_PATTERN = re.compile(r"令和\s*(\d+)\s*年度以降")
+WESTERN_YEAR_PATTERN = re.compile(r"(\d{4})\s*年度以降")
+# JV条件
+# jvMatch = lowerText.match(/(?:jv比率|出資比率|比率)\s*(\d+(?:\.\d+)?)\s*[%％]以上/)
+JV_RATIO_PATTERN = re.compile(r"(?:jv比率|出資比率|比率)\s*(\d+(?:\.\d+)?)\s*[%％]以上")
+# numMatch = lowerText.match(/出資比率が(\d+(?:\.\d+)?)%以上/)
+CAPITAL_RATIO_PATTERN = re.compile(r"出資比率が(\d+(?:\.\d+)?)%以上")
+
+# 発注機関ごとの点数条件
+AGENCY_KEYWORDS = [
+    "全省庁統一", "防衛省", "法務省", "財務省", "文部科学省", "厚生労働省",
+    "林野庁", "経済産業省", "内閣府", "農林水産省大臣官房予算課",
+    "農林水産省地方農政局", "最高裁判所", "国土交通省大臣官房会計課所掌機関",
+    "環境省", "国土交通省北海道開発局"
+]
+AGENCY_SCORE_PATTERNS = {
+    agency: re.compile(fr"{agency}[\s\S]*?(\d+)点未満のものを除く")
+    for agency in AGENCY_KEYWORDS
+}
+
+# 工事成績条件
+SCORE_PATTERN = re.compile(r"(?:成績|評定|点数|工事成績).*?(\d+)(?:\.\d+)?\s*点以上")
+SCORE_ONLY_PATTERN = re.compile(r"(\d+)(?:\.\d+)?\s*点以上")
+
+# 工事種別
+CONSTRUCTION_KEYWORDS = [
+    "土木", "建築", "大工", "左官", "とび・土工", "石", "屋根",
+    "電気", "管", "タイル", "鋼構造物", "鉄筋", "舗装", "しゅんせつ",
+    "板金", "ガラス", "塗装", "防水", "内装", "機械", "熱絶縁",
+    "電気通信", "造園", "さく井", "建具", "水道施設", "消防施設", "営繕"
+]
+
+# 構造・規模条件
+STRUCTURE_KEYWORDS = ["RC造", "S造", "SRC造", "木造", "鉄骨", "鉄筋コンクリート"]
+AREA_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*[㎡m2]\s*以上")
 
 
 
@@ -118,7 +168,7 @@ def extractExperienceConditions(text):
     # 平成年度
     # text = "平成 3 年度以降"
     # if yearMatch = text.match(/平成\s*(\d+)\s*年度以降/):
-    if yearMatch := re.search(r"平成\s*(\d+)\s*年度以降", text):
+    if yearMatch := HEISEI_YEAR_PATTERN.search(text):
         heisei = int(yearMatch[1])
         fiscalYear = ERA_OFFSETS["heisei"] + heisei
         conditions["yearFrom"] = fiscalYear
@@ -127,7 +177,7 @@ def extractExperienceConditions(text):
 
     # 令和年度
     # elif yearMatch = text.match(/令和\s*(\d+)\s*年度以降/):
-    elif yearMatch := re.search(r"令和\s*(\d+)\s*年度以降", text):
+    elif yearMatch := REIWA_YEAR_PATTERN.search(text):
         reiwa = int(yearMatch[1])
         # const fiscalYear = (reiwa === 1) ? 2019 : (ERA_OFFSETS["reiwa"] + reiwa)
         fiscalYear = ERA_OFFSETS["reiwa"] + reiwa
@@ -139,7 +189,7 @@ def extractExperienceConditions(text):
             # その他は4月1日開始
             conditions["fiscalYearFrom"] = pd.Timestamp(year=fiscalYear, month=4, day=1)
     # 西暦年度
-    elif yearMatch := re.search(r"(\d{4})\s*年度以降", text):
+    elif yearMatch := WESTERN_YEAR_PATTERN.search(text):
         fiscalYear = int(yearMatch[1])
         conditions["yearFrom"] = fiscalYear
         # 4月1日開始
@@ -158,16 +208,14 @@ def extractExperienceConditions(text):
         conditions["requiredContractorLayer"] = "三次請"
 
     # 3. JV条件の抽出（既存のコード）
-    # jvMatch = lowerText.match(/(?:jv比率|出資比率|比率)\s*(\d+(?:\.\d+)?)\s*[%％]以上/)
-    jvMatch = re.search(r"(?:jv比率|出資比率|比率)\s*(\d+(?:\.\d+)?)\s*[%％]以上", lowerText)
+    jvMatch = JV_RATIO_PATTERN.search(lowerText)
     # jvMatch = re.search(r"(?:jv比率|出資比率|比率)\s*(\d+(?:\.\d+)?)\s*[%％]以上", "この案件は出資比率 12.5％以上が条件です")
     if jvMatch:
         conditions["minJvRatio"] = float(jvMatch[1])
     elif "出資比率が20%以上" in lowerText:
         conditions["minJvRatio"] = 20
     elif "出資比率が" in lowerText and "%以上" in lowerText:
-        # numMatch = lowerText.match(/出資比率が(\d+(?:\.\d+)?)%以上/)
-        numMatch = re.search(r"出資比率が(\d+(?:\.\d+)?)%以上", lowerText)
+        numMatch = CAPITAL_RATIO_PATTERN.search(lowerText)
         if numMatch:
             conditions["minJvRatio"] = float(numMatch[1])
         elif "共同企業体" in lowerText or "jv" in lowerText:
@@ -175,27 +223,21 @@ def extractExperienceConditions(text):
 
 
     # 4. 発注機関ごとの点数条件を抽出
-    agencyKeywords = [
-        "全省庁統一", "防衛省", "法務省", "財務省", "文部科学省", "厚生労働省",
-        "林野庁", "経済産業省", "内閣府", "農林水産省大臣官房予算課",
-        "農林水産省地方農政局", "最高裁判所", "国土交通省大臣官房会計課所掌機関",
-        "環境省", "国土交通省北海道開発局"
-    ]
-
-    # 各発注機関に関連する点数条件を抽出
-    for agency in agencyKeywords:
-        scorePattern = re.compile(fr"{agency}[\s\S]*?(\d+)点未満のものを除く")
-        scoreMatch = scorePattern.search(text)
+    # テキストに機関名がない機関のパターンは照合しない
+    for agency in AGENCY_KEYWORDS:
+        if agency not in text:
+            continue
+        scoreMatch = AGENCY_SCORE_PATTERNS[agency].search(text)
         if scoreMatch:
             minScore = int(scoreMatch[1])
             conditions["agencyScoreRequirements"][agency] = minScore
 
     # 5. 工事成績条件
-    scoreMatch1 = re.search(r"(?:成績|評定|点数|工事成績).*?(\d+)(?:\.\d+)?\s*点以上", text)
+    scoreMatch1 = SCORE_PATTERN.search(text)
     if scoreMatch1:
         conditions["minScore"] = float(scoreMatch1[1])
     elif "点以上" in text:
-        scoreMatch2 = re.search(r"(\d+)(?:\.\d+)?\s*点以上", text)
+        scoreMatch2 = SCORE_ONLY_PATTERN.search(text)
         if scoreMatch2:
             conditions["minScore"] = float(scoreMatch2[1])
 
@@ -204,27 +246,15 @@ def extractExperienceConditions(text):
         conditions["requiresAverage"] = True
 
     # 7. 工事種別の抽出
-    constructionKeywords = [
-        "土木", "建築", "大工", "左官", "とび・土工", "石", "屋根",
-        "電気", "管", "タイル", "鋼構造物", "鉄筋", "舗装", "しゅんせつ",
-        "板金", "ガラス", "塗装", "防水", "内装", "機械", "熱絶縁",
-        "電気通信", "造園", "さく井", "建具", "水道施設", "消防施設", "営繕"
-    ]
-    for keyword in constructionKeywords:
-        if fr"{keyword}工事" in lowerText:
-            conditions["constructionTypes"].append(keyword)
-        elif keyword in lowerText:
-            conditions["constructionTypes"].append(keyword)
+    # (「〇〇工事」は「〇〇」を含むので、キーワードが含まれるかだけを見ればよい)
+    conditions["constructionTypes"] = [keyword for keyword in CONSTRUCTION_KEYWORDS if keyword in lowerText]
 
     # 8. 構造・規模条件
-    structureKeywords = ["RC造", "S造", "SRC造", "木造", "鉄骨", "鉄筋コンクリート"]
-    for keyword in structureKeywords:
-        # TODO
-        # 細かいが、こちらは lowerText を使わないのか？(RC造が、rc造だったりしないのか？)
-        if keyword in text:
-            conditions["structures"].append(keyword)
-
-    areaMatch = re.search(r"(\d+(?:\.\d+)?)\s*[㎡m2]\s*以上", text)
+    # TODO
+    # 細かいが、こちらは lowerText を使わないのか？(RC造が、rc造だったりしないのか？)
+    conditions["structures"] = [keyword for keyword in STRUCTURE_KEYWORDS if keyword in text]
+
+    areaMatch = AREA_PATTERN.search(text)
     if areaMatch:
         conditions["minArea"] = float(areaMatch[1])
 
@@ -233,29 +263,29 @@ def extractExperienceConditions(text):
 
 
 # 条件に基づいて実績をフィルタリングする
-def filterExperiencesByConditions(experiences, conditions):
+def filterExperiencesByConditions(experiences, conditions, snapshot=None):
 
     def _filterFunc(exp):
         matches = True
         # 1. 期間条件 (completion_date の確認強化)
         if conditions["fiscalYearFrom"]:
             # 有効な日付かどうかをチェック (日付型かつ有効な値)
-            hasValidCompletionDate = isinstance(exp["completion_date"], datetime) and not math.isnan(exp["completion_date"].timestamp())
+            hasValidCompletionDate = isinstance(exp.completion_date, datetime) and not math.isnan(exp.completion_date.timestamp())
 
             if not hasValidCompletionDate:
                 matches = False
-            elif exp["completion_date"] < conditions["fiscalYearFrom"]:
+            elif exp.completion_date < conditions["fiscalYearFrom"]:
                 matches = False
         elif conditions["yearFrom"]:
             # 下位互換性のためにyearFromも残しておく (fiscalYearFromが無い場合)
             # 有効な日付かどうかをチェック追加
-            hasValidCompletionDate = isinstance(exp["completion_date"], datetime) and not math.isnan(exp["completion_date"].timestamp())
+            hasValidCompletionDate = isinstance(exp.completion_date, datetime) and not math.isnan(exp.completion_date.timestamp())
 
             if not hasValidCompletionDate:
                 matches = False
             else:
-                completionYear = exp["completion_date"].year
-                completionMonth = exp["completion_date"].month
+                completionYear = exp.completion_date.year
+                completionMonth = exp.completion_date.month
 
                 # 年度判定 (同じ年なら4月以降かチェック)
                 if completionYear < conditions["yearFrom"] or (completionYear == conditions["yearFrom"] and completionMonth < 4):
@@ -263,41 +293,47 @@ def filterExperiencesByConditions(experiences, conditions):
 
         # 2. 請負階層条件 (立場)の確認
         if matches and conditions["requiredContractorLayer"]:
-            if exp["contractor_layer"] != conditions["requiredContractorLayer"]:
+            if exp.contractor_layer != conditions["requiredContractorLayer"]:
                 matches = False
         elif matches and conditions["requiresOriginalContractor"]:
             # 下位互換性のため (requiredContractorLayerが設定されていない場合)
-            if exp["contractor_layer"] != "元請け":
+            if exp.contractor_layer != "元請け":
                 matches = False
 
         # 3. JV比率条件
         if matches and conditions["minJvRatio"] is not None:
             # JVフラグがtrueで、かつJV比率が条件以上の場合のみOK
-            if exp["is_jv_flg"]:
-                if exp["jv_ratio"] < conditions["minJvRatio"]:
+            if exp.is_jv_flg:
+                if exp.jv_ratio < conditions["minJvRatio"]:
                     matches = False
         else:
             # JVでない場合は、元請けなら条件は満たすとみなす（JV条件は元請けまたはJV比率XX%という共通解釈）
-            if exp["contractor_layer"] != "元請け":
+            if exp.contractor_layer != "元請け":
                 matches = False
 
         # 4. 工事種別条件を確認する前に、先に情報を取得しておく
         constructionInfo = None
         if matches and len(conditions["constructionTypes"]) > 0:
-            constructionInfo = getConstructionInfo(
-                constructionNo=exp["construction_no"],
-                construction_data=pd.read_csv("data/master/construction_master.txt",sep="\t")
-            )
+            if snapshot is not None:
+                constructionInfo = getConstructionInfo(constructionNo=exp.construction_no, snapshot=snapshot)
+            else:
+                constructionInfo = getConstructionInfo(
+                    constructionNo=exp.construction_no,
+                    construction_data=getMaster("construction")
+                )
             # if not constructionInfo:
                 # 疑問：ここでmatches = False としないのか？Loggerでは x としている。
 
         # 発注機関情報も先に取得
         agencyInfo = None
         if matches:
-            agencyInfo = getAgencyInfo(
-                agencyNo=exp["agency_no"], 
-                agency_data=pd.read_csv("data/master/agency_master.txt",sep="\t")
-            )
+            if snapshot is not None:
+                agencyInfo = getAgencyInfo(agencyNo=exp.agency_no, snapshot=snapshot)
+            else:
+                agencyInfo = getAgencyInfo(
+                    agencyNo=exp.agency_no,
+                    agency_data=getMaster("agency")
+                )
         # if not agencyInfo:
         #     疑問：ここでmatches = False としないのか？Loggerでは x としている。
         # else:
@@ -319,8 +355,8 @@ def filterExperiencesByConditions(experiences, conditions):
         # 5. 工事成績条件（全般）
         if matches and conditions["minScore"] is not None:
             score = 0
-            if isinstance(exp["final_score"], (int, float)):
-                score = exp["final_score"]
+            if isinstance(exp.final_score, (int, float)):
+                score = exp.final_score
 
             if score < conditions["minScore"]:
                 matches = False
@@ -346,8 +382,8 @@ def filterExperiencesByConditions(experiences, conditions):
                 if isThisAgency:
                     # 成績点のチェック
                     score = 0
-                    if isinstance(exp["final_score"], (int, float)):
-                        score = exp["final_score"]
+                    if isinstance(exp.final_score, (int, float)):
+                        score = exp.final_score
 
                     if score < minScore:
                         matches = False
@@ -368,15 +404,16 @@ def filterExperiencesByConditions(experiences, conditions):
     return matchingExperiences
 
 
-def generateSuccessReason(matchingExperiences, conditions, agency_data=pd.read_csv("data/master/agency_master.txt",sep="\t"), construction_data=pd.read_csv("data/master/construction_master.txt",sep="\t")):
+def generateSuccessReason(matchingExperiences, conditions, agency_data=None, construction_data=None, snapshot=None):
     # 最も新しい実績情報を1件だけ取得
     # mostRecentExperience = matchingExperiences.sort((a, b) => b.completion_date - a.completion_date)[0];
-    mostRecentExperience = sorted(matchingExperiences, key=lambda x: x["completion_date"], reverse=True)[0]
+    mostRecentExperience = sorted(matchingExperiences, key=lambda x: x.completion_date, reverse=True)[0]
 
     # 発注機関情報を取得 - ここが重要
     agencyInfo = getAgencyInfo(
-        agencyNo=mostRecentExperience["agency_no"], 
-        agency_data=agency_data
+        agencyNo=mostRecentExperience.agency_no, 
+        agency_data=agency_data,
+        snapshot=snapshot
     )
 
     # 発注機関名を正しく設定 - nullチェックを強化
@@ -390,8 +427,9 @@ def generateSuccessReason(matchingExperiences, conditions, agency_data=pd.read_c
 
     # 工事種別情報を取得 - ここも重要
     constructionInfo = getConstructionInfo(
-        constructionNo=mostRecentExperience["construction_no"],
-        construction_data=construction_data
+        constructionNo=mostRecentExperience.construction_no,
+        construction_data=construction_data,
+        snapshot=snapshot
     )
 
     # 工事種別名を正しく設定 - nullチェックを強化
@@ -401,13 +439,13 @@ def generateSuccessReason(matchingExperiences, conditions, agency_data=pd.read_c
 
     # 完成日のフォーマット
     completionDateStr = "不明"
-    if isinstance(mostRecentExperience["completion_date"], datetime) and not math.isnan(mostRecentExperience["completion_date"].timestamp()):
-        # completionDateStr = Utilities.formatDate(mostRecentExperience["completion_date"], Session.getScriptTimeZone(), "yyyy年MM月dd日")
+    if isinstance(mostRecentExperience.completion_date, datetime) and not math.isnan(mostRecentExperience.completion_date.timestamp()):
+        # completionDateStr = Utilities.formatDate(mostRecentExperience.completion_date, Session.getScriptTimeZone(), "yyyy年MM月dd日")
         #
         # Google Apps Script の Session.getScriptTimeZone() 相当を指定
         # ここでは日本時間 (Asia/Tokyo) を例に
         tz = pytz.timezone("Asia/Tokyo")
-        some_date_tz = mostRecentExperience["completion_date"].astimezone(tz)
+        some_date_tz = mostRecentExperience.completion_date.astimezone(tz)
         # フォーマット
         completionDateStr = some_date_tz.strftime("%Y年%m月%d日")
 
@@ -418,19 +456,19 @@ def generateSuccessReason(matchingExperiences, conditions, agency_data=pd.read_c
     if conditions["yearFrom"]:
         #completionYear = mostRecentExperience.completion_date.getFullYear()
         #completionMonth = mostRecentExperience.completion_date.getMonth() + 1;
-        completionYear = mostRecentExperience["completion_date"].year
-        completionMonth = mostRecentExperience["completion_date"].month
+        completionYear = mostRecentExperience.completion_date.year
+        completionMonth = mostRecentExperience.completion_date.month
         conditionDetails.append(fr"{conditions['yearFrom']}年度以降の条件に対して{completionYear}年{completionMonth}月に完成")
 
     # 2. 立場条件
     if conditions["requiredContractorLayer"]:
-        conditionDetails.append(fr"{conditions['requiredContractorLayer']}の条件に対して{mostRecentExperience['contractor_layer']}として参加")
+        conditionDetails.append(fr"{conditions['requiredContractorLayer']}の条件に対して{mostRecentExperience.contractor_layer}として参加")
     elif conditions["requiresOriginalContractor"]:
-        conditionDetails.append(fr"元請の条件に対して{mostRecentExperience['contractor_layer']}として参加")
+        conditionDetails.append(fr"元請の条件に対して{mostRecentExperience.contractor_layer}として参加")
 
     # 3. JV条件
-    if conditions["minJvRatio"] is not None and mostRecentExperience["is_jv_flg"]:
-        conditionDetails.append(fr"JV比率{conditions['minJvRatio']}%以上の条件に対してJV比率{mostRecentExperience['jv_ratio']}%で参加")
+    if conditions["minJvRatio"] is not None and mostRecentExperience.is_jv_flg:
+        conditionDetails.append(fr"JV比率{conditions['minJvRatio']}%以上の条件に対してJV比率{mostRecentExperience.jv_ratio}%で参加")
 
     # 4. 発注機関固有の点数条件（発注機関が一致する場合のみ）
     if agencyInfo:
@@ -438,12 +476,12 @@ def generateSuccessReason(matchingExperiences, conditions, agency_data=pd.read_c
         for agency, minScore in conditions["agencyScoreRequirements"].items():
             isThisAgency = (agencyInfo["agency_name"] and agency in agencyInfo["agency_name"]) or (agencyInfo["parent_name"] and agency in agencyInfo["parent_name"])
 
-            if isThisAgency and isinstance(mostRecentExperience["final_score"], (int, float)):
-                conditionDetails.append(fr"{agency}発注の成績{minScore}点以上の条件に対して成績{mostRecentExperience['final_score']}点を獲得")
+            if isThisAgency and isinstance(mostRecentExperience.final_score, (int, float)):
+                conditionDetails.append(fr"{agency}発注の成績{minScore}点以上の条件に対して成績{mostRecentExperience.final_score}点を獲得")
 
     # 5. 一般的な成績点条件
-    if conditions["minScore"] is not None and isinstance(mostRecentExperience["final_score"], (int, float)):
-        conditionDetails.append(fr"成績{conditions['minScore']}点以上の条件に対して成績{mostRecentExperience['final_score']}点を獲得")
+    if conditions["minScore"] is not None and isinstance(mostRecentExperience.final_score, (int, float)):
+        conditionDetails.append(fr"成績{conditions['minScore']}点以上の条件に対して成績{mostRecentExperience.final_score}点を獲得")
 
     # 6. 工事種別条件
     if len(conditions["constructionTypes"]) > 0 and constructionInfo:
@@ -460,12 +498,12 @@ def generateSuccessReason(matchingExperiences, conditions, agency_data=pd.read_c
     result = fr"{agencyName}発注の{constructionName} {completionDateStr}完成"
 
     # JV情報
-    if mostRecentExperience["is_jv_flg"]:
-        result += fr"、JV出資比率{mostRecentExperience['jv_ratio']}%"
+    if mostRecentExperience.is_jv_flg:
+        result += fr"、JV出資比率{mostRecentExperience.jv_ratio}%"
 
     # 成績点情報
-    if isinstance(mostRecentExperience["final_score"], (int, float)) and mostRecentExperience["final_score"] > 0:
-        result += fr"、成績{mostRecentExperience['final_score']}点"
+    if isinstance(mostRecentExperience.final_score, (int, float)) and mostRecentExperience.final_score > 0:
+        result += fr"、成績{mostRecentExperience.final_score}点"
 
     result += ")"
 
@@ -533,13 +571,15 @@ def generateFailureReason(conditions):
     return "要求される実績条件を満たす工事実績が確認できません"
 
 
-def checkExperienceRequirement(requirementText, officeNo, office_experience_data=pd.read_csv("data/master/office_work_achivements_master.txt",sep="\t"), agency_data=pd.read_csv("data/master/agency_master.txt",sep="\t"), construction_data=pd.read_csv("data/master/construction_master.txt",sep="\t")):
-    # 1. 要件テキストから条件を抽出
-    conditions = extractExperienceConditions(text=requirementText)
+def checkExperienceRequirement(requirementText, officeNo, office_experience_data=None, agency_data=None, construction_data=None, snapshot=None, conditions=None):
+    # 1. 要件テキストから条件を抽出 (事前に解析済みの conditions があれば再解析しない)
+    if conditions is None:
+        conditions = extractExperienceConditions(text=requirementText)
     # 2. 拠点の実績データを取得
     experiences = getOfficeExperiences(
         officeNo=officeNo, 
-        office_experience_data = office_experience_data
+        office_experience_data = office_experience_data,
+        snapshot=snapshot
     )
     if not experiences or len(experiences) == 0:
         return {
@@ -548,7 +588,7 @@ def checkExperienceRequirement(requirementText, officeNo, office_experience_data
         }
 
     # 3. 条件を満たす実績があるかチェック
-    matchingExperiences = filterExperiencesByConditions(experiences=experiences, conditions=conditions)
+    matchingExperiences = filterExperiencesByConditions(experiences=experiences, conditions=conditions, snapshot=snapshot)
 
     # 結果判定 (条件に合う実績が1つ以上あればOK)
     if len(matchingExperiences) > 0:
@@ -557,7 +597,8 @@ def checkExperienceRequirement(requirementText, officeNo, office_experience_data
             matchingExperiences=matchingExperiences, 
             conditions=conditions, 
             agency_data=agency_data, 
-            construction_data=construction_data
+            construction_data=construction_data,
+            snapshot=snapshot
         )
         return {
             "is_ok": True,
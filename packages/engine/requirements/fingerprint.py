@@ -0,0 +1,146 @@
+# coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+#######################################
+# step3 の差分判定用フィンガープリント
+#   拠点ごと・公告の要件セットごとに、判定に使う入力データの内容ハッシュを計算する。
+#   前回の判定時から値が変わった拠点・公告だけを判定し直すために使う。
+#######################################
+
+# 全拠点の判定に共通して使うマスター (変わったら全拠点が対象になる)
+SHARED_MASTER_TABLES = ("agency", "construction", "technician_qualification")
+
+# 公告の要件セットのハッシュに含める列
+REQUIREMENT_COLUMNS = ("requirement_no", "requirement_type", "requirement_text")
+
+OFFICE_KEY_COLUMNS = ["company_no", "office_no"]
+
+
+def _rowHashes(data, columns=None):
+    """各行の内容ハッシュ (uint64) を返す。列名も含めてハッシュするので列の追加・削除も変更とみなす。"""
+    if columns is not None:
+        data = data[[column for column in columns if column in data.columns]]
+    data = data.reindex(columns=sorted(data.columns, key=str))
+    rowHashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    columnHash = pd.util.hash_pandas_object(pd.Series([str(column) for column in data.columns], dtype=object), index=False).to_numpy()
+    return rowHashes ^ np.bitwise_xor.reduce(columnHash, initial=np.uint64(0))
+
+
+def _groupHashes(data, keys, columns=None):
+    """
+    keys ごとに、行の内容と並び順を合わせたハッシュを返す (keys を索引とする uint64 の Series)。
+
+    checker は「最初に一致した行」を使うことがあるので、同じグループ内の並び順もハッシュに含める。
+    """
+    if data is None or data.shape[0] == 0 or any(key not in data.columns for key in keys):
+        return pd.Series(dtype="uint64")
+    data = data[data[keys].notnull().all(axis=1)]
+    rowHashes = _rowHashes(data, columns)
+    order = data.groupby(keys, sort=False).cumcount().to_numpy()
+    frame = data[keys].copy()
+    frame["_hash"] = pd.util.hash_pandas_object(
+        pd.DataFrame({"row": rowHashes, "order": order}), index=False
+    ).to_numpy()
+    # 和 (2^64 での剰余) はグループ内の順に依存しない。並び順は order でハッシュに含めている
+    return frame.groupby(keys, sort=False)["_hash"].sum()
+
+
+def _tableHash(data):
+    if data is None:
+        return np.uint64(0)
+    rowHashes = _rowHashes(data)
+    order = np.arange(len(rowHashes), dtype=np.uint64)
+    hashes = pd.util.hash_pandas_object(pd.DataFrame({"row": rowHashes, "order": order}), index=False)
+    return np.uint64(hashes.sum())
+
+
+def _toHex(values):
+    return [format(int(value), "016x") for value in values]
+
+
+def officeFingerprints(master_data_dict):
+    """
+    拠点ごとの入力データのフィンガープリントを返す。
+
+    拠点・企業・欠格情報・拠点登録許可・工事実績・従業員 (資格・経験を含む) の行と、
+    全拠点で共通のマスター (SHARED_MASTER_TABLES) から計算する。
+
+    Returns:
+        DataFrame: company_no, office_no, fingerprint (16桁の16進文字列)
+    """
+    office = master_data_dict["office"]
+    offices = office[OFFICE_KEY_COLUMNS].dropna().drop_duplicates().reset_index(drop=True)
+    if offices.shape[0] == 0:
+        return offices.assign(fingerprint=pd.Series(dtype=object))
+
+    components = {}
+    components["office"] = _groupHashes(office, ["office_no"])
+    components["office_registration_authorization"] = _groupHashes(
+        master_data_dict.get("office_registration_authorization"), ["office_no"]
+    )
+    components["office_work_achivements"] = _groupHashes(master_data_dict.get("office_work_achivements"), ["office_no"])
+    components["company"] = _groupHashes(master_data_dict.get("company"), ["company_no"])
+
+    # 欠格情報は company_id で持っているので company_no に付け替える
+    company = master_data_dict.get("company")
+    disqualifications = master_data_dict.get("disqualifications")
+    if company is not None and disqualifications is not None and "id" in company.columns and "company_id" in disqualifications.columns:
+        disqualifications = disqualifications.merge(
+            company[["id", "company_no"]].rename(columns={"id": "company_id"}), on="company_id", how="inner"
+        )
+        components["disqualifications"] = _groupHashes(disqualifications, ["company_no"])
+
+    # 従業員・資格・経験は従業員の所属拠点 (company_no, office_no) ごとにまとめる
+    employee = master_data_dict.get("employee")
+    components["employee"] = _groupHashes(employee, OFFICE_KEY_COLUMNS)
+    if employee is not None and all(column in employee.columns for column in ["employee_no"] + OFFICE_KEY_COLUMNS):
+        belongs = employee[["employee_no"] + OFFICE_KEY_COLUMNS].drop_duplicates()
+        for name in ("employee_qualification", "employee_experience"):
+            data = master_data_dict.get(name)
+            if data is not None and "employee_no" in data.columns:
+                columns = list(data.columns)
+                components[name] = _groupHashes(data.merge(belongs, on="employee_no", how="inner"), OFFICE_KEY_COLUMNS, columns)
+
+    shared = pd.util.hash_pandas_object(
+        pd.DataFrame({name: [_tableHash(master_data_dict.get(name))] for name in SHARED_MASTER_TABLES}), index=False
+    ).iloc[0]
+
+    parts = pd.DataFrame({"shared": np.full(offices.shape[0], shared, dtype=np.uint64)})
+    for name, hashes in components.items():
+        if hashes.shape[0] == 0:
+            parts[name] = np.zeros(offices.shape[0], dtype=np.uint64)
+            continue
+        # 索引の型 (int / float) が違っても値で突き合わせられるよう merge で拠点に対応付ける
+        matched = offices.merge(hashes.rename("_hash").reset_index(), on=list(hashes.index.names), how="left")
+        parts[name] = matched["_hash"].fillna(0).astype("uint64").to_numpy()
+
+    fingerprints = pd.util.hash_pandas_object(parts, index=False).to_numpy()
+    return offices.assign(fingerprint=_toHex(fingerprints))
+
+
+def announcementFingerprints(req_df):
+    """
+    公告ごとの要件セットのフィンガープリントを返す。
+
+    Returns:
+        DataFrame: announcement_no, fingerprint (16桁の16進文字列)
+    """
+    hashes = _groupHashes(req_df, ["announcement_no"], REQUIREMENT_COLUMNS)
+    return pd.DataFrame({"announcement_no": hashes.index.to_numpy(), "fingerprint": _toHex(hashes.to_numpy())})
+
+
+def changedKeys(current, stored, keys):
+    """
+    current と stored (前回の判定時のフィンガープリント) を比べ、値が変わったキーを返す。
+
+    stored に無いキーは新規 (まだ判定結果が無い) なので含めない。
+
+    Returns:
+        DataFrame: keys の列だけを持つ DataFrame
+    """
+    if stored is None or stored.shape[0] == 0:
+        return current[keys].iloc[:0]
+    merged = current.merge(stored[keys + ["fingerprint"]], on=keys, how="inner", suffixes=("", "_stored"))
+    return merged.loc[merged["fingerprint"] != merged["fingerprint_stored"], keys].reset_index(drop=True)
@@ -4,6 +4,9 @@ import re
 import pandas as pd
 import argparse
 
+from packages.engine.requirements.master_registry import getMaster
+from packages.engine.requirements.records import OfficeLicense, buildRecordIndex, buildRecords
+
 #######################################
 # 業種・等級要件の判定
 # *   - 全省庁統一 or 特定省庁 or その他 の3パターンに分岐
@@ -64,9 +67,44 @@ def getAgencyAreas(ministry):
     else:
         return []
 
+# 等級 (上位から順)
+LICENSE_GRADES = ["A", "B", "C", "D"]
+
+# 要件テキストの解析に使う正規表現・キーワード (extractGradeAndItemConditions)
+# agencyMatch = requirementText.match(/(防衛省|国土交通省|法務省|財務省|文部科学省|厚生労働省|農林水産省|経済産業省|環境省|内閣府)/);
+AGENCY_PATTERN = re.compile(r"(防衛省|国土交通省|法務省|財務省|文部科学省|厚生労働省|農林水産省|経済産業省|環境省|内閣府)")
+# gradeMatch = requirementText.match(/([A-D])(?:等級以上|以上の等級|等級|という等級|以上|等級以下|以下)/)
+GRADE_PATTERN = re.compile(r"([A-D])(?:等級以上|以上の等級|等級|という等級|以上|等級以下|以下)")
+# scoreMatch = requirementText.match(/(\d+)点(以上|以下|超|未満)?/);
+SCORE_PATTERN = re.compile(r"(\d+)点(以上|以下|超|未満)?")
+
+# 営業品目
+CONSTRUCTION_ITEMS = [
+    "土木", "建築", "大工", "左官", "とび、土工、コンクリート", "石", "屋根", "電気", "管",
+    "タイル、れんが、ブロック", "鋼構造物", "鉄筋", "舗装", "しゅんせつ", "板金", "ガラス",
+    "塗装", "防水", "内装仕上", "機械装置", "熱絶縁", "電気通信", "造園", "さく井", "建具",
+    "水道施設", "消防施設", "清掃施設", "解体", "その他", "グラウト", "維持", "自然環境共生",
+    "水環境処理"
+]
+UNIFIED_CATEGORIES = [
+    "物品の製造", "物品の販売", "役務の提供等", "物品の買受け"
+]
+SPECIFIC_ITEMS = [
+    "衣服・その他繊維製品類", "ゴム・皮革・プラスチック製品類", "窯業・土石製品類",
+    "非鉄金属・金属製品類", "フォーム印刷類", "その他印刷類", "図書類", "電子出版物類",
+    "紙・紙加工品類", "車両類", "その他輸送・搬送機械器具類", "船舶類", "燃料類", "家具・什器類",
+    "一般・産業用機器類", "電気・通信用機器類", "電子計算機類", "精密機器類", "医療用機器類",
+    "事務用機器類", "その他機器類", "医薬品・医療用品類", "事務用品類", "土木・建設・建築材料類",
+    "警察用装備品類", "防衛用装備品類", "その他類", "広告・宣伝類", "写真・製図類", "調査・研究類",
+    "情報処理類", "翻訳・通訳・速記類", "ソフトウェア開発類", "会場等の借り上げ類", "賃貸借類",
+    "建物管理等各種保守管理類", "運送類", "車両整備類", "船舶整備類", "電子出版類",
+    "防衛用装備品類の整備類", "立木竹類"
+]
+REQUIRED_ITEM_CANDIDATES = [*CONSTRUCTION_ITEMS, *UNIFIED_CATEGORIES, *SPECIFIC_ITEMS]
+
 # 等級(A/B/C/D)の比較判定
 def checkGrade(licenseGrade, requiredGrade, comparison):
-    grades = ["A", "B", "C", "D"]
+    grades = LICENSE_GRADES
     if licenseGrade in grades:
         licIndex = grades.index(licenseGrade)
     else:
@@ -110,7 +148,7 @@ def checkAllMinistryUnified(requiredItems, agencyMap, officeLicenses, constructi
     #        return False
     #    return agInfo.agency_name == "全省庁統一")
     def _filter(lic):
-        agInfo = agencyMap[lic["agency_no"]]
+        agInfo = agencyMap[lic.agency_no]
         if not agInfo:
             return False
         return agInfo["agency_name"] == "全省庁統一"
@@ -126,7 +164,7 @@ def checkAllMinistryUnified(requiredItems, agencyMap, officeLicenses, constructi
     if len(requiredItems) > 0:
         matchingLicenses = []
         for lic in unifiedLicenses:
-            cInfo = constructionMap[fr"{int(lic['construction_no']):04}"]
+            cInfo = constructionMap[fr"{int(lic.construction_no):04}"]
             if not cInfo:
                 continue
 
@@ -149,10 +187,10 @@ def checkAllMinistryUnified(requiredItems, agencyMap, officeLicenses, constructi
         if requiredGrade:
             gradeLicenses = []
             for lic in matchingLicenses:
-                if not lic["license_grade"]:
+                if not lic.license_grade:
                     continue
                 if checkGrade(
-                    licenseGrade = lic["license_grade"], 
+                    licenseGrade = lic.license_grade, 
                     requiredGrade = requiredGrade, 
                     comparison = gradeComparison
                     ):
@@ -167,9 +205,9 @@ def checkAllMinistryUnified(requiredItems, agencyMap, officeLicenses, constructi
             if requiredScore:
                 scoreLicenses = []
                 for lic in gradeLicenses:
-                    if not isinstance(lic["license_score"], (int, float)):
+                    if not isinstance(lic.license_score, (int, float)):
                         continue
-                    if checkScore(lic["license_score"], requiredScore, scoreComparison):
+                    if checkScore(lic.license_score, requiredScore, scoreComparison):
                         scoreLicenses.append(lic)
 
                 if len(scoreLicenses) == 0:
@@ -188,7 +226,7 @@ def checkAllMinistryUnified(requiredItems, agencyMap, officeLicenses, constructi
 def checkSpecificAgency(agency, agencyMap, officeLicenses, constructionMap, requiredItems, requiredGrade, gradeComparison, requiredScore, scoreComparison):
     # specificLicenses = officeLicenses.filter(lic => {
     def _filter(lic):
-        agInfo = agencyMap[lic["agency_no"]]
+        agInfo = agencyMap[lic.agency_no]
         if not agInfo:
             return False
         if agInfo["agency_name"] == agency:
@@ -209,7 +247,7 @@ def checkSpecificAgency(agency, agencyMap, officeLicenses, constructionMap, requ
     if len(requiredItems) > 0:
         matchingLicenses = []
         for lic in specificLicenses:
-            cInfo = constructionMap[fr"{int(lic['construction_no']):04}"]
+            cInfo = constructionMap[fr"{int(lic.construction_no):04}"]
             if not cInfo:
                 continue
             itemMatched = False
@@ -229,10 +267,10 @@ def checkSpecificAgency(agency, agencyMap, officeLicenses, constructionMap, requ
         if requiredGrade:
             gradeLicenses = []
             for lic in matchingLicenses:
-                if not lic["license_grade"]:
+                if not lic.license_grade:
                     continue
                 if checkGrade(
-                    licenseGrade = lic["license_grade"], 
+                    licenseGrade = lic.license_grade, 
                     requiredGrade = requiredGrade, 
                     comparison = gradeComparison
                     ):
@@ -247,9 +285,9 @@ def checkSpecificAgency(agency, agencyMap, officeLicenses, constructionMap, requ
             if requiredScore:
                 scoreLicenses = []
                 for lic in gradeLicenses:
-                    if not isinstance(lic["license_score"], (int, float)):
+                    if not isinstance(lic.license_score, (int, float)):
                         continue
-                    if checkScore(lic["license_score"], requiredScore, scoreComparison):
+                    if checkScore(lic.license_score, requiredScore, scoreComparison):
                         scoreLicenses.append(lic)
                 if len(scoreLicenses) == 0:
                     return {
@@ -268,7 +306,7 @@ def checkDefault(requiredItems, officeLicenses, constructionMap, agencyMap, requ
     if len(requiredItems) > 0:
         matchingLicenses = []
         for lic in officeLicenses:
-            cInfo = constructionMap[fr"{int(lic['construction_no']):04}"]
+            cInfo = constructionMap[fr"{int(lic.construction_no):04}"]
             if not cInfo:
                 continue
             itemMatched = False
@@ -290,10 +328,10 @@ def checkDefault(requiredItems, officeLicenses, constructionMap, agencyMap, requ
         if requiredGrade:
             gradeLicenses = []
             for lic in matchingLicenses:
-                if not lic["license_grade"]:
+                if not lic.license_grade:
                     continue
                 if checkGrade(
-                    licenseGrade = lic["license_grade"], 
+                    licenseGrade = lic.license_grade, 
                     requiredGrade = requiredGrade, 
                     comparison = gradeComparison
                     ):
@@ -308,9 +346,9 @@ def checkDefault(requiredItems, officeLicenses, constructionMap, agencyMap, requ
             if requiredScore:
                 scoreLicenses = []
                 for lic in gradeLicenses:
-                    if not isinstance(lic["license_score"], (int, float)):
+                    if not isinstance(lic.license_score, (int, float)):
                         continue
-                    if checkScore(lic["license_score"], requiredScore, scoreComparison):
+                    if checkScore(lic.license_score, requiredScore, scoreComparison):
                         scoreLicenses.append(lic)
                 if len(scoreLicenses) == 0:
                     return {
@@ -322,18 +360,20 @@ def checkDefault(requiredItems, officeLicenses, constructionMap, agencyMap, requ
     if len(requiredAreas) > 0:
         areaLicenses = []
         for lic in officeLicenses:
-            agInfo = agencyMap.get(lic["agency_no"])
+            agInfo = agencyMap.get(lic.agency_no)
             if not agInfo or not agInfo["agency_area"]:
                 continue
 
-            if not isinstance(agInfo["agency_area"], str):
-                print(fr"agInfo['agency_area'] not str : {agInfo["agency_area"]}")
-                agInfo["agency_area"] = str(agInfo["agency_area"])
+            # agencyMap は判定間で共有するので書き換えない
+            agencyArea = agInfo["agency_area"]
+            if not isinstance(agencyArea, str):
+                print(fr"agInfo['agency_area'] not str : {agencyArea}")
+                agencyArea = str(agencyArea)
                 # time.sleep(5)
 
             areaMatched = False
             for area in requiredAreas:
-                if area in agInfo["agency_area"]:
+                if area in agencyArea:
                     areaMatched = True
                     break
             if areaMatched:
@@ -350,33 +390,63 @@ def checkDefault(requiredItems, officeLicenses, constructionMap, agencyMap, requ
     }
 
 
-def checkGradeAndItemRequirement(
-        requirementText, 
-        officeNo,
-        licenseData = pd.read_csv("data/master/office_registration_authorization_master.txt",sep="\t", converters={"construction_no": lambda x: str(x)}),
-        agencyData = pd.read_csv("data/master/agency_master.txt",sep="\t"),
-        constructionData = pd.read_csv("data/master/construction_master.txt",sep="\t")
-    ):
+# 発注機関マスター -> {agency_no: {agency_name, parent_agency_no, agency_area}}
+def buildAgencyMap(agencyData):
+    agencyMap = {}
+    for index, row in agencyData.iterrows():
+        agencyMap[row["agency_no"]] = {
+            "agency_name": row["agency_name"],
+            "parent_agency_no": row["parent_agency_no"],
+            "agency_area": row["agency_area"]
+        }
+    return agencyMap
+
+# 営業品目マスター -> {"0004" 形式の construction_no: {construction_name, category_segment}}
+def buildConstructionMap(constructionData):
+    constructionMap = {}
+    for index, row in constructionData.iterrows():
+        constructionMap[ f"{row['construction_no']:04d}" ] = {
+            "construction_name": row["construction_name"],
+            "category_segment": row["category_segment"]
+        }
+    return constructionMap
+
+
+# MasterSnapshot ごとに1回だけ agencyMap / constructionMap を作る (拠点・要件ごとに作り直さない)
+def getAgencyMap(snapshot):
+    return snapshot.derived("grade_item_agency_map", lambda snap: buildAgencyMap(snap.data("agency")))
+
+def getConstructionMap(snapshot):
+    return snapshot.derived("grade_item_construction_map", lambda snap: buildConstructionMap(snap.data("construction")))
+
+# 拠点登録許可 (ライセンス) を office_no ごとにまとめた OfficeLicense のリスト
+def _buildOfficeLicenses(snapshot):
+    return buildRecordIndex(OfficeLicense, snapshot.data("office_registration_authorization_with_converter"), "office_no")
+
+def getOfficeLicenses(snapshot, officeNo):
+    return snapshot.derived("grade_item_office_licenses", _buildOfficeLicenses).get(officeNo, [])
+
+
+# 要件テキストから業種・等級要件の条件を抽出する (拠点に依存しないので要件ごとに1回でよい)
+def extractGradeAndItemConditions(requirementText):
     # ----------------------------------------
     #  1. 要件テキストから必要な情報を抽出
     # ----------------------------------------
 
     # (A) 全省庁統一資格かどうか
     # isAllMinistryUnified = /全省庁統一/.test(requirementText);
-    isAllMinistryUnified = bool(re.search("全省庁統一", requirementText))
+    isAllMinistryUnified = "全省庁統一" in requirementText
     # (B) 特定省庁
     specificAgency = None
 
-    # agencyMatch = requirementText.match(/(防衛省|国土交通省|法務省|財務省|文部科学省|厚生労働省|農林水産省|経済産業省|環境省|内閣府)/);
-    agencyMatch = re.search(r"(防衛省|国土交通省|法務省|財務省|文部科学省|厚生労働省|農林水産省|経済産業省|環境省|内閣府)", requirementText)
+    agencyMatch = AGENCY_PATTERN.search(requirementText)
     if agencyMatch:
         specificAgency = agencyMatch[1]
 
     # (C) 等級要件(A～D)
     requiredGrade = None
     gradeComparison = "等しい"
-    # gradeMatch = requirementText.match(/([A-D])(?:等級以上|以上の等級|等級|という等級|以上|等級以下|以下)/)
-    gradeMatch = re.search(r"([A-D])(?:等級以上|以上の等級|等級|という等級|以上|等級以下|以下)", requirementText)
+    gradeMatch = GRADE_PATTERN.search(requirementText)
     if gradeMatch:
         requiredGrade = gradeMatch[1]
         # if (gradeMatch[0].includes("以上")) {
@@ -389,69 +459,72 @@ def checkGradeAndItemRequirement(
     # (D) 点数要件(例: "1200点以上"など)
     requiredScore = None
     scoreComparison = "以上"
-    # scoreMatch = requirementText.match(/(\d+)点(以上|以下|超|未満)?/);
     # requirementText = "1200点以上"
     # requirementText = "1200点"
-    scoreMatch = re.search(r"(\d+)点(以上|以下|超|未満)?", requirementText)
+    scoreMatch = SCORE_PATTERN.search(requirementText)
     if scoreMatch:
         requiredScore = int(scoreMatch[1])
         scoreComparison = scoreMatch[2] or "以上"
 
     # (E) 営業品目の抽出
-    requiredItems = []
-    constructionItems = [
-        "土木", "建築", "大工", "左官", "とび、土工、コンクリート", "石", "屋根", "電気", "管",
-        "タイル、れんが、ブロック", "鋼構造物", "鉄筋", "舗装", "しゅんせつ", "板金", "ガラス",
-        "塗装", "防水", "内装仕上", "機械装置", "熱絶縁", "電気通信", "造園", "さく井", "建具",
-        "水道施設", "消防施設", "清掃施設", "解体", "その他", "グラウト", "維持", "自然環境共生",
-        "水環境処理"
-    ]
-    unifiedCategories = [
-        "物品の製造", "物品の販売", "役務の提供等", "物品の買受け"
-    ]
-    specificItems = [
-        "衣服・その他繊維製品類", "ゴム・皮革・プラスチック製品類", "窯業・土石製品類",
-        "非鉄金属・金属製品類", "フォーム印刷類", "その他印刷類", "図書類", "電子出版物類",
-        "紙・紙加工品類", "車両類", "その他輸送・搬送機械器具類", "船舶類", "燃料類", "家具・什器類",
-        "一般・産業用機器類", "電気・通信用機器類", "電子計算機類", "精密機器類", "医療用機器類",
-        "事務用機器類", "その他機器類", "医薬品・医療用品類", "事務用品類", "土木・建設・建築材料類",
-        "警察用装備品類", "防衛用装備品類", "その他類", "広告・宣伝類", "写真・製図類", "調査・研究類",
-        "情報処理類", "翻訳・通訳・速記類", "ソフトウェア開発類", "会場等の借り上げ類", "賃貸借類",
-        "建物管理等各種保守管理類", "運送類", "車両整備類", "船舶整備類", "電子出版類",
-        "防衛用装備品類の整備類", "立木竹類"
-    ]
     #for item in [...constructionItems, ...unifiedCategories, ...specificItems]:
-    for item in [*constructionItems, *unifiedCategories, *specificItems]:
-        if item in requirementText:
-            requiredItems.append(item)
+    requiredItems = [item for item in REQUIRED_ITEM_CANDIDATES if item in requirementText]
 
     # (F) 地域要件の抽出
-    requiredAreas = []
     if specificAgency:
         agencyAreas = getAgencyAreas(specificAgency)
-        for area in agencyAreas:
-            if area in requirementText:
-                requiredAreas.append(area)
     else:
-        standardAreas = getAgencyAreas("全省庁統一")
-        for area in standardAreas:
-            if area in requirementText:
-                requiredAreas.append(area)
+        agencyAreas = getAgencyAreas("全省庁統一")
+    requiredAreas = [area for area in agencyAreas if area in requirementText]
+
+    return {
+        "isAllMinistryUnified": isAllMinistryUnified,
+        "specificAgency": specificAgency,
+        "requiredGrade": requiredGrade,
+        "gradeComparison": gradeComparison,
+        "requiredScore": requiredScore,
+        "scoreComparison": scoreComparison,
+        "requiredItems": requiredItems,
+        "requiredAreas": requiredAreas
+    }
+
+
+def checkGradeAndItemRequirement(
+        requirementText, 
+        officeNo,
+        licenseData=None,
+        agencyData=None,
+        constructionData=None,
+        snapshot=None,
+        conditions=None,
+        agencyMap=None,
+        constructionMap=None
+    ):
+    # conditions: extractGradeAndItemConditions の結果 (事前に解析済みなら再解析しない)
+    # agencyMap / constructionMap: buildAgencyMap / buildConstructionMap の結果。
+    #   省略時は snapshot があればそこにキャッシュしたものを使い、なければ DataFrame から作る。
+    if conditions is None:
+        conditions = extractGradeAndItemConditions(requirementText)
+    isAllMinistryUnified = conditions["isAllMinistryUnified"]
+    specificAgency = conditions["specificAgency"]
+    requiredGrade = conditions["requiredGrade"]
+    gradeComparison = conditions["gradeComparison"]
+    requiredScore = conditions["requiredScore"]
+    scoreComparison = conditions["scoreComparison"]
+    requiredItems = conditions["requiredItems"]
+    requiredAreas = conditions["requiredAreas"]
 
     # 2. 拠点登録許可マスター (officeLicenses) を取得
     # licenseSheet = getSheetByName("拠点登録許可マスター")
     # licenseData = licenseSheet.getDataRange().getValues();
     # licenseData = None
-    officeLicenses = []
-    subset_data = licenseData[licenseData["office_no"]==officeNo]
-    for index, row in subset_data.iterrows():
-        officeLicenses.append({
-            "agency_no": row["agency_no"],
-            "construction_no": row["construction_no"],
-            "license_grade": row["license_grade"],
-            "license_score": row["license_score"],
-            "is_suspended": row["is_suspended"]
-        })
+    # snapshot があれば office_no ごとにまとめ済みのリストを使う (判定側では読み取り専用)
+    if snapshot is not None:
+        officeLicenses = getOfficeLicenses(snapshot, officeNo)
+    else:
+        if licenseData is None:
+            licenseData = getMaster("office_registration_authorization_with_converter")
+        officeLicenses = buildRecords(OfficeLicense, licenseData[licenseData["office_no"]==officeNo])
 
     # === (C) 取得ライセンス ===
     if len(officeLicenses) == 0:
@@ -462,22 +535,19 @@ def checkGradeAndItemRequirement(
 
     # 3. 発注機関マスターを取得
     # agencyData = pd.read_csv("data/master/agency_master.txt",sep="\t")
-    agencyMap = {}
-    for index, row in agencyData.iterrows():
-        agencyMap[row["agency_no"]] = {
-            "agency_name": row["agency_name"],
-            "parent_agency_no": row["parent_agency_no"],
-            "agency_area": row["agency_area"]
-        }
+    if agencyMap is None:
+        if snapshot is not None:
+            agencyMap = getAgencyMap(snapshot)
+        else:
+            agencyMap = buildAgencyMap(agencyData if agencyData is not None else getMaster("agency"))
 
     # 4. 営業品目マスターを取得
     # constructionData = pd.read_csv("data/master/construction_master.txt",sep="\t")
-    constructionMap = {}
-    for index, row in constructionData.iterrows():
-        constructionMap[ f"{row['construction_no']:04d}" ] = {
-            "construction_name": row["construction_name"],
-            "category_segment": row["category_segment"]
-        }
+    if constructionMap is None:
+        if snapshot is not None:
+            constructionMap = getConstructionMap(snapshot)
+        else:
+            constructionMap = buildConstructionMap(constructionData if constructionData is not None else getMaster("construction"))
     
     # 5. ライセンス情報をチェック (全省庁統一 / 特定省庁 / デフォルト)
     if isAllMinistryUnified:
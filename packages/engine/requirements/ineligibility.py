@@ -3,6 +3,9 @@
 import re
 import pandas as pd
 
+from packages.engine.requirements.master_registry import getMaster
+from packages.engine.requirements.snapshot import lookupRecords
+
 #######################################
 # 欠格要件の判定
 #   欠格要件用の判定(会社ベース + 拠点指名停止など)
@@ -10,10 +13,18 @@ import pandas as pd
 # ※requirementType === "欠格要件"の場合。
 #######################################
 
-def isOfficeSuspended(officeNo, office_registration_authorization_data=pd.read_csv("data/master/office_registration_authorization_master.txt",sep="\t")):
+def isOfficeSuspended(officeNo, office_registration_authorization_data=None, snapshot=None):
     # 拠点登録許可マスター
     # office_registration_authorization_data
-    
+    # snapshot (MasterSnapshot) があれば索引から引く
+    if snapshot is not None:
+        target_row = snapshot.first("office_registration_authorization", officeNo)
+        if target_row is not None and target_row["is_suspended"]:
+            return True
+        return False
+
+    if office_registration_authorization_data is None:
+        office_registration_authorization_data = getMaster("office_registration_authorization")
     target_data = office_registration_authorization_data[office_registration_authorization_data["office_no"] == officeNo]
     if target_data.shape[0] >= 1:
         keyname = "is_suspended" # 指名停止フラグ
@@ -24,21 +35,24 @@ def isOfficeSuspended(officeNo, office_registration_authorization_data=pd.read_c
     return False
 
 # 企業Noが一致する行(companies)を返す(無ければNone)
-def findCompanyRow(companyNo, company_data=None):
+def findCompanyRow(companyNo, company_data=None, snapshot=None):
     """
     company_data (DataFrame) から company_no が一致する行を返す。
 
     Args:
         companyNo: 企業番号 (INTEGER)
-        company_data: companies テーブルの DataFrame。必須。
+        company_data: companies テーブルの DataFrame。snapshot がない場合は必須。
+        snapshot: MasterSnapshot。指定時は索引から引く。
 
     Returns:
         DataFrame (1行) or None
     """
-    if company_data is None:
+    if snapshot is not None:
+        data = snapshot.frame("company", companyNo)
+    elif company_data is None:
         raise ValueError("company_data must be provided")
-
-    data = company_data[company_data["company_no"] == companyNo]
+    else:
+        data = company_data[company_data["company_no"] == companyNo]
     if data.shape[0] == 0:
         return None
     else:
@@ -46,7 +60,30 @@ def findCompanyRow(companyNo, company_data=None):
             print(f"Warning: 企業No={companyNo} に対して複数行ヒット({data.shape[0]}行)")
         return data.head(1)
 
-def checkIneligibilityDynamic(requirementText, companyNo, officeNo, company_data=None, disqualification_data=None, office_registration_authorization_data=None):
+# 欠格要件の判定ルール (上から順に最初にマッチしたものだけを適用する)
+INELIGIBILITY_RULES = [
+    ("article_70", re.compile(r"70条")),
+    ("article_71", re.compile(r"71条")),
+    ("bankruptcy", re.compile(r"破産|倒産")),
+    ("reorganization", re.compile(r"会社更生|民事再生|更生法|再生手続")),
+    ("adult_ward", re.compile(r"成年被後見|後見人|保佐人|法定代理")),
+    ("anti_social", re.compile(r"暴力団|反社会")),
+    ("foreign_law", re.compile(r"外国法|海外制裁|安保理|OFAC")),
+    ("subversive", re.compile(r"破壊的団体|破壊活動防止法|テロリスト")),
+    ("social_insurance", re.compile(r"社会保険|労働保険|保険料.*滞納")),
+    ("information_security", re.compile(r"情報保全|セキュリティ|保全体制|ISMS")),
+    ("boj_suspension", re.compile(r"日銀取引停止|日銀.*停止")),
+    ("office_suspension", re.compile(r"指名停止|営業停止|取引停止")),
+]
+
+# 要件テキストから適用する欠格ルールを抽出する (企業・拠点に依存しないので要件ごとに1回でよい)
+def extractIneligibilityConditions(requirementText):
+    for rule, pattern in INELIGIBILITY_RULES:
+        if pattern.search(requirementText):
+            return {"rule": rule}
+    return {"rule": None}
+
+def checkIneligibilityDynamic(requirementText, companyNo, officeNo, company_data=None, disqualification_data=None, office_registration_authorization_data=None, snapshot=None, conditions=None):
     """
     欠格要件の動的判定。
 
@@ -54,103 +91,112 @@ def checkIneligibilityDynamic(requirementText, companyNo, officeNo, company_data
         requirementText: 要件文テキスト
         companyNo: 企業番号 (INTEGER)
         officeNo: 拠点番号
-        company_data: companies テーブルの DataFrame。必須。
-        disqualification_data: company_disqualifications テーブルの DataFrame。必須。
+        company_data: companies テーブルの DataFrame。snapshot がない場合は必須。
+        disqualification_data: company_disqualifications テーブルの DataFrame。snapshot がない場合は必須。
         office_registration_authorization_data: 拠点登録許可マスターの DataFrame。
+        snapshot: MasterSnapshot。指定時は DataFrame 引数の代わりに索引から引く。
+        conditions: extractIneligibilityConditions の結果。省略時は requirementText から抽出する。
     """
-    if company_data is None:
-        raise ValueError("company_data must be provided")
-    if disqualification_data is None:
-        raise ValueError("disqualification_data must be provided")
+    if snapshot is None:
+        if company_data is None:
+            raise ValueError("company_data must be provided")
+        if disqualification_data is None:
+            raise ValueError("disqualification_data must be provided")
 
-    compRow = findCompanyRow(companyNo, company_data=company_data)
+    compRow = findCompanyRow(companyNo, company_data=company_data, snapshot=snapshot)
     if compRow is None or compRow.shape[0] == 0:
         # 会社そのものが見つからなければNG
         return { "is_ok": False, "reason": fr"欠格要件：企業No={companyNo}が見つからない" }
 
     # companies テーブルの id を使って company_disqualifications を引く
     company_id = compRow["id"].item()
-    disqRow = disqualification_data[disqualification_data["company_id"] == company_id]
+    if snapshot is not None:
+        disqRecord = snapshot.first("disqualifications", company_id)
+    else:
+        disqRecords = lookupRecords(disqualification_data, "company_id", company_id)
+        disqRecord = disqRecords[0] if disqRecords else None
 
-    if disqRow.shape[0] == 0:
+    if disqRecord is None:
         # 欠格データがない場合は全てOK
         return { "is_ok": True, "reason": "欠格要件：欠格データなし => OK" }
 
-    disqRow = disqRow.head(1)
-
     # company_disqualifications テーブルから snake_case カラムで取得
-    article70Flg = disqRow["article_70_flag"].item()
-    article71Flg = disqRow["article_71_flag"].item()
-    bankruptFlg = disqRow["bankruptcy_flag"].item()
-    rehabFlg = disqRow["corporate_reorganization_flag"].item()
-    rehabStartDt = disqRow["corporate_reorganization_start_date"].item()
-    reobtainedDt = disqRow["post_reorganization_reacquisition_date"].item()
-    violentFlg = disqRow["anti_social_forces_flag"].item()
-    legalIncapFlg = disqRow["adult_ward_flag"].item()
-    foreignFlg = disqRow["foreign_legal_restriction_flag"].item()
-    terroristFlg = disqRow["subversive_organization_flag"].item()
-    socialInsOk = disqRow["no_social_insurance_arrears_flag"].item()
-    infoSecFlg = disqRow["information_security_framework_flag"].item()
-    isSuspByBOJ = disqRow["boj_transaction_suspension_flag"].item()
+    article70Flg = disqRecord["article_70_flag"]
+    article71Flg = disqRecord["article_71_flag"]
+    bankruptFlg = disqRecord["bankruptcy_flag"]
+    rehabFlg = disqRecord["corporate_reorganization_flag"]
+    rehabStartDt = disqRecord["corporate_reorganization_start_date"]
+    reobtainedDt = disqRecord["post_reorganization_reacquisition_date"]
+    violentFlg = disqRecord["anti_social_forces_flag"]
+    legalIncapFlg = disqRecord["adult_ward_flag"]
+    foreignFlg = disqRecord["foreign_legal_restriction_flag"]
+    terroristFlg = disqRecord["subversive_organization_flag"]
+    socialInsOk = disqRecord["no_social_insurance_arrears_flag"]
+    infoSecFlg = disqRecord["information_security_framework_flag"]
+    isSuspByBOJ = disqRecord["boj_transaction_suspension_flag"]
+
+    if conditions is None:
+        conditions = extractIneligibilityConditions(requirementText)
+    rule = conditions["rule"]
 
     # (1) 70条
-    if re.search(r"70条", requirementText):
+    if rule == "article_70":
         if article70Flg or bankruptFlg or violentFlg or legalIncapFlg:
             return { "is_ok": False, "reason": "欠格要件：70条NG(破産/暴力団/成年後見等フラグ)" }
         else:
             return { "is_ok": True, "reason": "欠格要件：70条OK" }
 
     # (2) 71条
-    if re.search(r"71条", requirementText):
+    if rule == "article_71":
         if article71Flg:
             return { "is_ok": False, "reason": "欠格要件：71条NG(71条該当フラグ)" }
         else:
             return { "is_ok": True, "reason": "欠格要件：71条OK" }
 
     # (3) 破産/倒産
-    if re.search(r"破産|倒産", requirementText):
+    if rule == "bankruptcy":
         if bankruptFlg:
             return { "is_ok": False, "reason": "欠格要件：破産NG(破産フラグ)" }
         else:
             return { "is_ok": True, "reason": "欠格要件：破産OK" }
 
     # (4) 会社更生/民事再生
-    if re.search(r"会社更生|民事再生|更生法|再生手続", requirementText):
+    if rule == "reorganization":
         if rehabFlg and not reobtainedDt:
             return { "is_ok": False, "reason": "欠格要件：更生/再生NG(再取得なし)" }
         else:
             return { "is_ok": True, "reason": "欠格要件：更生/再生OK" }
 
     # (5) 成年後見   
-    if re.search(r"成年被後見|後見人|保佐人|法定代理", requirementText):
+    if rule == "adult_ward":
         if legalIncapFlg:
             return { "is_ok": False, "reason": "欠格要件：成年後見NG" }
         else:
             return { "is_ok": True, "reason": "欠格要件：成年後見OK" }
 
     # (6) 暴力団/反社会    
-    if re.search(r"暴力団|反社会", requirementText):
+    if rule == "anti_social":
         if violentFlg:
             return { "is_ok": False, "reason": "欠格要件：暴力団NG" }
         else:
             return { "is_ok": True, "reason": "欠格要件：暴力団OK" }
 
     # (7) 外国法/海外制裁/安保理
-    if re.search(r"外国法|海外制裁|安保理|OFAC", requirementText):
+    if rule == "foreign_law":
         if foreignFlg:
             return { "is_ok": False, "reason": "欠格要件：海外制裁NG" }
         else:
             return { "is_ok": True, "reason": "欠格要件：海外制裁OK" }
 
     # (8) 破壊的団体
-    if re.search(r"破壊的団体|破壊活動防止法|テロリスト", requirementText):
+    if rule == "subversive":
         if terroristFlg:
             return { "is_ok": False, "reason": "欠格要件：破壊的団体NG" }
         else:
             return { "is_ok": True, "reason": "欠格要件：破壊的団体OK" }
 
     # (9) 社会保険/労働保険の滞納
-    if re.search(r"社会保険|労働保険|保険料.*滞納", requirementText):
+    if rule == "social_insurance":
         # TODO
         # 例: socialInsOk が true なら OK。falseまたはnullならNG
         # ※ 上のコメントの内容に従えば、true なら "is_ok" は True
@@ -162,7 +208,7 @@ def checkIneligibilityDynamic(requirementText, companyNo, officeNo, company_data
             return { "is_ok": True, "reason": "欠格要件：社会保険滞納OK" }
 
     # (10) 情報保全/セキュリティ
-    if re.search(r"情報保全|セキュリティ|保全体制|ISMS", requirementText):
+    if rule == "information_security":
         # 例: infoSecFlg === true の場合NG扱いなど
         if infoSecFlg:
             return { "is_ok": False, "reason": "欠格要件：情報保全NG" }
@@ -170,18 +216,19 @@ def checkIneligibilityDynamic(requirementText, companyNo, officeNo, company_data
             return { "is_ok": True, "reason": "欠格要件：情報保全OK" }
 
     # (11) 日銀取引停止
-    if re.search(r"日銀取引停止|日銀.*停止", requirementText):
+    if rule == "boj_suspension":
         if isSuspByBOJ:
             return { "is_ok": False, "reason": "欠格要件：日銀取引停止NG" }
         else:
             return { "is_ok": True, "reason": "欠格要件：日銀取引停止OK" }
 
     # (12) 指名停止/営業停止 (拠点単位で見る例)
-    if re.search(r"指名停止|営業停止|取引停止", requirementText):
+    if rule == "office_suspension":
         # 拠点マスター or 拠点登録許可マスターで is_suspended_flg をチェック
         if isOfficeSuspended(
             officeNo=officeNo,
-            office_registration_authorization_data=office_registration_authorization_data
+            office_registration_authorization_data=office_registration_authorization_data,
+            snapshot=snapshot
             ):
             return { "is_ok": False, "reason": "欠格要件：拠点指名停止NG" }
         else:
@@ -3,6 +3,9 @@
 import re
 import pandas as pd
 
+from packages.engine.requirements.master_registry import getMaster
+from packages.engine.requirements.snapshot import lookupRecords
+
 
 #######################################
 # 所在地要件の判定
@@ -11,14 +14,18 @@ import pandas as pd
 
 # 管轄地域名（防衛局など）から対応する都道府県をリストで返す。
 # agencyData:発注者機関マスターから、管轄地域情報を取得
-def expandRegionToPrefectures(regionName=None, agencyData=pd.read_csv("data/master/agency_master.txt",sep="\t")):
+def expandRegionToPrefectures(regionName=None, agencyData=None, snapshot=None):
     if regionName is None:
         regionName = "東北"
-    
-    target_data = agencyData[(agencyData["agency_name"] == regionName) & (agencyData["agency_area"].notnull())]
-    if target_data.shape[0] >= 1:
-        agency_area = target_data["agency_area"]
-        agency_area = [part.strip() for part in agency_area.str.split(",").tolist()[0]]
+
+    if snapshot is not None:
+        target_rows = [row for row in snapshot.rows("agency", regionName, column="agency_name") if pd.notnull(row["agency_area"])]
+    else:
+        if agencyData is None:
+            agencyData = getMaster("agency")
+        target_rows = agencyData[(agencyData["agency_name"] == regionName) & (agencyData["agency_area"].notnull())].to_dict("records")
+    if len(target_rows) >= 1:
+        agency_area = [part.strip() for part in target_rows[0]["agency_area"].split(",")]
         return agency_area
 
     # 発注者機関マスターに該当がない場合、ハードコーディングされたマッピングを使用
@@ -38,13 +45,19 @@ def expandRegionToPrefectures(regionName=None, agencyData=pd.read_csv("data/mast
 
     return regionPrefectureMap.get(regionName, [])
 
-def getOfficeLocation(officeNo, officeData = pd.read_csv("data/master/office_master.txt",sep="\t")):
-    
-    target_data = officeData[officeData["office_no"] == officeNo]
-    if target_data.shape[0] >= 1:
-        officelocation = target_data["office_address"].tolist()[0]
-        officetype = target_data["office_type"].tolist()[0]
-        officeprefecture = target_data["Located_Prefecture"].tolist()[0]
+def getOfficeLocation(officeNo, officeData=None, snapshot=None):
+
+    if snapshot is not None:
+        target_row = snapshot.first("office", officeNo)
+    else:
+        if officeData is None:
+            officeData = getMaster("office")
+        target_rows = lookupRecords(officeData, "office_no", officeNo)
+        target_row = target_rows[0] if target_rows else None
+    if target_row is not None:
+        officelocation = target_row["office_address"]
+        officetype = target_row["office_type"]
+        officeprefecture = target_row["Located_Prefecture"]
         return officelocation, officetype, officeprefecture
 
     return "", "", ""
@@ -76,49 +89,62 @@ def expandOfficeType(officeType):
 
 
 # extractLocationRequirements
-# => 以下の3つを返す。処理を分けた。
+# => 以下の3つを返す。抽出処理自体は3つの関数に分けた。
 #  return {
 #    prefectures: extractedPrefectures,
 #    regions: extractedRegions,
 #    officeTypes: extractedOfficeTypes
 #  };
+# 拠点に依存しないので、要件ごとに1回解析して checkLocationRequirement に渡せる。
 def extractLocationRequirements(requirementText):
-    1
+    return {
+        "prefectures": extractPrefectures(requirementText),
+        "regions": extractRegions(requirementText),
+        "officeTypes": extractOfficeTypes(requirementText),
+        # 「支店等」「営業拠点」は拠点種別照合の特殊処理で使う
+        "hasBranchEtc": '支店等' in requirementText,
+        "hasSalesBase": '営業拠点' in requirementText
+    }
+
+# 都道府県名リスト（完全版のみ）
+PREFECTURE_PATTERNS = [
+    "北海道", "青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県",
+    "茨城県", "栃木県", "群馬県", "埼玉県", "千葉県", "東京都", "神奈川県",
+    "新潟県", "富山県", "石川県", "福井県", "山梨県", "長野県", "岐阜県",
+    "静岡県", "愛知県", "三重県", "滋賀県", "京都府", "大阪府", "兵庫県",
+    "奈良県", "和歌山県", "鳥取県", "島根県", "岡山県", "広島県", "山口県",
+    "徳島県", "香川県", "愛媛県", "高知県", "福岡県", "佐賀県", "長崎県",
+    "熊本県", "大分県", "宮崎県", "鹿児島県", "沖縄県"
+]
+
+# 省略版の都道府県名（単独で出現する場合のみ判定）
+SHORT_PREFECTURE_PATTERNS = {
+    "北海道": "北海道",
+    "青森": "青森県", "岩手": "岩手県", "宮城": "宮城県", "秋田": "秋田県", "山形": "山形県", "福島": "福島県",
+    "茨城": "茨城県", "栃木": "栃木県", "群馬": "群馬県", "埼玉": "埼玉県", "千葉": "千葉県", "東京": "東京都", "神奈川": "神奈川県",
+    "新潟": "新潟県", "富山": "富山県", "石川": "石川県", "福井": "福井県", "山梨": "山梨県", "長野": "長野県", "岐阜": "岐阜県",
+    "静岡": "静岡県", "愛知": "愛知県", "三重": "三重県", "滋賀": "滋賀県", "京都": "京都府", "大阪": "大阪府", "兵庫": "兵庫県",
+    "奈良": "奈良県", "和歌山": "和歌山県", "鳥取": "鳥取県", "島根": "島根県", "岡山": "岡山県", "広島": "広島県", "山口": "山口県",
+    "徳島": "徳島県", "香川": "香川県", "愛媛": "愛媛県", "高知": "高知県", "福岡": "福岡県", "佐賀": "佐賀県", "長崎": "長崎県",
+    "熊本": "熊本県", "大分": "大分県", "宮崎": "宮崎県", "鹿児島": "鹿児島県", "沖縄": "沖縄県"
+}
+
+# 単語の区切り (空白・句読点)
+WORD_SEPARATOR_PATTERN = re.compile(r'[ 　,、。.・\s]+')
 
 def extractPrefectures(requirementText):
     extractedPrefectures = []
 
-    # 都道府県名リスト（完全版のみ）
-    PREFECTURE_PATTERNS = [
-        "北海道", "青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県",
-        "茨城県", "栃木県", "群馬県", "埼玉県", "千葉県", "東京都", "神奈川県",
-        "新潟県", "富山県", "石川県", "福井県", "山梨県", "長野県", "岐阜県",
-        "静岡県", "愛知県", "三重県", "滋賀県", "京都府", "大阪府", "兵庫県",
-        "奈良県", "和歌山県", "鳥取県", "島根県", "岡山県", "広島県", "山口県",
-        "徳島県", "香川県", "愛媛県", "高知県", "福岡県", "佐賀県", "長崎県",
-        "熊本県", "大分県", "宮崎県", "鹿児島県", "沖縄県"
-    ]
-
-    # 省略版の都道府県名（単独で出現する場合のみ判定）
-    SHORT_PREFECTURE_PATTERNS = {
-        "北海道": "北海道",
-        "青森": "青森県", "岩手": "岩手県", "宮城": "宮城県", "秋田": "秋田県", "山形": "山形県", "福島": "福島県",
-        "茨城": "茨城県", "栃木": "栃木県", "群馬": "群馬県", "埼玉": "埼玉県", "千葉": "千葉県", "東京": "東京都", "神奈川": "神奈川県",
-        "新潟": "新潟県", "富山": "富山県", "石川": "石川県", "福井": "福井県", "山梨": "山梨県", "長野": "長野県", "岐阜": "岐阜県",
-        "静岡": "静岡県", "愛知": "愛知県", "三重": "三重県", "滋賀": "滋賀県", "京都": "京都府", "大阪": "大阪府", "兵庫": "兵庫県",
-        "奈良": "奈良県", "和歌山": "和歌山県", "鳥取": "鳥取県", "島根": "島根県", "岡山": "岡山県", "広島": "広島県", "山口": "山口県",
-        "徳島": "徳島県", "香川": "香川県", "愛媛": "愛媛県", "高知": "高知県", "福岡": "福岡県", "佐賀": "佐賀県", "長崎": "長崎県",
-        "熊本": "熊本県", "大分": "大分県", "宮崎": "宮崎県", "鹿児島": "鹿児島県", "沖縄": "沖縄県"
-    }
-
     # 特別なケース処理: 主要都道府県を完全一致で検出
     # 「東京都」と「京都府」の誤抽出問題(東京都に京都が含まれる？)を解決するために、明示的な検出を行う
 
     # 空白区切りで分割して単語単位での検証を行う
-    words = re.split(r'[ 　,、。.・\s]+', requirementText)
+    words = set(WORD_SEPARATOR_PATTERN.split(requirementText))
 
-    # 「〇〇都に」「〇〇県に」などのパターンを追加
+    # 「〇〇都に」「〇〇県に」などのパターンを追加 (テキストに含まれる都道府県名だけを調べる)
     for pref in PREFECTURE_PATTERNS:
+        if pref not in requirementText:
+            continue
         if pref + "に" in requirementText or pref + "内" in requirementText or pref + "内に" in requirementText:
             if not pref in extractedPrefectures:
                 extractedPrefectures.append(pref)
@@ -141,74 +167,71 @@ def extractPrefectures(requirementText):
     return extractedPrefectures
 
 
+# 管轄地域名パターン
+REGION_PATTERNS = [
+    "北海道防衛局", "帯広防衛支局", "東北防衛局", "北関東防衛局", "南関東防衛局",
+    "東海防衛支局", "近畿中部防衛局", "中国四国防衛局", "九州防衛局", "沖縄防衛局"
+]
+
+# 防衛局管内などの表現に対応
+REGION_KEYWORDS = [
+    { "pattern": re.compile("北海道防衛局管内|北海道防衛局管轄"), "region": "北海道防衛局" },
+    { "pattern": re.compile("帯広防衛支局管内|帯広防衛支局管轄"), "region": "帯広防衛支局" },
+    { "pattern": re.compile("東北防衛局管内|東北防衛局管轄"), "region": "東北防衛局" },
+    { "pattern": re.compile("北関東防衛局管内|北関東防衛局管轄"), "region": "北関東防衛局" },
+    { "pattern": re.compile("南関東防衛局管内|南関東防衛局管轄"), "region": "南関東防衛局" },
+    { "pattern": re.compile("東海防衛支局管内|東海防衛支局管轄"), "region": "東海防衛支局" },
+    { "pattern": re.compile("近畿中部防衛局管内|近畿中部防衛局管轄"), "region": "近畿中部防衛局" },
+    { "pattern": re.compile("中国四国防衛局管内|中国四国防衛局管轄"), "region": "中国四国防衛局" },
+    { "pattern": re.compile("九州防衛局管内|九州防衛局管轄"), "region": "九州防衛局" },
+    { "pattern": re.compile("沖縄防衛局管内|沖縄防衛局管轄"), "region": "沖縄防衛局" }
+]
+
 def extractRegions(requirementText):
-    extractedRegions = []
-
-    # 管轄地域名パターン
-    REGION_PATTERNS = [
-        "北海道防衛局", "帯広防衛支局", "東北防衛局", "北関東防衛局", "南関東防衛局",
-        "東海防衛支局", "近畿中部防衛局", "中国四国防衛局", "九州防衛局", "沖縄防衛局"
-    ]
-
-    for region in REGION_PATTERNS:
-        if requirementText.find(region) >= 0:
-            extractedRegions.append(region)
-    
-    # 防衛局管内などの表現に対応
-    regionKeywords = [
-        { "pattern": "北海道防衛局管内|北海道防衛局管轄", "region": "北海道防衛局" },
-        { "pattern": "帯広防衛支局管内|帯広防衛支局管轄", "region": "帯広防衛支局" },
-        { "pattern": "東北防衛局管内|東北防衛局管轄", "region": "東北防衛局" },
-        { "pattern": "北関東防衛局管内|北関東防衛局管轄", "region": "北関東防衛局" },
-        { "pattern": "南関東防衛局管内|南関東防衛局管轄", "region": "南関東防衛局" },
-        { "pattern": "東海防衛支局管内|東海防衛支局管轄", "region": "東海防衛支局" },
-        { "pattern": "近畿中部防衛局管内|近畿中部防衛局管轄", "region": "近畿中部防衛局" },
-        { "pattern": "中国四国防衛局管内|中国四国防衛局管轄", "region": "中国四国防衛局" },
-        { "pattern": "九州防衛局管内|九州防衛局管轄", "region": "九州防衛局" },
-        { "pattern": "沖縄防衛局管内|沖縄防衛局管轄", "region": "沖縄防衛局" }
-      ]
-    
-    for kw in regionKeywords:
-        if re.search(kw["pattern"],requirementText) and not kw["region"] in extractedRegions:
+    extractedRegions = [region for region in REGION_PATTERNS if region in requirementText]
+
+    for kw in REGION_KEYWORDS:
+        if kw["pattern"].search(requirementText) and not kw["region"] in extractedRegions:
             extractedRegions.append(kw["region"])
 
     return extractedRegions
 
+
+# 拠点種別パターン - 「等」付きの表現も含む
+OFFICE_TYPE_PATTERNS = [
+    {
+        "pattern": "本店",
+        "expanded": ["本店", "本社", "HEADQUARTER"]
+    },
+    {
+        "pattern": "支店",
+        "expanded": ["支店", "BRANCH"]
+    },
+    {
+        "pattern": "営業所",
+        "expanded": ["営業所", "SALES_OFFICE"]
+    },
+    {
+        "pattern": "出張所",
+        "expanded": ["出張所"]
+    }
+]
+
+# 「等」付きのパターン
+ETC_PATTERNS = [
+    {
+        "pattern": "支店等",
+        "expanded": ["支店", "営業所", "出張所", "BRANCH", "SALES_OFFICE"]
+    },
+    {
+        "pattern": "営業所等",
+        "expanded": ["営業所", "出張所", "SALES_OFFICE"]
+    }
+]
+
 def extractOfficeTypes(requirementText):
     extractedOfficeTypes = []
 
-    # 拠点種別パターン - 「等」付きの表現も含む
-    OFFICE_TYPE_PATTERNS = [
-        {
-            "pattern": "本店",
-            "expanded": ["本店", "本社", "HEADQUARTER"]
-        },
-        {
-            "pattern": "支店",
-            "expanded": ["支店", "BRANCH"]
-        },
-        {
-            "pattern": "営業所",
-            "expanded": ["営業所", "SALES_OFFICE"]
-        },
-        {
-            "pattern": "出張所",
-            "expanded": ["出張所"]
-        }
-    ]
-
-    # 「等」付きのパターン
-    ETC_PATTERNS = [
-        {
-            "pattern": "支店等",
-            "expanded": ["支店", "営業所", "出張所", "BRANCH", "SALES_OFFICE"]
-        },
-        {
-            "pattern": "営業所等",
-            "expanded": ["営業所", "出張所", "SALES_OFFICE"]
-        }
-    ]
-
     # 3. 拠点種別の抽出 (まず「等」付きのものを先に)
     etcFound = False
     for typeObj in ETC_PATTERNS:
@@ -235,24 +258,55 @@ def extractOfficeTypes(requirementText):
     return extractedOfficeTypes
 
 
+# 拠点種別が要件の拠点種別条件を満たすか (conditions は extractLocationRequirements の結果)
+def matchOfficeType(officetype, conditions):
+    officetypes = conditions["officeTypes"]
+    if len(officetypes) == 0:
+        # 拠点種別指定がない場合は無条件でOK
+        return True
+
+    # 拠点種別の拡張処理
+    expandedOfficeType = expandOfficeType(officetype)
+
+    # 「支店等」のような表現に対応する特殊処理
+    if conditions["hasBranchEtc"] and ('支店' in officetype or '営業所' in officetype or '出張所' in officetype):
+        return True
+    # 「営業拠点」のような表現に対応する特殊処理
+    elif conditions["hasSalesBase"]:
+        return True
+
+    # 通常の拠点種別マッチング
+    for type_ in officetypes:
+        for expandedType in expandedOfficeType:
+            if type_ in expandedType or expandedType in type_:
+                return True
+    return False
+
+
 def checkLocationRequirement(
     requirementText, 
     officeNo, 
-    agencyData=pd.read_csv("data/master/agency_master.txt",sep="\t"),
-    officeData = pd.read_csv("data/master/office_master.txt",sep="\t")
+    agencyData=None,
+    officeData=None,
+    snapshot=None,
+    conditions=None
     ):
 
-    prefectures = extractPrefectures(requirementText)
-    regions = extractRegions(requirementText)
-    officetypes = extractOfficeTypes(requirementText)
+    # conditions: extractLocationRequirements の結果 (事前に解析済みなら再解析しない)
+    if conditions is None:
+        conditions = extractLocationRequirements(requirementText)
+    prefectures = conditions["prefectures"]
+    regions = conditions["regions"]
+    officetypes = conditions["officeTypes"]
 
-    prefectures_from_regions = sum([expandRegionToPrefectures(regionName=region, agencyData=agencyData) for region in regions],[])
+    prefectures_from_regions = sum([expandRegionToPrefectures(regionName=region, agencyData=agencyData, snapshot=snapshot) for region in regions],[])
 
     prefectures = list(set(prefectures + prefectures_from_regions))
 
     officelocation, officetype, officeprefecture = getOfficeLocation(
         officeNo=officeNo,
-        officeData = officeData
+        officeData = officeData,
+        snapshot=snapshot
     )
 
     if not officelocation and not officeprefecture:
@@ -281,30 +335,7 @@ def checkLocationRequirement(
                     matchedPrefecture.append(pref)
 
     # 4. 拠点種別条件の照合
-    officeTypeMatch = False
-
-    if len(officetypes) == 0:
-        # 拠点種別指定がない場合は無条件でOK
-        officeTypeMatch = True
-    else:
-        # 拠点種別の拡張処理
-        expandedOfficeType = expandOfficeType(officetype)
-
-        # 「支店等」のような表現に対応する特殊処理
-        if '支店等' in requirementText and ('支店' in officetype or '営業所' in officetype or '出張所' in officetype):
-            officeTypeMatch = True
-            # 「営業拠点」のような表現に対応する特殊処理
-        elif '営業拠点' in requirementText:
-            officeTypeMatch = True
-        # 通常の拠点種別マッチング
-        else:
-            for type_ in officetypes:
-                for expandedType in expandedOfficeType:
-                    if type_ in expandedType or expandedType in type_:
-                        officeTypeMatch = True
-                        break
-                if officeTypeMatch:
-                    break
+    officeTypeMatch = matchOfficeType(officetype, conditions)
 
     # 5. 判定結果を返す
     if prefectureMatch and officeTypeMatch:
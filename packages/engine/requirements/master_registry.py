@@ -0,0 +1,81 @@
+# coding: utf-8 -*-
+
+import os
+
+import pandas as pd
+
+#######################################
+# マスターファイル (data/master/*.txt) の遅延読み込みレジストリ
+#   checker の既定引数で import 時に pd.read_csv していたものを、
+#   最初に使われた時点で1回だけ読み込み、テーブルごとにキャッシュする。
+#   ファイルの mtime / サイズが変わっていれば次の取得時に読み直す。
+#######################################
+
+DEFAULT_MASTER_DIR = "data/master"
+
+# テーブル名 (step3 の master_data_dict のキーに合わせる) -> (ファイル名, read_csv の追加引数)
+MASTER_FILES = {
+    "agency": ("agency_master.txt", {}),
+    "construction": ("construction_master.txt", {}),
+    "office": ("office_master.txt", {}),
+    "office_registration_authorization": ("office_registration_authorization_master.txt", {}),
+    "office_registration_authorization_with_converter": (
+        "office_registration_authorization_master.txt", {"converters": {"construction_no": str}}
+    ),
+    "office_work_achivements": ("office_work_achivements_master.txt", {}),
+    "employee": ("employee_master.txt", {}),
+    "employee_qualification": ("employee_qualification_master.txt", {}),
+    "technician_qualification": ("technician_qualification_master.txt", {}),
+    "employee_experience": ("employee_experience_master.txt", {}),
+}
+
+
+class MasterRegistry:
+    """
+    マスターファイルをテーブル名で取得する。
+
+    返す DataFrame はキャッシュしたものをそのまま共有するため、呼び出し側で書き換えないこと。
+    """
+
+    def __init__(self, masterDir=DEFAULT_MASTER_DIR):
+        self.masterDir = masterDir
+        # name -> (path, (mtime_ns, size), DataFrame)
+        self._cache = {}
+        self.loads = 0
+
+    def path(self, name):
+        if name not in MASTER_FILES:
+            raise KeyError(f"未登録のマスターテーブルです: {name}")
+        return os.path.join(self.masterDir, MASTER_FILES[name][0])
+
+    def get(self, name):
+        path = self.path(name)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == path and cached[1] == version:
+            return cached[2]
+
+        data = pd.read_csv(path, sep="\t", **MASTER_FILES[name][1])
+        self._cache[name] = (path, version, data)
+        self.loads += 1
+        return data
+
+    def setMasterDir(self, masterDir):
+        self.masterDir = masterDir
+        self.clear()
+
+    def clear(self):
+        self._cache.clear()
+
+
+_registry = MasterRegistry()
+
+
+def getMasterRegistry():
+    return _registry
+
+
+def getMaster(name):
+    """既定のレジストリからマスターテーブルを取得する（初回のみファイルを読む）。"""
+    return _registry.get(name)
@@ -0,0 +1,99 @@
+# coding: utf-8 -*-
+
+from itertools import starmap
+from typing import NamedTuple
+
+#######################################
+# checker が参照するマスター行のレコード型
+#   拠点の実績・ライセンス、従業員の資格・工事経験を行 dict ではなく NamedTuple で持つ。
+#   行ごとの dict を作らないので生成が軽く、pickle (プロセスプールへの受け渡し) も小さい。
+#   MasterSnapshot からは snapshot.derived で1回だけ作り、すべての checker で読み取り専用として共有する。
+#######################################
+
+
+class OfficeExperience(NamedTuple):
+    """拠点工事実績 1件 (実績要件)"""
+    office_experience_no: object
+    office_no: object
+    agency_no: object
+    construction_no: object
+    project_name: object
+    contractor_layer: object  # 請負階層
+    start_date: object        # 着工日
+    completion_date: object   # 完成日
+    final_score: object       # 工事成績点
+    total_amount: object      # 契約金額
+    is_jv_flg: object         # JVフラグ
+    jv_ratio: object          # JV出資比率
+    remarks: object           # 備考
+
+
+class OfficeLicense(NamedTuple):
+    """拠点登録許可 (ライセンス) 1件 (業種・等級要件)"""
+    agency_no: object
+    construction_no: object
+    license_grade: object
+    license_score: object
+    is_suspended: object
+
+
+class EmployeeQualification(NamedTuple):
+    """在籍従業員の有効な資格 1件 (技術者要件)"""
+    employee_no: object
+    employee_name: object
+    office_no: object
+    qualification_name: object
+    obtained_date: object
+    is_active: object
+
+
+class EmployeeExperience(NamedTuple):
+    """在籍従業員の工事経験 1件 (技術者要件)"""
+    employee_no: object
+    employee_name: object
+    office_no: object
+    project_name: object
+    role_position: object
+    start_date: object
+    end_date: object
+    agency_no: object
+    construction_no: object
+    is_original_contractor: object
+    final_score: object
+
+
+# レコード型 -> 元のマスターの列名 (フィールド名と異なるものだけ)
+RECORD_SOURCE_COLUMNS = {
+    OfficeExperience: {"is_jv_flg": "is_jv_flag"},
+    EmployeeExperience: {"is_original_contractor": "is_original_contractor_flg"},
+    EmployeeQualification: {"is_active": "is_active_flg"},
+}
+
+
+def buildRecords(recordType, data):
+    """
+    DataFrame の各行を recordType のレコードにしたリストを返す (元の行順)。
+
+    値は列ごとの .tolist() で取り出すので、to_dict("records") と同じ Python スカラーになる。
+    列名がフィールド名と異なるものは RECORD_SOURCE_COLUMNS で読み替える。
+    """
+    if data.shape[0] == 0:
+        return []
+    renames = RECORD_SOURCE_COLUMNS.get(recordType, {})
+    columns = [data[renames.get(field, field)].tolist() for field in recordType._fields]
+    return list(starmap(recordType, zip(*columns)))
+
+
+def buildRecordIndex(recordType, data, column):
+    """
+    column の値ごとに recordType のレコードをまとめた dict を返す (各リストは元の行順)。
+
+    column が欠損の行は除く (== でも一致しないので、MasterSnapshot の索引と同じ扱い)。
+    """
+    if column not in data.columns:
+        return {}
+    data = data[data[column].notna()]
+    index = {}
+    for key, record in zip(data[column].tolist(), buildRecords(recordType, data)):
+        index.setdefault(key, []).append(record)
+    return index
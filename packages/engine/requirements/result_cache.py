@@ -0,0 +1,156 @@
+# coding: utf-8 -*-
+
+import hashlib
+import os
+import pickle
+from collections import Counter, OrderedDict
+
+#######################################
+# 要件判定結果のメモ化
+#   checker の結果は (要件テキスト, 拠点・企業のマスターの内容) で決まる。
+#   同じ拠点に同じ要件テキスト (欠格要件の定型文や全省庁統一の等級条項など) が
+#   別の公告で出てきたら、判定し直さずに前回の結果を使う。
+#   キーには拠点のフィンガープリント (fingerprint.officeFingerprints) を含めるので、
+#   ファイルに保存して次回の step3 で使っても、マスターが変わった拠点には当たらない。
+#######################################
+
+RESULT_CACHE_SIZE = 200000
+
+
+def requirementTextHash(requirement_type, requirement_text):
+    """要件種別と要件テキストのハッシュ (16進文字列)。"""
+    return hashlib.sha1(f"{requirement_type}\0{requirement_text}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    checker の結果 {"is_ok", "reason"} の LRU キャッシュ。
+
+    キーは (要件テキストのハッシュ, 企業番号, 拠点番号, 拠点のフィンガープリント)。
+    理由の文言には拠点番号が入ることがあるので、拠点をまたいで結果は共有しない。
+    要件種別ごとにヒット数・ミス数を数える。
+
+    Args:
+        maxsize: 保持する結果の最大件数
+        office_fingerprints: officeFingerprints の結果 (省略時はフィンガープリントをキーに含めない)
+        keep_new_entries: 新しく追加した結果を takeNewEntries で取り出せるよう控えておくかどうか
+            (ワーカーの結果を親プロセスで集めてファイルに保存する場合に使う)
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, office_fingerprints=None, keep_new_entries=False):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be >= 1: {maxsize}")
+        self.maxsize = maxsize
+        self.keepNewEntries = keep_new_entries
+        self.officeFingerprints = {}
+        if office_fingerprints is not None:
+            self.officeFingerprints = dict(zip(
+                zip(office_fingerprints["company_no"], office_fingerprints["office_no"]),
+                office_fingerprints["fingerprint"],
+            ))
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict()
+        self._newEntries = {}
+        # 同じ要件テキストのハッシュは1回だけ計算する
+        self._textHashes = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, requirement_type, requirement_text, company_no, office_no):
+        textKey = (requirement_type, requirement_text)
+        textHash = self._textHashes.get(textKey)
+        if textHash is None:
+            textHash = self._textHashes[textKey] = requirementTextHash(requirement_type, requirement_text)
+        return (textHash, company_no, office_no, self.officeFingerprints.get((company_no, office_no)))
+
+    def _put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def getOrEvaluate(self, compiled, company_no, office_no, evaluate):
+        """
+        キャッシュにあればその結果を、なければ evaluate() の結果を登録して返す。
+
+        Args:
+            compiled: CompiledRequirement
+            company_no: 企業番号
+            office_no: 拠点番号
+            evaluate: 引数なしで checker を呼ぶ関数
+        """
+        requirement_type = compiled.requirement_type
+        try:
+            key = self.key(requirement_type, compiled.requirement_text, company_no, office_no)
+        except TypeError:
+            # ハッシュできない値 (想定外の型) はメモ化しない
+            return evaluate()
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits[requirement_type] += 1
+            return value
+        self.misses[requirement_type] += 1
+        value = evaluate()
+        self._put(key, value)
+        if self.keepNewEntries:
+            self._newEntries[key] = value
+        return value
+
+    def takeNewEntries(self):
+        """前回の呼び出し以降に追加した結果を返し、控えを空にする。"""
+        entries, self._newEntries = self._newEntries, {}
+        return entries
+
+    def update(self, entries):
+        """他のキャッシュ (ワーカー) で追加された結果を取り込む。"""
+        for key, value in entries.items():
+            self._put(key, value)
+
+    def takeStats(self):
+        """
+        前回の呼び出し以降のヒット数・ミス数 {"hits": {種別: 件数}, "misses": {種別: 件数}} を返し、
+        カウンタを 0 に戻す (ワーカーがチャンクごとに親プロセスへ渡す)。
+        """
+        stats = {"hits": dict(self.hits), "misses": dict(self.misses)}
+        self.hits.clear()
+        self.misses.clear()
+        return stats
+
+    def addStats(self, stats):
+        """他のキャッシュ (ワーカー) の takeStats() を足し合わせる。"""
+        self.hits.update(stats["hits"])
+        self.misses.update(stats["misses"])
+
+    def hitRate(self):
+        total = sum(self.hits.values()) + sum(self.misses.values())
+        return sum(self.hits.values()) / total if total else 0.0
+
+    def report(self):
+        """要件種別ごとのヒット率の文字列を返す。"""
+        lines = [f"Result cache: {len(self)} entries, hit rate {self.hitRate():.1%}"]
+        for requirement_type in sorted(set(self.hits) | set(self.misses)):
+            hits = self.hits[requirement_type]
+            total = hits + self.misses[requirement_type]
+            lines.append(f"  {requirement_type}: {hits}/{total} hits ({hits / total:.1%})")
+        return "\n".join(lines)
+
+    def save(self, path):
+        """保持している結果をファイルに保存する (新しいものから maxsize 件)。"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(list(self._entries.items()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """save で保存した結果を読み込む。ファイルがなければ何もしない。"""
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for key, value in pickle.load(f):
+                self._put(key, value)
@@ -0,0 +1,160 @@
+# coding: utf-8 -*-
+
+import pandas as pd
+
+#######################################
+# step3 用マスターデータのスナップショット
+#   各マスター DataFrame をキー列でハッシュ索引化しておき、
+#   checker からは df[df["office_no"] == officeNo] のような全件走査ではなく
+#   辞書引き (O(1)) で対象行を取得する。
+#######################################
+
+# テーブル名 (step3 の master_data_dict のキー) -> 索引キー列 (先頭が既定の索引)
+SNAPSHOT_INDEX_COLUMNS = {
+    "company": ("company_no",),
+    "disqualifications": ("company_id",),
+    "office": ("office_no",),
+    "office_registration_authorization": ("office_no",),
+    "office_registration_authorization_with_converter": ("office_no",),
+    "agency": ("agency_no", "agency_name"),
+    "construction": ("construction_no",),
+    "office_work_achivements": ("office_no",),
+    "employee": ("employee_no",),
+    "employee_qualification": ("employee_no",),
+    "technician_qualification": ("qualification_no",),
+    "employee_experience": ("employee_no",),
+}
+
+# 在籍中従業員を (company_no, office_no) で引くための派生索引名
+ACTIVE_EMPLOYEE_INDEX = "active_employee"
+
+
+def lookupRecords(data, column, value):
+    """
+    DataFrame から column == value の行を dict のリストで返す（索引を使わない場合の経路）。
+
+    .tolist()[0] / .item() で値を取り出していた従来処理と同じ Python スカラーが得られる。
+    """
+    return data[data[column] == value].to_dict("records")
+
+
+def truthyMask(values):
+    """
+    各値を Python の if 判定と同じ規則で bool 化した配列を返す (NaN は True, None は False)。
+
+    行 dict の値に対する `if row["xxx_flg"]:` をベクトルで行うときに使う。
+    """
+    return pd.Series(values, dtype=object).to_numpy(dtype=object).astype(bool)
+
+
+def _buildPositions(data, keys):
+    if data is None or data.shape[0] == 0:
+        return {}
+    if any(key not in data.columns for key in keys):
+        return {}
+    by = keys[0] if len(keys) == 1 else list(keys)
+    # groupby は NaN キーを落とすが、== 比較でも NaN は一致しないので結果は同じ
+    return data.reset_index(drop=True).groupby(by, sort=False).indices
+
+
+class MasterSnapshot:
+    """
+    step3 のマスターデータをキー列で索引化したスナップショット。
+
+    Args:
+        master_data_dict: step3 の master_data_dict (テーブル名 -> DataFrame)。
+
+    rows() は行 dict のリスト、frame() は DataFrame の部分集合を返す。
+    いずれも元の DataFrame の行順を保つ。column を省略した場合は
+    SNAPSHOT_INDEX_COLUMNS の先頭列で引く。
+    """
+
+    def __init__(self, master_data_dict):
+        self._frames = {}
+        self._records = {}
+        self._positions = {}
+        self._derived = {}
+
+        for name, data in master_data_dict.items():
+            if data is None:
+                continue
+            self._frames[name] = data
+            columns = SNAPSHOT_INDEX_COLUMNS.get(name, ())
+            for column in columns:
+                self._positions[(name, column)] = _buildPositions(data, (column,))
+            if columns:
+                self._positions[name] = self._positions[(name, columns[0])]
+
+        # 在籍中の従業員 (is_retired_flg が立っていない行) を (company_no, office_no) で索引化
+        # 判定式は getEmployeeQualifications の (company_no == x) & (~is_retired_flg) と揃える
+        employee = self._frames.get("employee")
+        if employee is not None and "is_retired_flg" in employee.columns:
+            active_mask = pd.Series(True, index=employee.index) & (~employee["is_retired_flg"])
+            active = employee[active_mask]
+            self._frames[ACTIVE_EMPLOYEE_INDEX] = active
+            self._positions[ACTIVE_EMPLOYEE_INDEX] = _buildPositions(active, ("company_no", "office_no"))
+
+    def has(self, name):
+        return name in self._frames
+
+    def data(self, name):
+        """索引元の DataFrame をそのまま返す。"""
+        return self._frames[name]
+
+    def records(self, name):
+        """
+        索引元の全行を dict のリストで返す (元の行順)。
+
+        行 dict は参照されたテーブルだけ初回に作る (レコード型で読むテーブルの dict は作らない)。
+        """
+        records = self._records.get(name)
+        if records is None:
+            records = self._records[name] = self._frames[name].to_dict("records")
+        return records
+
+    def derived(self, name, factory):
+        """
+        スナップショットから派生させた値を name ごとに1回だけ作ってキャッシュする。
+
+        factory(snapshot) の戻り値をそのまま保持する (None も結果として保持する)。
+        """
+        if name not in self._derived:
+            self._derived[name] = factory(self)
+        return self._derived[name]
+
+    def _lookup(self, name, key, column):
+        index_name = name if column is None else (name, column)
+        return self._positions.get(index_name, {}).get(key)
+
+    def rows(self, name, key, column=None):
+        """key に一致する行を dict のリストで返す (該当なしは空リスト)。"""
+        positions = self._lookup(name, key, column)
+        if positions is None:
+            return []
+        records = self.records(name)
+        return [records[i] for i in positions]
+
+    def rows_isin(self, name, keys, column=None):
+        """keys のいずれかに一致する行を元の行順で返す (df[df[col].isin(keys)] 相当)。"""
+        positions = set()
+        for key in keys:
+            found = self._lookup(name, key, column)
+            if found is not None:
+                positions.update(found)
+        records = self.records(name)
+        return [records[i] for i in sorted(positions)]
+
+    def first(self, name, key, column=None):
+        """key に一致する最初の行 dict を返す (該当なしは None)。"""
+        positions = self._lookup(name, key, column)
+        if positions is None or len(positions) == 0:
+            return None
+        return self.records(name)[positions[0]]
+
+    def frame(self, name, key, column=None):
+        """key に一致する行を DataFrame で返す (従来の df[df[col] == key] と同じ形)。"""
+        data = self._frames[name]
+        positions = self._lookup(name, key, column)
+        if positions is None:
+            return data.iloc[0:0]
+        return data.iloc[positions]
@@ -5,6 +5,10 @@ import logging
 import pandas as pd
 import datetime
 
+from packages.engine.requirements.master_registry import getMaster
+from packages.engine.requirements.records import EmployeeExperience, EmployeeQualification, buildRecords
+from packages.engine.requirements.snapshot import ACTIVE_EMPLOYEE_INDEX, truthyMask
+
 logger = logging.getLogger(__name__)
 
 #######################################
@@ -180,9 +184,9 @@ def getAllQualificationsList():
 
 
 # 資格連番から資格名を取得
-def getQualificationName(qualificationNo, qualMasterData=None):
-    if qualMasterData is None:
-        qualMasterData = pd.read_csv("data/master/technician_qualification_master.txt", sep="\t")
+def getQualificationName(qualificationNo, qualMasterData=None, snapshot=None):
+    if qualMasterData is None and snapshot is None:
+        qualMasterData = getMaster("technician_qualification")
     #const qualMasterSheet = getSheetByName("技術者資格マスター");
     #const qualMasterData = qualMasterSheet.getDataRange().getValues();
     qualifications = []
@@ -193,18 +197,114 @@ def getQualificationName(qualificationNo, qualMasterData=None):
     # 2: 種別
     # ...
 
-    subData = qualMasterData[qualMasterData["qualification_no"] == qualificationNo]
+    if snapshot is not None:
+        subData = snapshot.frame("technician_qualification", qualificationNo)
+    else:
+        subData = qualMasterData[qualMasterData["qualification_no"] == qualificationNo]
     if subData.shape[0] == 0:
         return None
     elif subData.shape[0] > 1:
         logger.warning("複数の資格連番が存在します。qualificationNo=%s", qualificationNo)
         subData = subData.iloc[0:1]
 
-    # 種別があれば付加する
-    if subData["qualification_type"]:
-        return subData["qualification_name"] + "(" + subData["qualification_type"] + ")"
-    else:
-        return subData["qualification_name"]
+    row = subData.iloc[0]
+    return formatQualificationName(row["qualification_name"], row["qualification_type"])
+
+
+# 資格名に種別があれば付加する (種別が空・欠損なら資格名のみ)
+def formatQualificationName(qualificationName, qualificationType):
+    if pd.notnull(qualificationType) and qualificationType:
+        return f"{qualificationName}({qualificationType})"
+    return qualificationName
+
+
+#######################################
+# 技術者要件の判定用の従業員索引 (TechnicianRoster)
+#   在籍従業員 x 有効な従業員資格 x 技術者資格マスター、在籍従業員 x 従業員工事経験 を
+#   MasterSnapshot ごとに1回だけ merge し、(company_no, office_no) ごとにまとめておく。
+#   各リストの要素と並び順は getEmployeeQualifications / getEmployeeExperiences の戻り値と同じ。
+#   判定側では読み取り専用として扱う。
+#######################################
+
+EMPTY_ROSTER_ENTRY = {"qualifications": [], "employeeQuals": {}, "experiences": []}
+
+EXPERIENCE_COLUMNS = [
+    "employee_no", "project_name", "role_position", "start_date", "end_date",
+    "agency_no", "construction_no", "is_original_contractor_flg", "final_score"
+]
+
+
+def _rosterEntry(roster, companyNo, officeNo):
+    entry = roster.get((companyNo, officeNo))
+    if entry is None:
+        entry = {"qualifications": [], "employeeQuals": {}, "experiences": []}
+        roster[(companyNo, officeNo)] = entry
+    return entry
+
+
+def buildTechnicianRoster(snapshot):
+    """
+    (company_no, office_no) -> {"qualifications", "employeeQuals", "experiences"} の辞書を作る。
+
+    qualifications: EmployeeQualification のリスト (getEmployeeQualifications と同じ内容・順)
+    employeeQuals: qualifications を従業員ごとにまとめたもの (groupQualificationsByEmployee)
+    experiences: EmployeeExperience のリスト (getEmployeeExperiences と同じ内容・順)
+    """
+    roster = {}
+
+    employees = snapshot.data(ACTIVE_EMPLOYEE_INDEX)
+    employees = employees[employees["company_no"].notnull() & employees["office_no"].notnull()]
+    # 同じ拠点に同じ employee_no が複数いる場合は先頭の従業員情報を使う (従来の next(...) と同じ)
+    employees = employees.drop_duplicates(subset=["company_no", "office_no", "employee_no"], keep="first")
+    employees = employees[["employee_no", "employee_name", "company_no", "office_no"]]
+    if employees.shape[0] == 0:
+        return roster
+
+    # 1. 資格: 有効な従業員資格に資格連番ごとの先頭行の資格名を付け、在籍従業員と結合する
+    qualData = snapshot.data("employee_qualification")
+    qualMaster = snapshot.data("technician_qualification")
+    qualMaster = qualMaster[qualMaster["qualification_no"].notnull()].drop_duplicates(subset="qualification_no", keep="first")
+    qualNames = {
+        no: formatQualificationName(name, type_)
+        for no, name, type_ in zip(
+            qualMaster["qualification_no"].tolist(),
+            qualMaster["qualification_name"].tolist(),
+            qualMaster["qualification_type"].tolist()
+        )
+    }
+    qualRows = qualData[truthyMask(qualData["is_active_flg"])]
+    if qualRows.shape[0] > 0:
+        qualRows = qualRows[["employee_no", "qualification_no", "obtained_date", "is_active_flg"]].reset_index(drop=True)
+        qualRows["_row_order"] = range(qualRows.shape[0])
+        # 資格名は辞書で引く (資格連番の型がマスター間で揃っていなくても merge のように例外にせず、一致しないだけにする)
+        qualRows["qualification_name"] = [qualNames.get(no) for no in qualRows["qualification_no"].tolist()]
+        # 資格名が引けない・空のものは対象外 (従来の if qualificationName: と同じ)
+        qualRows = qualRows[truthyMask(qualRows["qualification_name"])]
+        merged = qualRows.merge(employees, on="employee_no", how="inner").sort_values("_row_order", kind="stable")
+        for companyNo, officeNo, qual in zip(merged["company_no"].tolist(), merged["office_no"].tolist(), buildRecords(EmployeeQualification, merged)):
+            _rosterEntry(roster, companyNo, officeNo)["qualifications"].append(qual)
+
+    for entry in roster.values():
+        entry["employeeQuals"] = groupQualificationsByEmployee(entry["qualifications"])
+
+    # 2. 工事経験: 在籍従業員の工事経験 (元の行順)
+    expData = snapshot.data("employee_experience")
+    if expData.shape[0] > 0:
+        expRows = expData[EXPERIENCE_COLUMNS].reset_index(drop=True)
+        expRows["_row_order"] = range(expRows.shape[0])
+        merged = expRows.merge(employees, on="employee_no", how="inner").sort_values("_row_order", kind="stable")
+        for companyNo, officeNo, exp in zip(merged["company_no"].tolist(), merged["office_no"].tolist(), buildRecords(EmployeeExperience, merged)):
+            _rosterEntry(roster, companyNo, officeNo)["experiences"].append(exp)
+
+    return roster
+
+
+def getTechnicianRoster(snapshot):
+    return snapshot.derived("technician_roster", buildTechnicianRoster)
+
+
+def getTechnicianRosterEntry(snapshot, companyNo, officeNo):
+    return getTechnicianRoster(snapshot).get((companyNo, officeNo), EMPTY_ROSTER_ENTRY)
 
 
 def getEmployeeQualifications(
@@ -212,14 +312,19 @@ def getEmployeeQualifications(
         officeNo,
         employeeData=None,
         qualData=None,
-        qualMasterData=None
+        qualMasterData=None,
+        snapshot=None
         ):
+    # snapshot があれば TechnicianRoster (まとめて結合済みの索引) から返す
+    if snapshot is not None:
+        return getTechnicianRosterEntry(snapshot, companyNo, officeNo)["qualifications"]
+
     if employeeData is None:
-        employeeData = pd.read_csv("data/master/employee_master.txt", sep="\t")
+        employeeData = getMaster("employee")
     if qualData is None:
-        qualData = pd.read_csv("data/master/employee_qualification_master.txt", sep="\t")
+        qualData = getMaster("employee_qualification")
     if qualMasterData is None:
-        qualMasterData = pd.read_csv("data/master/technician_qualification_master.txt", sep="\t")
+        qualMasterData = getMaster("technician_qualification")
     # 1. 従業員マスターから対象拠点の従業員を取得
     # employeeData = pd.read_csv("data/master/employee_master.txt", sep="\t")
     employees = []
@@ -238,9 +343,10 @@ def getEmployeeQualifications(
     # 特定の拠点が指定されている場合はそれもチェック
     subData = employeeData[(employeeData["company_no"] == companyNo) & (~employeeData["is_retired_flg"])]
     subData = subData[(subData["office_no"] == officeNo)]
+    employeeRows = (row for index, row in subData.iterrows())
 
     # 欠損対応は必要？
-    for index, row in subData.iterrows():
+    for row in employeeRows:
         employees.append({
             "employee_no": row["employee_no"],
             "employee_name": row["employee_name"],
@@ -266,8 +372,10 @@ def getEmployeeQualifications(
     #employeeIds = employees.map(emp => emp.employee_no)
     employeeIds = [emp["employee_no"] for emp in employees]
 
+    qualRows = (row for index, row in qualData.iterrows())
+
     # for (let i = 1; i < qualData.length; i++) {
-    for index, row in qualData.iterrows():
+    for row in qualRows:
         employeeNo = row["employee_no"]
         # 対象従業員の資格で、有効なものを抽出
         if employeeNo in employeeIds and row["is_active_flg"]:
@@ -278,31 +386,36 @@ def getEmployeeQualifications(
                 # 該当する従業員情報を取得
                 # employee = employees.find(emp => emp.employee_no === employeeNo)
                 employee = next((emp for emp in employees if emp["employee_no"] == employeeNo), None)
-                qualifications.append({
-                    "employee_no": employeeNo,
-                    "employee_name": employee["employee_name"] if employee else "不明",
-                    "office_no": employee["office_no"] if employee else None,
-                    "qualification_name": qualificationName,
-                    "obtained_date": row["obtained_date"],
-                    "is_active": row["is_active_flg"]
-                })
+                qualifications.append(EmployeeQualification(
+                    employee_no=employeeNo,
+                    employee_name=employee["employee_name"] if employee else "不明",
+                    office_no=employee["office_no"] if employee else None,
+                    qualification_name=qualificationName,
+                    obtained_date=row["obtained_date"],
+                    is_active=row["is_active_flg"]
+                ))
 
     return qualifications
 
 
 
 # 指定された企業・拠点に所属する従業員の実務経験情報を取得
-def getEmployeeExperiences(companyNo, officeNo, employeeData=None, expData=None):
+def getEmployeeExperiences(companyNo, officeNo, employeeData=None, expData=None, snapshot=None):
+    # snapshot があれば TechnicianRoster (まとめて結合済みの索引) から返す
+    if snapshot is not None:
+        return getTechnicianRosterEntry(snapshot, companyNo, officeNo)["experiences"]
+
     if employeeData is None:
-        employeeData = pd.read_csv("data/master/employee_master.txt", sep="\t")
+        employeeData = getMaster("employee")
     if expData is None:
-        expData = pd.read_csv("data/master/employee_experience_master.txt", sep="\t")
+        expData = getMaster("employee_experience")
     # 1. 従業員マスターから対象拠点の従業員を取得
     # employeeData = pd.read_csv("data/master/employee_master.txt", sep="\t")
     employees = []
 
     subData = employeeData[(employeeData["company_no"]==companyNo) & (~employeeData["is_retired_flg"])]
-    for index, row in subData.iterrows():
+    employeeRows = (row for index, row in subData.iterrows())
+    for row in employeeRows:
         if row["office_no"] == officeNo:
             employees.append({
                 "employee_no": row["employee_no"],
@@ -334,26 +447,33 @@ def getEmployeeExperiences(companyNo, officeNo, employeeData=None, expData=None)
     employeeIds = [v["employee_no"] for v in employees]
 
     subData = expData[expData["employee_no"].isin(employeeIds)]
-    for index, row in subData.iterrows():
+    expRows = (row for index, row in subData.iterrows())
+    for row in expRows:
         employee = next((emp for emp in employees if emp["employee_no"] == row["employee_no"]), None)
-        experiences.append({
-            "employee_no": row["employee_no"],
-            "employee_name": employee["employee_name"] if employee else "不明",
-            "office_no": employee["office_no"] if employee else None,
-            "project_name": row["project_name"],
-            "role_position": row["role_position"],
-            "start_date": row["start_date"],
-            "end_date": row["end_date"],
-            "agency_no": row["agency_no"],
-            "construction_no": row["construction_no"],
-            "is_original_contractor": row["is_original_contractor_flg"],
-            "final_score": row["final_score"]
-        })
+        experiences.append(EmployeeExperience(
+            employee_no=row["employee_no"],
+            employee_name=employee["employee_name"] if employee else "不明",
+            office_no=employee["office_no"] if employee else None,
+            project_name=row["project_name"],
+            role_position=row["role_position"],
+            start_date=row["start_date"],
+            end_date=row["end_date"],
+            agency_no=row["agency_no"],
+            construction_no=row["construction_no"],
+            is_original_contractor=row["is_original_contractor_flg"],
+            final_score=row["final_score"]
+        ))
 
     return experiences
 
 
 
+# 要件テキストの解析に使う資格リスト・正規表現 (extractTechnicianRequirements)
+ALL_QUALIFICATIONS = getAllQualificationsList()
+EXPERIENCE_YEARS_PATTERN = re.compile(r"(\d+)年(?:以上の)?(?:実務)?経験")
+EXPERIENCE_SCORE_PATTERN = re.compile(r"成績(?:評定)?(?:が|で)?(\d+)点以上")
+
+
 def extractTechnicianRequirements(text):
     # 結果を格納するオブジェクト
     requirements = {
@@ -387,16 +507,16 @@ def extractTechnicianRequirements(text):
     if '主任技術者' in normalizedText:
         requirements["needsSupervisingEngineer"] = True
 
-    # 4. 全資格リストとのマッチング
-    allQualifications = getAllQualificationsList()
-    for qual in allQualifications:
+    # 4. 全資格リストとのマッチング (テキストに含まれる資格名だけを調べる)
+    for qual in ALL_QUALIFICATIONS:
+        if qual not in text:
+            continue
         # 種別を持つ特別な資格かチェック
         if qual == '2級土木施工管理技士' or qual == '2級建築施工管理技士' or qual == '電気主任技術者':
             # 完全一致の資格名がある場合（種別なし）
-            if qual in text:
-                requirements["requiredQualifications"].append(qual)
+            requirements["requiredQualifications"].append(qual)
 
-            # 種別付きのパターンを検索
+            # 種別付きのパターンを検索 (種別付きの表記は資格名を含むので、資格名がある場合だけ調べればよい)
             if qual == '2級土木施工管理技士':
                 types = ['土木', '鋼構造物塗装', '薬液注入']
                 for type_ in types:
@@ -415,7 +535,7 @@ def extractTechnicianRequirements(text):
                         requirements["requiredQualifications"].append(qual + '（' + type_ + '）')
 
         # 通常の資格（種別なし）
-        elif qual in text:
+        else:
             requirements["requiredQualifications"].append(qual)
 
     # 5. 同等資格の処理 - 要件定義未完了のため削除
@@ -426,12 +546,12 @@ def extractTechnicianRequirements(text):
         requirements["requiresExperience"] = True
 
         # 経験年数の抽出
-        yearMatch = re.search(r"(\d+)年(?:以上の)?(?:実務)?経験", text)
+        yearMatch = EXPERIENCE_YEARS_PATTERN.search(text)
         if yearMatch:
             requirements["experienceYears"] = int(yearMatch[1])
 
         # 工事成績要件の抽出
-        scoreMatch = re.search(r"成績(?:評定)?(?:が|で)?(\d+)点以上", text)
+        scoreMatch = EXPERIENCE_SCORE_PATTERN.search(text)
         if scoreMatch:
             requirements["experienceScore"] = int(scoreMatch[1])
 
@@ -448,10 +568,10 @@ def checkMonitoringEngineerRequirement(employeeQualifications):
         employeesWithTraining = {}
 
         for qual in employeeQualifications:
-            if qual["qualification_name"] == "監理技術者資格者証":
-                employeesWithCert[qual["employee_no"]] = qual["employee_name"]
-            if qual["qualification_name"] == "監理技術者講習修了証":
-                employeesWithTraining[qual["employee_no"]] = qual["employee_name"]
+            if qual.qualification_name == "監理技術者資格者証":
+                employeesWithCert[qual.employee_no] = qual.employee_name
+            if qual.qualification_name == "監理技術者講習修了証":
+                employeesWithTraining[qual.employee_no] = qual.employee_name
 
         # 両方の資格を持つ従業員を特定
         qualifiedEmployees = []
@@ -505,7 +625,7 @@ def checkExperienceRequirements(requirements, employeeExperiences, matchingEmplo
         # 該当する従業員の経験のみフィルタリング
         #relevantExperiences = employeeExperiences.filter(exp =>
         #    qualifiedEmployeeNames.includes(exp.employee_name))
-        relevantExperiences = [exp for exp in employeeExperiences if exp["employee_name"] in qualifiedEmployeeNames]
+        relevantExperiences = [exp for exp in employeeExperiences if exp.employee_name in qualifiedEmployeeNames]
 
         if len(relevantExperiences) == 0:
             return {
@@ -520,14 +640,14 @@ def checkExperienceRequirements(requirements, employeeExperiences, matchingEmplo
             employeeExperienceYears = {}
 
             for exp in relevantExperiences:
-                if not employeeExperienceYears.get(exp["employee_name"]):
-                    employeeExperienceYears[exp["employee_name"]] = 0
+                if not employeeExperienceYears.get(exp.employee_name):
+                    employeeExperienceYears[exp.employee_name] = 0
 
                 # 開始日と終了日が正しい日付形式の場合のみ計算
-                if isinstance(exp["start_date"], datetime) and isinstance(exp["end_date"], datetime):
-                    diffTime = abs(exp["end_date"] - exp["start_date"])
+                if isinstance(exp.start_date, datetime) and isinstance(exp.end_date, datetime):
+                    diffTime = abs(exp.end_date - exp.start_date)
                     diffYears = diffTime.days / 365.25
-                    employeeExperienceYears[exp["employee_name"]] += diffYears
+                    employeeExperienceYears[exp.employee_name] += diffYears
 
             # 要件年数を満たす従業員がいるかチェック
             experiencedEmployees = []
@@ -546,7 +666,7 @@ def checkExperienceRequirements(requirements, employeeExperiences, matchingEmplo
             # 工事成績が要件を満たす経験があるかチェック
             #highScoreExperiences = relevantExperiences.filter(exp =>
             #    typeof exp.final_score === 'number' && exp.final_score >= requirements.experienceScore)
-            highScoreExperiences = [exp for exp in relevantExperiences if isinstance(exp["final_score"], (int, float)) and exp["final_score"] >= requirements["experienceScore"]]
+            highScoreExperiences = [exp for exp in relevantExperiences if isinstance(exp.final_score, (int, float)) and exp.final_score >= requirements["experienceScore"]]
             if len(highScoreExperiences) == 0:
                 return {
                     "is_ok": False,
@@ -616,8 +736,21 @@ def updateEvaluationMessage(companyNo, officeNo, message):
     logger.warning("updateEvaluationMessage は未実装です。companyNo=%s, officeNo=%s", companyNo, officeNo)
     return None
 
+# 従業員ごとに保有資格をまとめる ({employee_no: {"name", "qualifications"}})
+def groupQualificationsByEmployee(employeeQualifications):
+    employeeQuals = {}
+    for qual in employeeQualifications:
+        if not employeeQuals.get(qual.employee_no):
+            employeeQuals[qual.employee_no] = {
+                "name": qual.employee_name,
+                "qualifications": []
+            }
+        employeeQuals[qual.employee_no]["qualifications"].append(qual.qualification_name)
+    return employeeQuals
+
 # 要件と実際の資格・経験を照合 - 元の関数名を維持
-def matchTechnicianRequirements(requirements, employeeQualifications, employeeExperiences):
+def matchTechnicianRequirements(requirements, employeeQualifications, employeeExperiences, employeeQuals=None):
+    # employeeQuals: groupQualificationsByEmployee(employeeQualifications) の結果 (まとめ済みなら再集計しない)
     try:
         # 監理技術者資格要件がある場合の特別チェック
         if (requirements["needsMonitoringEngineer"]):
@@ -634,14 +767,8 @@ def matchTechnicianRequirements(requirements, employeeQualifications, employeeEx
         # 一般的な資格要件のチェック
         if requirements["requiredQualifications"] and len(requirements["requiredQualifications"]) > 0:
             # 各従業員が持つ資格をリスト化
-            employeeQuals = {}
-            for qual in employeeQualifications:
-                if not employeeQuals.get(qual["employee_no"]):
-                    employeeQuals[qual["employee_no"]] = {
-                        "name": qual["employee_name"],
-                        "qualifications": []
-                    }
-                employeeQuals[qual["employee_no"]]["qualifications"].append(qual["qualification_name"])
+            if employeeQuals is None:
+                employeeQuals = groupQualificationsByEmployee(employeeQualifications)
 
             # 要求資格を1つ以上満たす従業員がいるかチェック
             qualificationMatch = False
@@ -711,19 +838,25 @@ def checkTechnicianRequirement(
         employeeData=None,
         qualData=None,
         qualMasterData=None,
-        expData=None
+        expData=None,
+        snapshot=None,
+        conditions=None
         ):
-    if employeeData is None:
-        employeeData = pd.read_csv("data/master/employee_master.txt", sep="\t")
-    if qualData is None:
-        qualData = pd.read_csv("data/master/employee_qualification_master.txt", sep="\t")
-    if qualMasterData is None:
-        qualMasterData = pd.read_csv("data/master/technician_qualification_master.txt", sep="\t")
-    if expData is None:
-        expData = pd.read_csv("data/master/employee_experience_master.txt", sep="\t")
+    if snapshot is None:
+        if employeeData is None:
+            employeeData = getMaster("employee")
+        if qualData is None:
+            qualData = getMaster("employee_qualification")
+        if qualMasterData is None:
+            qualMasterData = getMaster("technician_qualification")
+        if expData is None:
+            expData = getMaster("employee_experience")
     try:
-        # 1. 要件テキストから必要な資格や条件を抽出
-        requirements = extractTechnicianRequirements(requirementText)
+        # 1. 要件テキストから必要な資格や条件を抽出 (事前に解析済みの conditions があれば再解析しない)
+        if conditions is not None:
+            requirements = conditions
+        else:
+            requirements = extractTechnicianRequirements(requirementText)
 
         # 専任要件の有無をチェック
         needsDedicatedTechnician = requirements["needsDedicatedTechnician"]
@@ -734,7 +867,8 @@ def checkTechnicianRequirement(
             officeNo=officeNo,
             employeeData=employeeData, 
             qualData=qualData, 
-            qualMasterData=qualMasterData
+            qualMasterData=qualMasterData,
+            snapshot=snapshot
         )
 
         # 従業員資格がなければNG判定
@@ -751,14 +885,16 @@ def checkTechnicianRequirement(
                 companyNo=companyNo, 
                 officeNo=officeNo,
                 employeeData = employeeData, 
-                expData = expData
+                expData = expData,
+                snapshot=snapshot
             )
 
         # 4. 要件と実際の資格・経験を照合
         matchResult = matchTechnicianRequirements(
             requirements=requirements, 
             employeeQualifications=employeeQualifications, 
-            employeeExperiences=employeeExperiences
+            employeeExperiences=employeeExperiences,
+            employeeQuals=getTechnicianRosterEntry(snapshot, companyNo, officeNo)["employeeQuals"] if snapshot is not None else None
         )
 
         # 5. 企業公告判定マスターのメッセージ欄に専任要件を記録（必要な場合）
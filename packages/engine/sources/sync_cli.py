@@ -46,7 +46,7 @@ def _create_db_operator(args):
     if not db_path.exists():
         print(f"Error: SQLite database file not found: {db_path}")
         sys.exit(1)
-    return DBOperatorSQLITE3(sqlite3_db_file_path=str(db_path))
+    return DBOperatorSQLITE3(sqlite3_db_file_path=str(db_path), sqlite3_performance_mode=args.sqlite3_performance_mode)
 
 
 def _load_source_pages(json_path: Path):
@@ -89,6 +89,7 @@ def build_parser():
     parser.add_argument("--use_gcp_vm", action="store_true")
     parser.add_argument("--use_postgres", action="store_true")
     parser.add_argument("--sqlite3_db_file_path", default=None)
+    parser.add_argument("--sqlite3_performance_mode", action="store_true")
     parser.add_argument("--bigquery_location", default=None)
     parser.add_argument("--bigquery_project_id", default=None)
     parser.add_argument("--bigquery_dataset_name", default=None)
@@ -0,0 +1,118 @@
+"""
+判定エンジンのベンチマーク (pytest-benchmark)。
+
+pytest-benchmark が入っていない環境ではスキップする。規模は環境変数で変えられる::
+
+    JUDGE_BENCH_SCALE=10k python -m pytest tests/benchmarks --benchmark-only
+
+- JUDGE_BENCH_SCALE: 拠点数 (1k / 10k / 100k または数値、既定は 1k)
+- JUDGE_BENCH_ANNOUNCEMENTS: 公告数 (既定は 2)
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import packages.engine.domain  # noqa: F401  (requirements は domain 経由で import する)
+from packages.engine.benchmarks.synthetic import (
+    REQUIREMENT_TEXTS,
+    generateSyntheticData,
+    loadIntoDatabase,
+    resolveScale,
+    writeMasterFiles,
+)
+from packages.engine.domain.bid_judgement import BidJudgementSan
+from packages.engine.domain.master import _evaluate_requirement, _process_judgement_chunk
+from packages.engine.repository.base import TablenamesConfig
+from packages.engine.repository.sqlite import DBOperatorSQLITE3
+from packages.engine.requirements.compiled import compileRequirement
+from packages.engine.requirements.master_registry import getMasterRegistry
+from packages.engine.requirements.snapshot import MasterSnapshot
+
+N_OFFICES = resolveScale(os.environ.get("JUDGE_BENCH_SCALE", "1k"))
+N_ANNOUNCEMENTS = int(os.environ.get("JUDGE_BENCH_ANNOUNCEMENTS", "2"))
+
+# checker 単体の計測で判定する拠点数
+CHECKER_OFFICES = 200
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    return generateSyntheticData(n_offices=N_OFFICES, n_announcements=N_ANNOUNCEMENTS)
+
+
+@pytest.fixture(scope="module")
+def snapshot(synthetic):
+    _, _, master_data_dict = synthetic
+    return MasterSnapshot(master_data_dict)
+
+
+def test_generate_synthetic_data(benchmark):
+    benchmark.pedantic(generateSyntheticData, kwargs={"n_offices": N_OFFICES, "n_announcements": N_ANNOUNCEMENTS}, rounds=3)
+
+
+def test_process_judgement_chunk(benchmark, synthetic):
+    pairs, req_df, master_data_dict = synthetic
+    req_df_map = dict(tuple(req_df.groupby("announcement_no")))
+    result = benchmark.pedantic(_process_judgement_chunk, args=((pairs, req_df_map, master_data_dict),), rounds=1)
+    assert len(result["judgement"]) == pairs.shape[0]
+
+
+def test_process_judgement_chunk_matching_achievements(benchmark):
+    # 全拠点が実績要件を満たす (実績要件の判定で最も重い generateSuccessReason まで通る)
+    pairs, req_df, master_data_dict = generateSyntheticData(
+        n_offices=N_OFFICES, n_announcements=N_ANNOUNCEMENTS, matching_achievements=True
+    )
+    req_df_map = dict(tuple(req_df.groupby("announcement_no")))
+    result = benchmark.pedantic(_process_judgement_chunk, args=((pairs, req_df_map, master_data_dict),), rounds=1)
+    assert len(result["judgement"]) == pairs.shape[0]
+    assert not [row for row in result["insufficient"] if row["requirement_type"] == "実績要件"]
+
+
+@pytest.mark.parametrize("requirement_type", list(REQUIREMENT_TEXTS))
+def test_checker(benchmark, synthetic, snapshot, requirement_type):
+    pairs, _, master_data_dict = synthetic
+    offices = pairs[["company_no", "office_no"]].drop_duplicates().head(CHECKER_OFFICES)
+    compiled_list = [
+        compileRequirement(requirement_no, requirement_type, text)
+        for requirement_no, text in enumerate(REQUIREMENT_TEXTS[requirement_type])
+    ]
+
+    def evaluate():
+        return [
+            _evaluate_requirement(compiled, company_no, office_no, master_data_dict, snapshot)
+            for compiled in compiled_list
+            for company_no, office_no in zip(offices["company_no"], offices["office_no"])
+        ]
+
+    results = benchmark(evaluate)
+    assert len(results) == len(compiled_list) * offices.shape[0]
+
+
+@pytest.fixture
+def step3_database(synthetic, tmp_path):
+    """合成データの SQLite DB と、合成マスターを読むように切り替えたマスターレジストリ。"""
+    _, req_df, master_data_dict = synthetic
+    writeMasterFiles(master_data_dict, str(tmp_path / "master"))
+    registry = getMasterRegistry()
+    master_dir = registry.masterDir
+    registry.setMasterDir(str(tmp_path / "master"))
+    db_operator = DBOperatorSQLITE3(sqlite3_db_file_path=str(tmp_path / "bench.db"))
+    tablenamesconfig = TablenamesConfig()
+    loadIntoDatabase(db_operator, tablenamesconfig, req_df, master_data_dict)
+    yield db_operator, tablenamesconfig
+    registry.setMasterDir(master_dir)
+
+
+def test_step3_sqlite(benchmark, synthetic, step3_database):
+    pairs, _, _ = synthetic
+    db_operator, tablenamesconfig = step3_database
+    san = BidJudgementSan(tablenamesconfig=tablenamesconfig, db_operator=db_operator)
+    # 2回目以降は判定済みの行が対象外になるので、毎回結果のテーブルを作り直す
+    benchmark.pedantic(san.step3, kwargs={"remove_table": True}, rounds=1)
+    judgements = db_operator.selectToTable(tablenamesconfig.company_bid_judgement)
+    assert isinstance(judgements, pd.DataFrame)
+    assert judgements.shape[0] == pairs.shape[0]
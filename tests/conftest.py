@@ -1,6 +1,33 @@
+import sqlite3
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def sqlite_operator():
+    """
+    DBOperatorSQLITE3 を作る関数 (引数はデータベースファイルのパス、既定はインメモリ)。
+
+    DBOperator.__init__ は BigQuery の認証情報も探して遅いので、__init__ を通さずに
+    SQLite の接続だけ同じ設定 (isolation_level=None の autocommit) で作る。
+    """
+    from packages.engine.repository.sqlite import DBOperatorSQLITE3
+
+    connections = []
+
+    def create(path=":memory:"):
+        operator = object.__new__(DBOperatorSQLITE3)
+        operator.conn = sqlite3.connect(path, isolation_level=None)
+        operator.cur = operator.conn.cursor()
+        connections.append(operator.conn)
+        return operator
+
+    yield create
+    for conn in connections:
+        conn.close()
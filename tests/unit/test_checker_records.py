@@ -0,0 +1,139 @@
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements は domain 経由で import する)
+from packages.engine.requirements.experience import checkExperienceRequirement, getOfficeExperiences
+from packages.engine.requirements.grade_item import getOfficeLicenses
+from packages.engine.requirements.records import OfficeExperience, OfficeLicense, buildRecordIndex, buildRecords
+from packages.engine.requirements.snapshot import MasterSnapshot
+
+
+def _licenses():
+    return pd.DataFrame({
+        "office_no": [1, 2, np.nan, 1],
+        "agency_no": [5, 6, 7, 8],
+        "construction_no": ["0001", "0002", "0003", "0004"],
+        "license_grade": ["A", None, "B", "C"],
+        "license_score": [900.0, np.nan, 800.0, 700.0],
+        "is_suspended": [0, 0, 0, 1],
+    })
+
+
+def test_build_records_gives_python_scalars_like_row_dicts():
+    data = _licenses()
+    records = buildRecords(OfficeLicense, data)
+    # NaN を含むので repr で比べる
+    assert [repr(record._asdict()) for record in records] == [
+        repr({key: row[key] for key in OfficeLicense._fields}) for row in data.to_dict("records")
+    ]
+    assert type(records[0].agency_no) is int
+    assert type(records[0].license_score) is float
+
+
+def test_build_records_renames_source_columns():
+    data = pd.DataFrame({name: [1] for name in OfficeExperience._fields if name != "is_jv_flg"} | {"is_jv_flag": [True]})
+    assert buildRecords(OfficeExperience, data)[0].is_jv_flg is True
+
+
+def test_record_index_keeps_row_order_and_skips_missing_keys():
+    index = buildRecordIndex(OfficeLicense, _licenses(), "office_no")
+    assert list(index) == [1, 2]
+    assert [record.agency_no for record in index[1]] == [5, 8]
+
+
+def test_record_index_of_empty_or_keyless_table():
+    assert buildRecordIndex(OfficeLicense, pd.DataFrame({"office_no": pd.Series([], dtype="int64")}), "office_no") == {}
+    assert buildRecordIndex(OfficeLicense, pd.DataFrame({"agency_no": [1]}), "office_no") == {}
+
+
+def test_snapshot_shares_records_between_calls():
+    snapshot = MasterSnapshot({"office_registration_authorization_with_converter": _licenses()})
+    first = getOfficeLicenses(snapshot, 1)
+    assert first is getOfficeLicenses(snapshot, 1)
+    assert all(isinstance(record, OfficeLicense) for record in first)
+    assert getOfficeLicenses(snapshot, 3) == []
+
+
+def test_office_experiences_match_with_and_without_snapshot():
+    data = pd.DataFrame({
+        "office_experience_no": [1, 2, 3],
+        "office_no": [1, 2, 1],
+        "agency_no": [1, 1, 2],
+        "construction_no": [1, 2, 3],
+        "project_name": ["a", "b", "c"],
+        "contractor_layer": ["元請け", "一次請", "元請け"],
+        "start_date": pd.to_datetime(["2020-04-01", "2021-04-01", "2022-04-01"]),
+        "completion_date": pd.to_datetime(["2021-03-31", "2022-03-31", "2023-03-31"]),
+        "final_score": [80.0, 70.0, np.nan],
+        "total_amount": [1000, 2000, 3000],
+        "is_jv_flag": [False, True, False],
+        "jv_ratio": [np.nan, 30.0, np.nan],
+        "remarks": [None, None, "x"],
+    })
+    snapshot = MasterSnapshot({"office_work_achivements": data})
+    expected = getOfficeExperiences(1, office_experience_data=data)
+    assert [record.office_experience_no for record in expected] == [1, 3]
+    assert repr(getOfficeExperiences(1, snapshot=snapshot)) == repr(expected)
+
+
+def test_snapshot_builds_row_dicts_only_when_read():
+    snapshot = MasterSnapshot({"office_registration_authorization_with_converter": _licenses()})
+    getOfficeLicenses(snapshot, 1)
+    size_before = len(pickle.dumps(snapshot))
+    snapshot.records("office_registration_authorization_with_converter")
+    assert len(pickle.dumps(snapshot)) > size_before
+
+
+def _experience_masters():
+    # 完成日は datetime のまま持つ (pd.Timestamp だと generateSuccessReason の astimezone が tz-naive で例外になる)
+    achievements = pd.DataFrame({
+        "office_experience_no": [1, 2, 3],
+        "office_no": [1, 1, 1],
+        "agency_no": [2, 2, 2],
+        "construction_no": [7, 8, 14],
+        "project_name": ["a", "b", "c"],
+        "contractor_layer": ["元請け", "元請け", "一次請"],
+        "start_date": ["2019-04-01", "2021-04-01", "2022-04-01"],
+        "completion_date": pd.Series([datetime(2020, 3, 31), datetime(2022, 3, 31), datetime(2023, 3, 31)], dtype=object),
+        "final_score": [80, 75, 70],
+        "total_amount": [1000, 2000, 3000],
+        "is_jv_flag": [False, False, True],
+        "jv_ratio": [np.nan, np.nan, 40.0],
+        "remarks": [None, None, None],
+    })
+    agency = pd.DataFrame({
+        "agency_no": [1, 2],
+        "agency_name": ["全省庁統一", "北海道"],
+        "parent_agency_no": [None, 1],
+        "agency_level": [0, 1],
+        "agency_area": [None, "北海道"],
+    })
+    construction = pd.DataFrame({
+        "construction_no": [7, 8, 14],
+        "construction_name": ["土木", "建築", "電気"],
+        "category_segment": ["各発注機関用"] * 3,
+        "parent_construction_no": [2, 2, 2],
+    })
+    return {"office_work_achivements": achievements, "agency": agency, "construction": construction}
+
+
+@pytest.mark.parametrize("text, detail", [
+    ("平成20年度以降に元請けとして完成した土木工事の施工実績を有すること", "元請けの条件に対して元請けとして参加"),
+    ("2015年度以降に一次請として電気工事の実績を有すること。JV比率20%以上", "JV比率20.0%以上の条件に対してJV比率40.0%で参加"),
+    ("令和2年度以降に完成した建築工事の実績があり、工事成績65点以上であること", "成績65.0点以上の条件に対して成績75点を獲得"),
+])
+def test_experience_success_reason_reads_record_fields(text, detail):
+    masters = _experience_masters()
+    expected = checkExperienceRequirement(
+        text, 1,
+        office_experience_data=masters["office_work_achivements"],
+        agency_data=masters["agency"],
+        construction_data=masters["construction"],
+    )
+    assert expected["is_ok"] is True
+    assert detail in expected["reason"]
+    assert checkExperienceRequirement(text, 1, snapshot=MasterSnapshot(masters)) == expected
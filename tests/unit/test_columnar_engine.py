@@ -0,0 +1,332 @@
+import pandas as pd
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements.experience は domain 経由で import する)
+from packages.engine.domain.master import (
+    EARLY_EXIT_REMARKS,
+    EARLY_EXIT_REQUIREMENT_COSTS,
+    _JUDGEMENT_WORKER_CONTEXT,
+    _early_exit_order,
+    _evaluate_requirement,
+    _init_judgement_worker,
+    _prefilter_judgement_pairs,
+    _process_judgement_chunk,
+    _process_judgement_chunk_columnar,
+    _summarize_office_judgement,
+)
+from packages.engine.domain.judgement import _run_step3_batch
+from packages.engine.requirements.columnar import evaluateRequirementColumnar
+from packages.engine.requirements.compiled import CompiledRequirement, compileRequirement
+from packages.engine.requirements.result_cache import ResultCache
+from packages.engine.requirements.snapshot import MasterSnapshot
+
+
+@pytest.fixture
+def master_data_dict():
+    office = pd.DataFrame({
+        "office_no": [1, 2, 3, 4],
+        "company_no": [1, 1, 2, 3],
+        "office_type": ["本社", "支店", "本社", "営業所"],
+        "office_address": ["愛知県瀬戸市", "東京都千代田区", "福岡県福岡市", "青森県青森市"],
+        "Located_Prefecture": ["愛知県", "東京都", "福岡県", ""],
+    })
+    company = pd.DataFrame({"company_no": [1, 2, 3], "id": ["cmp-1", "cmp-2", "cmp-3"]})
+    disqualifications = pd.DataFrame({
+        "company_id": ["cmp-1", "cmp-2"],
+        "article_70_flag": [False, False],
+        "article_71_flag": [False, True],
+        "bankruptcy_flag": [False, False],
+        "corporate_reorganization_flag": [True, False],
+        "corporate_reorganization_start_date": [None, None],
+        "post_reorganization_reacquisition_date": [None, None],
+        "anti_social_forces_flag": [False, False],
+        "adult_ward_flag": [False, False],
+        "foreign_legal_restriction_flag": [False, False],
+        "subversive_organization_flag": [False, False],
+        "no_social_insurance_arrears_flag": [False, False],
+        "information_security_framework_flag": [False, False],
+        "boj_transaction_suspension_flag": [False, False],
+    })
+    registration = pd.DataFrame({
+        "office_no": [1, 1, 2, 3],
+        "agency_no": [1, 2, 2, 3],
+        "construction_no": ["4", "14", "14", "1"],
+        "license_grade": ["C", "A", "B", None],
+        "license_score": [800, 1300, 900, None],
+        "is_suspended": [0, 0, 0, 1],
+    })
+    agency = pd.DataFrame({
+        "agency_no": [1, 2, 3],
+        "agency_name": ["全省庁統一", "防衛省", "東北防衛局"],
+        "parent_agency_no": [None, None, 2],
+        "agency_area": [None, "九州・沖縄", "青森県,岩手県"],
+    })
+    construction = pd.DataFrame({
+        "construction_no": [1, 4, 14],
+        "construction_name": ["土木", "物品の販売", "電気"],
+        "category_segment": ["各発注機関用", "全省庁統一", "各発注機関用"],
+    })
+    employee = pd.DataFrame({
+        "employee_no": [10, 11],
+        "company_no": [1, 2],
+        "office_no": [1, 3],
+        "employee_name": ["a", "b"],
+        "is_retired_flg": [False, False],
+    })
+    employee_qualification = pd.DataFrame({
+        "employee_no": [10],
+        "qualification_no": [99],
+        "obtained_date": [None],
+        "is_active_flg": [True],
+    })
+    technician_qualification = pd.DataFrame({
+        "qualification_no": [1],
+        "qualification_name": ["1級土木施工管理技士"],
+        "qualification_type": [None],
+    })
+    return {
+        "company": company,
+        "disqualifications": disqualifications,
+        "office": office,
+        "office_registration_authorization": registration,
+        "office_registration_authorization_with_converter": registration,
+        "agency": agency,
+        "construction": construction,
+        "office_work_achivements": pd.DataFrame({"office_no": pd.Series([], dtype="int64")}),
+        "employee": employee,
+        "employee_qualification": employee_qualification,
+        "technician_qualification": technician_qualification,
+        "employee_experience": pd.DataFrame({"employee_no": pd.Series([], dtype="int64")}),
+    }
+
+
+COMPANY_NOS = [1, 1, 2, 3, 9]
+OFFICE_NOS = [1, 2, 3, 4, 99]
+
+
+@pytest.mark.parametrize("requirement_type, text", [
+    ("欠格要件", "第70条及び第71条の規定に該当しない者"),
+    ("欠格要件", "第71条に該当しない者"),
+    ("欠格要件", "会社更生法に基づく更生手続開始の申立てがなされていないこと"),
+    ("欠格要件", "指名停止期間中でないこと"),
+    ("欠格要件", "入札説明書を受領していること"),
+    ("所在地要件", "愛知県内に本店を有すること"),
+    ("所在地要件", "東北防衛局管内に支店等を有すること"),
+    ("所在地要件", "東京都又は福岡県に営業拠点を有すること"),
+    ("業種・等級要件", "全省庁統一資格の「物品の販売」に係る等級がA、B、C、D等級であること"),
+    ("業種・等級要件", "防衛省の電気工事でB等級以上かつ1000点以上であること"),
+    ("業種・等級要件", "土木に係る一般競争参加資格を有し九州・沖縄の地域"),
+    ("実績要件", "平成20年度以降に元請として完成した工事の実績を有すること"),
+    ("技術者要件", "1級土木施工管理技士を配置できること"),
+    ("その他要件", "現場説明会に参加すること"),
+])
+def test_columnar_matches_row_checkers(master_data_dict, requirement_type, text):
+    snapshot = MasterSnapshot(master_data_dict)
+    compiled = compileRequirement(0, requirement_type, text)
+
+    def fallback(company_no, office_no):
+        return _evaluate_requirement(compiled, company_no, office_no, master_data_dict, snapshot)
+
+    expected = [fallback(company_no, office_no) for company_no, office_no in zip(COMPANY_NOS, OFFICE_NOS)]
+    assert evaluateRequirementColumnar(compiled, COMPANY_NOS, OFFICE_NOS, snapshot, fallback) == expected
+
+
+@pytest.fixture
+def chunk_args(master_data_dict):
+    df_chunk = pd.DataFrame({
+        "announcement_no": [1, 1, 2, 1, 3],
+        "company_no": [1, 2, 1, 3, 1],
+        "office_no": [1, 3, 2, 4, 1],
+    })
+    req_df = pd.DataFrame({
+        "announcement_no": [1, 1, 1, 2, 2],
+        "requirement_no": [0, 1, 2, 0, 1],
+        "requirement_type": ["欠格要件", "所在地要件", "業種・等級要件", "技術者要件", "その他要件"],
+        "requirement_text": [
+            "第71条に該当しない者",
+            "愛知県内に本店を有すること",
+            "防衛省の電気工事でB等級以上であること",
+            "1級土木施工管理技士を配置できること",
+            "現場説明会に参加すること",
+        ],
+    })
+    req_df_map = dict(tuple(req_df.groupby("announcement_no")))
+    return df_chunk, req_df_map, master_data_dict
+
+
+IGNORED_COLUMNS = {"evaluation_no", "sufficiency_detail_no", "shortage_detail_no", "createdDate", "updatedDate"}
+
+
+def normalise(result):
+    return {
+        key: [{k: v for k, v in row.items() if k not in IGNORED_COLUMNS} for row in rows]
+        for key, rows in result.items()
+    }
+
+
+def test_columnar_chunk_matches_row_chunk(chunk_args):
+    row_result = _process_judgement_chunk(chunk_args)
+    columnar_result = _process_judgement_chunk_columnar(chunk_args)
+    assert len(row_result["judgement"]) == 4
+    assert normalise(columnar_result) == normalise(row_result)
+
+
+@pytest.mark.parametrize("process_chunk", [_process_judgement_chunk, _process_judgement_chunk_columnar])
+def test_chunk_uses_master_data_shared_by_initializer(chunk_args, process_chunk):
+    df_chunk, req_df_map, master_data_dict = chunk_args
+    expected = normalise(process_chunk(chunk_args))
+    snapshot = MasterSnapshot(master_data_dict)
+    _init_judgement_worker(req_df_map, master_data_dict, snapshot)
+    try:
+        assert _JUDGEMENT_WORKER_CONTEXT["snapshot"] is snapshot
+        assert normalise(process_chunk(df_chunk)) == expected
+    finally:
+        _JUDGEMENT_WORKER_CONTEXT.clear()
+
+
+def test_chunk_reuses_cached_results_for_repeated_requirement_texts(chunk_args):
+    df_chunk, req_df_map, master_data_dict = chunk_args
+    # 公告3 は公告1 と同じ要件テキスト。拠点 (1, 1) は両方の公告の対象
+    req_df_map = dict(req_df_map)
+    req_df_map[3] = req_df_map[1].assign(announcement_no=3)
+    expected = normalise(_process_judgement_chunk((df_chunk, req_df_map, master_data_dict)))
+
+    cache = ResultCache(keep_new_entries=True)
+    _init_judgement_worker(req_df_map, master_data_dict, MasterSnapshot(master_data_dict), cache)
+    try:
+        result = _process_judgement_chunk(df_chunk)
+        cached = result.pop("result_cache")
+        assert normalise(result) == expected
+        assert cached["stats"]["hits"] == {"欠格要件": 1, "所在地要件": 1, "業種・等級要件": 1}
+        assert sum(cached["stats"]["misses"].values()) == len(cached["entries"]) == 11
+
+        # 2回目は全件キャッシュから返る
+        result = _process_judgement_chunk(df_chunk)
+        cached = result.pop("result_cache")
+        assert normalise(result) == expected
+        assert sum(cached["stats"]["misses"].values()) == 0
+        assert cached["entries"] == {}
+    finally:
+        _JUDGEMENT_WORKER_CONTEXT.clear()
+
+
+
+def test_prefilter_prunes_pairs_failing_license_or_location(chunk_args):
+    df_chunk, req_df_map, master_data_dict = chunk_args
+    full = normalise(_process_judgement_chunk(chunk_args))
+    remaining, pruned = _prefilter_judgement_pairs(df_chunk, req_df_map, master_data_dict, MasterSnapshot(master_data_dict))
+
+    failing = {
+        (row["announcement_no"], row["office_no"])
+        for row in full["insufficient"]
+        if row["requirement_type"] in ("業種・等級要件", "所在地要件")
+    }
+    pruned_pairs = {(row["announcement_no"], row["office_no"]) for row in pruned["judgement"]}
+    assert pruned_pairs == failing
+    assert not failing & set(zip(remaining["announcement_no"], remaining["office_no"]))
+
+    # 事前判定した要件の結果は通常の判定と同じ。判定していない要件の列は None
+    pruned_insufficient = normalise(pruned)["insufficient"]
+    assert pruned_insufficient == [
+        row for row in full["insufficient"]
+        if (row["announcement_no"], row["office_no"]) in failing
+        and row["requirement_type"] in ("業種・等級要件", "所在地要件")
+    ]
+    for row in pruned["judgement"]:
+        assert row["final_status"] is False
+        assert row["requirement_ineligibility"] is None
+
+
+def test_early_exit_order_follows_costs():
+    compiled_requirements = [
+        CompiledRequirement(0, "欠格要件", ""),
+        CompiledRequirement(1, "所在地要件", ""),
+        CompiledRequirement(2, "未知の要件", ""),
+        CompiledRequirement(3, "業種・等級要件", ""),
+        CompiledRequirement(4, "所在地要件", ""),
+    ]
+    assert _early_exit_order(compiled_requirements, EARLY_EXIT_REQUIREMENT_COSTS) == [3, 1, 4, 0, 2]
+
+
+def test_early_exit_stops_at_first_failing_requirement(chunk_args):
+    df_chunk, req_df_map, master_data_dict = chunk_args
+    full = normalise(_process_judgement_chunk(chunk_args))
+    _init_judgement_worker(req_df_map, master_data_dict, MasterSnapshot(master_data_dict), early_exit_costs=EARLY_EXIT_REQUIREMENT_COSTS)
+    try:
+        result = normalise(_process_judgement_chunk(df_chunk))
+        assert normalise(_process_judgement_chunk_columnar(df_chunk)) == result
+    finally:
+        _JUDGEMENT_WORKER_CONTEXT.clear()
+
+    full_judgements = {(row["announcement_no"], row["office_no"]): row for row in full["judgement"]}
+    assert len(result["judgement"]) == len(full_judgements)
+    for row in result["judgement"]:
+        pair = (row["announcement_no"], row["office_no"])
+        expected = full_judgements[pair]
+        # 適格かどうかは通常の判定と同じ。すべて満たす組み合わせは結果もすべて同じ
+        assert row["final_status"] == expected["final_status"]
+        if expected["final_status"]:
+            assert row == expected
+            continue
+        assert row["remarks"] == EARLY_EXIT_REMARKS
+        insufficient = [r for r in result["insufficient"] if (r["announcement_no"], r["office_no"]) == pair]
+        assert len(insufficient) == 1
+        assert insufficient[0] in full["insufficient"]
+
+    # 公告1 は 業種・等級要件 < 所在地要件 < 欠格要件 の順に判定する。拠点4 は業種・等級要件で打ち切る
+    office4 = next(row for row in result["judgement"] if row["office_no"] == 4)
+    assert office4["requirement_grade_item"] is False
+    assert office4["requirement_location"] is None
+    assert office4["requirement_ineligibility"] is None
+    assert [r for r in result["sufficient"] if r["office_no"] == 4] == []
+
+
+def test_summary_groups_deficit_reasons_by_type():
+    evaluated = [
+        (CompiledRequirement(0, "所在地要件", ""), {"is_ok": False, "reason": "所在地要件：要求地域(愛知県)に拠点がありません"}),
+        (CompiledRequirement(1, "欠格要件", ""), {"is_ok": True, "reason": "欠格要件：欠格データなし => OK"}),
+        (CompiledRequirement(2, "実績要件", ""), {"is_ok": False, "reason": "実績要件 : 拠点ID=1に実績情報が見つかりません"}),
+        (CompiledRequirement(3, "所在地要件", ""), {"is_ok": False, "reason": "所在地要件:要求地域(愛知県)に拠点がありません"}),
+        (CompiledRequirement(4, "その他要件", ""), {"is_ok": False, "reason": "その他要件があります。確認してください"}),
+    ]
+    checked, sufficient, insufficient = _summarize_office_judgement(1, 2, 3, "ev", evaluated)
+
+    # 種別は不足の出現順、同じ理由は1回だけ。"種別:" で始まらない理由はそのまま
+    assert checked["deficit_requirement_message"] == (
+        "[所在地要件]要求地域(愛知県)に拠点がありません"
+        " [実績要件]実績要件 : 拠点ID=1に実績情報が見つかりません"
+        " [その他要件]その他要件があります。確認してください"
+    )
+    assert (checked["requirement_location"], checked["requirement_experience"], checked["requirement_other"]) == (False, False, False)
+    assert checked["requirement_ineligibility"] is True
+    assert checked["final_status"] is False
+    assert [row["requirement_no"] for row in sufficient] == [1]
+    assert [row["requirement_no"] for row in insufficient] == [0, 2, 3, 4]
+
+    checked, _, _ = _summarize_office_judgement(1, 2, 3, "ev", evaluated[1:2])
+    assert checked["final_status"] is True
+    assert checked["deficit_requirement_message"] == ""
+
+
+@pytest.mark.parametrize("process_chunk", [_process_judgement_chunk, _process_judgement_chunk_columnar])
+def test_profiled_batch_reports_checker_timings(chunk_args, process_chunk, tmp_path):
+    df_chunk, req_df_map, master_data_dict = chunk_args
+    expected = normalise(process_chunk(chunk_args))
+    _init_judgement_worker(req_df_map, master_data_dict, MasterSnapshot(master_data_dict), profile_dir=str(tmp_path))
+    try:
+        batch_no, result = _run_step3_batch(process_chunk, (7, df_chunk))
+    finally:
+        _JUDGEMENT_WORKER_CONTEXT.clear()
+    profiled = result.pop("profile")
+    assert batch_no == 7
+    assert normalise(result) == expected
+
+    calls = {(kind, name): n for kind, name, n, seconds in profiled}
+    assert calls[("worker", "batch")] == 1
+    if process_chunk is _process_judgement_chunk:
+        # 行単位の判定は 拠点 x 要件 ごとに1回
+        assert calls[("checker", "欠格要件")] == 3
+        assert calls[("checker", "技術者要件")] == 1
+    else:
+        assert calls[("columnar", "欠格要件")] == 1
+    assert len(list(tmp_path.glob("step3_worker_*.prof"))) == 1
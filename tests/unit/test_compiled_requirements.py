@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements.experience は domain 経由で import する)
+from packages.engine.requirements.compiled import (
+    CompiledRequirement,
+    compileRequirement,
+    compileRequirements,
+)
+from packages.engine.requirements.grade_item import checkGradeAndItemRequirement
+from packages.engine.requirements.ineligibility import extractIneligibilityConditions
+from packages.engine.requirements.location import checkLocationRequirement
+
+
+def test_compile_requirement_dispatches_by_type():
+    compiled = compileRequirement(3, "欠格要件", "第71条に該当しない者であること")
+    assert isinstance(compiled, CompiledRequirement)
+    assert compiled.requirement_no == 3
+    assert compiled.conditions == {"rule": "article_71"}
+
+
+def test_compile_requirement_is_memoised_by_text():
+    text = "愛知県内に本店を有すること"
+    first = compileRequirement(0, "所在地要件", text)
+    second = compileRequirement(5, "所在地要件", text)
+    assert first.conditions is second.conditions
+    assert second.requirement_no == 5
+
+
+def test_compile_requirement_other_type_has_no_conditions():
+    assert compileRequirement(0, "その他要件", "入札説明書を受領していること").conditions is None
+
+
+def test_compile_requirement_unparseable_text_falls_back_to_checker():
+    assert compileRequirement(0, "所在地要件", None).conditions is None
+
+
+def test_compile_requirements_keeps_row_order():
+    req_df = pd.DataFrame({
+        "announcement_no": [1, 1],
+        "requirement_no": [1, 0],
+        "requirement_type": ["所在地要件", "欠格要件"],
+        "requirement_text": ["東京都内に支店を有すること", "破産者でないこと"],
+    })
+    compiled = compileRequirements(req_df)
+    assert [c.requirement_no for c in compiled] == [1, 0]
+    assert compiled[1].conditions == {"rule": "bankruptcy"}
+
+
+def test_ineligibility_rule_priority_follows_original_order():
+    # 70条と破産の両方を含む場合は 70条 が優先される
+    assert extractIneligibilityConditions("70条および破産")["rule"] == "article_70"
+    assert extractIneligibilityConditions("該当なし")["rule"] is None
+
+
+@pytest.mark.parametrize("text", [
+    "全省庁統一資格の「物品の販売」に係る等級がA、B、C、D等級であること",
+    "防衛省の建築工事で1200点以上であること",
+    "電気工事に係る一般競争参加資格を有し九州・沖縄の地域",
+])
+def test_grade_item_with_compiled_conditions_matches_text_parse(text):
+    licenses = pd.DataFrame({
+        "office_no": [1, 1],
+        "agency_no": [1, 2],
+        "construction_no": ["4", "14"],
+        "license_grade": ["C", "A"],
+        "license_score": [800, 1300],
+        "is_suspended": [0, 0],
+    })
+    agency = pd.DataFrame({
+        "agency_no": [1, 2],
+        "agency_name": ["全省庁統一", "防衛省"],
+        "parent_agency_no": [None, None],
+        "agency_area": ["北海道", "九州・沖縄"],
+    })
+    construction = pd.DataFrame({
+        "construction_no": [4, 14],
+        "construction_name": ["物品の販売", "電気"],
+        "category_segment": ["全省庁統一", "各発注機関用"],
+    })
+    compiled = compileRequirement(0, "業種・等級要件", text)
+    kwargs = dict(requirementText=text, officeNo=1, licenseData=licenses, agencyData=agency, constructionData=construction)
+    assert checkGradeAndItemRequirement(**kwargs, conditions=compiled.conditions) == checkGradeAndItemRequirement(**kwargs)
+
+
+def test_location_with_compiled_conditions_matches_text_parse():
+    office = pd.DataFrame({
+        "office_no": [1],
+        "office_type": ["支店"],
+        "office_address": ["東京都千代田区"],
+        "Located_Prefecture": ["東京都"],
+    })
+    agency = pd.DataFrame({"agency_no": [1], "agency_name": ["全省庁統一"], "agency_area": [None]})
+    text = "東京都内に支店等を有すること"
+    compiled = compileRequirement(0, "所在地要件", text)
+    kwargs = dict(requirementText=text, officeNo=1, agencyData=agency, officeData=office)
+    assert checkLocationRequirement(**kwargs, conditions=compiled.conditions) == checkLocationRequirement(**kwargs)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import packages.engine.repository.postgres as postgres
+from packages.engine.repository.base import BID_REQUIREMENTS_COLUMNS, COMPANY_BID_JUDGEMENT_COLUMNS, dataframe_to_rows
+
+
+def _requirements(announcement_nos, start=1):
+    return pd.DataFrame({
+        "document_id": [f"doc{no}" for no in announcement_nos],
+        "announcement_no": announcement_nos,
+        "requirement_no": range(start, start + len(announcement_nos)),
+        "requirement_type": "実績要件",
+        "requirement_text": "text",
+        "is_ocr_failed": False,
+        "done_judgement": False,
+        "createdDate": "2026-01-01",
+        "updatedDate": "2026-01-01",
+        "extra": 0,
+    })
+
+
+def _operator(sqlite_operator, direct_write_max_rows):
+    operator = sqlite_operator()
+    operator.direct_write_max_rows = direct_write_max_rows
+    operator.createBidRequirements("bid_requirements")
+    return operator
+
+
+def _save_requirements(operator, data):
+    return operator.insertRows(
+        data, "bid_requirements", operator.mergeRequirements, BID_REQUIREMENTS_COLUMNS, skip_existing_key="announcement_no"
+    )
+
+
+@pytest.mark.parametrize("direct_write_max_rows", [0, 5000])
+def test_requirements_skip_announcements_already_stored(sqlite_operator, direct_write_max_rows):
+    operator = _operator(sqlite_operator, direct_write_max_rows)
+    assert _save_requirements(operator, _requirements([1, 2, 2])) == 3
+    # 既にある公告 (1, 2) の要件は書き込まず、同じ書き込みの中の同じ公告の要件はすべて書き込む
+    assert _save_requirements(operator, _requirements([2, 3, 3, 1], start=10)) == 2
+    stored = operator.selectToTable("bid_requirements")
+    assert stored["announcement_no"].tolist() == [1, 2, 2, 3, 3]
+    assert operator.showAllTables()["name"].tolist() == ["bid_requirements"]
+
+
+def test_direct_and_staged_writes_store_the_same_rows(sqlite_operator):
+    staged, direct = _operator(sqlite_operator, 0), _operator(sqlite_operator, 5000)
+    data = _requirements([1, 2])
+    data.loc[1, "requirement_text"] = None
+    for operator in (staged, direct):
+        _save_requirements(operator, data)
+    pd.testing.assert_frame_equal(direct.selectToTable("bid_requirements"), staged.selectToTable("bid_requirements"))
+
+
+def test_direct_write_stores_timestamps_and_missing_values(sqlite_operator):
+    operator = sqlite_operator()
+    operator.createCompanyBidJudgements("company_bid_judgement")
+    data = pd.DataFrame({column: [None, None] for column in COMPANY_BID_JUDGEMENT_COLUMNS})
+    data["evaluation_no"] = ["e1", "e2"]
+    data["office_no"] = [1.0, np.nan]
+    data["createdDate"] = pd.to_datetime(["2026-01-02 03:04:05", None])
+    assert operator.insertRowsDirect("company_bid_judgement", data) == 2
+    stored = operator.selectToTable("company_bid_judgement")
+    assert stored["createdDate"].tolist() == ["2026-01-02 03:04:05", None]
+    assert stored["office_no"].tolist()[0] == 1 and pd.isna(stored["office_no"].tolist()[1])
+
+
+def test_direct_write_rolls_back_on_error(sqlite_operator):
+    operator = _operator(sqlite_operator, 5000)
+    data = _requirements([1, 2])
+    data["requirement_no"] = [1, 1]  # UNIQUE(requirement_no) に違反する
+    with pytest.raises(Exception):
+        _save_requirements(operator, data)
+    assert operator.selectToTable("bid_requirements").shape[0] == 0
+    assert not operator.conn.in_transaction
+
+
+def test_dataframe_to_rows_gives_python_scalars():
+    rows = dataframe_to_rows(pd.DataFrame({"a": [1, 2], "b": [0.5, np.nan], "c": ["x", None]}))
+    assert rows == [(1, 0.5, "x"), (2, None, None)]
+    assert type(rows[0][0]) is int
+
+
+def test_postgres_direct_write_filters_existing_keys_and_sets_updated_date(monkeypatch):
+    class Cursor:
+        def __init__(self):
+            self.executed = []
+
+        def execute(self, statement, params=None):
+            self.executed.append(params)
+
+        def fetchall(self):
+            return [(1,)]
+
+    class Connection:
+        autocommit = True
+
+        def commit(self):
+            pass
+
+        def rollback(self):
+            pass
+
+    calls = []
+    monkeypatch.setattr(postgres, "execute_values", lambda cur, statement, rows, template, page_size: calls.append((rows, template)))
+    operator = object.__new__(postgres.DBOperatorPOSTGRES)
+    operator.conn, operator.cur = Connection(), Cursor()
+
+    data = _requirements([1, 2, 2])[BID_REQUIREMENTS_COLUMNS]
+    assert operator.insertRowsDirect("bid_requirements", data, skip_existing_key="announcement_no") == 2
+    assert operator.cur.executed == [[[1, 2]]]
+    (rows, template), = calls
+    assert template == "(%s, %s, %s, %s, %s, %s, %s, %s, NOW()::text)"
+    assert rows == [
+        ("doc2", 2, 2, "実績要件", "text", False, False, "2026-01-01"),
+        ("doc2", 2, 3, "実績要件", "text", False, False, "2026-01-01"),
+    ]
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements.experience は domain 経由で import する)
+from packages.engine.requirements.location import getOfficeLocation
+from packages.engine.requirements.master_registry import MasterRegistry, getMasterRegistry
+
+
+def _writeOffice(master_dir, office_type):
+    pd.DataFrame({
+        "office_no": [1],
+        "office_type": [office_type],
+        "office_address": ["愛知県瀬戸市"],
+        "Located_Prefecture": ["愛知県"],
+    }).to_csv(os.path.join(master_dir, "office_master.txt"), sep="\t", index=False)
+
+
+def test_registry_caches_until_file_changes(tmp_path):
+    _writeOffice(tmp_path, "本社")
+    registry = MasterRegistry(str(tmp_path))
+    first = registry.get("office")
+    assert registry.get("office") is first
+    assert registry.loads == 1
+
+    _writeOffice(tmp_path, "支店")
+    path = registry.path("office")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert registry.get("office")["office_type"].tolist() == ["支店"]
+    assert registry.loads == 2
+
+
+def test_registry_converter_keeps_construction_no_as_str(tmp_path):
+    pd.DataFrame({"office_no": [1], "construction_no": [4]}).to_csv(
+        os.path.join(tmp_path, "office_registration_authorization_master.txt"), sep="\t", index=False
+    )
+    registry = MasterRegistry(str(tmp_path))
+    assert registry.get("office_registration_authorization_with_converter")["construction_no"].tolist() == ["4"]
+    assert registry.get("office_registration_authorization")["construction_no"].tolist() == [4]
+
+
+def test_registry_rejects_unknown_table(tmp_path):
+    with pytest.raises(KeyError):
+        MasterRegistry(str(tmp_path)).get("unknown")
+
+
+@pytest.fixture
+def default_registry(tmp_path):
+    registry = getMasterRegistry()
+    master_dir = registry.masterDir
+    registry.setMasterDir(str(tmp_path))
+    yield registry
+    registry.setMasterDir(master_dir)
+
+
+def test_checker_default_reads_from_registry(default_registry, tmp_path):
+    _writeOffice(tmp_path, "本社")
+    assert getOfficeLocation(1) == ("愛知県瀬戸市", "本社", "愛知県")
+    assert default_registry.loads >= 1
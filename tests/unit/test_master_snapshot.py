@@ -0,0 +1,188 @@
+import pandas as pd
+import pytest
+
+from packages.engine.requirements.snapshot import ACTIVE_EMPLOYEE_INDEX, MasterSnapshot
+from packages.engine.requirements.grade_item import checkGradeAndItemRequirement, getAgencyMap, getConstructionMap
+from packages.engine.requirements.ineligibility import checkIneligibilityDynamic
+from packages.engine.requirements.location import checkLocationRequirement
+from packages.engine.requirements.technician import checkTechnicianRequirement, formatQualificationName
+
+
+@pytest.fixture
+def master_data_dict():
+    office = pd.DataFrame({
+        "office_no": [1, 2, 3],
+        "company_no": [1, 1, 2],
+        "office_type": ["本社", "支店", "本社"],
+        "office_address": ["愛知県瀬戸市", "東京都千代田区", "福岡県福岡市"],
+        "Located_Prefecture": ["愛知県", "東京都", "福岡県"],
+    })
+    company = pd.DataFrame({"company_no": [1, 2], "id": ["cmp-1", "cmp-2"]})
+    disqualifications = pd.DataFrame({
+        "company_id": ["cmp-2"],
+        "article_70_flag": [False],
+        "article_71_flag": [True],
+        "bankruptcy_flag": [False],
+        "corporate_reorganization_flag": [False],
+        "corporate_reorganization_start_date": [None],
+        "post_reorganization_reacquisition_date": [None],
+        "anti_social_forces_flag": [False],
+        "adult_ward_flag": [False],
+        "foreign_legal_restriction_flag": [False],
+        "subversive_organization_flag": [False],
+        "no_social_insurance_arrears_flag": [False],
+        "information_security_framework_flag": [False],
+        "boj_transaction_suspension_flag": [False],
+    })
+    registration = pd.DataFrame({"office_no": [1, 3], "agency_no": [1, 1], "is_suspended": [0, 1]})
+    employee = pd.DataFrame({
+        "employee_no": [10, 11, 12],
+        "company_no": [1, 1, 1],
+        "office_no": [1, 1, 2],
+        "employee_name": ["a", "b", "c"],
+        "is_retired_flg": [False, True, False],
+    })
+    agency = pd.DataFrame({
+        "agency_no": [1, 2],
+        "agency_name": ["全省庁統一", "東北防衛局"],
+        "parent_agency_no": [None, 1],
+        "agency_area": [None, "青森県,岩手県"],
+    })
+    return {
+        "company": company,
+        "disqualifications": disqualifications,
+        "office": office,
+        "office_registration_authorization": registration,
+        "agency": agency,
+        "employee": employee,
+    }
+
+
+def test_rows_keep_original_order(master_data_dict):
+    snapshot = MasterSnapshot(master_data_dict)
+    assert [row["office_no"] for row in snapshot.rows("office", 1)] == [1]
+    assert snapshot.rows("office", 99) == []
+    assert snapshot.first("office", 99) is None
+    assert snapshot.frame("office", 2)["office_type"].tolist() == ["支店"]
+    assert snapshot.first("agency", "東北防衛局", column="agency_name")["agency_no"] == 2
+
+
+def test_rows_isin_matches_dataframe_isin(master_data_dict):
+    snapshot = MasterSnapshot(master_data_dict)
+    employee = master_data_dict["employee"]
+    expected = employee[employee["employee_no"].isin([12, 10])].to_dict("records")
+    assert snapshot.rows_isin("employee", [12, 10]) == expected
+
+
+def test_active_employee_index_excludes_retired(master_data_dict):
+    snapshot = MasterSnapshot(master_data_dict)
+    rows = snapshot.rows(ACTIVE_EMPLOYEE_INDEX, (1, 1))
+    assert [row["employee_no"] for row in rows] == [10]
+
+
+@pytest.mark.parametrize("company_no, office_no, text", [
+    (1, 1, "第70条及び第71条の規定に該当しない者"),
+    (2, 3, "第71条に該当しない者"),
+    (2, 3, "指名停止期間中でないこと"),
+    (3, 1, "破産者でないこと"),
+])
+def test_ineligibility_with_snapshot_matches_dataframe(master_data_dict, company_no, office_no, text):
+    snapshot = MasterSnapshot(master_data_dict)
+    kwargs = dict(
+        requirementText=text,
+        companyNo=company_no,
+        officeNo=office_no,
+        company_data=master_data_dict["company"],
+        disqualification_data=master_data_dict["disqualifications"],
+        office_registration_authorization_data=master_data_dict["office_registration_authorization"],
+    )
+    assert checkIneligibilityDynamic(**kwargs, snapshot=snapshot) == checkIneligibilityDynamic(**kwargs)
+
+
+@pytest.mark.parametrize("office_no, text", [
+    (1, "愛知県内に本店を有すること"),
+    (2, "愛知県内に本店を有すること"),
+    (3, "東北防衛局管内に支店等を有すること"),
+    (99, "愛知県内に本店を有すること"),
+])
+def test_location_with_snapshot_matches_dataframe(master_data_dict, office_no, text):
+    snapshot = MasterSnapshot(master_data_dict)
+    kwargs = dict(
+        requirementText=text,
+        officeNo=office_no,
+        agencyData=master_data_dict["agency"],
+        officeData=master_data_dict["office"],
+    )
+    assert checkLocationRequirement(**kwargs, snapshot=snapshot) == checkLocationRequirement(**kwargs)
+
+
+def test_grade_item_maps_are_built_once_per_snapshot(master_data_dict):
+    master_data_dict["construction"] = pd.DataFrame({
+        "construction_no": [4],
+        "construction_name": ["物品の販売"],
+        "category_segment": ["全省庁統一"],
+    })
+    master_data_dict["office_registration_authorization_with_converter"] = pd.DataFrame({
+        "office_no": [1, 1],
+        "agency_no": [1, 2],
+        "construction_no": ["4", "4"],
+        "license_grade": ["C", "A"],
+        "license_score": [800, 1300],
+        "is_suspended": [0, 0],
+    })
+    master_data_dict["agency"] = master_data_dict["agency"].assign(agency_area=[float("nan"), "東北"])
+    snapshot = MasterSnapshot(master_data_dict)
+    agencyMap = getAgencyMap(snapshot)
+    assert getAgencyMap(snapshot) is agencyMap
+    assert getConstructionMap(snapshot) is getConstructionMap(snapshot)
+
+    # 地域要件の判定で agency_area (NaN) を str 化しても共有の agencyMap は書き換えない
+    text = "物品の販売に係る資格を有し東北の地域"
+    kwargs = dict(
+        requirementText=text,
+        officeNo=1,
+        licenseData=master_data_dict["office_registration_authorization_with_converter"],
+        agencyData=master_data_dict["agency"],
+        constructionData=master_data_dict["construction"],
+    )
+    assert checkGradeAndItemRequirement(**kwargs, snapshot=snapshot) == checkGradeAndItemRequirement(**kwargs)
+    assert not isinstance(agencyMap[1]["agency_area"], str)
+
+
+@pytest.mark.parametrize("office_no, text", [
+    (1, "1級土木施工管理技士を配置できること"),
+    (1, "1級建築施工管理技士を配置できること"),
+    (2, "1級土木施工管理技士を配置できること"),
+])
+def test_technician_with_snapshot_matches_dataframe(master_data_dict, office_no, text):
+    master_data_dict["employee_qualification"] = pd.DataFrame({
+        "employee_no": [10, 11, 12],
+        "qualification_no": [1, 1, 2],
+        "obtained_date": [None, None, None],
+        "is_active_flg": [True, True, True],
+    })
+    master_data_dict["technician_qualification"] = pd.DataFrame({
+        "qualification_no": [1, 2],
+        "qualification_name": ["1級土木施工管理技士", "1級建築施工管理技士"],
+        "qualification_type": [None, "建築"],
+    })
+    master_data_dict["employee_experience"] = pd.DataFrame({"employee_no": pd.Series([], dtype="int64")})
+    snapshot = MasterSnapshot(master_data_dict)
+    kwargs = dict(
+        requirementText=text,
+        companyNo=1,
+        officeNo=office_no,
+        employeeData=master_data_dict["employee"],
+        qualData=master_data_dict["employee_qualification"],
+        qualMasterData=master_data_dict["technician_qualification"],
+        expData=master_data_dict["employee_experience"],
+    )
+    expected = checkTechnicianRequirement(**kwargs)
+    assert checkTechnicianRequirement(**kwargs, snapshot=snapshot) == expected
+    assert "判定処理中にエラー" not in expected["reason"]
+
+
+def test_format_qualification_name_appends_type():
+    assert formatQualificationName("1級建築施工管理技士", "建築") == "1級建築施工管理技士(建築)"
+    assert formatQualificationName("1級土木施工管理技士", None) == "1級土木施工管理技士"
+    assert formatQualificationName("1級土木施工管理技士", float("nan")) == "1級土木施工管理技士"
@@ -0,0 +1,134 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from packages.engine.repository.postgres import DBOperatorPOSTGRES, _copy_column_type, _copy_text_rows
+
+
+class _FakeCursor:
+    def __init__(self):
+        self.statements = []
+        self.copied = None
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def copy_expert(self, statement, file):
+        self.statements.append(statement)
+        self.copied = file.read()
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.autocommit = True
+        self.events = []
+
+    def commit(self):
+        self.events.append(("commit", self.autocommit))
+
+    def rollback(self):
+        self.events.append(("rollback", self.autocommit))
+
+
+def _operator():
+    operator = object.__new__(DBOperatorPOSTGRES)
+    operator.conn = _FakeConnection()
+    operator.cur = _FakeCursor()
+    return operator
+
+
+@pytest.mark.parametrize("column, expected", [
+    (pd.Series([1, 2]), "BIGINT"),
+    (pd.Series([1, None], dtype=object), "BIGINT"),
+    (pd.Series([1, 2], dtype="int32"), "INTEGER"),
+    (pd.Series([1.5, np.nan]), "DOUBLE PRECISION"),
+    (pd.Series([True, None]), "BOOLEAN"),
+    (pd.Series(pd.to_datetime(["2020-01-01", None])), "TIMESTAMP WITHOUT TIME ZONE"),
+    (pd.Series(pd.to_datetime(["2020-01-01"]).tz_localize("Asia/Tokyo")), "TIMESTAMP WITH TIME ZONE"),
+    (pd.Series([datetime.date(2020, 1, 1)]), "DATE"),
+    (pd.Series(["a", None]), "TEXT"),
+    (pd.Series([None, None]), "TEXT"),
+    (pd.Series([1, "a"]), "TEXT"),
+    (pd.Series(pd.to_timedelta([1], unit="s")), None),
+])
+def test_copy_column_type_follows_to_sql(column, expected):
+    assert _copy_column_type(column) == expected
+
+
+def test_copy_text_rows_escapes_and_writes_nulls():
+    data = pd.DataFrame({
+        "no": [1, None],
+        "score": [1.5, np.nan],
+        "flag": [True, False],
+        "text": ["a\tb\\c\nd", ""],
+        "at": pd.to_datetime(["2020-01-02 03:04:05", None]),
+    })
+    types = [_copy_column_type(column) for _, column in data.items()]
+    assert _copy_text_rows(data, types) == (
+        "1.0\t1.5\tt\ta\\tb\\\\c\\nd\t2020-01-02 03:04:05\n"
+        "\\N\t\\N\tf\t\t\\N\n"
+    )
+
+
+def test_upload_creates_typed_table_and_copies_in_one_transaction():
+    operator = _operator()
+    data = pd.DataFrame({"evaluation_no": ["e1", "e2"], "office_no": [1, 2], "createdDate": ["x", None]})
+    operator.uploadDataToTable(data, "tmp_result_judgement", chunksize=5000)
+
+    drop, create, copy = operator.cur.statements
+    assert "DROP TABLE IF EXISTS" in repr(drop)
+    assert "Identifier('createdDate'), SQL(' '), SQL('TEXT')" in repr(create)
+    assert "Identifier('office_no'), SQL(' '), SQL('BIGINT')" in repr(create)
+    assert "FROM STDIN" in repr(copy)
+    assert operator.cur.copied == "e1\t1\tx\ne2\t2\t\\N\n"
+    # autocommit を外して1回だけ commit し、元に戻す
+    assert operator.conn.events == [("commit", False)]
+    assert operator.conn.autocommit is True
+
+
+def test_upload_of_empty_frame_only_creates_table():
+    operator = _operator()
+    operator.uploadDataToTable(pd.DataFrame({"document_id": pd.Series([], dtype=object)}), "tmp_check")
+    assert len(operator.cur.statements) == 2
+    assert operator.cur.copied is None
+
+
+def test_upload_rolls_back_on_failure():
+    operator = _operator()
+
+    def fail(statement, file):
+        raise RuntimeError("copy failed")
+
+    operator.cur.copy_expert = fail
+    with pytest.raises(RuntimeError):
+        operator.uploadDataToTable(pd.DataFrame({"a": [1]}), "tmp_a")
+    assert operator.conn.events == [("rollback", False)]
+    assert operator.conn.autocommit is True
+
+
+def test_upload_rejects_unsafe_table_name():
+    with pytest.raises(ValueError):
+        _operator().uploadDataToTable(pd.DataFrame({"a": [1]}), 'tmp"; DROP TABLE x; --')
+
+
+@pytest.mark.parametrize("temporary, create", [(False, "CREATE UNLOGGED TABLE"), (True, "CREATE TEMPORARY TABLE")])
+def test_postgres_staging_table_is_unlogged_or_temporary(temporary, create):
+    operator = _operator()
+    with operator.stagingTable(pd.DataFrame({"a": [1]}), "tmp_result_judgement", temporary=temporary) as tmp_table:
+        statements = [repr(statement) for statement in operator.cur.statements]
+        assert f"SQL('{create}'), SQL(' '), Identifier('{tmp_table}')" in statements[1]
+    assert f"Identifier('{tmp_table}')" in repr(operator.cur.statements[-1])
+    assert "DROP TABLE IF EXISTS" in repr(operator.cur.statements[-1])
+
+
+def test_upload_joins_an_open_transaction():
+    operator = _operator()
+    with operator.transaction():
+        operator.uploadDataToTable(pd.DataFrame({"a": [1]}), "tmp_a")
+        operator.cur.execute("INSERT INTO t SELECT * FROM tmp_a")
+        assert operator.conn.events == []
+    # 外側の with を抜けたときに1回だけ commit する
+    assert operator.conn.events == [("commit", False)]
+    assert operator.conn.autocommit is True
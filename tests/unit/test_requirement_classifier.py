@@ -0,0 +1,62 @@
+import re
+
+import pandas as pd
+import pytest
+
+from packages.engine.domain.requirement_classifier import (
+    OTHER_REQUIREMENT_TYPE,
+    REQUIREMENT_TYPE_KEYWORDS,
+    classify_requirement_type,
+    classify_requirement_types,
+    expand_requirement_types,
+)
+
+TEXTS = [
+    "令和07・08・09年度防衛省競争参加資格の「C」等級に格付けされていること",
+    "会社更生法に基づき更生手続開始の申立てがなされていないこと",
+    "愛知県内に本店が所在すること",
+    "1級土木施工管理技士又は監理技術者資格者証を有する者を配置できること",
+    "JV比率20%以上の過去実績を有すること",
+    "特定JVの構成員であること",
+    "入札説明書を受領していること",
+    "",
+]
+
+
+def _legacy_types(text):
+    """分類器導入前の、タイプごとに re.search する判定 (convertRequirementTextDict の行展開)。"""
+    types = []
+    has_other_req = True
+    text_lower = text.lower()
+    for req_type, search_list in REQUIREMENT_TYPE_KEYWORDS.items():
+        hit = re.search("|".join(search_list), text_lower)
+        if hit or (req_type == OTHER_REQUIREMENT_TYPE and has_other_req):
+            types.append(req_type)
+            has_other_req = False
+    return types
+
+
+def _legacy_type(text):
+    text_lower = text.lower()
+    for req_type, search_list in REQUIREMENT_TYPE_KEYWORDS.items():
+        if req_type != OTHER_REQUIREMENT_TYPE and re.search("|".join(search_list), text_lower):
+            return req_type
+    return OTHER_REQUIREMENT_TYPE
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_classifier_matches_per_type_search(text):
+    assert classify_requirement_type(text) == _legacy_type(text)
+    assert expand_requirement_types(text) == _legacy_types(text)
+
+
+def test_keyword_inside_longer_keyword_is_counted():
+    # "jv比率" (実績要件) の中の "jv" (その他要件) も一致として扱う
+    assert expand_requirement_types("JV比率") == ["実績要件", OTHER_REQUIREMENT_TYPE]
+
+
+def test_classify_series_returns_type_column():
+    texts = pd.Series(TEXTS + TEXTS[:2], index=range(10, 20))
+    types = classify_requirement_types(texts)
+    assert types.index.tolist() == texts.index.tolist()
+    assert types.tolist() == [_legacy_type(text) for text in texts]
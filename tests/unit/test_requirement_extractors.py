@@ -0,0 +1,49 @@
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements は domain 経由で import する)
+from packages.engine.requirements.experience import extractExperienceConditions
+from packages.engine.requirements.grade_item import extractGradeAndItemConditions
+from packages.engine.requirements.location import extractPrefectures, extractRegions
+from packages.engine.requirements.technician import extractTechnicianRequirements
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("東京都内又は京都府に本店を有すること", ["東京都", "京都府"]),
+    # 短縮形は単語として現れる場合だけ (「東京」に「京都」が含まれる誤検出をしない)
+    ("東京 京都 大阪に支店", ["東京都", "京都府"]),
+    ("東京都の区域", []),
+])
+def test_extract_prefectures(text, expected):
+    assert extractPrefectures(text) == expected
+
+
+def test_extract_regions_keeps_pattern_order():
+    assert extractRegions("沖縄防衛局管内及び九州防衛局管轄") == ["九州防衛局", "沖縄防衛局"]
+
+
+def test_extract_technician_qualifications_with_types():
+    text = "2級土木施工管理技士（薬液注入）又は第3種電気主任技術者、1級土木施工管理技士補"
+    assert extractTechnicianRequirements(text)["requiredQualifications"] == [
+        "1級土木施工管理技士",
+        "1級土木施工管理技士補",
+        "2級土木施工管理技士",
+        "2級土木施工管理技士（薬液注入）",
+        "電気主任技術者",
+        "電気主任技術者（3種）",
+    ]
+
+
+def test_extract_experience_keywords_and_agency_score():
+    conditions = extractExperienceConditions("防衛省発注の土木工事及び電気通信工事（RC造）で65点未満のものを除く")
+    assert conditions["agencyScoreRequirements"] == {"防衛省": 65}
+    assert conditions["constructionTypes"] == ["土木", "電気", "電気通信"]
+    assert conditions["structures"] == ["RC造"]
+
+
+def test_extract_grade_and_item_conditions():
+    conditions = extractGradeAndItemConditions("防衛省の電気通信及びその他印刷類でB等級以上、南関東の地域")
+    assert conditions["specificAgency"] == "防衛省"
+    assert (conditions["requiredGrade"], conditions["gradeComparison"]) == ("B", "以上")
+    assert conditions["requiredItems"] == ["電気", "電気通信", "その他", "その他印刷類"]
+    # 防衛省の地域区分から抽出する
+    assert conditions["requiredAreas"] == ["南関東"]
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements.experience は domain 経由で import する)
+from packages.engine.requirements.compiled import CompiledRequirement
+from packages.engine.requirements.result_cache import ResultCache
+
+REQUIREMENT = CompiledRequirement(0, "欠格要件", "第71条に該当しない者")
+
+
+def _evaluate(calls, reason="欠格要件：欠格データなし => OK"):
+    def evaluate():
+        calls.append(reason)
+        return {"is_ok": True, "reason": reason}
+    return evaluate
+
+
+def _fingerprints(fingerprint):
+    return pd.DataFrame({"company_no": [1], "office_no": [1], "fingerprint": [fingerprint]})
+
+
+def test_cache_returns_stored_result_for_same_text_and_office():
+    cache = ResultCache()
+    calls = []
+    first = cache.getOrEvaluate(REQUIREMENT, 1, 1, _evaluate(calls))
+    again = cache.getOrEvaluate(CompiledRequirement(5, "欠格要件", REQUIREMENT.requirement_text), 1, 1, _evaluate(calls))
+    other_office = cache.getOrEvaluate(REQUIREMENT, 1, 2, _evaluate(calls))
+    assert first == again == other_office
+    assert len(calls) == 2
+    assert cache.hitRate() == pytest.approx(1 / 3)
+    assert cache.takeStats() == {"hits": {"欠格要件": 1}, "misses": {"欠格要件": 2}}
+    assert cache.takeStats() == {"hits": {}, "misses": {}}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(maxsize=2)
+    calls = []
+    for office_no in (1, 2, 1, 3):
+        cache.getOrEvaluate(REQUIREMENT, 1, office_no, _evaluate(calls))
+    assert len(cache) == 2
+    cache.getOrEvaluate(REQUIREMENT, 1, 2, _evaluate(calls))
+    assert len(calls) == 4
+
+
+def test_saved_results_are_not_used_after_office_changes(tmp_path):
+    path = str(tmp_path / "step3_result_cache.pkl")
+    cache = ResultCache(office_fingerprints=_fingerprints("aaaa"))
+    cache.getOrEvaluate(REQUIREMENT, 1, 1, _evaluate([]))
+    cache.save(path)
+
+    calls = []
+    same = ResultCache(office_fingerprints=_fingerprints("aaaa"))
+    same.load(path)
+    same.getOrEvaluate(REQUIREMENT, 1, 1, _evaluate(calls))
+    assert calls == []
+
+    changed = ResultCache(office_fingerprints=_fingerprints("bbbb"))
+    changed.load(path)
+    changed.getOrEvaluate(REQUIREMENT, 1, 1, _evaluate(calls))
+    assert len(calls) == 1
+
+
+def test_worker_entries_and_stats_merge_into_parent():
+    parent = ResultCache()
+    worker = ResultCache(keep_new_entries=True)
+    worker.getOrEvaluate(REQUIREMENT, 1, 1, _evaluate([]))
+    worker.getOrEvaluate(REQUIREMENT, 1, 1, _evaluate([]))
+    parent.update(worker.takeNewEntries())
+    parent.addStats(worker.takeStats())
+    assert len(parent) == 1
+    assert parent.hitRate() == 0.5
+    assert "欠格要件: 1/2 hits (50.0%)" in parent.report()
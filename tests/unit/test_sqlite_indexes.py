@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+
+def _indexes(operator, tablename):
+    return {
+        name: [row[2] for row in operator.conn.execute(f'PRAGMA index_info("{name}")').fetchall()]
+        for _, name, *_ in operator.conn.execute(f'PRAGMA index_list("{tablename}")').fetchall()
+        if not name.startswith("sqlite_autoindex_")
+    }
+
+
+def _plan(operator, query):
+    return " ".join(row[3] for row in operator.conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall())
+
+
+def test_create_index_accepts_column_list_and_is_idempotent(sqlite_operator):
+    operator = sqlite_operator()
+    operator.cur.execute('create table "t" (a integer, b text)')
+    operator.createIndex("idx_t_a_b", "t", ["a", "b DESC"])
+    operator.createIndex("idx_t_a_b", "t", ["a", "b DESC"])
+    assert _indexes(operator, "t") == {"idx_t_a_b": ["a", "b"]}
+    with pytest.raises(ValueError):
+        operator.createIndex("idx; DROP TABLE t", "t", "a")
+
+
+def test_created_tables_get_migration_indexes(sqlite_operator):
+    operator = sqlite_operator()
+    operator.createCompanyBidJudgements("company_bid_judgement")
+    operator.createSufficientRequirements("sufficient_requirements")
+    operator.createBidRequirements("bid_requirements")
+    assert _indexes(operator, "company_bid_judgement") == {
+        "idx_cbj_announcement_company_office": ["announcement_no", "company_no", "office_no"],
+        "idx_cbj_announcement_no": ["announcement_no"],
+    }
+    assert _indexes(operator, "sufficient_requirements") == {
+        "idx_sufficient_req_eval_ann": ["evaluation_no", "announcement_no"],
+        "idx_sufficient_req_company_office": ["company_no", "office_no"],
+    }
+    assert _indexes(operator, "bid_requirements") == {"idx_bid_requirements_announcement_no": ["announcement_no"]}
+
+
+def test_indexes_of_renamed_table_do_not_collide(sqlite_operator):
+    operator = sqlite_operator()
+    operator.createBidRequirements("bid_requirements")
+    operator.createBidRequirements("bid_requirements_test")
+    assert list(_indexes(operator, "bid_requirements_test")) == ["idx_bid_requirements_announcement_no__bid_requirements_test"]
+
+
+def test_uploaded_tables_skip_indexes_on_missing_columns(sqlite_operator):
+    operator = sqlite_operator()
+    data = pd.DataFrame({"announcement_id": [1], "document_id": ["d1"]})
+    operator.uploadDataToTable(data, "announcements_documents_master")
+    assert operator.ensurePerformanceIndexes("announcements_documents_master", "announcements_documents_master") == [
+        "idx_announcements_documents_master_announcement_id",
+        "idx_announcements_documents_master_document_id",
+    ]
+    assert operator.ensurePerformanceIndexes("office_master", "office_master") == []
+
+
+def test_hot_path_joins_use_indexes(sqlite_operator):
+    operator = sqlite_operator()
+    operator.createCompanyBidJudgements("company_bid_judgement")
+    operator.createBidRequirements("bid_requirements")
+    operator.uploadDataToTable(pd.DataFrame({"company_no": [1], "office_no": [1]}), "office_master")
+    operator.ensurePerformanceIndexes("office_master", "office_master")
+    operator.uploadDataToTable(pd.DataFrame({"announcement_no": [1]}), "bid_announcements")
+
+    statements = []
+    operator.conn.set_trace_callback(statements.append)
+    operator.preselectCompanyBidJudgement("company_bid_judgement", "office_master", "bid_announcements")
+    preselect, = statements
+    assert "USING COVERING INDEX idx_cbj_announcement_company_office" in _plan(operator, preselect)
+    assert "USING COVERING INDEX idx_bid_requirements_announcement_no" in _plan(
+        operator, "SELECT DISTINCT announcement_no FROM bid_requirements"
+    )
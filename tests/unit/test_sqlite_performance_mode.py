@@ -0,0 +1,92 @@
+import datetime
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from packages.engine.repository.sqlite import SQLITE_PERFORMANCE_PRAGMAS, DBOperatorSQLITE3
+
+
+def _table_info(conn, tablename):
+    return conn.execute(f'PRAGMA table_info("{tablename}")').fetchall()
+
+
+def _frame():
+    return pd.DataFrame({
+        "no": [1, 2, 3],
+        "score": [1.5, np.nan, 3.0],
+        "flag": [True, False, True],
+        "text": ["a", None, 'quote"d'],
+        "mixed": [1, "a", None],
+        "at": pd.to_datetime(["2026-01-02 03:04:05", None, "2026-01-03 00:00:00"]),
+        "day": [datetime.date(2026, 1, 2), None, datetime.date(2026, 1, 3)],
+        "clock": [datetime.time(3, 4, 5), None, datetime.time(6, 7, 8, 9)],
+        "empty": [None, None, None],
+    })
+
+
+def test_upload_matches_to_sql_types_and_values(sqlite_operator):
+    operator = sqlite_operator()
+    data = _frame()
+    operator.uploadDataToTable(data, "tmp_upload")
+    data.to_sql("tmp_to_sql", operator.conn, index=False)
+
+    assert _table_info(operator.conn, "tmp_upload") == _table_info(operator.conn, "tmp_to_sql")
+    assert (
+        operator.conn.execute("SELECT * FROM tmp_upload").fetchall()
+        == operator.conn.execute("SELECT * FROM tmp_to_sql").fetchall()
+    )
+
+
+def test_upload_replaces_table_in_one_transaction(sqlite_operator):
+    operator = sqlite_operator()
+    operator.uploadDataToTable(pd.DataFrame({"a": [1, 2]}), "tmp_a")
+    statements = []
+    operator.conn.set_trace_callback(statements.append)
+    operator.uploadDataToTable(pd.DataFrame({"b": ["x"]}), "tmp_a")
+
+    assert statements[0] == "BEGIN" and statements[-1] == "COMMIT"
+    assert operator.selectToTable("tmp_a")["b"].tolist() == ["x"]
+
+
+def test_failed_upload_keeps_previous_table(sqlite_operator):
+    operator = sqlite_operator()
+    operator.uploadDataToTable(pd.DataFrame({"a": [1, 2]}), "tmp_a")
+    with pytest.raises(sqlite3.Error):
+        operator.uploadDataToTable(pd.DataFrame([[1, 2]], columns=["a", "a"]), "tmp_a")
+    assert operator.selectToTable("tmp_a")["a"].tolist() == [1, 2]
+    assert not operator.conn.in_transaction
+
+
+def test_upload_falls_back_to_to_sql_for_timedelta(sqlite_operator):
+    operator = sqlite_operator()
+    with pytest.warns(UserWarning, match="timedelta"):
+        operator.uploadDataToTable(pd.DataFrame({"wait": pd.to_timedelta([1], unit="s")}), "tmp_wait")
+    assert operator.selectToTable("tmp_wait")["wait"].tolist() == [1_000_000_000]
+
+
+def test_performance_mode_sets_pragmas(sqlite_operator, tmp_path):
+    operator = sqlite_operator(str(tmp_path / "engine.db"))
+    applied = operator.enablePerformanceMode()
+    assert applied == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": 2,
+    }
+    # journal_mode=WAL はファイルに残る
+    assert sqlite3.connect(str(tmp_path / "engine.db")).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_constructor_enables_performance_mode(tmp_path):
+    path = str(tmp_path / "engine.db")
+    operator = DBOperatorSQLITE3(sqlite3_db_file_path=path, sqlite3_performance_mode=True)
+    try:
+        assert operator.sqlite3_performance_mode is True
+        pragmas = {name: operator.conn.execute(f"PRAGMA {name}").fetchone()[0] for name, _ in SQLITE_PERFORMANCE_PRAGMAS}
+        assert pragmas == {"journal_mode": "wal", "synchronous": 1, "mmap_size": 268435456, "cache_size": -65536, "temp_store": 2}
+        assert operator.conn.isolation_level is None
+    finally:
+        operator.conn.close()
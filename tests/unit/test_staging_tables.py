@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+
+def test_staging_table_is_dropped_after_use(sqlite_operator):
+    operator = sqlite_operator()
+    with operator.stagingTable(pd.DataFrame({"document_id": ["a", "b"]}), "tmp_req_check") as tmp_table:
+        assert tmp_table.startswith("tmp_req_check_")
+        assert operator.selectToTable(tmp_table)["document_id"].tolist() == ["a", "b"]
+    assert not operator.ifTableExists(tmp_table)
+
+
+def test_staging_table_is_dropped_on_error(sqlite_operator):
+    operator = sqlite_operator()
+    with pytest.raises(RuntimeError):
+        with operator.stagingTable(pd.DataFrame({"a": [1]}), "tmp_a") as tmp_table:
+            raise RuntimeError("merge failed")
+    assert not operator.ifTableExists(tmp_table)
+
+
+def test_staging_table_names_do_not_collide(sqlite_operator):
+    operator = sqlite_operator()
+    data = pd.DataFrame({"a": [1]})
+    with operator.stagingTable(data, "tmp_bid_requirements_ocr") as first:
+        with operator.stagingTable(data, "tmp_bid_requirements_ocr") as second:
+            assert first != second
+            assert operator.ifTableExists(first) and operator.ifTableExists(second)
+
+
+def test_staging_table_prefix_is_validated(sqlite_operator):
+    operator = sqlite_operator()
+    with pytest.raises(ValueError):
+        operator.stagingTableName("tmp; DROP TABLE x")
+
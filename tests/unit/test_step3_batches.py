@@ -0,0 +1,244 @@
+import pandas as pd
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements.experience は domain 経由で import する)
+from packages.engine.domain.judgement import JudgementMixin, Step3ResultSink, _run_step3_batch, _split_step3_batches
+from packages.engine.domain.profiling import Step3Profiler
+from packages.engine.repository.base import (
+    COMPANY_BID_JUDGEMENT_COLUMNS,
+    INSUFFICIENT_REQUIREMENTS_COLUMNS,
+    SUFFICIENT_REQUIREMENTS_COLUMNS,
+    DBOperator,
+    TablenamesConfig,
+)
+
+
+@pytest.fixture
+def req_df_map():
+    # 公告1: 要件4件、公告2: 要件1件、公告3: 要件なし
+    req_df = pd.DataFrame({
+        "announcement_no": [1, 1, 1, 1, 2],
+        "requirement_no": [0, 1, 2, 3, 0],
+    })
+    return dict(tuple(req_df.groupby("announcement_no")))
+
+
+def test_batches_keep_row_order_and_are_weighted_by_requirement_count(req_df_map):
+    df0 = pd.DataFrame({
+        "announcement_no": [2, 2, 2, 2, 1, 1, 3, 2],
+        "office_no": [1, 2, 3, 4, 5, 6, 7, 8],
+    })
+    batches = _split_step3_batches(df0, req_df_map, batch_size=4)
+    assert [batch["office_no"].tolist() for batch in batches] == [[1, 2, 3, 4], [5], [6], [7, 8]]
+    pd.testing.assert_frame_equal(pd.concat(batches), df0)
+
+
+def test_row_heavier_than_batch_size_closes_its_batch(req_df_map):
+    df0 = pd.DataFrame({"announcement_no": [2, 1, 2, 2], "office_no": [1, 2, 3, 4]})
+    batches = _split_step3_batches(df0, req_df_map, batch_size=2)
+    assert [batch["office_no"].tolist() for batch in batches] == [[1, 2], [3], [4]]
+
+
+def test_batch_size_defaults_from_worker_count(req_df_map):
+    df0 = pd.DataFrame({"announcement_no": [2] * 64, "office_no": range(64)})
+    assert len(_split_step3_batches(df0, req_df_map, n_processes=2)) == 16
+    assert _split_step3_batches(df0.iloc[:0], req_df_map) == []
+    with pytest.raises(ValueError):
+        _split_step3_batches(df0, req_df_map, batch_size=0)
+
+
+def test_run_step3_batch_returns_batch_number():
+    assert _run_step3_batch(len, (3, [1, 2])) == (3, 2)
+
+
+class RecordingOperator:
+    # 中間テーブルの作成・削除と直接書き込みの判定は DBOperator のものをそのまま使う
+    # (transaction はトランザクションの無い DB と同じく何もしない)
+    stagingTableName = DBOperator.stagingTableName
+    uploadStagingTable = DBOperator.uploadStagingTable
+    stagingTable = DBOperator.stagingTable
+    useDirectWrite = DBOperator.useDirectWrite
+    transaction = DBOperator.transaction
+
+    def __init__(self, direct_write_max_rows=0):
+        self.direct_write_max_rows = direct_write_max_rows
+        self.tables = {}
+        self.inserted = {"judgement": [], "sufficient": [], "insufficient": []}
+        self.direct = []
+
+    def insertRowsDirect(self, target_tablename, data, skip_existing_key=None):
+        self.direct.append((target_tablename, data.shape[0]))
+        return data.shape[0]
+
+    def uploadDataToTable(self, data, tablename, chunksize=1):
+        self.tables[tablename] = data
+
+    def dropTable(self, tablename):
+        del self.tables[tablename]
+
+    def updateCompanyBidJudgement(self, company_bid_judgement_tablename, company_bid_judgement_tablename_for_update):
+        self.inserted["judgement"].append(len(self.tables[company_bid_judgement_tablename_for_update]))
+
+    def updateSufficientRequirements(self, sufficient_requirements_tablename, sufficient_requirements_tablename_for_update):
+        self.inserted["sufficient"].append(len(self.tables[sufficient_requirements_tablename_for_update]))
+
+    def updateInsufficientRequirements(self, insufficient_requirements_tablename, insufficient_requirements_tablename_for_update):
+        self.inserted["insufficient"].append(len(self.tables[insufficient_requirements_tablename_for_update]))
+
+
+def _result(n_judgement, n_sufficient, n_insufficient):
+    return {
+        "judgement": [{"evaluation_no": str(i)} for i in range(n_judgement)],
+        "sufficient": [{"sufficiency_detail_no": str(i)} for i in range(n_sufficient)],
+        "insufficient": [{"shortage_detail_no": str(i)} for i in range(n_insufficient)],
+    }
+
+
+def _sink(db_operator, flush_size, profiler=None):
+    return Step3ResultSink(
+        db_operator=db_operator,
+        tablename_company_bid_judgement="company_bid_judgement",
+        tablename_sufficient_requirement_master="sufficient_requirements",
+        tablename_insufficient_requirement_master="insufficient_requirements",
+        flush_size=flush_size,
+        profiler=profiler,
+    )
+
+
+def test_result_sink_flushes_every_flush_size_rows():
+    db_operator = RecordingOperator()
+    with _sink(db_operator, flush_size=5) as sink:
+        sink.add(_result(1, 2, 0))
+        assert db_operator.inserted["judgement"] == []
+        sink.add(_result(1, 0, 2))
+        sink.add(_result(1, 1, 0))
+    assert db_operator.inserted == {"judgement": [2, 1], "sufficient": [2, 1], "insufficient": [2]}
+    assert sink.written == {"judgement": 3, "sufficient": 3, "insufficient": 2}
+    assert db_operator.tables == {}
+
+
+def test_result_sink_keeps_flushed_rows_when_run_fails():
+    db_operator = RecordingOperator()
+    with pytest.raises(RuntimeError):
+        with _sink(db_operator, flush_size=2) as sink:
+            sink.add(_result(1, 1, 0))
+            sink.add(_result(1, 0, 0))
+            raise RuntimeError("worker failed")
+    assert db_operator.inserted == {"judgement": [1], "sufficient": [1], "insufficient": []}
+
+
+def test_result_sink_times_uploads_and_updates():
+    profiler = Step3Profiler()
+    with _sink(RecordingOperator(), flush_size=2, profiler=profiler) as sink:
+        sink.add(_result(1, 1, 0))
+        sink.add(_result(1, 0, 0))
+    calls = {row["name"]: row["calls"] for row in profiler.rows()}
+    assert calls == {"upload judgement": 2, "update judgement": 2, "upload sufficient": 1, "update sufficient": 1}
+
+
+def test_result_sink_inserts_small_flushes_directly():
+    db_operator = RecordingOperator(direct_write_max_rows=2)
+    profiler = Step3Profiler()
+    result = _result(0, 3, 0)
+    result["judgement"] = [{column: str(i) for column in COMPANY_BID_JUDGEMENT_COLUMNS} for i in range(2)]
+    with _sink(db_operator, flush_size=4, profiler=profiler) as sink:
+        sink.add(result)
+    # 2行以下は直接、3行は中間テーブル経由
+    assert db_operator.direct == [("company_bid_judgement", 2)]
+    assert db_operator.inserted == {"judgement": [], "sufficient": [3], "insufficient": []}
+    assert db_operator.tables == {}
+    calls = {row["name"]: row["calls"] for row in profiler.rows()}
+    assert calls == {"insert judgement": 1, "upload sufficient": 1, "update sufficient": 1}
+
+
+def test_result_sink_writes_judgements_last_without_transactions():
+    db_operator = RecordingOperator()
+
+    def fail(sufficient_requirements_tablename, sufficient_requirements_tablename_for_update):
+        raise RuntimeError("update failed")
+
+    db_operator.updateSufficientRequirements = fail
+    with pytest.raises(RuntimeError):
+        with _sink(db_operator, flush_size=3) as sink:
+            sink.add(_result(1, 1, 1))
+    # 判定結果は書き込まれていないので、再実行すると preselect で再び選ばれる
+    assert db_operator.inserted == {"judgement": [], "sufficient": [], "insufficient": [1]}
+    assert db_operator.tables == {}
+
+
+def _rows(columns, evaluation_nos, key_column=None):
+    return [
+        {column: (f"{key_column}_{i}" if column == key_column else evaluation_no if column == "evaluation_no" else 1)
+         for column in columns}
+        for i, evaluation_no in enumerate(evaluation_nos)
+    ]
+
+
+def _create_step3_tables(operator):
+    config = TablenamesConfig()
+    operator.createCompanyBidJudgements(config.company_bid_judgement)
+    operator.createSufficientRequirements(config.sufficient_requirements)
+    operator.createInsufficientRequirements(config.insufficient_requirements)
+    return config
+
+
+def _evaluation_nos(operator, tablename):
+    return sorted(row[0] for row in operator.conn.execute(f'SELECT evaluation_no FROM "{tablename}"').fetchall())
+
+
+@pytest.mark.parametrize("direct_write_max_rows", [0, 5000])
+def test_result_sink_rolls_back_whole_flush_when_detail_write_fails(sqlite_operator, direct_write_max_rows):
+    operator = sqlite_operator()
+    operator.direct_write_max_rows = direct_write_max_rows
+    config = _create_step3_tables(operator)
+    insert_rows_direct = operator.insertRowsDirect
+
+    def fail_direct(target_tablename, data, skip_existing_key=None):
+        if target_tablename == config.sufficient_requirements:
+            raise RuntimeError("insert failed")
+        return insert_rows_direct(target_tablename, data, skip_existing_key)
+
+    def fail_update(sufficient_requirements_tablename, sufficient_requirements_tablename_for_update):
+        raise RuntimeError("update failed")
+
+    operator.insertRowsDirect = fail_direct
+    operator.updateSufficientRequirements = fail_update
+    result = {
+        "judgement": _rows(COMPANY_BID_JUDGEMENT_COLUMNS, ["e1"]),
+        "sufficient": _rows(SUFFICIENT_REQUIREMENTS_COLUMNS, ["e1"], "sufficiency_detail_no"),
+        "insufficient": _rows(INSUFFICIENT_REQUIREMENTS_COLUMNS, ["e1"], "shortage_detail_no"),
+    }
+    with pytest.raises(RuntimeError):
+        with _sink(operator, flush_size=3) as sink:
+            sink.add(result)
+
+    # 先に書いた不足要件も含めて何も残らない
+    for tablename in (config.company_bid_judgement, config.sufficient_requirements, config.insufficient_requirements):
+        assert _evaluation_nos(operator, tablename) == []
+    assert not operator.conn.in_transaction
+    assert not [name for name, in operator.conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'tmp_%'")]
+
+
+class Step3Host(JudgementMixin):
+    def __init__(self, db_operator):
+        self.db_operator = db_operator
+        self.tablenamesconfig = TablenamesConfig()
+
+
+def test_orphan_details_are_deleted_before_rerun(sqlite_operator):
+    operator = sqlite_operator()
+    config = _create_step3_tables(operator)
+    operator.insertRowsDirect(config.company_bid_judgement, pd.DataFrame(_rows(COMPANY_BID_JUDGEMENT_COLUMNS, ["e1"])))
+    operator.insertRowsDirect(
+        config.sufficient_requirements,
+        pd.DataFrame(_rows(SUFFICIENT_REQUIREMENTS_COLUMNS, ["e1", "e2", "e2"], "sufficiency_detail_no")),
+    )
+    operator.insertRowsDirect(
+        config.insufficient_requirements,
+        pd.DataFrame(_rows(INSUFFICIENT_REQUIREMENTS_COLUMNS, ["e3"], "shortage_detail_no")),
+    )
+
+    Step3Host(operator)._delete_orphan_step3_details()
+    assert _evaluation_nos(operator, config.sufficient_requirements) == ["e1"]
+    assert _evaluation_nos(operator, config.insufficient_requirements) == []
+    assert _evaluation_nos(operator, config.company_bid_judgement) == ["e1"]
@@ -0,0 +1,145 @@
+import pandas as pd
+import pytest
+
+import packages.engine.domain  # noqa: F401  (requirements.experience は domain 経由で import する)
+from packages.engine.domain.judgement import JudgementMixin
+from packages.engine.repository.base import DBOperator, TablenamesConfig
+from packages.engine.requirements.fingerprint import (
+    announcementFingerprints,
+    changedKeys,
+    officeFingerprints,
+)
+
+
+@pytest.fixture
+def master_data_dict():
+    return {
+        "company": pd.DataFrame({"company_no": [1, 2], "id": ["cmp-1", "cmp-2"]}),
+        "disqualifications": pd.DataFrame({"company_id": ["cmp-2"], "article_71_flag": [False]}),
+        "office": pd.DataFrame({
+            "office_no": [1, 2, 3],
+            "company_no": [1, 1, 2],
+            "office_type": ["本社", "支店", "本社"],
+        }),
+        "office_registration_authorization": pd.DataFrame({"office_no": [1, 3], "license_grade": ["A", "B"]}),
+        "office_work_achivements": pd.DataFrame({"office_no": [2], "final_score": [80]}),
+        "employee": pd.DataFrame({"employee_no": [10, 11], "company_no": [1, 2], "office_no": [1, 3]}),
+        "employee_qualification": pd.DataFrame({"employee_no": [10, 11], "qualification_no": [1, 2]}),
+        "employee_experience": pd.DataFrame({"employee_no": pd.Series([], dtype="int64")}),
+        "agency": pd.DataFrame({"agency_no": [1], "agency_name": ["全省庁統一"]}),
+        "construction": pd.DataFrame({"construction_no": [1], "construction_name": ["土木"]}),
+        "technician_qualification": pd.DataFrame({"qualification_no": [1, 2], "qualification_name": ["a", "b"]}),
+    }
+
+
+def _changedOffices(before, after):
+    return changedKeys(officeFingerprints(after), officeFingerprints(before), ["company_no", "office_no"])["office_no"].tolist()
+
+
+def test_office_fingerprints_are_stable(master_data_dict):
+    first = officeFingerprints(master_data_dict)
+    assert first["office_no"].tolist() == [1, 2, 3]
+    assert first["fingerprint"].nunique() == 3
+    pd.testing.assert_frame_equal(first, officeFingerprints({k: v.copy() for k, v in master_data_dict.items()}))
+
+
+@pytest.mark.parametrize("name, edit, expected", [
+    ("office_registration_authorization", lambda df: df.assign(license_grade=["A", "C"]), [3]),
+    ("office_work_achivements", lambda df: df.assign(final_score=[90]), [2]),
+    ("employee_qualification", lambda df: df.assign(qualification_no=[2, 2]), [1]),
+    ("disqualifications", lambda df: df.assign(article_71_flag=[True]), [3]),
+    ("company", lambda df: df.assign(id=["cmp-1", "cmp-9"]), [3]),
+    ("agency", lambda df: df.assign(agency_name=["防衛省"]), [1, 2, 3]),
+])
+def test_only_offices_whose_inputs_changed_are_reported(master_data_dict, name, edit, expected):
+    edited = dict(master_data_dict)
+    edited[name] = edit(master_data_dict[name])
+    assert _changedOffices(master_data_dict, edited) == expected
+
+
+def test_row_order_within_office_is_part_of_fingerprint(master_data_dict):
+    edited = dict(master_data_dict)
+    edited["office_registration_authorization"] = pd.DataFrame({"office_no": [1, 1], "license_grade": ["A", "B"]})
+    reordered = dict(master_data_dict)
+    reordered["office_registration_authorization"] = pd.DataFrame({"office_no": [1, 1], "license_grade": ["B", "A"]})
+    assert _changedOffices(edited, reordered) == [1]
+
+
+def test_announcement_fingerprints_follow_requirement_set():
+    req_df = pd.DataFrame({
+        "announcement_no": [1, 1, 2],
+        "requirement_no": [0, 1, 0],
+        "requirement_type": ["欠格要件", "所在地要件", "その他要件"],
+        "requirement_text": ["破産者でないこと", "愛知県内に本店を有すること", "JV"],
+        "updatedDate": ["2024-01-01", "2024-01-01", "2024-01-01"],
+    })
+    before = announcementFingerprints(req_df)
+    touched = announcementFingerprints(req_df.assign(updatedDate="2025-01-01"))
+    assert changedKeys(touched, before, ["announcement_no"]).shape[0] == 0
+
+    edited = req_df.copy()
+    edited.loc[2, "requirement_text"] = "共同企業体"
+    assert changedKeys(announcementFingerprints(edited), before, ["announcement_no"])["announcement_no"].tolist() == [2]
+
+
+def test_new_keys_are_not_reported_as_changed(master_data_dict):
+    current = officeFingerprints(master_data_dict)
+    assert changedKeys(current, current.iloc[:1], ["company_no", "office_no"]).shape[0] == 0
+    assert changedKeys(current, None, ["company_no", "office_no"]).shape[0] == 0
+
+
+class FingerprintOperator:
+    # 中間テーブルの作成・削除は DBOperator のものをそのまま使う
+    stagingTableName = DBOperator.stagingTableName
+    uploadStagingTable = DBOperator.uploadStagingTable
+    stagingTable = DBOperator.stagingTable
+
+    def __init__(self, tables):
+        self.tables = dict(tables)
+        self.deleted = []
+
+    def ifTableExists(self, tablename):
+        return tablename in self.tables
+
+    def selectToTable(self, tablename, where_clause=""):
+        return self.tables[tablename]
+
+    def uploadDataToTable(self, data, tablename, chunksize=1):
+        self.tables[tablename] = data
+
+    def dropTable(self, tablename):
+        del self.tables[tablename]
+
+    def deleteRowsByKeys(self, target_tablename, source_tablename, key_column):
+        self.deleted.append((target_tablename, key_column, self.tables[source_tablename][key_column].tolist()))
+
+
+class Step3Host(JudgementMixin):
+    def __init__(self, db_operator):
+        self.db_operator = db_operator
+        self.tablenamesconfig = TablenamesConfig()
+
+
+def test_invalidate_deletes_results_of_changed_offices_only(master_data_dict):
+    config = TablenamesConfig()
+    offices = officeFingerprints(master_data_dict)
+    announcements = pd.DataFrame({"announcement_no": [1], "fingerprint": ["0"]})
+    db_operator = FingerprintOperator({
+        config.step3_office_fingerprints: offices.assign(fingerprint=["x", *offices["fingerprint"][1:]]),
+        config.step3_announcement_fingerprints: announcements,
+    })
+    Step3Host(db_operator)._invalidate_changed_step3_results(offices, announcements)
+    assert db_operator.deleted == [
+        (config.company_bid_judgement, "office_no", [1]),
+        (config.sufficient_requirements, "office_no", [1]),
+        (config.insufficient_requirements, "office_no", [1]),
+    ]
+    assert "tmp_step3_changed_keys" not in db_operator.tables
+
+
+def test_invalidate_without_stored_fingerprints_keeps_existing_results(master_data_dict):
+    db_operator = FingerprintOperator({})
+    Step3Host(db_operator)._invalidate_changed_step3_results(
+        officeFingerprints(master_data_dict), pd.DataFrame({"announcement_no": [1], "fingerprint": ["0"]})
+    )
+    assert db_operator.deleted == []
@@ -0,0 +1,56 @@
+import csv
+import json
+
+from packages.engine.domain.profiling import Step3Profiler, load_checker_costs
+
+
+def test_profiler_accumulates_calls_and_time_per_name():
+    profiler = Step3Profiler()
+    profiler.record("checker", "欠格要件", 0.5)
+    profiler.record("checker", "欠格要件", 0.25)
+    with profiler.measure("phase", "preselect"):
+        pass
+    rows = {(row["kind"], row["name"]): row for row in profiler.rows()}
+    assert rows[("checker", "欠格要件")]["calls"] == 2
+    assert rows[("checker", "欠格要件")]["seconds"] == 0.75
+    assert rows[("checker", "欠格要件")]["mean_ms"] == 375.0
+    assert rows[("phase", "preselect")]["calls"] == 1
+
+
+def test_worker_stats_merge_into_parent():
+    parent = Step3Profiler()
+    for _ in range(2):
+        worker = Step3Profiler()
+        worker.record("checker", "所在地要件", 1.0, calls=3)
+        parent.merge(worker.take())
+        assert worker.take() == []
+    assert parent.rows() == [
+        {"kind": "checker", "name": "所在地要件", "calls": 6, "seconds": 2.0, "mean_ms": 333.333}
+    ]
+
+
+def test_report_is_written_as_json_or_csv(tmp_path):
+    profiler = Step3Profiler()
+    profiler.record("phase", "load master", 1.5)
+
+    json_path = tmp_path / "profile.json"
+    profiler.write_report(str(json_path))
+    assert json.loads(json_path.read_text(encoding="utf-8")) == profiler.rows()
+
+    csv_path = tmp_path / "reports" / "profile.csv"
+    profiler.write_report(str(csv_path))
+    with open(csv_path, encoding="utf-8") as f:
+        assert list(csv.DictReader(f)) == [
+            {"kind": "phase", "name": "load master", "calls": "1", "seconds": "1.5", "mean_ms": "1500.0"}
+        ]
+
+
+def test_checker_costs_are_read_from_report(tmp_path):
+    profiler = Step3Profiler()
+    profiler.record("phase", "preselect", 1.0)
+    profiler.record("checker", "欠格要件", 0.2, calls=100)
+    profiler.record("checker", "所在地要件", 0.01, calls=100)
+    for name in ("profile.json", "profile.csv"):
+        path = str(tmp_path / name)
+        profiler.write_report(path)
+        assert load_checker_costs(path) == {"欠格要件": 2.0, "所在地要件": 0.1}
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from packages.engine.benchmarks.synthetic import MATCHING_ACHIEVEMENTS, generateSyntheticData, resolveScale, writeMasterFiles
+from packages.engine.domain.master import _process_judgement_chunk
+from packages.engine.requirements.master_registry import MASTER_FILES, MasterRegistry
+
+
+def test_same_seed_generates_same_data():
+    first = generateSyntheticData(n_offices=50, n_announcements=3, seed=7)
+    second = generateSyntheticData(n_offices=50, n_announcements=3, seed=7)
+    pd.testing.assert_frame_equal(first[0], second[0])
+    pd.testing.assert_frame_equal(first[1], second[1])
+    for name, data in first[2].items():
+        pd.testing.assert_frame_equal(data, second[2][name])
+
+
+def test_pairs_cover_every_office_for_each_announcement():
+    pairs, req_df, master_data_dict = generateSyntheticData(n_offices=30, offices_per_company=3, n_announcements=4)
+    assert pairs.shape[0] == 30 * 4
+    assert master_data_dict["company"].shape[0] == 10
+    assert set(req_df["announcement_no"]) <= set(pairs["announcement_no"])
+    assert master_data_dict["office_work_achivements"].empty
+
+
+@pytest.mark.parametrize("scale, expected", [("1k", 1000), ("10k", 10000), (250, 250), ("250", 250)])
+def test_resolve_scale(scale, expected):
+    assert resolveScale(scale) == expected
+
+
+def test_written_masters_are_read_by_registry(tmp_path):
+    _, _, master_data_dict = generateSyntheticData(n_offices=20, achievements=True)
+    writeMasterFiles(master_data_dict, str(tmp_path))
+    registry = MasterRegistry(str(tmp_path))
+    for name in MASTER_FILES:
+        assert registry.get(name).shape[0] == master_data_dict[name].shape[0]
+
+
+def test_matching_achievements_take_the_experience_success_path():
+    pairs, req_df, master_data_dict = generateSyntheticData(n_offices=20, n_announcements=4, matching_achievements=True, seed=1)
+    assert master_data_dict["office_work_achivements"].shape[0] == 20 * len(MATCHING_ACHIEVEMENTS)
+    experience_announcements = set(req_df.loc[req_df["requirement_type"] == "実績要件", "announcement_no"])
+    assert experience_announcements
+
+    req_df_map = dict(tuple(req_df.groupby("announcement_no")))
+    result = _process_judgement_chunk((pairs, req_df_map, master_data_dict))
+    assert not [row for row in result["insufficient"] if row["requirement_type"] == "実績要件"]
+    succeeded = [row for row in result["sufficient"] if row["requirement_type"] == "実績要件"]
+    assert {row["announcement_no"] for row in succeeded} == experience_announcements
+    assert all(row["requirement_description"].startswith("実績要件：") for row in succeeded)